@@ -0,0 +1,47 @@
+# api/client.py
+import http.client
+import os
+import threading
+from urllib.parse import urlsplit
+
+from api.protocol import encode, decode, raise_error, RemoteError
+
+_local = threading.local()
+
+def _base():
+    u = urlsplit(os.getenv("HOSPITAL_API_URL", "http://127.0.0.1:8765"))
+    return u.hostname or "127.0.0.1", u.port or 80
+
+def _connection(fresh=False) -> http.client.HTTPConnection:
+    # Her thread kendi keep-alive bağlantısını kullanır (prefetch thread'leri dahil)
+    conn = getattr(_local, "conn", None)
+    if conn is None or fresh:
+        if conn is not None:
+            conn.close()
+        host, port = _base()
+        conn = http.client.HTTPConnection(host, port, timeout=float(os.getenv("HOSPITAL_API_TIMEOUT", "30")))
+        _local.conn = conn
+    return conn
+
+def call(name: str, args=(), kwargs=None):
+    body = encode({"args": list(args), "kwargs": kwargs or {}})
+    headers = {"Content-Type": "application/json"}
+
+    for attempt in (0, 1):
+        conn = _connection(fresh=attempt > 0)
+        try:
+            conn.request("POST", f"/op/{name}", body=body, headers=headers)
+            resp = conn.getresponse()
+            payload = decode(resp.read())
+            break
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+            # sunucu boştaki keep-alive bağlantısını kapatmış olabilir: bir kez yeniden dene
+            if attempt:
+                raise RemoteError(f"API server unreachable: {e}") from e
+        except (OSError, http.client.HTTPException) as e:
+            _local.conn = None
+            raise RemoteError(f"API server unreachable: {e}") from e
+
+    if resp.status != 200:
+        raise_error((payload or {}).get("error", {"message": f"HTTP {resp.status}"}))
+    return payload.get("result")
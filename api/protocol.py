@@ -0,0 +1,57 @@
+# api/protocol.py
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from collections.abc import Mapping
+
+from services.base import ServiceError
+
+class RemoteError(Exception):
+    """Unexpected (DB / server) error raised by the API server."""
+
+def _json_default(v):
+    # Decimal -> str: tutarlar kayıpsız taşınır, UI zaten str() ile basıyor
+    if isinstance(v, Decimal):
+        return str(v)
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    if isinstance(v, Mapping):
+        return dict(v)
+    raise TypeError(f"Not JSON serializable: {type(v).__name__}")
+
+def to_plain(v):
+    """RowMapping / list[RowMapping] -> dict / list[dict]."""
+    if isinstance(v, Mapping):
+        return dict(v)
+    if isinstance(v, (list, tuple)):
+        return [to_plain(x) for x in v]
+    return v
+
+def encode(obj) -> bytes:
+    return json.dumps(obj, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+def decode(raw: bytes):
+    return json.loads(raw.decode("utf-8")) if raw else None
+
+def _error_classes():
+    out, todo = {}, [ServiceError]
+    while todo:
+        cls = todo.pop()
+        out[cls.__name__] = cls
+        todo.extend(cls.__subclasses__())
+    return out
+
+def error_payload(exc: Exception) -> dict:
+    payload = {"type": type(exc).__name__, "message": str(exc)}
+    if getattr(exc, "current", None) is not None:
+        # ConcurrencyConflict: sunucudaki güncel satır
+        payload["current"] = to_plain(exc.current)
+    return payload
+
+def raise_error(payload: dict):
+    """Re-raise a server-side error on the client with the same class when it is a ServiceError."""
+    cls = _error_classes().get(payload.get("type"), RemoteError)
+    err = cls(payload.get("message", ""))
+    if "current" in payload:
+        err.current = payload["current"]
+    raise err
@@ -0,0 +1,228 @@
+# api/server.py
+"""
+Optional local HTTP/JSON API so many desks share one pooled backend.
+
+    python -m api.server [--host 127.0.0.1] [--port 8765] [--workers 8] [--async-db] [--standin [path]]
+
+--async-db runs operations on the asyncio engine (services/aio.py) instead of
+a worker thread per in-flight query.
+
+Desks then run in thin-client mode:
+    HOSPITAL_API_URL=http://127.0.0.1:8765 python app.py
+
+Protocol: POST /op/<module.function> with {"args": [...], "kwargs": {...}}
+-> 200 {"result": ...} | 4xx/5xx {"error": {"type", "message"}}.  GET /health -> stats.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class ResultCache:
+    """
+    TTL cache for read operations, tagged with the tables they read.
+    Writes bump the version of their tables; a result computed while a write
+    happened on one of its tables is not stored (no stale re-caching).
+    """
+    def __init__(self, ttl_seconds: float):
+        self.ttl = ttl_seconds
+        self._items: dict[str, tuple[float, tuple, object]] = {}
+        self._versions: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        hit = self._items.get(key)
+        if hit and time.monotonic() - hit[0] < self.ttl:
+            self.hits += 1
+            return True, hit[2]
+        self.misses += 1
+        return False, None
+
+    def versions(self, tags: tuple) -> tuple:
+        return tuple(self._versions.get(t, 0) for t in tags)
+
+    def put(self, key: str, tags: tuple, seen_versions: tuple, value):
+        if self.versions(tags) != seen_versions:
+            return
+        self._items[key] = (time.monotonic(), tags, value)
+
+    def invalidate(self, tags: tuple):
+        for t in tags:
+            self._versions[t] = self._versions.get(t, 0) + 1
+        tagset = set(tags)
+        for key in [k for k, v in self._items.items() if tagset.intersection(v[1])]:
+            del self._items[key]
+
+class ApiServer:
+    def __init__(self, workers: int, cache_ttl: float, async_db: bool = False):
+        from services.base import OPERATIONS
+        self.operations = OPERATIONS
+        self.gateway = None
+        self.executor = None
+        if async_db:
+            from services.aio import AsyncGateway
+            self.gateway = AsyncGateway(max_concurrency=workers)
+        else:
+            # DB pool ile aynı boyutta: her worker thread en fazla bir bağlantı tutar
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api-db")
+        self.cache = ResultCache(cache_ttl)
+        self.inflight: dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+        self.requests = 0
+
+    async def _run(self, op, args, kwargs):
+        from api.protocol import to_plain
+        if self.gateway is not None:
+            result = await self.gateway.call(op.name, *args, **kwargs)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, lambda: op.fn(*args, **kwargs))
+        return to_plain(result)
+
+    async def dispatch(self, name: str, args: list, kwargs: dict):
+        op = self.operations.get(name)
+        if op is None:
+            raise KeyError(name)
+        self.requests += 1
+
+        if op.writes or not op.reads:
+            # yazan işlemler (okusa da, örn. rollups.refresh) hiç cache'lenmez;
+            # hata olsa bile kısmen commit edilmiş olabilir -> yine geçersiz kıl
+            try:
+                return await self._run(op, args, kwargs)
+            finally:
+                if op.writes:
+                    self.cache.invalidate(op.writes)
+
+        key = json.dumps([name, args, kwargs], sort_keys=True, default=str)
+        found, value = self.cache.get(key)
+        if found:
+            return value
+
+        # Request coalescing: aynı anda gelen aynı okuma tek sorgu olarak çalışır
+        fut = self.inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+            return await asyncio.shield(fut)
+
+        fut = asyncio.get_running_loop().create_future()
+        self.inflight[key] = fut
+        seen = self.cache.versions(op.reads)
+        try:
+            value = await self._run(op, args, kwargs)
+        except Exception as e:
+            fut.set_exception(e)
+            fut.exception()  # bekleyen yoksa "never retrieved" uyarısını önle
+            raise
+        finally:
+            self.inflight.pop(key, None)
+        self.cache.put(key, op.reads, seen, value)
+        fut.set_result(value)
+        return value
+
+    def health(self) -> dict:
+        return {
+            "operations": sorted(self.operations),
+            "requests": self.requests,
+            "cache_hits": self.cache.hits,
+            "cache_misses": self.cache.misses,
+            "coalesced": self.coalesced,
+        }
+
+    # ---------------- HTTP ----------------
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        from api.protocol import encode, decode, error_payload
+        from services.base import ServiceError
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = line.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0") or 0))
+
+                status, payload = 200, None
+                try:
+                    if method == "GET" and path == "/health":
+                        payload = self.health()
+                    elif method == "POST" and path.startswith("/op/"):
+                        req = decode(body) or {}
+                        result = await self.dispatch(path[4:], req.get("args", []), req.get("kwargs", {}))
+                        payload = {"result": result}
+                    else:
+                        status, payload = 404, {"error": {"type": "NotFound", "message": path}}
+                except KeyError as e:
+                    status, payload = 404, {"error": {"type": "NotFound", "message": f"Unknown operation {e}"}}
+                except ServiceError as e:
+                    status, payload = 409, {"error": error_payload(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": error_payload(e)}
+
+                data = encode(payload)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+async def serve(host: str, port: int, workers: int, cache_ttl: float, async_db: bool = False):
+    api = ApiServer(workers, cache_ttl, async_db)
+    server = await asyncio.start_server(api.handle_client, host, port)
+    mode = "async" if async_db else "threaded"
+    print(f"Hospital API listening on http://{host}:{port} ({len(api.operations)} operations, {mode} DB)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        if api.gateway is not None:
+            await api.gateway.aclose()
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Hospital local API server")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=int(os.getenv("MSSQL_POOL_SIZE", "5")))
+    ap.add_argument("--cache-ttl", type=float, default=30.0)
+    ap.add_argument("--async-db", action="store_true", help="use the asyncio engine (aioodbc / aiosqlite)")
+    ap.add_argument("--standin", nargs="?", const="hospital_standin.db", default=None,
+                    help="serve a local SQLite stand-in instead of SQL Server")
+    args = ap.parse_args(argv)
+
+    # Sunucu her zaman veritabanına doğrudan bağlanır (thin-client değil)
+    os.environ.pop("HOSPITAL_API_URL", None)
+    if args.standin:
+        from database import standin
+        os.environ["HOSPITAL_DB_URL"] = standin.url_for(standin.create(args.standin))
+
+    # operations registry'yi doldurmak için tüm servis modüllerini yükle
+    from services.base import load_operations
+    load_operations()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_ttl, args.async_db))
+    except KeyboardInterrupt:
+        sys.exit(0)
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,8 @@
 import sys
-from PyQt6.QtWidgets import QApplication, QMessageBox
+from PyQt6.QtWidgets import QMessageBox
+
+import profiling
+import tracing
 
 from ui.login import LoginWindow
 from ui.admin_window import AdminWindow
@@ -7,25 +10,28 @@ from ui.doctor_window import DoctorWindow
 from ui.receptionist_window import ReceptionistWindow
 
 def main():
-    app = QApplication(sys.argv)
+    # HOSPITAL_PROFILE ayarlıysa buton tıklamaları profillenir (bkz. profiling.py)
+    app = profiling.create_app(sys.argv)
     windows = {"login": None, "main": None}
 
     def show_login():
         if windows.get("main"):
             windows["main"].close()
             windows["main"] = None
+        tracing.set_session(None)
         windows["login"] = LoginWindow(on_success=open_by_role)
         windows["login"].show()
 
-    def open_by_role(session):
+    def open_by_role(session, prefetched=None):
         role = (session["role_name"] or "").lower()
+        tracing.set_session(session)
 
         if role == "admin":
-            windows["main"] = AdminWindow(session, on_logout=show_login)
+            windows["main"] = AdminWindow(session, on_logout=show_login, prefetched=prefetched)
         elif role == "doctor":
-            windows["main"] = DoctorWindow(session, on_logout=show_login)
+            windows["main"] = DoctorWindow(session, on_logout=show_login, prefetched=prefetched)
         elif role == "receptionist":
-            windows["main"] = ReceptionistWindow(session, on_logout=show_login)
+            windows["main"] = ReceptionistWindow(session, on_logout=show_login, prefetched=prefetched)
         else:
             QMessageBox.critical(None, "Error", f"Unknown role: {session['role_name']}")
             return
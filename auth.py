@@ -1,10 +1,9 @@
 # auth.py
 from sqlalchemy import text
-from db import get_engine
+from services.base import operation, connection
 
-engine = get_engine()
-
-def login(username: str, password: str):
+@operation()
+def login(username: str, password: str, conn=None):
     q = text("""
         SELECT ua.UserId, ua.RoleId, r.RoleName, ua.StaffId, ua.PatientId,
                ua.PasswordHash, ua.IsActive
@@ -13,8 +12,8 @@ def login(username: str, password: str):
         WHERE ua.Username = :u
     """)
 
-    with engine.connect() as conn:
-        row = conn.execute(q, {"u": username}).mappings().first()
+    with connection(conn) as c:
+        row = c.execute(q, {"u": username}).mappings().first()
 
     if not row:
         return None
@@ -50,7 +50,13 @@ CREATE TABLE Patient (
     Phone           NVARCHAR(20) NULL,
     Email           NVARCHAR(100) NULL,
     Address         NVARCHAR(255) NULL,
-    IsActive        BIT NOT NULL DEFAULT 1
+    IsActive        BIT NOT NULL DEFAULT 1,
+    -- Arama anahtarları: küçük harf, Türkçe karakterler sadeleştirilmiş (services/patients.normalize_name)
+    FirstNameNorm   NVARCHAR(50) NULL,
+    LastNameNorm    NVARCHAR(50) NULL,
+    -- Telefonun son 10 hanesi (services/patients.normalize_phone)
+    PhoneNorm       NVARCHAR(10) NULL,
+    RowVer          ROWVERSION               -- optimistic concurrency (services/base.update_changed)
 );
 GO
 
@@ -65,7 +71,8 @@ CREATE TABLE Staff (
     DepartmentId    INT NOT NULL,
     Phone           NVARCHAR(20) NULL,
     Email           NVARCHAR(100) NULL,
-    IsActive        BIT NOT NULL DEFAULT 1
+    IsActive        BIT NOT NULL DEFAULT 1,
+    RowVer          ROWVERSION
 );
 GO
 
@@ -79,7 +86,8 @@ CREATE TABLE UserAccount (
     RoleId          INT NOT NULL,
     StaffId         INT NULL,
     PatientId       INT NULL,
-    IsActive        BIT NOT NULL DEFAULT 1
+    IsActive        BIT NOT NULL DEFAULT 1,
+    RowVer          ROWVERSION
 );
 GO
 
@@ -130,7 +138,8 @@ CREATE TABLE Reservation (
     StatusId            INT NOT NULL,
     StartDate           DATE NOT NULL,
     EndDate             DATE NOT NULL,
-    CreatedDate         DATE NOT NULL DEFAULT GETDATE()
+    CreatedDate         DATE NOT NULL DEFAULT GETDATE(),
+    RowVer              ROWVERSION
     -- İstersen CHECK (StartDate < EndDate) ekleyebilirsin:
     -- ,CONSTRAINT CK_Reservation_Dates CHECK (StartDate < EndDate)
 );
@@ -180,7 +189,8 @@ CREATE TABLE ServiceRecord (
     ServiceDate             DATE NOT NULL,
     TotalPrice              DECIMAL(18,2) NOT NULL,
     StateCoveredAmount      DECIMAL(18,2) NOT NULL,
-    PatientPayableAmount    DECIMAL(18,2) NOT NULL
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    RowVer                  ROWVERSION               -- rollup watermark (services/rollups.py)
 );
 GO
 
@@ -203,7 +213,92 @@ CREATE TABLE Payment (
     PaymentDate     DATE NOT NULL,
     Amount          DECIMAL(18,2) NOT NULL,
     PaymentTypeId   INT NOT NULL,
-    Payer           NVARCHAR(20) NOT NULL  -- 'Patient' / 'State' gibi
+    Payer           NVARCHAR(20) NOT NULL,  -- 'Patient' / 'State' gibi
+    RowVer          ROWVERSION,
+    -- Settlement dosyası satırının anahtarı (services/payment_import.py); elle girilen ödemede NULL
+    ExternalRef     NVARCHAR(64) NULL
+);
+GO
+
+/* ============================
+   17. SERVICE RECORD BALANCE
+   ============================ */
+-- Payment ledger per ServiceRecord, maintained by services/balances.py
+-- in the same transaction as every Payment insert / delete.
+CREATE TABLE ServiceRecordBalance (
+    ServiceRecordId     INT NOT NULL PRIMARY KEY,
+    PayableAmount       DECIMAL(18,2) NOT NULL,   -- = ServiceRecord.PatientPayableAmount
+    PaidAmount          DECIMAL(18,2) NOT NULL DEFAULT 0,
+    OutstandingAmount   AS (PayableAmount - PaidAmount) PERSISTED,
+    -- U = unpaid, P = partially paid, S = settled, O = overpaid
+    BalanceStatus       AS (CAST(CASE
+                                WHEN PaidAmount > PayableAmount THEN 'O'
+                                WHEN PaidAmount = PayableAmount THEN 'S'
+                                WHEN PaidAmount = 0 THEN 'U'
+                                ELSE 'P' END AS CHAR(1))) PERSISTED
+);
+GO
+
+/* ============================
+   18. REVENUE ROLLUPS
+   ============================ */
+-- Pre-aggregated revenue, refreshed incrementally by services/rollups.py.
+-- ProgramId 0 = record without a StateProgram.
+CREATE TABLE RevenueDaily (
+    Day                     DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    ProgramId               INT NOT NULL,
+    RecordCount             INT NOT NULL,
+    TotalPrice              DECIMAL(18,2) NOT NULL,
+    StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_RevenueDaily PRIMARY KEY (Day, DepartmentId, ProgramId)
+);
+GO
+
+CREATE TABLE RevenueMonthly (
+    MonthStart              DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    ProgramId               INT NOT NULL,
+    RecordCount             INT NOT NULL,
+    TotalPrice              DECIMAL(18,2) NOT NULL,
+    StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_RevenueMonthly PRIMARY KEY (MonthStart, DepartmentId, ProgramId)
+);
+GO
+
+CREATE TABLE CollectionDaily (
+    Day                     DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    PaymentTypeId           INT NOT NULL,
+    PaymentCount            INT NOT NULL,
+    Amount                  DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_CollectionDaily PRIMARY KEY (Day, DepartmentId, PaymentTypeId)
+);
+GO
+
+CREATE TABLE CollectionMonthly (
+    MonthStart              DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    PaymentTypeId           INT NOT NULL,
+    PaymentCount            INT NOT NULL,
+    Amount                  DECIMAL(18,2) NOT NULL,
+    CONSTRAINT PK_CollectionMonthly PRIMARY KEY (MonthStart, DepartmentId, PaymentTypeId)
+);
+GO
+
+-- Last processed RowVer per source table
+CREATE TABLE RollupWatermark (
+    SourceTable             NVARCHAR(50) NOT NULL PRIMARY KEY,
+    LastRowVersion          BIGINT NOT NULL
+);
+GO
+
+-- Days touched by deletes / date changes (a watermark cannot see those)
+CREATE TABLE RevenueDirtyDay (
+    Id                      INT IDENTITY(1,1) PRIMARY KEY,
+    Day                     DATE NOT NULL
 );
 GO
 
@@ -323,4 +418,102 @@ GO
 ALTER TABLE Payment
 ADD CONSTRAINT FK_Payment_PaymentType
     FOREIGN KEY (PaymentTypeId) REFERENCES PaymentType(PaymentTypeId);
-GO
\ No newline at end of file
+GO
+-- ServiceRecordBalance → ServiceRecord
+ALTER TABLE ServiceRecordBalance
+ADD CONSTRAINT FK_ServiceRecordBalance_ServiceRecord
+    FOREIGN KEY (ServiceRecordId) REFERENCES ServiceRecord(ServiceRecordId);
+GO
+
+/* ============================
+   INDEXES
+   ============================ */
+
+-- Coverage recalculation (services/coverage.py): one program's records in ServiceRecordId order
+CREATE INDEX IX_ServiceRecord_Program
+ON ServiceRecord (ProgramId, ServiceRecordId)
+INCLUDE (TotalPrice, StateCoveredAmount, PatientPayableAmount);
+GO
+
+-- Payments tab collection queues (unpaid / partially paid / overpaid), newest first
+CREATE INDEX IX_ServiceRecordBalance_Status
+ON ServiceRecordBalance (BalanceStatus, ServiceRecordId)
+INCLUDE (PayableAmount, PaidAmount, OutstandingAmount);
+GO
+
+-- PaymentDialog record search: patient name prefix, patient -> records, service date
+CREATE INDEX IX_Patient_LastName ON Patient (LastName, FirstName);
+GO
+CREATE INDEX IX_Patient_FirstName ON Patient (FirstName, LastName);
+GO
+CREATE INDEX IX_ServiceRecord_Patient ON ServiceRecord (PatientId, ServiceRecordId);
+GO
+CREATE INDEX IX_ServiceRecord_ServiceDate ON ServiceRecord (ServiceDate, ServiceRecordId);
+GO
+
+-- Doktor iş listesi: DoctorId + tarih aralığı seek, keyset sayfalama (ServiceDate DESC, ServiceRecordId DESC)
+CREATE INDEX IX_ServiceRecord_Doctor ON ServiceRecord (DoctorId, ServiceDate, ServiceRecordId)
+INCLUDE (PatientId, ServiceId, ProgramId, TotalPrice, PatientPayableAmount, StateCoveredAmount, RowVer);
+GO
+
+-- Revenue rollups: changed rows since the watermark, and per-day recomputation
+CREATE INDEX IX_ServiceRecord_RowVer ON ServiceRecord (RowVer) INCLUDE (ServiceDate);
+GO
+CREATE INDEX IX_Payment_RowVer ON Payment (RowVer) INCLUDE (PaymentDate);
+GO
+CREATE INDEX IX_Payment_PaymentDate ON Payment (PaymentDate)
+INCLUDE (ServiceRecordId, PaymentTypeId, Amount);
+GO
+
+-- Patient search (services/patients.search_patients): normalized name prefix, TOP N
+CREATE INDEX IX_Patient_LastNameNorm ON Patient (LastNameNorm, FirstNameNorm)
+INCLUDE (FirstName, LastName, TCNo, BirthDate, IsActive);
+GO
+CREATE INDEX IX_Patient_FirstNameNorm ON Patient (FirstNameNorm, LastNameNorm)
+INCLUDE (FirstName, LastName, TCNo, BirthDate, IsActive);
+GO
+
+-- Duplicate patient check (services/duplicates.py): same / day-month swapped birth date, same phone
+CREATE INDEX IX_Patient_BirthDate ON Patient (BirthDate)
+INCLUDE (FirstNameNorm, LastNameNorm, PhoneNorm, TCNo);
+GO
+CREATE INDEX IX_Patient_PhoneNorm ON Patient (PhoneNorm)
+INCLUDE (FirstNameNorm, LastNameNorm, BirthDate, TCNo);
+GO
+
+-- Patient timeline (services/timeline.py): one patient's reservations and payments
+CREATE INDEX IX_Reservation_Patient ON Reservation (PatientId, StartDate)
+INCLUDE (RoomId, StatusId, EndDate);
+GO
+CREATE INDEX IX_Payment_ServiceRecord ON Payment (ServiceRecordId, PaymentDate)
+INCLUDE (Amount, PaymentTypeId, Payer);
+GO
+
+-- Reservation overlap check (services/reservations.py): seek + key-range lock on one room
+CREATE INDEX IX_Reservation_Room ON Reservation (RoomId, EndDate)
+INCLUDE (StartDate, StatusId);
+GO
+
+-- Settlement import: a line already posted is skipped when the file is posted again
+CREATE UNIQUE INDEX UX_Payment_ExternalRef ON Payment (ExternalRef) WHERE ExternalRef IS NOT NULL;
+GO
+
+-- Search key backfill for patients inserted outside the service layer (safe to re-run)
+UPDATE Patient
+SET FirstNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(FirstName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u'))),
+    LastNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(LastName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u')))
+WHERE FirstNameNorm IS NULL OR LastNameNorm IS NULL;
+GO
+
+UPDATE Patient
+SET PhoneNorm = NULLIF(RIGHT(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone, ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', ''), 10), '')
+WHERE PhoneNorm IS NULL AND Phone IS NOT NULL;
+GO
+
+-- Ledger backfill for records created before the ledger existed (safe to re-run)
+INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+       COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+FROM ServiceRecord sr
+WHERE NOT EXISTS (SELECT 1 FROM ServiceRecordBalance b WHERE b.ServiceRecordId = sr.ServiceRecordId);
+GO
@@ -4,6 +4,15 @@ GO
 ------------------------------------------------------------
 -- 1) Clear data (child -> parent order)  [NO DROP]
 ------------------------------------------------------------
+-- derived tables first: balance ledger (FK -> ServiceRecord) and rollups;
+-- watermark removed too, so the next refresh rebuilds the rollups from scratch
+DELETE FROM ServiceRecordBalance;
+DELETE FROM RevenueDirtyDay;
+DELETE FROM RevenueDaily;
+DELETE FROM RevenueMonthly;
+DELETE FROM CollectionDaily;
+DELETE FROM CollectionMonthly;
+DELETE FROM RollupWatermark;
 DELETE FROM Payment;
 DELETE FROM ServiceRecord;
 DELETE FROM Reservation;
@@ -136,4 +145,20 @@ INSERT INTO Payment
 (ServiceRecordId, PaymentDate, Amount, PaymentTypeId, Payer)
 VALUES
 (1, CAST(GETDATE() AS date), 100.00, 2, 'Patient'),
-(2, CAST(GETDATE() AS date), 300.00, 1, 'Patient');
\ No newline at end of file
+(2, CAST(GETDATE() AS date), 300.00, 1, 'Patient');
+
+-- Payment ledger (ServiceRecordBalance) for the seeded records
+INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+       COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+FROM ServiceRecord sr;
+
+-- Patient search / duplicate check keys for the seeded patients
+UPDATE Patient
+SET FirstNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(FirstName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u'))),
+    LastNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(LastName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u')))
+WHERE FirstNameNorm IS NULL OR LastNameNorm IS NULL;
+
+UPDATE Patient
+SET PhoneNorm = NULLIF(RIGHT(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone, ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', ''), 10), '')
+WHERE PhoneNorm IS NULL AND Phone IS NOT NULL;
@@ -0,0 +1,414 @@
+/*
+    SQLite stand-in for HospitalDB (local testing without SQL Server).
+    Same tables/columns as HospitalDB.sql + seed data of HospitalSeed.sql.
+    Create with:  python -m database.standin
+*/
+
+CREATE TABLE Role (
+    RoleId          INTEGER PRIMARY KEY AUTOINCREMENT,
+    RoleName        NVARCHAR(50) NOT NULL,
+    Description     NVARCHAR(255) NULL
+);
+
+CREATE TABLE Hospital (
+    HospitalId      INTEGER PRIMARY KEY AUTOINCREMENT,
+    HospitalName    NVARCHAR(100) NOT NULL,
+    Address         NVARCHAR(255) NULL,
+    Phone           NVARCHAR(20) NULL
+);
+
+CREATE TABLE Department (
+    DepartmentId    INTEGER PRIMARY KEY AUTOINCREMENT,
+    DepartmentName  NVARCHAR(100) NOT NULL,
+    Description     NVARCHAR(255) NULL,
+    HospitalId      INT NOT NULL REFERENCES Hospital(HospitalId)
+);
+
+CREATE TABLE Patient (
+    PatientId       INTEGER PRIMARY KEY AUTOINCREMENT,
+    FirstName       NVARCHAR(50) NOT NULL,
+    LastName        NVARCHAR(50) NOT NULL,
+    TCNo            NVARCHAR(11) NOT NULL UNIQUE COLLATE NOCASE,
+    BirthDate       DATE NOT NULL,
+    Gender          NVARCHAR(10) NULL,
+    Phone           NVARCHAR(20) NULL,
+    Email           NVARCHAR(100) NULL,
+    Address         NVARCHAR(255) NULL,
+    IsActive        BIT NOT NULL DEFAULT 1,
+    -- NOCASE: SQLite LIKE 'abc%' ancak NOCASE kolon/index ile index kullanır
+    FirstNameNorm   NVARCHAR(50) NULL COLLATE NOCASE,
+    LastNameNorm    NVARCHAR(50) NULL COLLATE NOCASE,
+    PhoneNorm       NVARCHAR(10) NULL,
+    RowVer          INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE Staff (
+    StaffId         INTEGER PRIMARY KEY AUTOINCREMENT,
+    FirstName       NVARCHAR(50) NOT NULL,
+    LastName        NVARCHAR(50) NOT NULL,
+    Title           NVARCHAR(50) NULL,
+    DepartmentId    INT NOT NULL REFERENCES Department(DepartmentId),
+    Phone           NVARCHAR(20) NULL,
+    Email           NVARCHAR(100) NULL,
+    IsActive        BIT NOT NULL DEFAULT 1,
+    RowVer          INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE UserAccount (
+    UserId          INTEGER PRIMARY KEY AUTOINCREMENT,
+    Username        NVARCHAR(50) NOT NULL UNIQUE,
+    PasswordHash    NVARCHAR(255) NOT NULL,
+    RoleId          INT NOT NULL REFERENCES Role(RoleId),
+    StaffId         INT NULL REFERENCES Staff(StaffId),
+    PatientId       INT NULL REFERENCES Patient(PatientId),
+    IsActive        BIT NOT NULL DEFAULT 1,
+    RowVer          INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE RoomType (
+    RoomTypeId      INTEGER PRIMARY KEY AUTOINCREMENT,
+    TypeName        NVARCHAR(50) NOT NULL,
+    Description     NVARCHAR(255) NULL,
+    DefaultCapacity INT NOT NULL,
+    BaseDailyPrice  DECIMAL(18,2) NOT NULL
+);
+
+CREATE TABLE Room (
+    RoomId          INTEGER PRIMARY KEY AUTOINCREMENT,
+    RoomNumber      NVARCHAR(20) NOT NULL,
+    RoomTypeId      INT NOT NULL REFERENCES RoomType(RoomTypeId),
+    HospitalId      INT NOT NULL REFERENCES Hospital(HospitalId),
+    Floor           NVARCHAR(10) NULL,
+    IsActive        BIT NOT NULL DEFAULT 1,
+    DepartmentId    INT NOT NULL REFERENCES Department(DepartmentId)
+);
+
+CREATE TABLE ReservationStatus (
+    StatusId        INTEGER PRIMARY KEY AUTOINCREMENT,
+    StatusName      NVARCHAR(50) NOT NULL,
+    Description     NVARCHAR(255) NULL
+);
+
+CREATE TABLE Reservation (
+    ReservationId       INTEGER PRIMARY KEY AUTOINCREMENT,
+    PatientId           INT NOT NULL REFERENCES Patient(PatientId),
+    RoomId              INT NOT NULL REFERENCES Room(RoomId),
+    CreatedByStaffId    INT NOT NULL REFERENCES Staff(StaffId),
+    StatusId            INT NOT NULL REFERENCES ReservationStatus(StatusId),
+    StartDate           DATE NOT NULL,
+    EndDate             DATE NOT NULL,
+    CreatedDate         DATE NOT NULL DEFAULT (DATE('now')),
+    RowVer              INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE ServiceCategory (
+    ServiceCategoryId   INTEGER PRIMARY KEY AUTOINCREMENT,
+    CategoryName        NVARCHAR(100) NOT NULL,
+    Description         NVARCHAR(255) NULL
+);
+
+CREATE TABLE HealthService (
+    ServiceId           INTEGER PRIMARY KEY AUTOINCREMENT,
+    ServiceName         NVARCHAR(100) NOT NULL,
+    ServiceCategoryId   INT NOT NULL REFERENCES ServiceCategory(ServiceCategoryId),
+    BasePrice           DECIMAL(18,2) NOT NULL
+);
+
+CREATE TABLE StateProgram (
+    ProgramId           INTEGER PRIMARY KEY AUTOINCREMENT,
+    ProgramName         NVARCHAR(100) NOT NULL,
+    Description         NVARCHAR(255) NULL,
+    CoverageRate        DECIMAL(5,2) NOT NULL
+);
+
+CREATE TABLE ServiceRecord (
+    ServiceRecordId         INTEGER PRIMARY KEY AUTOINCREMENT,
+    PatientId               INT NOT NULL REFERENCES Patient(PatientId),
+    ServiceId               INT NOT NULL REFERENCES HealthService(ServiceId),
+    DoctorId                INT NOT NULL REFERENCES Staff(StaffId),
+    ProgramId               INT NULL REFERENCES StateProgram(ProgramId),
+    ServiceDate             DATE NOT NULL,
+    TotalPrice              DECIMAL(18,2) NOT NULL,
+    StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    RowVer                  INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE PaymentType (
+    PaymentTypeId       INTEGER PRIMARY KEY AUTOINCREMENT,
+    PaymentTypeName     NVARCHAR(50) NOT NULL,
+    Description         NVARCHAR(255) NULL
+);
+
+CREATE TABLE Payment (
+    PaymentId       INTEGER PRIMARY KEY AUTOINCREMENT,
+    ServiceRecordId INT NOT NULL REFERENCES ServiceRecord(ServiceRecordId),
+    PaymentDate     DATE NOT NULL,
+    Amount          DECIMAL(18,2) NOT NULL,
+    PaymentTypeId   INT NOT NULL REFERENCES PaymentType(PaymentTypeId),
+    Payer           NVARCHAR(20) NOT NULL,
+    RowVer          INTEGER NOT NULL DEFAULT 0,
+    ExternalRef     NVARCHAR(64) NULL
+);
+
+-- Payment ledger (services/balances.py). ROUND: SQLite REAL toplamlarında kuruş hatası olmasın
+CREATE TABLE ServiceRecordBalance (
+    ServiceRecordId     INTEGER PRIMARY KEY REFERENCES ServiceRecord(ServiceRecordId),
+    PayableAmount       DECIMAL(18,2) NOT NULL,
+    PaidAmount          DECIMAL(18,2) NOT NULL DEFAULT 0,
+    OutstandingAmount   DECIMAL(18,2) GENERATED ALWAYS AS (ROUND(PayableAmount - PaidAmount, 2)) STORED,
+    BalanceStatus       CHAR(1) GENERATED ALWAYS AS (CASE
+                            WHEN ROUND(PaidAmount, 2) > ROUND(PayableAmount, 2) THEN 'O'
+                            WHEN ROUND(PaidAmount, 2) = ROUND(PayableAmount, 2) THEN 'S'
+                            WHEN PaidAmount = 0 THEN 'U'
+                            ELSE 'P' END) STORED
+);
+
+-- Revenue rollups (services/rollups.py)
+CREATE TABLE RevenueDaily (
+    Day                     DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    ProgramId               INT NOT NULL,
+    RecordCount             INT NOT NULL,
+    TotalPrice              DECIMAL(18,2) NOT NULL,
+    StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    PRIMARY KEY (Day, DepartmentId, ProgramId)
+);
+
+CREATE TABLE RevenueMonthly (
+    MonthStart              DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    ProgramId               INT NOT NULL,
+    RecordCount             INT NOT NULL,
+    TotalPrice              DECIMAL(18,2) NOT NULL,
+    StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+    PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+    PRIMARY KEY (MonthStart, DepartmentId, ProgramId)
+);
+
+CREATE TABLE CollectionDaily (
+    Day                     DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    PaymentTypeId           INT NOT NULL,
+    PaymentCount            INT NOT NULL,
+    Amount                  DECIMAL(18,2) NOT NULL,
+    PRIMARY KEY (Day, DepartmentId, PaymentTypeId)
+);
+
+CREATE TABLE CollectionMonthly (
+    MonthStart              DATE NOT NULL,
+    DepartmentId            INT NOT NULL,
+    PaymentTypeId           INT NOT NULL,
+    PaymentCount            INT NOT NULL,
+    Amount                  DECIMAL(18,2) NOT NULL,
+    PRIMARY KEY (MonthStart, DepartmentId, PaymentTypeId)
+);
+
+CREATE TABLE RollupWatermark (
+    SourceTable             NVARCHAR(50) NOT NULL PRIMARY KEY,
+    LastRowVersion          BIGINT NOT NULL
+);
+
+CREATE TABLE RevenueDirtyDay (
+    Id                      INTEGER PRIMARY KEY AUTOINCREMENT,
+    Day                     DATE NOT NULL
+);
+
+/* ============================
+   ROWVERSION (SQL Server ROWVERSION karşılığı)
+   ============================ */
+-- Veritabanı genelinde artan sayaç; her insert/update satırın RowVer'ını yeniler
+CREATE TABLE RowVersionSeq (Value INTEGER NOT NULL);
+INSERT INTO RowVersionSeq (Value) VALUES (0);
+
+CREATE TRIGGER trg_ServiceRecord_RowVer_I AFTER INSERT ON ServiceRecord
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE ServiceRecord SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE ServiceRecordId = NEW.ServiceRecordId;
+END;
+
+CREATE TRIGGER trg_ServiceRecord_RowVer_U AFTER UPDATE ON ServiceRecord
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE ServiceRecord SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE ServiceRecordId = NEW.ServiceRecordId;
+END;
+
+CREATE TRIGGER trg_Payment_RowVer_I AFTER INSERT ON Payment
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Payment SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE PaymentId = NEW.PaymentId;
+END;
+
+CREATE TRIGGER trg_Payment_RowVer_U AFTER UPDATE ON Payment
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Payment SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE PaymentId = NEW.PaymentId;
+END;
+
+CREATE TRIGGER trg_Patient_RowVer_I AFTER INSERT ON Patient
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Patient SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE PatientId = NEW.PatientId;
+END;
+
+CREATE TRIGGER trg_Patient_RowVer_U AFTER UPDATE ON Patient
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Patient SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE PatientId = NEW.PatientId;
+END;
+
+CREATE TRIGGER trg_Staff_RowVer_I AFTER INSERT ON Staff
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Staff SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE StaffId = NEW.StaffId;
+END;
+
+CREATE TRIGGER trg_Staff_RowVer_U AFTER UPDATE ON Staff
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Staff SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE StaffId = NEW.StaffId;
+END;
+
+CREATE TRIGGER trg_UserAccount_RowVer_I AFTER INSERT ON UserAccount
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE UserAccount SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE UserId = NEW.UserId;
+END;
+
+CREATE TRIGGER trg_UserAccount_RowVer_U AFTER UPDATE ON UserAccount
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE UserAccount SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE UserId = NEW.UserId;
+END;
+
+CREATE TRIGGER trg_Reservation_RowVer_I AFTER INSERT ON Reservation
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Reservation SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE ReservationId = NEW.ReservationId;
+END;
+
+CREATE TRIGGER trg_Reservation_RowVer_U AFTER UPDATE ON Reservation
+BEGIN
+    UPDATE RowVersionSeq SET Value = Value + 1;
+    UPDATE Reservation SET RowVer = (SELECT Value FROM RowVersionSeq) WHERE ReservationId = NEW.ReservationId;
+END;
+
+/* ============================
+   INDEXES (HospitalDB.sql ile aynı)
+   ============================ */
+CREATE INDEX IX_ServiceRecord_Program ON ServiceRecord (ProgramId, ServiceRecordId);
+CREATE INDEX IX_ServiceRecordBalance_Status ON ServiceRecordBalance (BalanceStatus, ServiceRecordId);
+CREATE INDEX IX_Patient_LastName ON Patient (LastName, FirstName);
+CREATE INDEX IX_Patient_FirstName ON Patient (FirstName, LastName);
+CREATE INDEX IX_Patient_LastNameNorm ON Patient (LastNameNorm, FirstNameNorm);
+CREATE INDEX IX_Patient_FirstNameNorm ON Patient (FirstNameNorm, LastNameNorm);
+CREATE INDEX IX_ServiceRecord_Patient ON ServiceRecord (PatientId, ServiceRecordId);
+CREATE INDEX IX_ServiceRecord_ServiceDate ON ServiceRecord (ServiceDate, ServiceRecordId);
+CREATE INDEX IX_ServiceRecord_Doctor ON ServiceRecord (DoctorId, ServiceDate, ServiceRecordId);
+CREATE INDEX IX_ServiceRecord_RowVer ON ServiceRecord (RowVer);
+CREATE INDEX IX_Payment_RowVer ON Payment (RowVer);
+CREATE INDEX IX_Payment_PaymentDate ON Payment (PaymentDate);
+CREATE INDEX IX_Patient_BirthDate ON Patient (BirthDate);
+CREATE INDEX IX_Patient_PhoneNorm ON Patient (PhoneNorm);
+CREATE INDEX IX_Reservation_Patient ON Reservation (PatientId, StartDate);
+CREATE INDEX IX_Reservation_Room ON Reservation (RoomId, EndDate);
+CREATE INDEX IX_Payment_ServiceRecord ON Payment (ServiceRecordId, PaymentDate);
+CREATE UNIQUE INDEX UX_Payment_ExternalRef ON Payment (ExternalRef) WHERE ExternalRef IS NOT NULL;
+
+/* ============================
+   SEED (HospitalSeed.sql ile aynı)
+   ============================ */
+INSERT INTO Hospital (HospitalName, Address, Phone)
+VALUES ('Merkez Hastanesi', 'Istanbul', '02120000000');
+
+INSERT INTO Role (RoleName, Description) VALUES
+('Admin', 'System administrator'),
+('Doctor', 'Medical doctor'),
+('Receptionist', 'Front desk staff');
+
+INSERT INTO Department (DepartmentName, Description, HospitalId) VALUES
+('Genel Servis', 'General services', 1),
+('Dahiliye', 'Internal medicine', 1);
+
+INSERT INTO Staff (FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive) VALUES
+('Ali',    'Yilmaz', 'Admin',        1, '5551112233', 'ali.admin@hospital.com', 1),
+('Ayse',   'Demir',  'Doctor',       2, '5552223344', 'ayse.dr@hospital.com',   1),
+('Mehmet', 'Kaya',   'Receptionist', 1, '5553334455', 'mehmet.rec@hospital.com',1);
+
+INSERT INTO RoomType (TypeName, Description, DefaultCapacity, BaseDailyPrice) VALUES
+('Standard', 'Standard room', 2, 1500),
+('Deluxe',   'Deluxe room',   1, 2500);
+
+INSERT INTO Room (RoomNumber, RoomTypeId, HospitalId, Floor, IsActive, DepartmentId) VALUES
+('101', 1, 1, '1', 1, 1),
+('102', 1, 1, '1', 1, 1),
+('201', 2, 1, '2', 1, 2),
+('202', 2, 1, '2', 1, 2);
+
+INSERT INTO ReservationStatus (StatusName, Description) VALUES
+('Reserved',  'Booked, not checked in'),
+('CheckedIn', 'Patient checked in'),
+('Cancelled', 'Reservation cancelled');
+
+INSERT INTO PaymentType (PaymentTypeName, Description) VALUES
+('Cash', 'Nakit'),
+('Card', 'Kredi Kartı'),
+('Transfer', 'Havale/EFT');
+
+INSERT INTO StateProgram (ProgramName, Description, CoverageRate) VALUES
+('SGK',  'Devlet kapsamı', 0.80),
+('None', 'Kapsam yok',     0.00);
+
+INSERT INTO ServiceCategory (CategoryName, Description) VALUES
+('Muayene',     'Poliklinik muayene'),
+('Laboratuvar', 'Lab testleri'),
+('Goruntuleme', 'Radyoloji / MR / BT');
+
+INSERT INTO HealthService (ServiceName, ServiceCategoryId, BasePrice) VALUES
+('Dahiliye Muayene', 1, 500),
+('Kan Testi',        2, 300),
+('MR Cekimi',        3, 1200);
+
+INSERT INTO Patient
+(FirstName, LastName, TCNo, BirthDate, Gender, Phone, Email, Address, IsActive)
+VALUES
+('Omer', 'Zorlu', '11111111111', '2001-01-01', 'Male',   '5554445566', 'omer@demo.com', 'Istanbul', 1),
+('Ece',  'Kaya',  '22222222222', '1999-05-12', 'Female', '5557778899', 'ece@demo.com',  'Istanbul', 1);
+
+INSERT INTO UserAccount (Username, PasswordHash, RoleId, StaffId, PatientId, IsActive) VALUES
+('admin',     '1234', 1, 1, NULL, 1),
+('doctor',    '1234', 2, 2, NULL, 1),
+('reception', '1234', 3, 3, NULL, 1);
+
+INSERT INTO Reservation
+(PatientId, RoomId, CreatedByStaffId, StatusId, StartDate, EndDate, CreatedDate)
+VALUES
+(1, 3, 3, 1, '2025-01-10', '2025-01-12', DATE('now')),
+(2, 1, 3, 1, '2025-01-15', '2025-01-16', DATE('now'));
+
+INSERT INTO ServiceRecord
+(PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice, StateCoveredAmount, PatientPayableAmount)
+VALUES
+(1, 1, 2, 1, DATE('now'), 500.00, 400.00, 100.00),
+(2, 2, 2, 2, DATE('now'), 300.00,   0.00, 300.00);
+
+INSERT INTO Payment
+(ServiceRecordId, PaymentDate, Amount, PaymentTypeId, Payer)
+VALUES
+(1, DATE('now'), 100.00, 2, 'Patient'),
+(2, DATE('now'), 300.00, 1, 'Patient');
+
+INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+       COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+FROM ServiceRecord sr;
+
+UPDATE Patient
+SET FirstNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(FirstName), 'ç', 'c'), 'Ç', 'c'), 'ğ', 'g'), 'Ğ', 'g'), 'ı', 'i'), 'İ', 'i'), 'ö', 'o'), 'Ö', 'o'), 'ş', 's'), 'Ş', 's'), 'ü', 'u'), 'Ü', 'u'))),
+    LastNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(LastName), 'ç', 'c'), 'Ç', 'c'), 'ğ', 'g'), 'Ğ', 'g'), 'ı', 'i'), 'İ', 'i'), 'ö', 'o'), 'Ö', 'o'), 'ş', 's'), 'Ş', 's'), 'ü', 'u'), 'Ü', 'u')))
+WHERE FirstNameNorm IS NULL OR LastNameNorm IS NULL;
+
+UPDATE Patient
+SET PhoneNorm = NULLIF(SUBSTR(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone, ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', ''), -10), '')
+WHERE PhoneNorm IS NULL AND Phone IS NOT NULL;
@@ -0,0 +1,236 @@
+/*
+    Brings a HospitalDB created from an older HospitalDB.sql up to date.
+    Every step checks first, so the script is safe to re-run; data is kept.
+    New databases: HospitalDB.sql already contains all of this.
+*/
+
+USE HospitalDB;
+GO
+
+/* ============================
+   1. ROWVERSION COLUMNS
+   ============================ */
+-- Optimistic concurrency (services/base.update_changed) and rollup watermarks (services/rollups.py).
+-- Tablo başına tek ROWVERSION kolonu olabilir: varsa dokunma.
+IF COL_LENGTH('Patient', 'RowVer') IS NULL
+    ALTER TABLE Patient ADD RowVer ROWVERSION;
+GO
+IF COL_LENGTH('Staff', 'RowVer') IS NULL
+    ALTER TABLE Staff ADD RowVer ROWVERSION;
+GO
+IF COL_LENGTH('UserAccount', 'RowVer') IS NULL
+    ALTER TABLE UserAccount ADD RowVer ROWVERSION;
+GO
+IF COL_LENGTH('Reservation', 'RowVer') IS NULL
+    ALTER TABLE Reservation ADD RowVer ROWVERSION;
+GO
+IF COL_LENGTH('ServiceRecord', 'RowVer') IS NULL
+    ALTER TABLE ServiceRecord ADD RowVer ROWVERSION;
+GO
+IF COL_LENGTH('Payment', 'RowVer') IS NULL
+    ALTER TABLE Payment ADD RowVer ROWVERSION;
+GO
+
+/* ============================
+   2. PATIENT SEARCH KEYS
+   ============================ */
+-- services/patients.normalize_name / normalize_phone
+IF COL_LENGTH('Patient', 'FirstNameNorm') IS NULL
+    ALTER TABLE Patient ADD FirstNameNorm NVARCHAR(50) NULL;
+GO
+IF COL_LENGTH('Patient', 'LastNameNorm') IS NULL
+    ALTER TABLE Patient ADD LastNameNorm NVARCHAR(50) NULL;
+GO
+IF COL_LENGTH('Patient', 'PhoneNorm') IS NULL
+    ALTER TABLE Patient ADD PhoneNorm NVARCHAR(10) NULL;
+GO
+
+-- Settlement import key (services/payment_import.py)
+IF COL_LENGTH('Payment', 'ExternalRef') IS NULL
+    ALTER TABLE Payment ADD ExternalRef NVARCHAR(64) NULL;
+GO
+
+/* ============================
+   3. LEDGER AND ROLLUP TABLES
+   ============================ */
+IF OBJECT_ID('ServiceRecordBalance', 'U') IS NULL
+BEGIN
+    CREATE TABLE ServiceRecordBalance (
+        ServiceRecordId     INT NOT NULL PRIMARY KEY,
+        PayableAmount       DECIMAL(18,2) NOT NULL,
+        PaidAmount          DECIMAL(18,2) NOT NULL DEFAULT 0,
+        OutstandingAmount   AS (PayableAmount - PaidAmount) PERSISTED,
+        BalanceStatus       AS (CAST(CASE
+                                    WHEN PaidAmount > PayableAmount THEN 'O'
+                                    WHEN PaidAmount = PayableAmount THEN 'S'
+                                    WHEN PaidAmount = 0 THEN 'U'
+                                    ELSE 'P' END AS CHAR(1))) PERSISTED,
+        CONSTRAINT FK_ServiceRecordBalance_ServiceRecord
+            FOREIGN KEY (ServiceRecordId) REFERENCES ServiceRecord(ServiceRecordId)
+    );
+END
+GO
+
+IF OBJECT_ID('RevenueDaily', 'U') IS NULL
+    CREATE TABLE RevenueDaily (
+        Day                     DATE NOT NULL,
+        DepartmentId            INT NOT NULL,
+        ProgramId               INT NOT NULL,
+        RecordCount             INT NOT NULL,
+        TotalPrice              DECIMAL(18,2) NOT NULL,
+        StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+        PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+        CONSTRAINT PK_RevenueDaily PRIMARY KEY (Day, DepartmentId, ProgramId)
+    );
+GO
+
+IF OBJECT_ID('RevenueMonthly', 'U') IS NULL
+    CREATE TABLE RevenueMonthly (
+        MonthStart              DATE NOT NULL,
+        DepartmentId            INT NOT NULL,
+        ProgramId               INT NOT NULL,
+        RecordCount             INT NOT NULL,
+        TotalPrice              DECIMAL(18,2) NOT NULL,
+        StateCoveredAmount      DECIMAL(18,2) NOT NULL,
+        PatientPayableAmount    DECIMAL(18,2) NOT NULL,
+        CONSTRAINT PK_RevenueMonthly PRIMARY KEY (MonthStart, DepartmentId, ProgramId)
+    );
+GO
+
+IF OBJECT_ID('CollectionDaily', 'U') IS NULL
+    CREATE TABLE CollectionDaily (
+        Day                     DATE NOT NULL,
+        DepartmentId            INT NOT NULL,
+        PaymentTypeId           INT NOT NULL,
+        PaymentCount            INT NOT NULL,
+        Amount                  DECIMAL(18,2) NOT NULL,
+        CONSTRAINT PK_CollectionDaily PRIMARY KEY (Day, DepartmentId, PaymentTypeId)
+    );
+GO
+
+IF OBJECT_ID('CollectionMonthly', 'U') IS NULL
+    CREATE TABLE CollectionMonthly (
+        MonthStart              DATE NOT NULL,
+        DepartmentId            INT NOT NULL,
+        PaymentTypeId           INT NOT NULL,
+        PaymentCount            INT NOT NULL,
+        Amount                  DECIMAL(18,2) NOT NULL,
+        CONSTRAINT PK_CollectionMonthly PRIMARY KEY (MonthStart, DepartmentId, PaymentTypeId)
+    );
+GO
+
+IF OBJECT_ID('RollupWatermark', 'U') IS NULL
+    CREATE TABLE RollupWatermark (
+        SourceTable             NVARCHAR(50) NOT NULL PRIMARY KEY,
+        LastRowVersion          BIGINT NOT NULL
+    );
+GO
+
+IF OBJECT_ID('RevenueDirtyDay', 'U') IS NULL
+    CREATE TABLE RevenueDirtyDay (
+        Id                      INT IDENTITY(1,1) PRIMARY KEY,
+        Day                     DATE NOT NULL
+    );
+GO
+
+/* ============================
+   4. INDEXES
+   ============================ */
+-- Same definitions as the INDEXES section of HospitalDB.sql
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecord_Program' AND object_id = OBJECT_ID('ServiceRecord'))
+    CREATE INDEX IX_ServiceRecord_Program ON ServiceRecord (ProgramId, ServiceRecordId)
+    INCLUDE (TotalPrice, StateCoveredAmount, PatientPayableAmount);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecordBalance_Status' AND object_id = OBJECT_ID('ServiceRecordBalance'))
+    CREATE INDEX IX_ServiceRecordBalance_Status ON ServiceRecordBalance (BalanceStatus, ServiceRecordId)
+    INCLUDE (PayableAmount, PaidAmount, OutstandingAmount);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_LastName' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_LastName ON Patient (LastName, FirstName);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_FirstName' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_FirstName ON Patient (FirstName, LastName);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecord_Patient' AND object_id = OBJECT_ID('ServiceRecord'))
+    CREATE INDEX IX_ServiceRecord_Patient ON ServiceRecord (PatientId, ServiceRecordId);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecord_ServiceDate' AND object_id = OBJECT_ID('ServiceRecord'))
+    CREATE INDEX IX_ServiceRecord_ServiceDate ON ServiceRecord (ServiceDate, ServiceRecordId);
+GO
+-- Eski sürümde INCLUDE'da StateCoveredAmount / RowVer yoktu (iş listesi key lookup yapar): yeniden kur
+IF NOT EXISTS (SELECT 1 FROM sys.indexes i
+               JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+               JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+               WHERE i.object_id = OBJECT_ID('ServiceRecord') AND i.name = 'IX_ServiceRecord_Doctor'
+                 AND c.name = 'RowVer')
+BEGIN
+    IF EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecord_Doctor' AND object_id = OBJECT_ID('ServiceRecord'))
+        DROP INDEX IX_ServiceRecord_Doctor ON ServiceRecord;
+    CREATE INDEX IX_ServiceRecord_Doctor ON ServiceRecord (DoctorId, ServiceDate, ServiceRecordId)
+    INCLUDE (PatientId, ServiceId, ProgramId, TotalPrice, PatientPayableAmount, StateCoveredAmount, RowVer);
+END
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_ServiceRecord_RowVer' AND object_id = OBJECT_ID('ServiceRecord'))
+    CREATE INDEX IX_ServiceRecord_RowVer ON ServiceRecord (RowVer) INCLUDE (ServiceDate);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_RowVer' AND object_id = OBJECT_ID('Payment'))
+    CREATE INDEX IX_Payment_RowVer ON Payment (RowVer) INCLUDE (PaymentDate);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_PaymentDate' AND object_id = OBJECT_ID('Payment'))
+    CREATE INDEX IX_Payment_PaymentDate ON Payment (PaymentDate)
+    INCLUDE (ServiceRecordId, PaymentTypeId, Amount);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_LastNameNorm' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_LastNameNorm ON Patient (LastNameNorm, FirstNameNorm)
+    INCLUDE (FirstName, LastName, TCNo, BirthDate, IsActive);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_FirstNameNorm' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_FirstNameNorm ON Patient (FirstNameNorm, LastNameNorm)
+    INCLUDE (FirstName, LastName, TCNo, BirthDate, IsActive);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_BirthDate' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_BirthDate ON Patient (BirthDate)
+    INCLUDE (FirstNameNorm, LastNameNorm, PhoneNorm, TCNo);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Patient_PhoneNorm' AND object_id = OBJECT_ID('Patient'))
+    CREATE INDEX IX_Patient_PhoneNorm ON Patient (PhoneNorm)
+    INCLUDE (FirstNameNorm, LastNameNorm, BirthDate, TCNo);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Reservation_Patient' AND object_id = OBJECT_ID('Reservation'))
+    CREATE INDEX IX_Reservation_Patient ON Reservation (PatientId, StartDate)
+    INCLUDE (RoomId, StatusId, EndDate);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Payment_ServiceRecord' AND object_id = OBJECT_ID('Payment'))
+    CREATE INDEX IX_Payment_ServiceRecord ON Payment (ServiceRecordId, PaymentDate)
+    INCLUDE (Amount, PaymentTypeId, Payer);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_Reservation_Room' AND object_id = OBJECT_ID('Reservation'))
+    CREATE INDEX IX_Reservation_Room ON Reservation (RoomId, EndDate)
+    INCLUDE (StartDate, StatusId);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'UX_Payment_ExternalRef' AND object_id = OBJECT_ID('Payment'))
+    CREATE UNIQUE INDEX UX_Payment_ExternalRef ON Payment (ExternalRef) WHERE ExternalRef IS NOT NULL;
+GO
+
+/* ============================
+   5. BACKFILL
+   ============================ */
+-- Search keys for existing patients (same rules as services/patients.normalize_name / normalize_phone)
+UPDATE Patient
+SET FirstNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(FirstName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u'))),
+    LastNameNorm = LTRIM(RTRIM(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(LOWER(LastName), N'ç', 'c'), N'Ç', 'c'), N'ğ', 'g'), N'Ğ', 'g'), N'ı', 'i'), N'İ', 'i'), N'ö', 'o'), N'Ö', 'o'), N'ş', 's'), N'Ş', 's'), N'ü', 'u'), N'Ü', 'u')))
+WHERE FirstNameNorm IS NULL OR LastNameNorm IS NULL;
+GO
+
+UPDATE Patient
+SET PhoneNorm = NULLIF(RIGHT(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(Phone, ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', ''), 10), '')
+WHERE PhoneNorm IS NULL AND Phone IS NOT NULL;
+GO
+
+-- Ledger rows for records created before the ledger existed
+INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+       COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+FROM ServiceRecord sr
+WHERE NOT EXISTS (SELECT 1 FROM ServiceRecordBalance b WHERE b.ServiceRecordId = sr.ServiceRecordId);
+GO
@@ -0,0 +1,41 @@
+# database/standin.py
+"""
+Creates the local SQLite stand-in database (no SQL Server needed).
+
+    python -m database.standin [path] [--force]
+
+Then point the app / API server at it:
+    HOSPITAL_DB_URL=sqlite:///hospital_standin.db
+"""
+import os
+import sqlite3
+import sys
+
+SCHEMA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "HospitalStandin.sql")
+DEFAULT_PATH = "hospital_standin.db"
+
+def create(path: str = DEFAULT_PATH, force: bool = False) -> str:
+    if os.path.exists(path):
+        if not force:
+            return path
+        os.remove(path)
+
+    with open(SCHEMA_FILE, encoding="utf-8") as f:
+        script = f.read()
+
+    conn = sqlite3.connect(path)
+    try:
+        conn.executescript(script)
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+def url_for(path: str) -> str:
+    return f"sqlite:///{os.path.abspath(path)}"
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    path = create(args[0] if args else DEFAULT_PATH, force="--force" in sys.argv)
+    print(f"Stand-in ready: {path}")
+    print(f"HOSPITAL_DB_URL={url_for(path)}")
@@ -1,16 +1,40 @@
 # db.py
 import os
+import sqlite3
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, make_url
 
 load_dotenv()
 
-def get_engine():
+def _sqlite_concat(*parts):
+    # SQL Server CONCAT davranışı: NULL -> '' ve sayılar metne çevrilir
+    return "".join("" if p is None else str(p) for p in parts)
+
+def _sqlite_round_half_up(value, digits=0):
+    # SQL Server ROUND gibi: decimal üzerinde, yarım yukarı (SQLite ROUND float'ta: 61.725 -> 61.72)
+    if value is None:
+        return None
+    return float(Decimal(str(value)).quantize(Decimal(1).scaleb(-int(digits)), rounding=ROUND_HALF_UP))
+
+def _setup_sqlite(engine):
+    # Local stand-in (SQL Server olmadan test): T-SQL'de olup SQLite'ta olmayan fonksiyonlar
+    # Decimal parametreler (compute_coverage vb.) metin olarak gider, NUMERIC kolon sayıya çevirir
+    sqlite3.register_adapter(Decimal, str)
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.create_function("CONCAT", -1, _sqlite_concat, deterministic=True)
+        dbapi_conn.create_function("ROUND_HALF_UP", -1, _sqlite_round_half_up, deterministic=True)
+        dbapi_conn.execute("PRAGMA foreign_keys = ON")
+
+def _mssql_odbc() -> str:
     server = os.getenv("MSSQL_SERVER")
     db = os.getenv("MSSQL_DB")
     driver = os.getenv("MSSQL_DRIVER", "ODBC Driver 17 for SQL Server")
 
-    odbc = (
+    return (
         f"DRIVER={{{driver}}};"
         f"SERVER={server};"
         f"DATABASE={db};"
@@ -18,8 +42,61 @@ def get_engine():
         f"TrustServerCertificate=yes;"
     )
 
+def _pool_size() -> int:
+    return int(os.getenv("MSSQL_POOL_SIZE", "5"))
+
+@lru_cache(maxsize=None)
+def get_engine():
+    # Tek engine (tek connection pool) tüm modüller ve prefetch thread'leri arasında paylaşılır.
+    url = os.getenv("HOSPITAL_DB_URL")
+    if url:
+        # örn: sqlite:///hospital_standin.db (bkz. database/standin.py)
+        engine = create_engine(url, future=True)
+        if engine.dialect.name == "sqlite":
+            _setup_sqlite(engine)
+        return engine
+
     engine = create_engine(
-        f"mssql+pyodbc:///?odbc_connect={odbc}",
-        future=True
+        f"mssql+pyodbc:///?odbc_connect={_mssql_odbc()}",
+        future=True,
+        pool_size=_pool_size(),
+        # executemany (toplu insert/update) tek round-trip'te parametre dizisi olarak gider
+        fast_executemany=True,
     )
     return engine
+
+# Sync driver -> asyncio driver (aynı veritabanı, aynı SQL)
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mssql": "mssql+aioodbc",
+    "mssql+pyodbc": "mssql+aioodbc",
+}
+
+@lru_cache(maxsize=None)
+def get_async_engine():
+    """
+    asyncio engine for the same database as get_engine() (aioodbc for SQL
+    Server, aiosqlite for the local stand-in). Used by services/aio.py.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = os.getenv("HOSPITAL_DB_URL")
+    try:
+        if url:
+            u = make_url(url)
+            u = u.set(drivername=_ASYNC_DRIVERS.get(u.drivername, u.drivername))
+            engine = create_async_engine(u)
+            if engine.dialect.name == "sqlite":
+                _setup_sqlite(engine.sync_engine)
+            return engine
+
+        return create_async_engine(
+            f"mssql+aioodbc:///?odbc_connect={_mssql_odbc()}",
+            pool_size=_pool_size(),
+            max_overflow=int(os.getenv("MSSQL_ASYNC_MAX_OVERFLOW", "10")),
+        )
+    except ImportError as e:
+        # sürücüler requirements.txt'te opsiyonel
+        raise ImportError(f"The async database path needs aiosqlite / aioodbc "
+                          f"(see the optional extras in requirements.txt): {e}") from e
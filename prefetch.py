@@ -0,0 +1,90 @@
+# prefetch.py
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from refcache import reference_cache
+from services import balances, definitions, patients, payments, reservations, schema, service_records, staff, users
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prefetch")
+
+# Login bundan uzun beklemez; yetişmeyen yükleyicinin verisini pencere kendisi sorgular
+TIMEOUT = float(os.getenv("HOSPITAL_PREFETCH_TIMEOUT", "5"))
+
+def _doctor_plan(session):
+    staff_id = session["staff_id"]
+    return {
+        "service_records": lambda: service_records.list_worklist(
+            staff_id, start=service_records.default_worklist_start(), end=date.today()),
+        "@HealthService": definitions.list_services,
+        "@StateProgram": definitions.list_programs,
+    }
+
+def _receptionist_plan(session):
+    return {
+        "patients": patients.list_patients,
+        "reservations": reservations.list_reservations,
+        "availability": reservations.list_availability,
+        "@ReservationStatus": definitions.list_statuses,
+        "@Room:combo": definitions.list_rooms_for_combo,
+    }
+
+def _admin_plan(session):
+    return {
+        "users": users.list_users,
+        "staff": staff.list_staff,
+        "payments": payments.list_payments,
+        "balances": lambda: balances.list_by_status("U"),
+        "@Role": definitions.list_roles,
+        "@Department": definitions.list_departments,
+        "@PaymentType": definitions.list_payment_types,
+        # System Definitions sekmeleri için; sonuç services.schema içinde tutulur
+        "schema": lambda: schema.load(definitions.DEFINITION_TABLES),
+    }
+
+_PLANS = {
+    "admin": _admin_plan,
+    "doctor": _doctor_plan,
+    "receptionist": _receptionist_plan,
+}
+
+class PrefetchJob:
+    """
+    Runs a role's initial queries in parallel on background threads.
+
+    Keys starting with '@' are reference tables ('@Table' or '@Table:variant');
+    their rows go into reference_cache instead of the result dict.
+    Failed loaders and loaders still running after timeout seconds are simply
+    left out, the window then queries by itself.
+    """
+    def __init__(self, plan: dict, timeout: float = TIMEOUT):
+        self.deadline = time.monotonic() + timeout
+        # contextvars kopyası: yükleyiciler açık izleme span'inin (login tıklaması) altında görünür
+        self.futures = {key: _executor.submit(contextvars.copy_context().run, fn) for key, fn in plan.items()}
+
+    def done(self) -> bool:
+        """Every loader finished, or the deadline passed."""
+        return time.monotonic() >= self.deadline or all(f.done() for f in self.futures.values())
+
+    def result(self) -> dict:
+        """Waits until the deadline at most; loaders not finished by then are left out."""
+        out = {}
+        for key, fut in self.futures.items():
+            try:
+                rows = fut.result(timeout=max(0.0, self.deadline - time.monotonic()))
+            except Exception:
+                fut.cancel()    # henüz başlamadıysa havuzu meşgul etmesin
+                continue
+            if key.startswith("@"):
+                table, _, variant = key[1:].partition(":")
+                reference_cache.put(table, rows, variant)
+            else:
+                out[key] = rows
+        return out
+
+def start(session) -> PrefetchJob:
+    role = (session.get("role_name") or "").lower()
+    plan_fn = _PLANS.get(role)
+    return PrefetchJob(plan_fn(session) if plan_fn else {})
@@ -0,0 +1,259 @@
+# profiling.py
+"""
+Opt-in profiling of UI actions (button clicks).
+
+    HOSPITAL_PROFILE=1       profile every click from the start
+    HOSPITAL_PROFILE=toggle  installed but off; Ctrl+Shift+F12 switches it on / off
+    HOSPITAL_PROFILE_DIR     output directory (default ~/.hospital/profiles)
+
+Each click on a button (Add, Edit, Save / OK, Refresh, ...) is run under
+cProfile. Per action a <time>_<owner>_<button>.prof file (pstats /
+snakeviz) is written and one line is appended to actions.jsonl:
+
+    wall_ms     the slot, from click to return
+    python_ms   Python code in the slot (inflated by the profiler itself)
+    db_ms       waiting in the database driver (sqlite3 / pyodbc, or the
+                API socket when HOSPITAL_API_URL is set), queries = calls
+    qt_ms       Qt calls made from the slot (setItem, resize, show, ...)
+    modal_ms    time a dialog opened by the slot was waiting for the user
+    render_ms   paint / layout events processed right after the slot
+
+A click inside a dialog (e.g. its OK button) is its own action; the outer
+action (the one that opened the dialog) is paused meanwhile.
+
+    python -m profiling [DIR]   per-action summary of actions.jsonl
+"""
+import cProfile
+import functools
+import json
+import os
+import pstats
+import re
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from PyQt6.QtCore import QEvent, Qt, QTimer
+from PyQt6.QtWidgets import QAbstractButton, QApplication
+
+PROFILE_DIR = Path(os.getenv("HOSPITAL_PROFILE_DIR", Path.home() / ".hospital" / "profiles"))
+TOGGLE_KEY = (Qt.Key.Key_F12, Qt.KeyboardModifier.ControlModifier | Qt.KeyboardModifier.ShiftModifier)
+
+RENDER_EVENTS = {QEvent.Type.Paint, QEvent.Type.UpdateRequest, QEvent.Type.LayoutRequest, QEvent.Type.Polish}
+_DB_CALLS = ("of 'sqlite3.", "of 'pyodbc.", "of '_socket.socket'")
+# exec() ve QMessageBox statik metotları kullanıcıyı bekler
+_MODAL_CALLS = tuple(f"<built-in method {m}>" for m in ("exec", "question", "warning", "information", "critical",
+                                                        "getSaveFileName"))
+
+def is_click(receiver, event) -> bool:
+    t = event.type()
+    if t == QEvent.Type.KeyPress and event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+        # dialoglarda Enter, odaktaki alandan varsayılan butona gider
+        return True
+    if not isinstance(receiver, QAbstractButton):
+        return False
+    if t == QEvent.Type.MouseButtonRelease:
+        return event.button() == Qt.MouseButton.LeftButton
+    return t == QEvent.Type.KeyRelease and event.key() == Qt.Key.Key_Space and not event.isAutoRepeat()
+
+def _owner(widget):
+    """Nearest ui.* widget (window, dialog, GenericCrudWidget) holding the button, or None."""
+    w = widget.parentWidget()
+    while w is not None and not type(w).__module__.startswith("ui."):
+        w = w.parentWidget()
+    return w
+
+def button_names(button) -> tuple[str, str]:
+    """('ReceptionistWindow', 'Refresh [btn_p_refresh]'): aynı yazılı butonlar attribute adıyla ayrılır."""
+    owner = _owner(button)
+    text = button.text().replace("&", "").strip() or button.toolTip() or "button"
+    if owner is None:
+        return type(button.window()).__name__, text
+    table = getattr(owner, "table_name", None)
+    name = f"{type(owner).__name__}[{table}]" if isinstance(table, str) else type(owner).__name__
+    attr = next((k for k, v in vars(owner).items() if v is button), None)
+    return name, f"{text} [{attr}]" if attr else text
+
+def split(stats: pstats.Stats) -> dict:
+    """ms per bucket from a profile: C calls are classified by name, the rest is Python."""
+    db = qt = modal = total = 0.0
+    queries = 0
+    for (filename, _line, name), (_cc, ncalls, tottime, _ct, _callers) in stats.stats.items():
+        total += tottime
+        if filename != "~":
+            continue
+        if any(k in name for k in _DB_CALLS):
+            db += tottime
+            if "execute" in name:
+                queries += ncalls
+        elif name in _MODAL_CALLS:
+            modal += tottime
+        elif name.startswith("<built-in method ") and "." not in name and " of " not in name:
+            # PyQt (sip) metotları modül adı olmadan görünür: <built-in method setItem>
+            qt += tottime
+    return {"python_ms": round((total - db - qt - modal) * 1000, 2), "db_ms": round(db * 1000, 2),
+            "qt_ms": round(qt * 1000, 2), "modal_ms": round(modal * 1000, 2), "queries": queries}
+
+def watch_buttons(widget, prop: str, callback):
+    """
+    callback(button) on clicked for the button (or every button in the
+    widget's window). Only a real click counts: the release can be outside
+    the button, Enter may not reach a default button.
+    """
+    buttons = [widget] if isinstance(widget, QAbstractButton) else widget.window().findChildren(QAbstractButton)
+    for b in buttons:
+        if b.property(prop) is None:
+            b.setProperty(prop, True)
+            b.clicked.connect(lambda *_, b=b: callback(b))
+
+class _Action:
+    def __init__(self):
+        self.owner = self.label = None
+        self.profile = cProfile.Profile()
+        self.started = datetime.now()
+        self.wall = 0.0
+        self.render = 0.0
+
+class ActionProfiler:
+    def __init__(self, directory: Path = PROFILE_DIR, enabled: bool = True):
+        self.directory = Path(directory)
+        self.enabled = enabled
+        self._stack: list[_Action] = []
+        self._settling: list[_Action] = []
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        win = QApplication.activeWindow()
+        if win is not None:
+            title = win.windowTitle().removesuffix(" [profiling]")
+            win.setWindowTitle(title + " [profiling]" if self.enabled else title)
+        print(f"UI profiling {'on' if self.enabled else 'off'} -> {self.directory}", file=sys.stderr)
+
+    def _clicked(self, button):
+        if self._stack and self._stack[-1].label is None:
+            self._stack[-1].owner, self._stack[-1].label = button_names(button)
+
+    def dispatch(self, notify, receiver, event):
+        """Runs notify(receiver, event), profiled when it is a button click."""
+        if event.type() in RENDER_EVENTS and self._settling:
+            t0 = time.perf_counter()
+            try:
+                return notify(receiver, event)
+            finally:
+                self._settling[-1].render += time.perf_counter() - t0
+
+        if not (receiver.isWidgetType() and receiver.isEnabled() and is_click(receiver, event)):
+            return notify(receiver, event)
+
+        watch_buttons(receiver, "_profiling_watch", self._clicked)
+        action = _Action()
+        outer = self._stack[-1] if self._stack else None
+        if outer is not None:
+            outer.profile.disable()
+        self._stack.append(action)
+        t0 = time.perf_counter()
+        action.profile.enable()
+        try:
+            return notify(receiver, event)
+        finally:
+            action.profile.disable()
+            action.wall = time.perf_counter() - t0
+            self._stack.pop()
+            if outer is not None:
+                outer.profile.enable()
+            if action.label is not None:
+                # çizim olayları slot döndükten sonra gelir: kuyruk boşalınca kaydet
+                self._settling.append(action)
+                QTimer.singleShot(0, lambda: self._finish(action))
+
+    def _finish(self, action: _Action):
+        if action in self._settling:
+            self._settling.remove(action)
+        try:
+            self.write(action)
+        except OSError as e:
+            print(f"profile not written: {e}", file=sys.stderr)
+
+    def write(self, action: _Action):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = action.started.strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", f"{action.owner}_{action.label}").strip("-")
+        path = self.directory / f"{stamp}_{slug}.prof"
+        action.profile.dump_stats(str(path))
+
+        record = {"ts": action.started.isoformat(timespec="milliseconds"), "owner": action.owner,
+                  "action": action.label, "wall_ms": round(action.wall * 1000, 2),
+                  **split(pstats.Stats(str(path))), "render_ms": round(action.render * 1000, 2),
+                  "profile": path.name}
+        with open(self.directory / "actions.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+class ProfilingApplication(QApplication):
+    """QApplication whose notify() runs events through ActionProfiler and / or tracing.ActionTracer."""
+    def __init__(self, argv, profiler: ActionProfiler | None = None, tracer=None):
+        super().__init__(argv)
+        self.profiler = profiler
+        self.tracer = tracer
+
+    def notify(self, receiver, event):
+        if self.profiler is not None and event.type() == QEvent.Type.KeyPress \
+                and (event.key(), event.modifiers()) == TOGGLE_KEY:
+            if not event.isAutoRepeat():
+                self.profiler.toggle()
+            return True
+        notify = super().notify
+        if self.profiler is not None and self.profiler.enabled:
+            notify = functools.partial(self.profiler.dispatch, notify)
+        if self.tracer is not None:
+            # iz dışta: profil, izleme maliyetini içermez
+            notify = functools.partial(self.tracer.dispatch, notify)
+        return notify(receiver, event)
+
+def create_app(argv) -> QApplication:
+    """
+    Plain QApplication unless HOSPITAL_PROFILE or HOSPITAL_TRACE is set (no
+    per-event overhead then).
+    """
+    import tracing
+
+    mode = os.getenv("HOSPITAL_PROFILE", "").strip().lower()
+    profiler = None if mode in ("", "0", "off") else ActionProfiler(enabled=mode != "toggle")
+    tracer = None
+    if tracing.enabled():
+        tracing.instrument_ui()
+        tracer = tracing.ActionTracer()
+    if profiler is None and tracer is None:
+        return QApplication(argv)
+    return ProfilingApplication(argv, profiler, tracer)
+
+def summarize(directory: Path = PROFILE_DIR) -> list[dict]:
+    """actions.jsonl grouped by owner + action: count, p50 / max wall and mean split."""
+    groups: dict[tuple, list] = {}
+    try:
+        with open(Path(directory) / "actions.jsonl", encoding="utf-8") as f:
+            for line in f:
+                r = json.loads(line)
+                groups.setdefault((r["owner"], r["action"]), []).append(r)
+    except FileNotFoundError:
+        return []
+    out = []
+    for (owner, action), rows in groups.items():
+        walls = sorted(r["wall_ms"] for r in rows)
+        mean = lambda k: round(sum(r[k] for r in rows) / len(rows), 1)
+        out.append({"owner": owner, "action": action, "n": len(rows), "p50_ms": walls[len(walls) // 2],
+                    "max_ms": walls[-1], "python_ms": mean("python_ms"), "db_ms": mean("db_ms"),
+                    "qt_ms": mean("qt_ms"), "render_ms": mean("render_ms"), "modal_ms": mean("modal_ms"),
+                    "slowest": max(rows, key=lambda r: r["wall_ms"])["profile"]})
+    return sorted(out, key=lambda r: r["max_ms"], reverse=True)
+
+if __name__ == "__main__":
+    directory = Path(sys.argv[1]) if len(sys.argv) > 1 else PROFILE_DIR
+    rows = summarize(directory)
+    if not rows:
+        print(f"No actions recorded in {directory}")
+    print(f"{'action':<46}{'n':>5}{'p50':>9}{'max':>9}{'python':>9}{'db':>9}{'qt':>9}{'render':>9}{'modal':>9}")
+    for r in rows:
+        name = f"{r['owner']} / {r['action']}"[:45]
+        print(f"{name:<46}{r['n']:>5}{r['p50_ms']:>9.1f}{r['max_ms']:>9.1f}{r['python_ms']:>9.1f}"
+              f"{r['db_ms']:>9.1f}{r['qt_ms']:>9.1f}{r['render_ms']:>9.1f}{r['modal_ms']:>9.1f}   {r['slowest']}")
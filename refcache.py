@@ -0,0 +1,47 @@
+# refcache.py
+import threading
+import time
+
+class ReferenceCache:
+    """
+    Process-wide cache for small, rarely changing definition tables
+    (HealthService, StateProgram, ReservationStatus, Room, PaymentType, ...).
+
+    Entries are keyed by (table, variant) so one table can back several
+    loaders (e.g. Room list for combos vs. Room FK list). Writes to a table
+    must call invalidate(table).
+    """
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl = ttl_seconds
+        self._items: dict[tuple[str, str], tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, table: str, loader, variant: str = "") -> list:
+        key = (table, variant)
+        now = time.monotonic()
+        with self._lock:
+            hit = self._items.get(key)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+
+        rows = list(loader())
+        self.put(table, rows, variant)
+        return rows
+
+    def put(self, table: str, rows: list, variant: str = ""):
+        with self._lock:
+            self._items[(table, variant)] = (time.monotonic(), list(rows))
+
+    def discard(self, table: str, variant: str = ""):
+        with self._lock:
+            self._items.pop((table, variant), None)
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            if not tables:
+                self._items.clear()
+                return
+            for key in [k for k in self._items if k[0] in tables]:
+                del self._items[key]
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,64 @@
+# services/aio.py
+"""
+asyncio access path over the same operation catalog as the sync services.
+
+Every @operation function takes an optional sync `conn`; AsyncGateway runs it
+inside AsyncConnection.run_sync(), so the SQL and business rules are shared
+and the driver I/O (aioodbc / aiosqlite) is awaited on the event loop instead
+of blocking a thread per request.
+
+    gw = AsyncGateway(max_concurrency=20, timeout=10)
+    rows = await gw.call("patients.list_patients")
+    results = await gw.call_many([("reservations.list_availability", (), {}), ...])
+    await gw.aclose()
+
+Operations are registered when their service modules are imported
+(services.base.load_operations() imports all of them).
+"""
+import asyncio
+import os
+
+from db import get_async_engine
+from services.base import OPERATIONS, ServiceError
+
+class AsyncGateway:
+    """
+    Bounded, cancellable async executor for service operations.
+
+    At most `max_concurrency` operations hold a DB connection at once; the rest
+    wait on a semaphore (cheap coroutines, no threads). `timeout` bounds the
+    whole call including the wait; on timeout or task cancellation the
+    connection is released and any open transaction is rolled back.
+    """
+    def __init__(self, max_concurrency: int | None = None, timeout: float | None = None):
+        self.engine = get_async_engine()
+        # Varsayılan: pool_size (5) + max_overflow (10)
+        self.max_concurrency = max_concurrency or int(os.getenv("HOSPITAL_ASYNC_CONCURRENCY", "15"))
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def _execute(self, op, args, kwargs):
+        async with self._slots:
+            # Yazan operasyonlar tek transaction içinde, diğerleri düz bağlantıda
+            scope = self.engine.begin() if op.writes else self.engine.connect()
+            async with scope as conn:
+                return await conn.run_sync(lambda sync_conn: op.fn(*args, conn=sync_conn, **kwargs))
+
+    async def call(self, name: str, *args, timeout: float | None = None, **kwargs):
+        op = OPERATIONS.get(name)
+        if op is None:
+            raise ServiceError(f"Unknown operation: {name}")
+        limit = timeout if timeout is not None else self.timeout
+        if limit is None:
+            return await self._execute(op, args, kwargs)
+        return await asyncio.wait_for(self._execute(op, args, kwargs), limit)
+
+    async def call_many(self, calls, return_exceptions: bool = True) -> list:
+        """Runs (name, args, kwargs) tuples concurrently, within the same limit."""
+        return await asyncio.gather(
+            *(self.call(name, *args, **(kwargs or {})) for name, args, kwargs in calls),
+            return_exceptions=return_exceptions,
+        )
+
+    async def aclose(self):
+        await self.engine.dispose()
@@ -0,0 +1,201 @@
+# services/balances.py
+"""
+ServiceRecordBalance ledger: paid-to-date / outstanding per ServiceRecord.
+
+Ledger rows are written only through the helpers below, always on the
+caller's connection, so they commit or roll back together with the Payment /
+ServiceRecord change that caused them. OutstandingAmount and BalanceStatus
+are computed columns (see HospitalDB.sql).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from services.base import ServiceError, dialect_name, fetch_all, fetch_one, id_list_sql, top_n_sql, operation
+
+CENT = Decimal("0.01")
+
+STATUS_LABELS = {
+    "U": "Unpaid",
+    "P": "Partially paid",
+    "S": "Settled",
+    "O": "Overpaid",
+}
+
+class Overpayment(ServiceError):
+    """Payment would take a record's paid amount above its PatientPayableAmount."""
+
+LIST_BY_STATUS_SQL = """
+    SELECT {top} b.ServiceRecordId, sr.PatientId,
+           CONCAT(p.FirstName, ' ', p.LastName) AS PatientName,
+           sr.ServiceDate, b.PayableAmount, b.PaidAmount, b.OutstandingAmount, b.BalanceStatus
+    FROM ServiceRecordBalance b
+    JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+    JOIN Patient p ON p.PatientId = sr.PatientId
+    WHERE b.BalanceStatus = :status
+    ORDER BY b.ServiceRecordId DESC
+    {limit}
+"""
+
+GET_SQL = text("""
+    SELECT ServiceRecordId, PayableAmount, PaidAmount, OutstandingAmount, BalanceStatus
+    FROM ServiceRecordBalance
+    WHERE ServiceRecordId = :sr
+""")
+
+# Eksik ledger satırları (ledger'dan önce oluşmuş / başka yoldan eklenmiş kayıtlar)
+ENSURE_SQL = id_list_sql("""
+    INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+    SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+           COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+    FROM ServiceRecord sr
+    WHERE sr.ServiceRecordId IN :ids
+      AND NOT EXISTS (SELECT 1 FROM ServiceRecordBalance b WHERE b.ServiceRecordId = sr.ServiceRecordId)
+""")
+
+# Yeni eklenen kayıtlar: :ids = insert'ün döndürdüğü ServiceRecordId'ler
+OPEN_NEW_SQL = id_list_sql("""
+    INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+    SELECT sr.ServiceRecordId, sr.PatientPayableAmount, 0
+    FROM ServiceRecord sr
+    WHERE sr.ServiceRecordId IN :ids
+      AND NOT EXISTS (SELECT 1 FROM ServiceRecordBalance b WHERE b.ServiceRecordId = sr.ServiceRecordId)
+""")
+
+SYNC_PAYABLE_SQL = id_list_sql("""
+    UPDATE ServiceRecordBalance
+    SET PayableAmount = (SELECT sr.PatientPayableAmount FROM ServiceRecord sr
+                         WHERE sr.ServiceRecordId = ServiceRecordBalance.ServiceRecordId)
+    WHERE ServiceRecordId IN :ids
+""")
+
+# Bir ServiceRecordId aralığında PayableAmount'u kayıtla eşitler (toplu coverage yeniden hesabı)
+SYNC_PAYABLE_RANGE_SQL = {
+    "mssql": """
+        UPDATE b
+        SET PayableAmount = sr.PatientPayableAmount
+        FROM ServiceRecordBalance b
+        JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+        WHERE b.ServiceRecordId > :after AND b.ServiceRecordId <= :last
+          AND b.PayableAmount <> sr.PatientPayableAmount
+    """,
+    "sqlite": """
+        UPDATE ServiceRecordBalance
+        SET PayableAmount = sr.PatientPayableAmount
+        FROM ServiceRecord sr
+        WHERE sr.ServiceRecordId = ServiceRecordBalance.ServiceRecordId
+          AND ServiceRecordBalance.ServiceRecordId > :after AND ServiceRecordBalance.ServiceRecordId <= :last
+          AND ServiceRecordBalance.PayableAmount <> sr.PatientPayableAmount
+    """,
+}
+
+CLOSE_SQL = id_list_sql("""
+    DELETE FROM ServiceRecordBalance
+    WHERE ServiceRecordId IN (SELECT ServiceRecordId FROM ServiceRecord
+                              WHERE ServiceRecordId IN :ids AND DoctorId = :doc)
+""")
+
+# Koşullu: fazla ödeme satırı güncellemez (rowcount 0)
+APPLY_SQL = text("""
+    UPDATE ServiceRecordBalance
+    SET PaidAmount = ROUND(PaidAmount + :amount, 2)
+    WHERE ServiceRecordId = :sr AND ROUND(PaidAmount + :amount, 2) <= PayableAmount
+""")
+
+ADD_SQL = text("""
+    UPDATE ServiceRecordBalance
+    SET PaidAmount = ROUND(PaidAmount + :amount, 2)
+    WHERE ServiceRecordId = :sr
+""")
+
+OVERPAID_IN_SQL = id_list_sql(
+    "SELECT ServiceRecordId FROM ServiceRecordBalance WHERE ServiceRecordId IN :ids AND BalanceStatus = 'O'"
+)
+
+REVERT_SQL = id_list_sql("""
+    UPDATE ServiceRecordBalance
+    SET PaidAmount = ROUND(PaidAmount - (SELECT SUM(p.Amount) FROM Payment p
+                                         WHERE p.PaymentId IN :ids
+                                           AND p.ServiceRecordId = ServiceRecordBalance.ServiceRecordId), 2)
+    WHERE ServiceRecordId IN (SELECT ServiceRecordId FROM Payment WHERE PaymentId IN :ids)
+""")
+
+def _amount(v) -> Decimal:
+    return Decimal(str(v)).quantize(CENT)
+
+def _per_record(rows) -> dict:
+    per_record = defaultdict(Decimal)
+    for r in rows:
+        per_record[int(r["ServiceRecordId"])] += _amount(r["Amount"])
+    return per_record
+
+@operation(reads=("ServiceRecordBalance", "ServiceRecord", "Patient"))
+def list_by_status(status: str, limit: int = 500, conn=None):
+    """Newest records in one BalanceStatus ('U', 'P', 'S', 'O'), index seek + TOP N."""
+    return fetch_all(top_n_sql(LIST_BY_STATUS_SQL, conn), {"status": status, "limit": limit}, conn=conn)
+
+@operation(reads=("ServiceRecordBalance",))
+def get_balance(service_record_id: int, conn=None):
+    return fetch_one(GET_SQL, {"sr": service_record_id}, conn=conn)
+
+# ---------------- ledger maintenance (caller's transaction) ----------------
+
+def ensure(conn, service_record_ids):
+    ids = list(set(service_record_ids))
+    if ids:
+        conn.execute(ENSURE_SQL, {"ids": ids})
+
+def open_new(conn, service_record_ids):
+    ids = list(set(service_record_ids))
+    if ids:
+        conn.execute(OPEN_NEW_SQL, {"ids": ids})
+
+def sync_payable(conn, service_record_ids):
+    ids = list(set(service_record_ids))
+    if ids:
+        conn.execute(SYNC_PAYABLE_SQL, {"ids": ids})
+
+def sync_payable_range(conn, after_id: int, last_id: int):
+    conn.execute(text(SYNC_PAYABLE_RANGE_SQL[dialect_name(conn)]), {"after": after_id, "last": last_id})
+
+def close(conn, service_record_ids, doctor_id: int):
+    ids = list(set(service_record_ids))
+    if ids:
+        conn.execute(CLOSE_SQL, {"ids": ids, "doc": doctor_id})
+
+def apply_payments(conn, rows):
+    """
+    Adds payment amounts to the ledger; raises Overpayment (caller's
+    transaction then rolls back) if any record would be overpaid.
+    """
+    per_record = _per_record(rows)
+    ensure(conn, per_record)
+
+    for sr_id, amount in per_record.items():
+        if conn.execute(APPLY_SQL, {"sr": sr_id, "amount": amount}).rowcount == 0:
+            bal = conn.execute(GET_SQL, {"sr": sr_id}).mappings().first()
+            outstanding = bal["OutstandingAmount"] if bal else "?"
+            raise Overpayment(
+                f"Payment of {amount} exceeds the outstanding amount {outstanding} of ServiceRecord #{sr_id}."
+            )
+
+def apply_payments_bulk(conn, rows):
+    """
+    Set-based variant of apply_payments for pre-validated batches: one
+    executemany, then one check query. Raises Overpayment listing the
+    overpaid records (caller rolls back and can retry row by row).
+    """
+    per_record = _per_record(rows)
+    if not per_record:
+        return
+    conn.execute(ADD_SQL, [{"sr": sr, "amount": amt} for sr, amt in per_record.items()])
+    over = conn.execute(OVERPAID_IN_SQL, {"ids": list(per_record)}).scalars().all()
+    if over:
+        raise Overpayment(f"Batch would overpay ServiceRecord(s): {', '.join(map(str, over))}.")
+
+def revert_payments(conn, payment_ids):
+    """Call before deleting the payments (amounts are read from Payment)."""
+    ids = list(set(payment_ids))
+    if ids:
+        conn.execute(REVERT_SQL, {"ids": ids})
@@ -0,0 +1,249 @@
+# services/base.py
+import functools
+import importlib
+import os
+from contextlib import contextmanager
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.exc import DBAPIError
+from db import get_engine
+import tracing
+
+# Thin-client mode: operations are executed by the local API server (api/server.py)
+API_URL = os.getenv("HOSPITAL_API_URL")
+
+class ServiceError(Exception):
+    """Business rule violation detected by the service layer (not a DB error)."""
+
+class ConcurrencyConflict(ServiceError):
+    """
+    The row was changed or deleted by another user since it was read.
+    current: the row as it is now on the server (None if it is gone).
+    """
+    def __init__(self, message: str, current: dict | None = None):
+        super().__init__(message)
+        self.current = current
+
+@dataclass(frozen=True)
+class Operation:
+    name: str
+    fn: object
+    reads: tuple = ()    # tables the result depends on -> cacheable on the API server
+    writes: tuple = ()   # tables modified -> invalidates cached reads
+
+OPERATIONS: dict[str, Operation] = {}
+
+_write_listeners = []
+
+# @operation içeren her modül: API sunucusu ve AsyncGateway katalogu buradan yükler
+SERVICE_MODULES = (
+    "auth",
+    "services.balances",
+    "services.definitions",
+    "services.duplicates",
+    "services.patients",
+    "services.payments",
+    "services.reservations",
+    "services.rollups",
+    "services.service_records",
+    "services.staff",
+    "services.timeline",
+    "services.users",
+)
+
+def load_operations() -> dict:
+    """Imports SERVICE_MODULES so that all their operations are registered; -> OPERATIONS."""
+    for name in SERVICE_MODULES:
+        importlib.import_module(name)
+    return OPERATIONS
+
+def on_write(listener):
+    """
+    listener(tables) is called after every write operation made from this
+    process (local or through the API server); used by client-side caches.
+    """
+    _write_listeners.append(listener)
+    return listener
+
+def _notify(tables: tuple):
+    for listener in _write_listeners:
+        listener(tables)
+
+def operation(reads=(), writes=()):
+    """
+    Registers a service function as an API operation named '<module>.<function>'.
+    In thin-client mode the decorated function forwards the call to the API server.
+    """
+    writes = tuple(writes)
+
+    def deco(fn):
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        OPERATIONS[name] = Operation(name, fn, tuple(reads), writes)
+        if not API_URL:
+            if not writes:
+                return fn
+
+            @functools.wraps(fn)
+            def local(*args, **kwargs):
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    # hata durumunda da: kısmen yazılmış olabilir, cache'i boşaltmak zararsız
+                    _notify(writes)
+            return local
+
+        @functools.wraps(fn)
+        def remote(*args, conn=None, **kwargs):
+            if conn is not None:
+                raise ServiceError("Explicit transactions are not available in thin-client mode.")
+            from api.client import call
+            try:
+                return call(name, args, kwargs)
+            finally:
+                if writes:
+                    _notify(writes)
+        return remote
+
+    if not tracing.enabled():
+        return deco
+
+    def traced_deco(fn):
+        # HOSPITAL_TRACE: her servis çağrısı bir span (bkz. tracing.py)
+        name = f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+        return tracing.trace_operation(name, writes, deco(fn), remote=bool(API_URL))
+    return traced_deco
+
+@contextmanager
+def transaction(conn=None):
+    """
+    Explicit transaction scope.
+    Pass an existing connection to join its transaction (several service calls
+    then commit or roll back together); otherwise a new one is opened and
+    committed on exit.
+    """
+    if conn is not None:
+        yield conn
+        return
+    # engine ilk kullanımda oluşturulur (thin-client modunda hiç oluşturulmaz)
+    with get_engine().begin() as c:
+        yield c
+
+@contextmanager
+def connection(conn=None):
+    if conn is not None:
+        yield conn
+        return
+    with get_engine().connect() as c:
+        yield c
+
+def fetch_all(q, params=None, conn=None) -> list:
+    with connection(conn) as c:
+        return list(c.execute(q, params or {}).mappings().all())
+
+def fetch_one(q, params=None, conn=None):
+    with connection(conn) as c:
+        return c.execute(q, params or {}).mappings().first()
+
+def id_list_sql(sql: str):
+    """text() with an expanding :ids parameter (WHERE x IN :ids)."""
+    return text(sql).bindparams(bindparam("ids", expanding=True))
+
+def bulk_execute(q, ids, params=None, conn=None) -> dict:
+    """
+    Runs q ('... WHERE <pk> IN :ids') for all ids in one statement.
+    If the statement fails (FK violation, ...) each id is retried in its own
+    savepoint: rows that can be changed are, the others are reported.
+    -> {"done": rows affected, "failed": [{"id", "error"}]}
+    """
+    ids = list(ids)
+    if not ids:
+        return {"done": 0, "failed": []}
+    params = dict(params or {})
+    with transaction(conn) as c:
+        try:
+            with c.begin_nested():
+                return {"done": c.execute(q, dict(params, ids=ids)).rowcount, "failed": []}
+        except DBAPIError:
+            pass
+        # Toplu komut geri alındı; satır satır dene, hatalıları raporla
+        done, failed = 0, []
+        for i in ids:
+            try:
+                with c.begin_nested():
+                    done += c.execute(q, dict(params, ids=[i])).rowcount
+            except DBAPIError as e:
+                failed.append({"id": i, "error": str(e.orig if e.orig is not None else e).strip()})
+        return {"done": done, "failed": failed}
+
+def dialect_name(conn=None) -> str:
+    return (conn if conn is not None else get_engine()).dialect.name
+
+@functools.lru_cache(maxsize=None)
+def _top_n(sql: str, dialect: str):
+    if dialect == "mssql":
+        return text(sql.format(top="TOP (:limit)", limit=""))
+    return text(sql.format(top="", limit="LIMIT :limit"))
+
+def top_n_sql(sql: str, conn=None):
+    """
+    text() for a TOP-N query written as 'SELECT {top} ... ORDER BY ... {limit}'
+    with a :limit parameter: SQL Server gets TOP (:limit), SQLite LIMIT :limit.
+    """
+    return _top_n(sql, dialect_name(conn))
+
+def pick(data: dict, fields) -> dict:
+    return {f: data.get(f) for f in fields}
+
+def same_value(a, b) -> bool:
+    # Dialog değerleri (str / float) ile DB değerleri (Decimal / date / bool) karşılaştırılır
+    if a in (None, "") or b in (None, ""):
+        return a in (None, "") and b in (None, "")
+    numbers = (bool, int, float, Decimal)
+    if isinstance(a, numbers) or isinstance(b, numbers):
+        try:
+            return Decimal(str(int(a) if isinstance(a, bool) else a)) == \
+                Decimal(str(int(b) if isinstance(b, bool) else b))
+        except InvalidOperation:
+            return False
+    return str(a).strip() == str(b).strip()
+
+def changed_fields(original: dict, data: dict) -> dict:
+    """The items of data that differ from original (keys missing from original count as changed)."""
+    return {k: v for k, v in data.items() if k not in original or not same_value(original[k], v)}
+
+def update_changed(table: str, pk: str, pk_value, changes: dict, version=None, original: dict | None = None,
+                   current_sql=None, extra_where: str = "", extra_params: dict | None = None, conn=None) -> bool:
+    """
+    One UPDATE of only the changed columns of one row, guarded by
+    RowVer = version or, for tables without a RowVer, by the original values
+    of those columns. No row matched -> ConcurrencyConflict carrying the
+    current server row (current_sql: text() with :id). False if nothing changed.
+    """
+    if not changes:
+        return False
+    params = dict(changes, _pk=pk_value, **(extra_params or {}))
+    where = [f"{pk}=:_pk"]
+    with transaction(conn) as c:
+        if version is not None:
+            # RowVer istemciye BIGINT olarak gider (JSON / thin-client)
+            where.append("RowVer = CAST(:_rv AS BINARY(8))" if c.dialect.name == "mssql" else "RowVer = :_rv")
+            params["_rv"] = int(version)
+        elif original is not None:
+            for col in changes:
+                if col not in original:
+                    continue
+                if original[col] is None:
+                    where.append(f"{col} IS NULL")
+                else:
+                    where.append(f"{col} = :_o_{col}")
+                    params[f"_o_{col}"] = original[col]
+        sets = ", ".join(f"{col}=:{col}" for col in changes)
+        q = text(f"UPDATE {table} SET {sets} WHERE {' AND '.join(where)} {extra_where}")
+        if c.execute(q, params).rowcount:
+            return True
+        current = fetch_one(current_sql, {"id": pk_value}, conn=c) if current_sql is not None else None
+    if current is None:
+        raise ConcurrencyConflict(f"{table} {pk}={pk_value} no longer exists.")
+    raise ConcurrencyConflict(f"{table} {pk}={pk_value} was changed by another user.", dict(current))
@@ -0,0 +1,179 @@
+# services/coverage.py
+"""
+Batch recalculation of StateCoveredAmount / PatientPayableAmount after a
+StateProgram.CoverageRate change.
+
+Records are scanned in ServiceRecordId order (keyset chunks, no OFFSET) and
+the split is recomputed with compute_coverage() (Decimal, ROUND_HALF_UP --
+the same rule the ServiceRecord dialog uses) for the diff report. Writing
+is one set-based UPDATE ... FROM StateProgram per chunk (id range), which
+recomputes the split in SQL with the same rounding and only touches rows
+that change, plus the ServiceRecordBalance payable sync for the range.
+Each chunk commits on its own, so a run over millions of rows never holds
+one huge transaction. written is the UPDATE's own row count; conflicts are
+rows whose values changed between the scan and the write.
+
+A dry run (commit=False) produces the same report without writing.
+"""
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from sqlalchemy import text, bindparam
+
+from services import balances
+from services.base import ServiceError, transaction, connection, dialect_name, top_n_sql
+from services.service_records import compute_coverage
+
+SCAN_SQL = """
+    SELECT {top} sr.ServiceRecordId, sr.ProgramId, sr.TotalPrice,
+           sr.StateCoveredAmount, sr.PatientPayableAmount, sp.CoverageRate
+    FROM ServiceRecord sr
+    LEFT JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
+    WHERE sr.ServiceRecordId > :after {program_filter}
+    ORDER BY sr.ServiceRecordId
+    {limit}
+"""
+
+# Yeni değerler SQL içinde hesaplanır (tarama ile yazma arasında değişen kayıt da doğru yazılır).
+# SQL Server ROUND decimal'de yarımı yukarı yuvarlar; SQLite ROUND float'ta çalışır, stand-in
+# ROUND_HALF_UP'ı kullanır (db.py).
+RECALC_SQL = {
+    "mssql": """
+        UPDATE sr
+        SET StateCoveredAmount = n.Covered,
+            PatientPayableAmount = sr.TotalPrice - n.Covered
+        FROM ServiceRecord sr
+        LEFT JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
+        CROSS APPLY (SELECT ROUND(sr.TotalPrice * COALESCE(sp.CoverageRate, 0), 2) AS Covered) n
+        WHERE sr.ServiceRecordId > :after AND sr.ServiceRecordId <= :last {program_filter}
+          AND (sr.StateCoveredAmount <> n.Covered OR sr.PatientPayableAmount <> sr.TotalPrice - n.Covered)
+    """,
+    "sqlite": """
+        UPDATE ServiceRecord
+        SET StateCoveredAmount = n.Covered,
+            PatientPayableAmount = ROUND_HALF_UP(ServiceRecord.TotalPrice - n.Covered, 2)
+        FROM (SELECT sr.ServiceRecordId AS Id,
+                     ROUND_HALF_UP(sr.TotalPrice * COALESCE(sp.CoverageRate, 0), 2) AS Covered
+              FROM ServiceRecord sr
+              LEFT JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
+              WHERE sr.ServiceRecordId > :after AND sr.ServiceRecordId <= :last {program_filter}) n
+        WHERE ServiceRecord.ServiceRecordId = n.Id
+          AND (ServiceRecord.StateCoveredAmount <> n.Covered
+               OR ServiceRecord.PatientPayableAmount <> ROUND_HALF_UP(ServiceRecord.TotalPrice - n.Covered, 2))
+    """,
+}
+
+@dataclass
+class RecalcReport:
+    dry_run: bool
+    scanned: int = 0
+    changed: int = 0
+    written: int = 0
+    conflicts: int = 0
+    chunks: int = 0
+    covered_delta: Decimal = Decimal("0.00")   # sum(new - old) StateCoveredAmount
+    payable_delta: Decimal = Decimal("0.00")   # sum(new - old) PatientPayableAmount
+    elapsed: float = 0.0
+    samples: list = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.scanned / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        mode = "DRY RUN" if self.dry_run else "COMMITTED"
+        lines = [
+            f"[{mode}] scanned={self.scanned} changed={self.changed} written={self.written} "
+            f"conflicts={self.conflicts} chunks={self.chunks}",
+            f"StateCoveredAmount delta={self.covered_delta}  PatientPayableAmount delta={self.payable_delta}",
+            f"{self.elapsed:.2f}s ({self.rows_per_sec:,.0f} rows/s)",
+        ]
+        for s in self.samples:
+            lines.append(
+                f"  #{s['ServiceRecordId']} total={s['TotalPrice']} rate={s['CoverageRate']}: "
+                f"covered {s['OldCovered']} -> {s['NewCovered']}, payable {s['OldPayable']} -> {s['NewPayable']}"
+            )
+        return "\n".join(lines)
+
+def _dec(v) -> Decimal:
+    return Decimal(str(v if v is not None else 0))
+
+def _scan_sql(program_ids, conn):
+    if program_ids:
+        q = top_n_sql(SCAN_SQL.replace("{program_filter}", "AND sr.ProgramId IN :ids"), conn)
+        return q.bindparams(bindparam("ids", expanding=True))
+    return top_n_sql(SCAN_SQL.replace("{program_filter}", ""), conn)
+
+def _recalc_sql(program_ids, dialect: str):
+    if dialect not in RECALC_SQL:
+        raise ServiceError(f"Coverage recalculation is not supported on '{dialect}'.")
+    sql = RECALC_SQL[dialect].replace("{program_filter}", "AND sr.ProgramId IN :ids" if program_ids else "")
+    q = text(sql)
+    return q.bindparams(bindparam("ids", expanding=True)) if program_ids else q
+
+def _diff_chunk(rows, report: RecalcReport, sample_limit: int) -> list[dict]:
+    out = []
+    for r in rows:
+        old_covered, old_payable = _dec(r["StateCoveredAmount"]), _dec(r["PatientPayableAmount"])
+        covered, payable = compute_coverage(r["TotalPrice"], r["CoverageRate"])
+        if covered == old_covered and payable == old_payable:
+            continue
+        report.changed += 1
+        report.covered_delta += covered - old_covered
+        report.payable_delta += payable - old_payable
+        if len(report.samples) < sample_limit:
+            report.samples.append({
+                "ServiceRecordId": r["ServiceRecordId"], "TotalPrice": r["TotalPrice"],
+                "CoverageRate": r["CoverageRate"],
+                "OldCovered": old_covered, "NewCovered": covered,
+                "OldPayable": old_payable, "NewPayable": payable,
+            })
+        out.append({
+            "id": r["ServiceRecordId"], "total": r["TotalPrice"],
+            "covered": covered, "payable": payable,
+            "old_covered": r["StateCoveredAmount"], "old_payable": r["PatientPayableAmount"],
+        })
+    return out
+
+def recalculate(program_ids: list[int] | None = None, commit: bool = False,
+                chunk_size: int = 5000, sample_limit: int = 20, progress=None, conn=None) -> RecalcReport:
+    """
+    Recomputes the coverage split of every record (or only those of program_ids).
+    commit=False is a dry run. progress(report) is called after each chunk.
+    """
+    report = RecalcReport(dry_run=not commit)
+    started = time.perf_counter()
+    after = 0
+
+    with connection(conn) as c:
+        q = _scan_sql(program_ids, c)
+        while True:
+            params = {"after": after, "limit": chunk_size}
+            if program_ids:
+                params["ids"] = list(program_ids)
+            rows = c.execute(q, params).mappings().all()
+            if not rows:
+                break
+            last = rows[-1]["ServiceRecordId"]
+            report.scanned += len(rows)
+            report.chunks += 1
+
+            changes = _diff_chunk(rows, report, sample_limit)
+            if commit and changes:
+                # Dışarıdan bağlantı verildiyse onun transaction'ına katılır
+                with transaction(conn) as w:
+                    params["last"] = last
+                    del params["limit"]
+                    # tek UPDATE: rowcount her sürücüde gerçek sayı (executemany'deki gibi tahmin değil)
+                    written = w.execute(_recalc_sql(program_ids, dialect_name(w)), params).rowcount
+                    balances.sync_payable_range(w, after, last)
+                report.written += written
+                report.conflicts += abs(len(changes) - written)
+            after = last
+
+            if progress:
+                progress(report)
+
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,330 @@
+# services/definitions.py
+import logging
+import threading
+from datetime import date
+
+from sqlalchemy import text, inspect
+
+from refcache import reference_cache
+from services import schema
+from services.base import ServiceError, connection, transaction, fetch_all, fetch_one, id_list_sql, \
+    top_n_sql, operation, on_write, bulk_execute, changed_fields, update_changed
+
+log = logging.getLogger(__name__)
+
+# ---------------- reference lists (cached) ----------------
+@on_write
+def _invalidate_references(tables):
+    # Yazan her işlem (yerel ya da API sunucusu üzerinden) bu süreçteki listeleri boşaltır
+    if tables:
+        reference_cache.invalidate(*tables)
+
+ROLES_SQL = text("SELECT RoleId, RoleName FROM Role ORDER BY RoleId")
+DEPARTMENTS_SQL = text("SELECT DepartmentId, DepartmentName FROM Department ORDER BY DepartmentId")
+PAYMENT_TYPES_SQL = text("SELECT PaymentTypeId, PaymentTypeName FROM PaymentType ORDER BY PaymentTypeId")
+STATUSES_SQL = text("SELECT StatusId, StatusName FROM ReservationStatus ORDER BY StatusId")
+SERVICES_SQL = text("""
+    SELECT ServiceId, ServiceName, BasePrice
+    FROM HealthService
+    ORDER BY ServiceId
+""")
+PROGRAMS_SQL = text("""
+    SELECT ProgramId, ProgramName, CoverageRate
+    FROM StateProgram
+    ORDER BY ProgramId
+""")
+ROOMS_FOR_COMBO_SQL = text("""
+    SELECT r.RoomId,
+           CONCAT('RoomId=', r.RoomId) AS Display
+    FROM Room r
+    WHERE r.IsActive = 1 OR r.IsActive IS NULL
+    ORDER BY r.RoomId
+""")
+
+# FK combos for GenericCrudWidget: rows with id/name keys
+FK_SQL = {
+    "Hospital": text("SELECT HospitalId AS id, HospitalName AS name FROM Hospital ORDER BY HospitalId"),
+    "Department": text("SELECT DepartmentId AS id, DepartmentName AS name FROM Department ORDER BY DepartmentId"),
+    "ServiceCategory": text("SELECT ServiceCategoryId AS id, CategoryName AS name FROM ServiceCategory ORDER BY ServiceCategoryId"),
+    "RoomType": text("SELECT RoomTypeId AS id, TypeName AS name FROM RoomType ORDER BY RoomTypeId"),
+}
+
+@operation(reads=("Role",))
+def list_roles(conn=None):
+    return reference_cache.get("Role", lambda: fetch_all(ROLES_SQL, conn=conn))
+
+@operation(reads=("Department",))
+def list_departments(conn=None):
+    return reference_cache.get("Department", lambda: fetch_all(DEPARTMENTS_SQL, conn=conn))
+
+@operation(reads=("PaymentType",))
+def list_payment_types(conn=None):
+    return reference_cache.get("PaymentType", lambda: fetch_all(PAYMENT_TYPES_SQL, conn=conn))
+
+@operation(reads=("ReservationStatus",))
+def list_statuses(conn=None):
+    return reference_cache.get("ReservationStatus", lambda: fetch_all(STATUSES_SQL, conn=conn))
+
+@operation(reads=("HealthService",))
+def list_services(conn=None):
+    return reference_cache.get("HealthService", lambda: fetch_all(SERVICES_SQL, conn=conn))
+
+@operation(reads=("StateProgram",))
+def list_programs(conn=None):
+    return reference_cache.get("StateProgram", lambda: fetch_all(PROGRAMS_SQL, conn=conn))
+
+@operation(reads=("Room",))
+def list_rooms_for_combo(conn=None):
+    return reference_cache.get("Room", lambda: fetch_all(ROOMS_FOR_COMBO_SQL, conn=conn), "combo")
+
+@operation(reads=("Hospital", "Department", "ServiceCategory", "RoomType"))
+def list_fk(table: str, conn=None):
+    return reference_cache.get(table, lambda: fetch_all(FK_SQL[table], conn=conn), "fk")
+
+def fk_options(table: str, conn=None):
+    """[{id, name}] for an FK combo of any table: pk and first text column from reflected metadata."""
+    if table in FK_SQL:
+        return list_fk(table, conn=conn)
+    meta = schema.table_meta(table, conn=conn)
+    q = text(f"SELECT {meta['pk']} AS id, {meta['name_column']} AS name FROM {table} ORDER BY {meta['pk']}")
+    return reference_cache.get(table, lambda: fetch_all(q, conn=conn), "fk")
+
+def cancel_status_id(statuses=None):
+    """StatusId of the 'Cancelled' reservation status, or None."""
+    statuses = statuses if statuses is not None else list_statuses()
+    return next((s["StatusId"] for s in statuses if str(s["StatusName"]).lower().startswith("cancel")), None)
+
+# ---------------- generic table CRUD (definitions tabs) ----------------
+# table/column names come from code (FieldSpec config), never from user input.
+
+ROWS_PAGE = 500
+
+# System Definitions sekmeleri (kolonlar / FK'ler services.schema ile yansıtılır)
+DEFINITION_TABLES = ["Department", "RoomType", "ServiceCategory", "HealthService", "StateProgram",
+                     "PaymentType", "Room"]
+
+# Genel düzenleyicide açılabilen tablolar: sadece tanım / lookup tabloları.
+# Patient, UserAccount, ServiceRecord, Payment, ... servisler üzerinden yazılır
+# (normalize kolonlar, şifreler, bakiye defteri, rollup kuyruğu, coverage).
+EDITABLE_TABLES = DEFINITION_TABLES + ["Hospital", "ReservationStatus"]
+
+def check_editable(table: str, columns=()):
+    if table not in EDITABLE_TABLES:
+        raise ServiceError(f"{table} cannot be opened in the definitions editor.")
+    secret = [c for c in columns if schema.is_secret(c)]
+    if secret:
+        raise ServiceError(f"Column(s) not available: {', '.join(secret)}")
+
+_OPERATORS = (">=", "<=", "<>", ">", "<", "=")
+
+def _number(v: str):
+    try:
+        return int(v)
+    except ValueError:
+        try:
+            return float(v)
+        except ValueError:
+            return v
+
+def _filter_clause(col: str, raw: str, name: str, kind: str = "text"):
+    """
+    Column filter text -> (sql, params), or None while it is incomplete ('>='
+    with no value yet). '>=100', '<5', '=x', '<>x' compare; a number (or any
+    value on an ...Id column) is equality; other text is a prefix match
+    (index-friendly LIKE 'abc%'). A value the column cannot hold (text on a
+    number / ...Id column, a bad date) raises ServiceError.
+    """
+    raw = raw.strip()
+    op = next((o for o in _OPERATORS if raw.startswith(o)), None)
+    value_text = raw[len(op):].strip() if op else raw
+    if not value_text:
+        return None
+    value = value_text if kind == "date" else _number(value_text)
+    numeric = kind in ("int", "decimal", "bool") or col.lower().endswith("id")
+    if numeric and isinstance(value, str):
+        raise ServiceError(f"{col}: '{value_text}' is not a number")
+    if kind == "date" and op:
+        try:
+            date.fromisoformat(value_text)
+        except ValueError:
+            raise ServiceError(f"{col}: '{value_text}' is not a date (YYYY-MM-DD)") from None
+    if op:
+        return f"{col} {op} :{name}", {name: value}
+    if numeric or not isinstance(value, str):
+        return f"{col} = :{name}", {name: value}
+    escaped = raw.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{col} LIKE :{name} ESCAPE '\\'", {name: escaped + "%"}
+
+def _filter_clauses(table: str, filters: dict, conn=None):
+    """-> (where list, params, {column: problem}) ; incomplete / invalid filters are left out."""
+    kinds = {c["name"]: c["kind"] for c in schema.table_meta(table, conn=conn)["columns"]}
+    where, params, problems = [], {}, {}
+    for i, (col, raw) in enumerate(filters.items()):
+        try:
+            built = _filter_clause(col, str(raw), f"f{i}", kinds.get(col, "text"))
+        except ServiceError as e:
+            problems[col] = str(e)
+            continue
+        if built is not None:
+            where.append(built[0])
+            params.update(built[1])
+    return where, params, problems
+
+@operation()
+def filter_problems(table: str, filters: dict, conn=None) -> dict:
+    """{column: message} for the filters list_rows leaves out because the value does not fit the column."""
+    return _filter_clauses(table, {k: v for k, v in filters.items() if str(v).strip()}, conn)[2]
+
+def _keyset_clause(sort: str, pk: str, descending: bool, after):
+    """
+    WHERE part continuing after the last row (sort value, pk value) of the
+    previous page. NULL sort values come first in ascending order on both
+    SQL Server and SQLite.
+    """
+    value, last_pk = after
+    cmp = "<" if descending else ">"
+    params = {"after_pk": last_pk}
+    if sort == pk:
+        return f"{pk} {cmp} :after_pk", params
+    params["after_value"] = value
+    if value is None:
+        if descending:
+            return f"({sort} IS NULL AND {pk} < :after_pk)", params
+        return f"(({sort} IS NULL AND {pk} > :after_pk) OR {sort} IS NOT NULL)", params
+    clause = f"({sort} {cmp} :after_value OR ({sort} = :after_value AND {pk} {cmp} :after_pk)"
+    return clause + (f" OR {sort} IS NULL)" if descending else ")"), params
+
+_index_lock = threading.Lock()
+_leading_columns: dict[str, set] = {}
+_suggested: set = set()
+
+def _check_index(table: str, pk: str, columns, conn):
+    """Logs a CREATE INDEX suggestion once per column used in ORDER BY / WHERE without a leading index."""
+    with _index_lock:
+        leading = _leading_columns.get(table)
+    if leading is None:
+        insp = inspect(conn)
+        leading = {pk.lower()}
+        leading.update(ix["column_names"][0].lower() for ix in insp.get_indexes(table) if ix["column_names"])
+        leading.update(uq["column_names"][0].lower() for uq in insp.get_unique_constraints(table)
+                       if uq["column_names"])
+        with _index_lock:
+            _leading_columns[table] = leading
+    for col in columns:
+        if col.lower() in leading or (table, col) in _suggested:
+            continue
+        _suggested.add((table, col))
+        log.warning("No index supports %s.%s (sort/filter); consider: CREATE INDEX IX_%s_%s ON %s (%s, %s)",
+                    table, col, table, col, table, col, pk)
+
+def _version_select(version: str | None) -> str:
+    return f", CAST({version} AS BIGINT) AS {version}" if version else ""
+
+# Genel düzenleyici işlemleri: tablo çağrıda seçilir, etiketler tüm EDITABLE_TABLES'ı kapsar
+# (API sunucusu cache'i ve istemci reference_cache'i her yazmada boşaltılır)
+@operation(reads=EDITABLE_TABLES)
+def list_rows(table: str, pk: str, columns: list[str], sort: str | None = None, descending: bool = True,
+              filters: dict | None = None, after=None, limit: int | None = None, version: str | None = None,
+              conn=None):
+    """
+    One page of a definitions table.
+    sort / filters keys must be in columns (whitelist); filter values are
+    bound as parameters, filters that are incomplete or do not fit the column
+    are left out (see filter_problems). after = (sort value, pk value) of the last row of
+    the previous page (keyset paging); limit None = all rows. version: the
+    table's rowversion column (RowVer), returned as BIGINT for update_row.
+    """
+    check_editable(table, columns)
+    sort = sort or pk
+    filters = {k: v for k, v in (filters or {}).items() if str(v).strip()}
+    unknown = [c for c in (sort, *filters) if c not in columns]
+    if unknown:
+        raise ServiceError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+
+    where, params, _problems = _filter_clauses(table, filters, conn)
+    if after is not None:
+        clause, p = _keyset_clause(sort, pk, descending, after)
+        where.append(clause)
+        params.update(p)
+
+    direction = "DESC" if descending else "ASC"
+    order = f"{pk} {direction}" if sort == pk else f"{sort} {direction}, {pk} {direction}"
+    sql = (f"SELECT {{top}} {', '.join(columns)}{_version_select(version)} FROM {table}"
+           f"{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY {order} {{limit}}")
+
+    with connection(conn) as c:
+        if sort != pk or filters:
+            _check_index(table, pk, [sort, *filters], c)
+        if limit is None:
+            q = text(sql.format(top="", limit=""))
+        else:
+            q = top_n_sql(sql, c)
+            params["limit"] = limit
+        return fetch_all(q, params, conn=c)
+
+@operation(reads=EDITABLE_TABLES)
+def get_row(table: str, pk: str, columns: list[str], pk_value, conn=None):
+    check_editable(table, columns)
+    cols = ", ".join(columns)
+    return fetch_one(text(f"SELECT {cols} FROM {table} WHERE {pk}=:id"), {"id": pk_value}, conn=conn)
+
+def _insert_sql(table: str, fields: list[str]):
+    cols = ", ".join(fields)
+    params = ", ".join(f":{f}" for f in fields)
+    return text(f"INSERT INTO {table} ({cols}) VALUES ({params})")
+
+@operation(writes=EDITABLE_TABLES)
+def insert_row(table: str, data: dict, conn=None):
+    insert_rows(table, [data], conn=conn)
+
+@operation(writes=EDITABLE_TABLES)
+def insert_rows(table: str, rows: list[dict], conn=None):
+    if not rows:
+        return
+    check_editable(table, rows[0].keys())
+    q = _insert_sql(table, list(rows[0].keys()))
+    with transaction(conn) as c:
+        c.execute(q, rows)
+
+@operation(writes=EDITABLE_TABLES)
+def update_row(table: str, pk: str, pk_value, data: dict, original: dict | None = None, conn=None) -> bool:
+    """
+    original: the row as listed by list_rows. Only changed columns are
+    written, guarded by its RowVer if the table has one, otherwise by the
+    original values of those columns (services.base.update_changed).
+    """
+    check_editable(table, data.keys())
+    if original is None:
+        update_rows(table, pk, [dict(data, **{pk: pk_value})], conn=conn)
+        return True
+    version = "RowVer" if "RowVer" in original else None
+    columns = [k for k in original if k != version]
+    current_sql = text(f"SELECT {', '.join(columns)}{_version_select(version)} FROM {table} WHERE {pk}=:id")
+    return update_changed(table, pk, pk_value, changed_fields(original, data),
+                          version=original.get("RowVer"), original=original, current_sql=current_sql, conn=conn)
+
+@operation(writes=EDITABLE_TABLES)
+def update_rows(table: str, pk: str, rows: list[dict], conn=None):
+    """rows: dicts holding the pk column plus the columns to set."""
+    if not rows:
+        return
+    check_editable(table, rows[0].keys())
+    fields = [k for k in rows[0].keys() if k != pk]
+    set_clause = ", ".join(f"{f}=:{f}" for f in fields)
+    q = text(f"UPDATE {table} SET {set_clause} WHERE {pk}=:{pk}")
+    with transaction(conn) as c:
+        c.execute(q, rows)
+
+@operation(writes=EDITABLE_TABLES)
+def update_many(table: str, pk: str, ids: list, data: dict, conn=None) -> dict:
+    """Sets the same column values on all ids in one statement (see bulk_execute)."""
+    check_editable(table, data.keys())
+    set_clause = ", ".join(f"{f}=:{f}" for f in data)
+    q = id_list_sql(f"UPDATE {table} SET {set_clause} WHERE {pk} IN :ids")
+    return bulk_execute(q, ids, data, conn=conn)
+
+@operation(writes=EDITABLE_TABLES)
+def delete_rows(table: str, pk: str, ids: list, conn=None) -> dict:
+    check_editable(table)
+    q = id_list_sql(f"DELETE FROM {table} WHERE {pk} IN :ids")
+    return bulk_execute(q, ids, conn=conn)
@@ -0,0 +1,251 @@
+# services/duplicates.py
+"""
+Duplicate patient detection.
+
+A new / edited patient is compared with candidates found through indexed
+keys (TCNo, birth date incl. day/month swap, normalized phone, exact
+normalized name) plus the in-memory trigram index of patients.search_patients
+(name typos with a different birth date). Candidates are scored:
+
+    score = 0.5 * name similarity + 0.3 * birth date + 0.2 * phone
+
+(same TCNo = 1.0). Scores from THRESHOLD up are likely duplicates (Likely=True,
+PatientDialog asks before saving); patients with (almost) the same name but
+nothing else in common are only shown as hints. find_clusters()
+scores the whole table, comparing only patients that share a birth date
+block or a phone.
+"""
+import time
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy import text, bindparam
+
+from services import patients
+from services.base import connection, fetch_all, operation
+from services.trigram import trigrams
+
+NAME_WEIGHT = 0.5
+BIRTH_WEIGHT = 0.3
+PHONE_WEIGHT = 0.2
+# Aynı isim tek başına (0.5) yetmez: isim + doğum tarihi / telefon gerekir
+THRESHOLD = 0.6
+HINT_NAME_SIMILARITY = 0.8
+
+_COLUMNS = """PatientId, CONCAT(FirstName, ' ', LastName) AS FullName, TCNo, BirthDate, Phone, IsActive,
+              FirstNameNorm, LastNameNorm, PhoneNorm"""
+
+CANDIDATES_SQL = text(f"""
+    SELECT {_COLUMNS}
+    FROM Patient
+    WHERE PatientId IN (
+        SELECT PatientId FROM Patient WHERE TCNo = :tc
+        UNION SELECT PatientId FROM Patient WHERE BirthDate IN :dates
+        UNION SELECT PatientId FROM Patient WHERE PhoneNorm = :phone
+        UNION SELECT PatientId FROM Patient WHERE LastNameNorm = :last AND FirstNameNorm = :first
+        UNION SELECT PatientId FROM Patient WHERE PatientId IN :ids
+    )
+    AND PatientId <> :exclude
+""").bindparams(bindparam("dates", expanding=True), bindparam("ids", expanding=True))
+
+# Toplu tarama: CONCAT yok (stand-in'de Python fonksiyonu), FullName sadece sonuçlar için
+ALL_SQL = text("""
+    SELECT PatientId, FirstName, LastName, TCNo, BirthDate, Phone, IsActive,
+           FirstNameNorm, LastNameNorm, PhoneNorm
+    FROM Patient
+""")
+
+def _as_date(v):
+    if not v:
+        return None
+    if isinstance(v, date):
+        return v
+    try:
+        return date.fromisoformat(str(v)[:10])
+    except ValueError:
+        return None
+
+def _swapped(d: date):
+    # 03.04 <-> 04.03 karışıklığı
+    if d is None or d.day > 12 or d.day == d.month:
+        return None
+    return date(d.year, d.day, d.month)
+
+def _key(first, last, tc, birth, phone) -> dict:
+    name = f"{first or ''} {last or ''}".strip()
+    return {"name": name, "grams": trigrams(name), "tc": (tc or "").strip() or None,
+            "birth": _as_date(birth), "phone": phone or None}
+
+def _row_key(r) -> dict:
+    return _key(r["FirstNameNorm"], r["LastNameNorm"], r["TCNo"], r["BirthDate"], r["PhoneNorm"])
+
+def _score(a: dict, b: dict):
+    """-> (score 0..1, reasons, name similarity)."""
+    if a["tc"] and a["tc"] == b["tc"]:
+        return 1.0, ["same TCNo"], 1.0
+    ga, gb = a["grams"], b["grams"]
+    common = len(ga & gb)
+    name = common / (len(ga) + len(gb) - common) if ga and gb else 0.0
+    reasons = [f"name {name:.0%}"] if name >= 0.5 else []
+
+    birth = 0.0
+    if a["birth"] and b["birth"]:
+        if a["birth"] == b["birth"]:
+            birth = 1.0
+            reasons.append("same birth date")
+        elif _swapped(a["birth"]) == b["birth"]:
+            birth = 0.8
+            reasons.append("day/month swapped")
+
+    phone = 0.0
+    if a["phone"] and a["phone"] == b["phone"]:
+        phone = 1.0
+        reasons.append("same phone")
+
+    return round(NAME_WEIGHT * name + BIRTH_WEIGHT * birth + PHONE_WEIGHT * phone, 3), reasons, name
+
+def _public(r, score=None, reasons=None) -> dict:
+    full_name = r["FullName"] if "FullName" in r else f"{r['FirstName']} {r['LastName']}"
+    out = {"PatientId": r["PatientId"], "FullName": full_name, "TCNo": r["TCNo"],
+           "BirthDate": r["BirthDate"], "Phone": r["Phone"], "IsActive": r["IsActive"]}
+    if score is not None:
+        out["Score"] = score
+        out["Reasons"] = ", ".join(reasons)
+    return out
+
+@operation(reads=("Patient",))
+def find_duplicates(data: dict, exclude_id: int | None = None, limit: int = 10,
+                    threshold: float = THRESHOLD, conn=None):
+    """
+    Possible duplicates of a patient being entered (PatientDialog fields):
+    [{PatientId, FullName, TCNo, BirthDate, Phone, IsActive, Score, Reasons, Likely}],
+    best first. exclude_id: the patient being edited.
+    """
+    first = patients.normalize_name(data.get("FirstName"))
+    last = patients.normalize_name(data.get("LastName"))
+    key = _key(first, last, data.get("TCNo"), data.get("BirthDate"), patients.normalize_phone(data.get("Phone")))
+    if not (key["name"] or key["tc"] or key["phone"]):
+        return []
+
+    dates = [d for d in (key["birth"], _swapped(key["birth"])) if d]
+    ids = []
+    if len(key["name"]) >= 3:
+        # index henüz hazır değilse (ilk kullanım) sadece index'li anahtarlar
+        index = patients._fuzzy.get()
+        if index is not None:
+            ids = [p["PatientId"] for _s, p in
+                   index.search(key["name"], 20, min_similarity=HINT_NAME_SIMILARITY)]
+
+    rows = fetch_all(CANDIDATES_SQL, {
+        "tc": key["tc"], "dates": [d.isoformat() for d in dates], "phone": key["phone"],
+        "first": first or None, "last": last or None, "ids": ids, "exclude": exclude_id or 0,
+    }, conn=conn)
+
+    found = []
+    for r in rows:
+        score, reasons, name = _score(key, _row_key(r))
+        if score >= threshold or name >= HINT_NAME_SIMILARITY:
+            found.append(dict(_public(r, score, reasons), Likely=score >= threshold))
+    found.sort(key=lambda r: -r["Score"])
+    return found[:limit]
+
+@operation(reads=("Patient",))
+def find_clusters(threshold: float = THRESHOLD, max_block: int = 500, conn=None) -> dict:
+    """
+    Groups of likely duplicate patients across the whole table.
+    Only patients sharing a birth date (day/month swap included) or a phone
+    are compared; blocks larger than max_block (placeholder dates / phones)
+    are skipped. -> {clusters: [{Score, Patients: [...]}], patients, pairs,
+    skipped_blocks, seconds}
+    """
+    started = time.perf_counter()
+    with connection(conn) as c:
+        rows = c.execute(ALL_SQL).all()
+
+    names, births, phones = [], [], []
+    birth_blocks, phone_blocks = defaultdict(list), defaultdict(list)
+    for i, (_pid, _f, _l, _tc, birth, _ph, _a, first, last, phone) in enumerate(rows):
+        d = _as_date(birth)
+        names.append(trigrams(f"{first or ''} {last or ''}"))
+        births.append(d)
+        phones.append(phone)
+        if d:
+            # gün/ay yer değiştirmiş tarihler aynı bloğa düşsün
+            birth_blocks[d.year, min(d.day, d.month), max(d.day, d.month)].append(i)
+        if phone:
+            phone_blocks[phone].append(i)
+
+    parent = list(range(len(rows)))
+    best: dict[int, float] = {}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def link(i, j, score):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[rj] = ri
+        score = round(score, 3)
+        best[i] = max(best.get(i, 0), score)
+        best[j] = max(best.get(j, 0), score)
+
+    pairs = skipped = 0
+    compared_by_birth = set()
+    swapped_birth = BIRTH_WEIGHT * 0.8
+    # _score ile aynı hesap; tablo taramasında fonksiyon çağrısı olmadan
+    for members in birth_blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block:
+            skipped += 1
+            continue
+        compared_by_birth.update(members)
+        for x, i in enumerate(members):
+            gi, di, pi = names[i], births[i], phones[i]
+            li = len(gi)
+            for j in members[x + 1:]:
+                gj = names[j]
+                common = len(gi & gj)
+                score = (NAME_WEIGHT * common / (li + len(gj) - common) if li and gj else 0.0) \
+                    + (BIRTH_WEIGHT if di == births[j] else swapped_birth) \
+                    + (PHONE_WEIGHT if pi is not None and pi == phones[j] else 0.0)
+                if score >= threshold:
+                    link(i, j, score)
+        pairs += len(members) * (len(members) - 1) // 2
+
+    for members in phone_blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block:
+            skipped += 1
+            continue
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if births[i] and births[j] and (births[i] == births[j] or _swapped(births[i]) == births[j]) \
+                        and i in compared_by_birth:
+                    continue    # doğum tarihi bloğunda zaten karşılaştırıldı
+                pairs += 1
+                gi, gj = names[i], names[j]
+                common = len(gi & gj)
+                score = (NAME_WEIGHT * common / (len(gi) + len(gj) - common) if gi and gj else 0.0) + PHONE_WEIGHT
+                if births[i] and births[i] == births[j]:
+                    score += BIRTH_WEIGHT
+                elif births[i] and _swapped(births[i]) == births[j]:
+                    score += swapped_birth
+                if score >= threshold:
+                    link(i, j, score)
+
+    groups = defaultdict(list)
+    for i in best:
+        groups[find(i)].append(i)
+    clusters = [
+        {"Score": max(best[i] for i in g),
+         "Patients": [_public(rows[i]._mapping) for i in sorted(g, key=lambda i: rows[i].PatientId)]}
+        for g in groups.values()
+    ]
+    clusters.sort(key=lambda c: (-c["Score"], -len(c["Patients"])))
+    return {"clusters": clusters, "patients": len(rows), "pairs": pairs,
+            "skipped_blocks": skipped, "seconds": round(time.perf_counter() - started, 2)}
@@ -0,0 +1,236 @@
+# services/export.py
+"""
+Streaming export of grid queries to CSV (.csv / .csv.gz) or Parquet.
+
+Rows are read with yield_per (fetchmany batches from the DB cursor) and
+written batch by batch, so memory stays flat however large the result is.
+The file is written to '<path>.part' and renamed at the end; a cancelled or
+failed export leaves nothing behind.
+
+Exports read the database directly (not through the API server): they need
+a DB connection even in thin-client mode.
+"""
+import csv
+import gzip
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from services import patients, payments, reservations, schema, service_records, staff
+from services.base import ServiceError, connection
+
+# Grid kaynakları: rol pencerelerindeki tablolarla aynı sorgular
+EXPORTS = {
+    "payments": payments.LIST_SQL,
+    "patients": patients.LIST_SQL,
+    "reservations": reservations.LIST_SQL,
+    "staff": staff.LIST_SQL,
+    "doctor_records": service_records.DOCTOR_LIST_SQL,   # :doc
+    # PasswordHash dışarı çıkmasın
+    "users": text("""
+        SELECT ua.UserId, ua.Username, ua.RoleId, r.RoleName, ua.StaffId, ua.PatientId, ua.IsActive
+        FROM UserAccount ua
+        JOIN Role r ON r.RoleId = ua.RoleId
+        ORDER BY ua.UserId
+    """),
+    "service_records": text("""
+        SELECT sr.ServiceRecordId, sr.PatientId, sr.ServiceId, sr.DoctorId, sr.ProgramId,
+               sr.ServiceDate, sr.TotalPrice, sr.StateCoveredAmount, sr.PatientPayableAmount
+        FROM ServiceRecord sr
+        ORDER BY sr.ServiceRecordId
+    """),
+    "balances": text("""
+        SELECT b.ServiceRecordId, sr.PatientId, sr.ServiceDate,
+               b.PayableAmount, b.PaidAmount, b.OutstandingAmount, b.BalanceStatus
+        FROM ServiceRecordBalance b
+        JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+        WHERE b.BalanceStatus = :status
+        ORDER BY b.ServiceRecordId DESC
+    """),
+}
+
+FORMATS = ("csv", "csv.gz", "parquet")
+
+@dataclass
+class ExportReport:
+    path: str
+    fmt: str
+    rows: int = 0
+    columns: int = 0
+    seconds: float = 0.0
+    cancelled: bool = False
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def summary(self) -> str:
+        if self.cancelled:
+            return f"Export cancelled after {self.rows:,} rows (nothing written)."
+        return (f"{self.rows:,} rows x {self.columns} columns -> {self.path} ({self.fmt}) "
+                f"in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)")
+
+def format_for(path: str) -> str:
+    p = path.lower()
+    if p.endswith(".parquet"):
+        return "parquet"
+    if p.endswith(".csv.gz"):
+        return "csv.gz"
+    return "csv"
+
+def table_query(table: str, pk: str, columns: list[str]):
+    # tablo/kolon adları koddan gelir (FieldSpec config); CLI için yine de kontrol
+    names = [table, pk, *columns]
+    if not all(n.isidentifier() for n in names):
+        raise ServiceError(f"Invalid table/column name in {names}.")
+    secret = [c for c in columns if schema.is_secret(c)]
+    if secret:
+        raise ServiceError(f"Column(s) cannot be exported: {', '.join(secret)}")
+    return text(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {pk}")
+
+class _CsvWriter:
+    def __init__(self, path: str, columns: list[str], compressed: bool):
+        if compressed:
+            self.f = gzip.open(path, "wt", newline="", encoding="utf-8")
+        else:
+            # utf-8-sig: Excel Türkçe karakterleri doğru açsın
+            self.f = open(path, "w", newline="", encoding="utf-8-sig")
+        self.w = csv.writer(self.f)
+        self.w.writerow(columns)
+
+    def write(self, rows):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+class _ParquetWriter:
+    """Column types are fixed from the first batch; one row group per batch, zstd."""
+    def __init__(self, path: str, columns: list[str]):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ServiceError("Parquet export needs pyarrow (pip install pyarrow); use .csv or .csv.gz.") from None
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.columns = columns
+        self.types = None
+        self.scales = {}
+        self.w = None
+
+    def _infer(self, rows):
+        pa = self.pa
+        types = []
+        for i, _ in enumerate(self.columns):
+            sample = next((r[i] for r in rows if r[i] is not None), None)
+            if isinstance(sample, bool):
+                t = pa.bool_()
+            elif isinstance(sample, int):
+                # SQLite NUMERIC: 100.0 int olarak döner, aynı kolonda 99.5 float
+                t = pa.float64() if any(isinstance(r[i], float) for r in rows) else pa.int64()
+            elif isinstance(sample, float):
+                t = pa.float64()
+            elif isinstance(sample, Decimal):
+                scale = max(max(-r[i].as_tuple().exponent, 0) for r in rows if r[i] is not None)
+                self.scales[i] = Decimal(1).scaleb(-max(scale, 2))
+                t = pa.decimal128(38, max(scale, 2))
+            elif isinstance(sample, datetime):
+                t = pa.timestamp("us")
+            elif isinstance(sample, date):
+                t = pa.date32()
+            elif isinstance(sample, bytes):
+                t = pa.binary()
+            else:
+                t = pa.string()
+            types.append(t)
+        return types
+
+    def _column(self, i, values):
+        t = self.types[i]
+        if i in self.scales:
+            q = self.scales[i]
+            values = [None if v is None else Decimal(v).quantize(q) for v in values]
+        elif t == self.pa.string():
+            values = [None if v is None else str(v) for v in values]
+        try:
+            return self.pa.array(values, type=t)
+        except (self.pa.ArrowInvalid, self.pa.ArrowTypeError, TypeError) as e:
+            raise ServiceError(f"Column {self.columns[i]} changed type during export ({e}); use CSV.") from None
+
+    def write(self, rows):
+        if self.types is None:
+            self.types = self._infer(rows)
+            schema = self.pa.schema(list(zip(self.columns, self.types)))
+            self.w = self.pq.ParquetWriter(self.path, schema, compression="zstd")
+        cols = list(zip(*rows)) if rows else [() for _ in self.columns]
+        self.w.write_table(self.pa.Table.from_arrays(
+            [self._column(i, list(v)) for i, v in enumerate(cols)], names=self.columns))
+
+    def close(self):
+        if self.w is None:
+            # Boş sonuç: sadece kolon adları (string)
+            schema = self.pa.schema([(c, self.pa.string()) for c in self.columns])
+            self.w = self.pq.ParquetWriter(self.path, schema, compression="zstd")
+        self.w.close()
+
+def _writer(fmt: str, path: str, columns: list[str]):
+    if fmt == "parquet":
+        return _ParquetWriter(path, columns)
+    return _CsvWriter(path, columns, compressed=(fmt == "csv.gz"))
+
+def export_query(q, path: str, params: dict | None = None, fmt: str | None = None,
+                 batch_size: int = 20000, progress=None, cancel=None, conn=None) -> ExportReport:
+    """
+    Streams the rows of q into path.
+    progress(rows_written) is called after every batch; cancel is a
+    threading.Event (or anything with is_set()) checked between batches.
+    """
+    fmt = fmt or format_for(path)
+    if fmt not in FORMATS:
+        raise ServiceError(f"Unknown export format '{fmt}'.")
+    report = ExportReport(path=path, fmt=fmt)
+    tmp = path + ".part"
+    started = time.perf_counter()
+    writer = None
+    ok = False
+    try:
+        with connection(conn) as c:
+            result = c.execution_options(yield_per=batch_size).execute(q, params or {})
+            columns = list(result.keys())
+            report.columns = len(columns)
+            writer = _writer(fmt, tmp, columns)
+            for batch in result.partitions(batch_size):
+                if cancel is not None and cancel.is_set():
+                    report.cancelled = True
+                    result.close()
+                    break
+                writer.write(batch)
+                report.rows += len(batch)
+                if progress:
+                    progress(report.rows)
+        writer.close()
+        writer = None
+        if not report.cancelled:
+            os.replace(tmp, path)
+            ok = True
+    finally:
+        if writer is not None:
+            try:
+                writer.close()
+            except Exception:
+                pass
+        if not ok and os.path.exists(tmp):
+            os.remove(tmp)
+    report.seconds = time.perf_counter() - started
+    return report
+
+def export(source: str, path: str, params: dict | None = None, **kwargs) -> ExportReport:
+    """Named grid export (see EXPORTS)."""
+    if source not in EXPORTS:
+        raise ServiceError(f"Unknown export '{source}'. Available: {', '.join(sorted(EXPORTS))}")
+    return export_query(EXPORTS[source], path, params, **kwargs)
@@ -0,0 +1,277 @@
+# services/patients.py
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+from services.base import transaction, fetch_all, id_list_sql, pick, top_n_sql, operation, bulk_execute, \
+    changed_fields, update_changed
+from services.trigram import TrigramIndex
+
+FIELDS = ("FirstName", "LastName", "TCNo", "BirthDate", "Gender", "Phone", "Email", "Address", "IsActive")
+
+LIST_SQL = text("""
+    SELECT PatientId, FirstName, LastName, TCNo, BirthDate,
+        Gender, Phone, Email, Address, IsActive, CAST(RowVer AS BIGINT) AS RowVer
+    FROM Patient
+    ORDER BY PatientId
+""")
+
+CURRENT_SQL = text("""
+    SELECT PatientId, FirstName, LastName, TCNo, BirthDate,
+        Gender, Phone, Email, Address, IsActive, CAST(RowVer AS BIGINT) AS RowVer
+    FROM Patient
+    WHERE PatientId = :id
+""")
+
+ACTIVE_SQL = text("""
+    SELECT PatientId, CONCAT(FirstName, ' ', LastName) AS FullName
+    FROM Patient
+    WHERE IsActive = 1 OR IsActive IS NULL
+    ORDER BY PatientId
+""")
+
+# Hasta arama (combo yerine): index'li prefix arama + TOP N
+SEARCH_SQL = """
+    SELECT {top} PatientId, CONCAT(FirstName, ' ', LastName) AS FullName, TCNo, BirthDate
+    FROM Patient
+    WHERE {filter}
+    ORDER BY {order}
+    {limit}
+"""
+
+# Her mod bir veya birkaç (filtre, sıralama) sorgusu; her biri kendi index'i üzerinde TOP N,
+# sonuçlar sırayla birleştirilir (OR + sort yerine)
+SEARCH_MODES = {
+    "recent": [("", "PatientId DESC")],
+    "id": [("PatientId = :id", "PatientId")],
+    "tc": [("TCNo LIKE :prefix", "TCNo")],
+    "name": [
+        ("LastNameNorm LIKE :prefix", "LastNameNorm, FirstNameNorm"),
+        ("FirstNameNorm LIKE :prefix", "FirstNameNorm, LastNameNorm"),
+    ],
+    "fullname": [
+        ("FirstNameNorm LIKE :first AND LastNameNorm LIKE :last", "FirstNameNorm, LastNameNorm"),
+        ("LastNameNorm LIKE :first AND FirstNameNorm LIKE :last", "LastNameNorm, FirstNameNorm"),
+        # birden fazla ön ad: 'ali riza'
+        ("FirstNameNorm LIKE :prefix", "FirstNameNorm, LastNameNorm"),
+    ],
+}
+SEARCH_ACTIVE = "(IsActive = 1 OR IsActive IS NULL)"
+
+FUZZY_SOURCE_SQL = text("""
+    SELECT PatientId, CONCAT(FirstName, ' ', LastName) AS FullName, TCNo, BirthDate,
+           FirstNameNorm, LastNameNorm
+    FROM Patient
+    WHERE IsActive = 1 OR IsActive IS NULL
+""")
+
+INSERT_SQL = text("""
+    INSERT INTO Patient
+    (FirstName, LastName, TCNo, BirthDate, Gender, Phone, Email, Address, IsActive,
+     FirstNameNorm, LastNameNorm, PhoneNorm)
+    VALUES (:FirstName, :LastName, :TCNo, :BirthDate, :Gender, :Phone, :Email, :Address, :IsActive,
+            :FirstNameNorm, :LastNameNorm, :PhoneNorm)
+""")
+
+UPDATE_SQL = text("""
+    UPDATE Patient
+    SET FirstName=:FirstName, LastName=:LastName, TCNo=:TCNo, BirthDate=:BirthDate, Gender=:Gender,
+        Phone=:Phone, Email=:Email, Address=:Address, IsActive=:IsActive,
+        FirstNameNorm=:FirstNameNorm, LastNameNorm=:LastNameNorm, PhoneNorm=:PhoneNorm
+    WHERE PatientId=:PatientId
+""")
+
+SET_ACTIVE_SQL = id_list_sql("UPDATE Patient SET IsActive=:a WHERE PatientId IN :ids")
+TOGGLE_ACTIVE_SQL = id_list_sql(
+    "UPDATE Patient SET IsActive = CASE WHEN IsActive = 0 THEN 1 ELSE 0 END WHERE PatientId IN :ids"
+)
+DELETE_SQL = id_list_sql("DELETE FROM Patient WHERE PatientId IN :ids")
+
+# Türkçe karakterler sadeleştirilir; SQL script'lerindeki backfill ile aynı kural
+_NORM = str.maketrans("çÇğĞıİöÖşŞüÜ", "ccggiioossuu")
+
+# Opsiyonel bulanık arama (yazım hatası): HOSPITAL_PATIENT_FUZZY=1
+FUZZY_ENABLED = os.environ.get("HOSPITAL_PATIENT_FUZZY", "") == "1"
+FUZZY_TTL = 600
+
+def normalize_name(name) -> str:
+    return " ".join(str(name or "").translate(_NORM).lower().split())
+
+def normalize_phone(phone) -> str | None:
+    """Last 10 digits ('+90 (555) 444-55-66' -> '5554445566'); None if no digits."""
+    digits = "".join(ch for ch in str(phone or "") if ch.isdigit())
+    return digits[-10:] or None
+
+# Ad / telefon değişince arama anahtarları da yazılır
+DERIVED = {"FirstName": "FirstNameNorm", "LastName": "LastNameNorm", "Phone": "PhoneNorm"}
+
+def _params(r: dict) -> dict:
+    return dict(pick(r, FIELDS),
+                FirstNameNorm=normalize_name(r.get("FirstName")),
+                LastNameNorm=normalize_name(r.get("LastName")),
+                PhoneNorm=normalize_phone(r.get("Phone")))
+
+class _FuzzyIndex:
+    """
+    Process-wide trigram index over active patients. Built on a background
+    thread on first use; patient writes (and FUZZY_TTL) mark it stale and the
+    old index keeps answering until the rebuild is done.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = None
+        self._built_at = 0.0
+        self._stale = False
+        self._building = False
+
+    def get(self):
+        with self._lock:
+            expired = self._stale or time.monotonic() - self._built_at > FUZZY_TTL
+            if (self._index is None or expired) and not self._building:
+                self._building = True
+                threading.Thread(target=self._build, name="patient-trigram", daemon=True).start()
+            return self._index
+
+    def _build(self):
+        try:
+            rows = fetch_all(FUZZY_SOURCE_SQL)
+            index = TrigramIndex(
+                (r["PatientId"], f"{r['FirstNameNorm'] or ''} {r['LastNameNorm'] or ''}",
+                 {"PatientId": r["PatientId"], "FullName": r["FullName"], "TCNo": r["TCNo"],
+                  "BirthDate": r["BirthDate"], "Fuzzy": True})
+                for r in rows
+            )
+            with self._lock:
+                self._index, self._built_at, self._stale = index, time.monotonic(), False
+        finally:
+            with self._lock:
+                self._building = False
+
+    def invalidate(self):
+        with self._lock:
+            self._stale = True
+
+_fuzzy = _FuzzyIndex()
+
+def _search_mode(term: str):
+    """term -> (mode, params, normalized name or None)."""
+    term = term.strip().replace("%", "").replace("_", "")
+    if not term:
+        return "recent", {}, None
+    if term.startswith("#") and term[1:].isdigit():
+        return "id", {"id": int(term[1:])}, None
+    if term.isdigit():
+        return "tc", {"prefix": term + "%"}, None
+    norm = normalize_name(term)
+    parts = norm.split()
+    if len(parts) > 1:
+        return "fullname", {"first": parts[0] + "%", "last": parts[-1] + "%", "prefix": norm + "%"}, norm
+    return "name", {"prefix": norm + "%"}, norm
+
+@operation(reads=("Patient",))
+def search_patients(term: str = "", limit: int = 20, fuzzy: bool | None = None, conn=None):
+    """
+    Active patients for pickers: [{PatientId, FullName, TCNo, BirthDate}].
+    term: name prefix ('ali', 'Ali Yıl', case / Turkish letters ignored),
+    TCNo prefix or '#PatientId'; empty = newest patients. '#PatientId' also
+    finds an inactive patient (pickers preselect the patient of an existing
+    reservation / record that way). With fuzzy (default
+    HOSPITAL_PATIENT_FUZZY) short results are topped up from the trigram
+    index; those rows carry Fuzzy=True.
+    """
+    mode, params, norm = _search_mode(term)
+    rows, seen = [], set()
+    for where, order in SEARCH_MODES[mode]:
+        if mode != "id":
+            where = f"{SEARCH_ACTIVE} AND {where}" if where else SEARCH_ACTIVE
+        q = top_n_sql(SEARCH_SQL.replace("{filter}", where).replace("{order}", order), conn)
+        for r in fetch_all(q, dict(params, limit=limit - len(rows)), conn=conn):
+            if r["PatientId"] not in seen:
+                seen.add(r["PatientId"])
+                rows.append(r)
+        if len(rows) >= limit:
+            break
+
+    if (FUZZY_ENABLED if fuzzy is None else fuzzy) and norm and len(norm) >= 3 and len(rows) < limit:
+        index = _fuzzy.get()
+        if index is not None:
+            rows = [dict(r) for r in rows]
+            for _score, payload in index.search(norm, limit * 2):
+                if payload["PatientId"] not in seen:
+                    rows.append(payload)
+                    seen.add(payload["PatientId"])
+                if len(rows) >= limit:
+                    break
+    return rows
+
+@operation(reads=("Patient",))
+def list_patients(conn=None):
+    return fetch_all(LIST_SQL, conn=conn)
+
+@operation(reads=("Patient",))
+def list_active_patients(conn=None):
+    """[{PatientId, FullName}] for combos."""
+    return fetch_all(ACTIVE_SQL, conn=conn)
+
+@operation(writes=("Patient",))
+def add_patient(data: dict, conn=None):
+    add_patients([data], conn=conn)
+
+@operation(writes=("Patient",))
+def add_patients(rows: list[dict], conn=None):
+    if not rows:
+        return
+    with transaction(conn) as c:
+        c.execute(INSERT_SQL, [_params(r) for r in rows])
+    _fuzzy.invalidate()
+
+@operation(writes=("Patient",))
+def update_patient(patient_id: int, data: dict, original: dict | None = None, conn=None) -> bool:
+    """
+    original: the row as listed (list_patients, with RowVer). Only the changed
+    columns are written, guarded by RowVer -> ConcurrencyConflict with the
+    current row. Without original every column is written.
+    """
+    if original is None:
+        update_patients([dict(data, PatientId=patient_id)], conn=conn)
+        return True
+    params = _params(data)
+    changes = changed_fields(original, pick(params, [f for f in FIELDS if f in data]))
+    for field, norm in DERIVED.items():
+        if field in changes:
+            changes[norm] = params[norm]
+    updated = update_changed("Patient", "PatientId", patient_id, changes, version=original.get("RowVer"),
+                             original=original, current_sql=CURRENT_SQL, conn=conn)
+    if updated:
+        _fuzzy.invalidate()
+    return updated
+
+@operation(writes=("Patient",))
+def update_patients(rows: list[dict], conn=None):
+    """rows: full patient dicts including PatientId."""
+    if not rows:
+        return
+    with transaction(conn) as c:
+        c.execute(UPDATE_SQL, [dict(_params(r), PatientId=r["PatientId"]) for r in rows])
+    _fuzzy.invalidate()
+
+@operation(writes=("Patient",))
+def set_active(patient_ids: list[int], active: bool, conn=None) -> dict:
+    result = bulk_execute(SET_ACTIVE_SQL, patient_ids, {"a": 1 if active else 0}, conn=conn)
+    _fuzzy.invalidate()
+    return result
+
+@operation(writes=("Patient",))
+def toggle_active(patient_ids: list[int], conn=None) -> dict:
+    """Flips IsActive of every row (NULL counts as active)."""
+    result = bulk_execute(TOGGLE_ACTIVE_SQL, patient_ids, conn=conn)
+    _fuzzy.invalidate()
+    return result
+
+@operation(writes=("Patient",))
+def delete_patients(patient_ids: list[int], conn=None) -> dict:
+    result = bulk_execute(DELETE_SQL, patient_ids, conn=conn)
+    _fuzzy.invalidate()
+    return result
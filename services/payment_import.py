@@ -0,0 +1,296 @@
+# services/payment_import.py
+"""
+Bulk payment posting from bank transfer / POS settlement files.
+
+The file is read as a stream (csv reader, one line at a time). Each line is
+matched against an in-memory index of outstanding records built with one
+query at the start:
+
+  * 'SR#123' / 'SR123' in the reference   -> that ServiceRecord
+  * an 11-digit TCNo in the reference      -> that patient's oldest record
+                                              whose remaining balance covers the amount
+
+Amounts are validated against the remaining balance, which the index keeps
+up to date as lines are accepted (several lines may pay the same record).
+Accepted rows are inserted in chunks; each chunk is one transaction with
+one executemany INSERT (fast_executemany on SQL Server) and one set-based
+ledger update. If a chunk fails (e.g. a concurrent payment from the UI
+made a record overpaid, or a database error) it is rolled back and retried
+row by row, so only the offending lines end up in the exceptions report.
+Every accepted line is either posted or reported.
+
+Each line is stored with an external reference (format + hash of the raw
+line + its occurrence number in the file, so two identical lines are two
+payments). Lines whose reference is already in Payment are counted as
+already posted and skipped before matching, so posting the same file again
+(or a file that overlaps one already posted) does not pay anything twice.
+"""
+import csv
+import hashlib
+import re
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from services import balances, definitions
+from services.base import ServiceError, transaction, fetch_all, id_list_sql
+
+# Kolon adları dosya formatına göre (başlık satırı zorunlu)
+FORMATS = {
+    # Banka havale/EFT ekstresi
+    "bank": {"date": "TransactionDate", "amount": "Amount", "reference": "Description",
+             "payer": "SenderName", "payment_type": "Transfer"},
+    # POS gün sonu / settlement dosyası
+    "pos": {"date": "SettlementDate", "amount": "NetAmount", "reference": "OrderRef",
+            "payer": None, "payment_type": "Card"},
+}
+
+OUTSTANDING_INDEX_SQL = text("""
+    SELECT b.ServiceRecordId, b.OutstandingAmount, p.TCNo
+    FROM ServiceRecordBalance b
+    JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+    JOIN Patient p ON p.PatientId = sr.PatientId
+    WHERE b.BalanceStatus IN ('U', 'P')
+    ORDER BY b.ServiceRecordId
+""")
+
+IMPORT_INSERT_SQL = text("""
+    INSERT INTO Payment (ServiceRecordId, PaymentDate, Amount, PaymentTypeId, Payer, ExternalRef)
+    VALUES (:ServiceRecordId, :PaymentDate, :Amount, :PaymentTypeId, :Payer, :ExternalRef)
+""")
+
+POSTED_REFS_SQL = id_list_sql("SELECT ExternalRef FROM Payment WHERE ExternalRef IN :ids")
+
+_SR_RE = re.compile(r"SR\s*#?\s*(\d+)", re.IGNORECASE)
+_TC_RE = re.compile(r"(?<!\d)(\d{11})(?!\d)")
+_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%d/%m/%Y", "%Y%m%d")
+
+@dataclass
+class PostingReport:
+    dry_run: bool
+    lines: int = 0
+    accepted: int = 0
+    posted: int = 0
+    already_posted: int = 0
+    amount_accepted: Decimal = Decimal("0.00")
+    amount_posted: Decimal = Decimal("0.00")
+    exceptions: list = field(default_factory=list)   # {line, reason, raw}
+    index_size: int = 0
+    match_seconds: float = 0.0
+    insert_seconds: float = 0.0
+
+    @property
+    def rows_per_sec(self) -> float:
+        total = self.match_seconds + self.insert_seconds
+        return self.lines / total if total else 0.0
+
+    def summary(self) -> str:
+        mode = "DRY RUN" if self.dry_run else "POSTED"
+        return (
+            f"[{mode}] lines={self.lines} already posted={self.already_posted} accepted={self.accepted} "
+            f"posted={self.posted} exceptions={len(self.exceptions)} "
+            f"amount accepted={self.amount_accepted} posted={self.amount_posted}\n"
+            f"index={self.index_size} open records, parse+match {self.match_seconds:.2f}s, "
+            f"insert {self.insert_seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)"
+        )
+
+    def write_exceptions(self, path: str):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["Line", "Reason", "Raw"])
+            for e in self.exceptions:
+                w.writerow([e["line"], e["reason"], e["raw"]])
+
+class OutstandingIndex:
+    """Remaining balance per open record + TCNo -> record ids (oldest first)."""
+    def __init__(self, rows):
+        self.remaining: dict[int, Decimal] = {}
+        self.by_tc: dict[str, list[int]] = defaultdict(list)
+        for r in rows:
+            sr = int(r["ServiceRecordId"])
+            self.remaining[sr] = Decimal(str(r["OutstandingAmount"])).quantize(balances.CENT)
+            self.by_tc[str(r["TCNo"])].append(sr)
+
+    def __len__(self):
+        return len(self.remaining)
+
+    def match(self, reference: str, amount: Decimal):
+        """-> (ServiceRecordId, None) or (None, reason)."""
+        m = _SR_RE.search(reference)
+        if m:
+            sr = int(m.group(1))
+            left = self.remaining.get(sr)
+            if left is None:
+                return None, f"SR#{sr} has no outstanding balance"
+            if amount > left:
+                return None, f"amount {amount} exceeds outstanding {left} of SR#{sr}"
+            return sr, None
+
+        m = _TC_RE.search(reference)
+        if m:
+            candidates = [sr for sr in self.by_tc.get(m.group(1), ()) if self.remaining[sr] > 0]
+            if not candidates:
+                return None, f"no outstanding record for TCNo {m.group(1)}"
+            exact = next((sr for sr in candidates if self.remaining[sr] == amount), None)
+            sr = exact or next((sr for sr in candidates if self.remaining[sr] >= amount), None)
+            if sr is None:
+                return None, f"amount {amount} exceeds every open balance of TCNo {m.group(1)}"
+            return sr, None
+
+        return None, "no SR# or TCNo in reference"
+
+    def take(self, sr: int, amount: Decimal):
+        self.remaining[sr] -= amount
+
+def _parse_amount(s: str) -> Decimal:
+    """
+    '1.234,56' (TR), '1,234.56' (EN), '1234,5', '1.234.567'. A lone separator
+    followed by exactly three digits ('1,234') could be either and more than
+    two decimals would be rounded: both raise ValueError (exceptions report).
+    """
+    raw = (s or "").strip().replace(" ", "")
+    seps = [ch for ch in raw if ch in ",."]
+    if len(set(seps)) == 2:
+        dec = raw[max(raw.rfind(","), raw.rfind("."))]
+    elif len(seps) == 1:
+        if len(raw) - raw.find(seps[0]) - 1 == 3:
+            raise ValueError(f"ambiguous amount '{raw}' (thousands or decimal separator?)")
+        dec = seps[0]
+    else:
+        dec = None      # ayırıcı yok ya da sadece binlik gruplama (1.234.567)
+    whole, frac = raw.rsplit(dec, 1) if dec else (raw, None)
+    group = ({",", "."} - {dec}).pop() if dec else (seps[0] if seps else None)
+    if group and group in whole and not re.fullmatch(rf"[+-]?\d{{1,3}}(?:{re.escape(group)}\d{{3}})+", whole):
+        raise ValueError(f"bad amount '{raw}'")
+    number = (whole.replace(group, "") if group else whole) + (f".{frac}" if dec else "")
+    try:
+        amount = Decimal(number)
+        if not amount.is_finite():
+            raise InvalidOperation
+        if amount != amount.quantize(balances.CENT):
+            raise ValueError(f"amount '{raw}' has more than two decimals")
+        return amount.quantize(balances.CENT)
+    except InvalidOperation:
+        raise ValueError(f"bad amount '{raw}'") from None
+
+def _parse_date(s: str) -> date:
+    s = (s or "").strip()[:10]
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"bad date '{s}'")
+
+def _payment_type_id(name: str) -> int:
+    for pt in definitions.list_payment_types():
+        if str(pt["PaymentTypeName"]).lower() == name.lower():
+            return pt["PaymentTypeId"]
+    raise ServiceError(f"PaymentType '{name}' not found.")
+
+def _external_ref(fmt: str, raw: str, seen: dict) -> str:
+    """'bank:<sha1 of the line>:<n>', n = occurrence of the same line in this file."""
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    seen[digest] = n = seen.get(digest, 0) + 1
+    return f"{fmt}:{digest}:{n}"
+
+def _post_chunk(chunk, report: PostingReport):
+    try:
+        with transaction() as c:
+            balances.apply_payments_bulk(c, [p for _, _, p in chunk])
+            c.execute(IMPORT_INSERT_SQL, [p for _, _, p in chunk])
+        posted = chunk
+    except (ServiceError, DBAPIError):
+        # Toplu deneme başarısız: satır satır tekrar (sadece sorunlu satırlar exception olur)
+        posted = []
+        for item in chunk:
+            line_no, raw, p = item
+            try:
+                with transaction() as c:
+                    balances.apply_payments(c, [p])
+                    c.execute(IMPORT_INSERT_SQL, p)
+                posted.append(item)
+            except ServiceError as e:
+                report.exceptions.append({"line": line_no, "reason": str(e), "raw": raw})
+            except DBAPIError as e:
+                report.exceptions.append({"line": line_no, "reason": f"database error: {e.orig}", "raw": raw})
+    report.posted += len(posted)
+    report.amount_posted += sum((p["Amount"] for _, _, p in posted), Decimal("0.00"))
+
+def post_file(path: str, fmt: str = "bank", payment_type: str | None = None, commit: bool = False,
+              chunk_size: int = 1000, delimiter: str = ",", encoding: str = "utf-8-sig",
+              progress=None) -> PostingReport:
+    """
+    Parses, matches and (commit=True) posts a settlement file.
+    commit=False is a dry run: same matching and exceptions, nothing written.
+    """
+    spec = FORMATS[fmt]
+    type_id = _payment_type_id(payment_type or spec["payment_type"])
+    report = PostingReport(dry_run=not commit)
+
+    started = time.perf_counter()
+    index = OutstandingIndex(fetch_all(OUTSTANDING_INDEX_SQL))
+    report.index_size = len(index)
+
+    def flush(lines):
+        # Daha önce işlenmiş satırlar eşleştirmeden önce elenir (bakiyeden düşülmesinler)
+        posted_refs = {r["ExternalRef"] for r in fetch_all(POSTED_REFS_SQL, {"ids": [ln[2] for ln in lines]})}
+        chunk = []
+        for line_no, raw, ref, amount, paid_on, row in lines:
+            if ref in posted_refs:
+                report.already_posted += 1
+                continue
+            sr, reason = index.match(row.get(spec["reference"]) or "", amount)
+            if sr is None:
+                report.exceptions.append({"line": line_no, "reason": reason, "raw": raw})
+                continue
+
+            index.take(sr, amount)
+            report.accepted += 1
+            report.amount_accepted += amount
+            payer = (row.get(spec["payer"]) if spec["payer"] else None) or "Patient"
+            chunk.append((line_no, raw, {
+                "ServiceRecordId": sr, "PaymentDate": paid_on, "Amount": amount,
+                "PaymentTypeId": type_id, "Payer": payer.strip()[:20], "ExternalRef": ref,
+            }))
+        if chunk and commit:
+            t = time.perf_counter()
+            _post_chunk(chunk, report)
+            report.insert_seconds += time.perf_counter() - t
+        if progress:
+            progress(report)
+
+    pending, seen = [], {}
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.DictReader(f, delimiter=delimiter)
+        for line_no, row in enumerate(reader, start=2):
+            report.lines += 1
+            raw = delimiter.join(str(v) for v in row.values())
+            try:
+                amount = _parse_amount(row.get(spec["amount"]))
+                paid_on = _parse_date(row.get(spec["date"]))
+            except (ValueError, TypeError) as e:
+                report.exceptions.append({"line": line_no, "reason": f"unreadable line: {e}", "raw": raw})
+                continue
+            if amount <= 0:
+                report.exceptions.append({"line": line_no, "reason": "amount must be > 0", "raw": raw})
+                continue
+
+            pending.append((line_no, raw, _external_ref(fmt, raw, seen), amount, paid_on, row))
+            if len(pending) >= chunk_size:
+                flush(pending)
+                pending = []
+
+    if pending:
+        flush(pending)
+    elif progress:
+        progress(report)
+
+    report.match_seconds = time.perf_counter() - started - report.insert_seconds
+    report.exceptions.sort(key=lambda e: e["line"])
+    return report
@@ -0,0 +1,97 @@
+# services/payments.py
+from sqlalchemy import text
+
+from services import balances, rollups
+from services.base import transaction, fetch_all, id_list_sql, top_n_sql, operation
+
+LIST_SQL = text("""
+    SELECT p.PaymentId, p.ServiceRecordId, p.PaymentDate,
+        p.Amount, pt.PaymentTypeName, p.Payer
+    FROM Payment p
+    JOIN PaymentType pt ON pt.PaymentTypeId = p.PaymentTypeId
+    ORDER BY p.PaymentId DESC
+""")
+
+# Ödeme için kayıt arama: sadece açık (U/P) kayıtlar, modlara göre index'li filtre + TOP N
+SEARCH_OUTSTANDING_SQL = """
+    SELECT {top} sr.ServiceRecordId, sr.PatientId, p.TCNo,
+           CONCAT(p.FirstName, ' ', p.LastName) AS PatientName,
+           sr.ServiceDate, b.PayableAmount, b.PaidAmount, b.OutstandingAmount
+    FROM ServiceRecordBalance b
+    JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+    JOIN Patient p ON p.PatientId = sr.PatientId
+    WHERE b.BalanceStatus IN ('U', 'P') {filter}
+    ORDER BY b.ServiceRecordId DESC
+    {limit}
+"""
+
+SEARCH_FILTERS = {
+    "recent": "",
+    "id": "AND b.ServiceRecordId = :id",
+    "tc": "AND p.TCNo LIKE :prefix",
+    "date": "AND sr.ServiceDate = :date",
+    "name": "AND (p.FirstName LIKE :prefix OR p.LastName LIKE :prefix)",
+    "fullname": "AND p.FirstName LIKE :first AND p.LastName LIKE :last",
+}
+
+INSERT_SQL = text("""
+    INSERT INTO Payment (ServiceRecordId, PaymentDate, Amount, PaymentTypeId, Payer)
+    VALUES (:ServiceRecordId, :PaymentDate, :Amount, :PaymentTypeId, :Payer)
+""")
+
+DELETE_SQL = id_list_sql("DELETE FROM Payment WHERE PaymentId IN :ids")
+
+FIELDS = ("ServiceRecordId", "PaymentDate", "Amount", "PaymentTypeId", "Payer")
+
+@operation(reads=("Payment", "PaymentType"))
+def list_payments(conn=None):
+    return fetch_all(LIST_SQL, conn=conn)
+
+def _search_mode(term: str):
+    """term -> (filter key, params). '#12' / short digits = record id, long digits = TCNo prefix."""
+    term = term.strip().replace("%", "").replace("_", "")
+    if not term:
+        return "recent", {}
+    digits = term.lstrip("#")
+    if digits.isdigit():
+        if term.startswith("#") or len(digits) <= 6:
+            return "id", {"id": int(digits)}
+        return "tc", {"prefix": digits + "%"}
+    if len(term) == 10 and term[4] == "-" and term[7] == "-" and term.replace("-", "").isdigit():
+        return "date", {"date": term}
+    parts = term.split()
+    if len(parts) > 1:
+        return "fullname", {"first": parts[0] + "%", "last": " ".join(parts[1:]) + "%"}
+    return "name", {"prefix": term + "%"}
+
+@operation(reads=("ServiceRecordBalance", "ServiceRecord", "Patient"))
+def search_outstanding_records(term: str = "", limit: int = 50, conn=None):
+    """
+    Unpaid / partially paid records for PaymentDialog, newest first.
+    term: patient name prefix ('Ali', 'Ali Yil'), TCNo prefix, '#RecordId' or 'YYYY-MM-DD'.
+    """
+    mode, params = _search_mode(term)
+    q = top_n_sql(SEARCH_OUTSTANDING_SQL.replace("{filter}", SEARCH_FILTERS[mode]), conn)
+    return fetch_all(q, dict(params, limit=limit), conn=conn)
+
+@operation(writes=("Payment", "ServiceRecordBalance"))
+def add_payment(data: dict, conn=None):
+    add_payments([data], conn=conn)
+
+@operation(writes=("Payment", "ServiceRecordBalance"))
+def add_payments(rows: list[dict], conn=None):
+    """Raises balances.Overpayment (and inserts nothing) if a record would be overpaid."""
+    if not rows:
+        return
+    with transaction(conn) as c:
+        balances.apply_payments(c, rows)
+        c.execute(INSERT_SQL, [{f: r[f] for f in FIELDS} for r in rows])
+
+@operation(writes=("Payment", "ServiceRecordBalance", "RevenueDirtyDay"))
+def delete_payments(payment_ids: list[int], conn=None) -> int:
+    if not payment_ids:
+        return 0
+    with transaction(conn) as c:
+        balances.revert_payments(c, payment_ids)
+        rollups.mark_payments_dirty(c, payment_ids)
+        return c.execute(DELETE_SQL, {"ids": list(payment_ids)}).rowcount
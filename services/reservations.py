@@ -0,0 +1,167 @@
+# services/reservations.py
+from datetime import date
+
+from sqlalchemy import text
+
+from services.base import ServiceError, transaction, connection, fetch_all, id_list_sql, operation, bulk_execute, \
+    changed_fields, update_changed, dialect_name
+from services.definitions import list_statuses, cancel_status_id
+
+class ReservationConflict(ServiceError):
+    """Room is already booked for (part of) the requested date range."""
+
+LIST_SQL = text("""
+    SELECT res.ReservationId,
+           res.PatientId,
+           CONCAT(p.FirstName, ' ', p.LastName) AS PatientName,
+           res.RoomId,
+           res.StartDate,
+           res.EndDate,
+           res.StatusId,
+           st.StatusName,
+           CAST(res.RowVer AS BIGINT) AS RowVer
+    FROM Reservation res
+    JOIN Patient p ON p.PatientId = res.PatientId
+    JOIN ReservationStatus st ON st.StatusId = res.StatusId
+    ORDER BY res.ReservationId DESC
+""")
+
+CURRENT_SQL = text("""
+    SELECT ReservationId, PatientId, RoomId, StartDate, EndDate, StatusId, CAST(RowVer AS BIGINT) AS RowVer
+    FROM Reservation
+    WHERE ReservationId = :id
+""")
+
+# Basit özet tablo (doluluk/rezerv sayısı)
+AVAILABILITY_SQL = text("""
+    SELECT r.RoomId,
+           COUNT(res.ReservationId) AS TotalReservations,
+           SUM(CASE WHEN st.StatusName NOT LIKE 'Cancel%' THEN 1 ELSE 0 END) AS ActiveReservations,
+           MAX(res.EndDate) AS LastReservationEnd
+    FROM Room r
+    LEFT JOIN Reservation res ON res.RoomId = r.RoomId
+    LEFT JOIN ReservationStatus st ON st.StatusId = res.StatusId
+    GROUP BY r.RoomId
+    ORDER BY r.RoomId
+""")
+
+# Çakışma kontrolü (aynı oda, tarih aralığı overlap)
+_OVERLAP = """
+    SELECT COUNT(1)
+    FROM Reservation{hint}
+    WHERE RoomId = :room
+      AND StatusId <> :cancel
+      AND NOT (EndDate <= :start OR StartDate >= :end){exclude}
+"""
+OVERLAP_SQL = text(_OVERLAP.format(hint="", exclude=""))
+
+# Rezervasyon eklerken (yazma transaction'ı içinde), eşzamanlı iki kayıt aynı odayı alamasın:
+#   SQL Server: UPDLOCK + HOLDLOCK, odanın tarih aralığında key-range kilidi commit'e kadar tutulur
+#               (IX_Reservation_Room ile sadece o oda kilitlenir)
+#   SQLite:     satır kilidi yok; önce INSERT (veritabanı yazma kilidi), sonra yeni satır hariç kontrol
+OVERLAP_LOCKED_SQL = {
+    "mssql": text(_OVERLAP.format(hint=" WITH (UPDLOCK, HOLDLOCK)", exclude="")),
+    "sqlite": text(_OVERLAP.format(hint="", exclude="\n      AND ReservationId <> :new_id")),
+}
+
+INSERT_SQL = text("""
+    INSERT INTO Reservation
+    (PatientId, RoomId, CreatedByStaffId, StatusId, StartDate, EndDate, CreatedDate)
+    VALUES (:PatientId, :RoomId, :CreatedByStaffId, :StatusId, :StartDate, :EndDate, :CreatedDate)
+""")
+
+UPDATE_SQL = text("""
+    UPDATE Reservation
+    SET PatientId=:PatientId, RoomId=:RoomId, StartDate=:StartDate, EndDate=:EndDate, StatusId=:StatusId
+    WHERE ReservationId=:ReservationId
+""")
+
+SET_STATUS_SQL = id_list_sql("UPDATE Reservation SET StatusId=:sid WHERE ReservationId IN :ids")
+DELETE_SQL = id_list_sql("DELETE FROM Reservation WHERE ReservationId IN :ids")
+
+@operation(reads=("Reservation", "Patient", "ReservationStatus"))
+def list_reservations(conn=None):
+    return fetch_all(LIST_SQL, conn=conn)
+
+@operation(reads=("Room", "Reservation", "ReservationStatus"))
+def list_availability(conn=None):
+    return fetch_all(AVAILABILITY_SQL, conn=conn)
+
+@operation(reads=("Reservation",))
+def count_overlaps(room_id: int, start, end, conn=None) -> int:
+    with connection(conn) as c:
+        # Cancel status id bilinmiyorsa 0 verip devre dışı kalır.
+        cancel_id = cancel_status_id(list_statuses(conn=c)) or 0
+        return int(c.execute(OVERLAP_SQL, {
+            "room": room_id, "cancel": cancel_id, "start": start, "end": end,
+        }).scalar() or 0)
+
+@operation(writes=("Reservation",))
+def add_reservation(data: dict, created_by: int, conn=None):
+    add_reservations([data], created_by, conn=conn)
+
+@operation(writes=("Reservation",))
+def add_reservations(rows: list[dict], created_by: int, conn=None):
+    """
+    Books all rows in one transaction; raises ReservationConflict (and books
+    nothing) if any row overlaps an existing booking. The overlap check holds
+    a lock until commit (OVERLAP_LOCKED_SQL), so concurrent bookings of the
+    same room are serialized instead of both passing the check.
+    """
+    if not rows:
+        return
+    params = [{
+        "PatientId": r["PatientId"],
+        "RoomId": r["RoomId"],
+        "CreatedByStaffId": created_by,
+        "StatusId": r["StatusId"],
+        "StartDate": r["StartDate"],
+        "EndDate": r["EndDate"],
+        "CreatedDate": date.today(),
+    } for r in rows]
+    with transaction(conn) as c:
+        dialect = dialect_name(c)
+        if dialect not in OVERLAP_LOCKED_SQL:
+            raise ServiceError(f"Reservations cannot be added on '{dialect}'.")
+        cancel_id = cancel_status_id(list_statuses(conn=c)) or 0
+        for p in params:
+            check = {"room": p["RoomId"], "cancel": cancel_id, "start": p["StartDate"], "end": p["EndDate"]}
+            if dialect == "sqlite":
+                check["new_id"] = c.execute(INSERT_SQL, p).lastrowid
+            if c.execute(OVERLAP_LOCKED_SQL[dialect], check).scalar():
+                raise ReservationConflict(
+                    f"Room {p['RoomId']} is not available for {p['StartDate']} - {p['EndDate']}."
+                )
+            if dialect != "sqlite":
+                c.execute(INSERT_SQL, p)
+
+@operation(writes=("Reservation",))
+def update_reservation(reservation_id: int, data: dict, original: dict | None = None, conn=None) -> bool:
+    """original (listed row with RowVer): changed columns only, see patients.update_patient."""
+    if original is None:
+        update_reservations([dict(data, ReservationId=reservation_id)], conn=conn)
+        return True
+    fields = ("PatientId", "RoomId", "StartDate", "EndDate", "StatusId")
+    return update_changed("Reservation", "ReservationId", reservation_id,
+                          changed_fields(original, {f: data[f] for f in fields}),
+                          version=original.get("RowVer"), original=original, current_sql=CURRENT_SQL, conn=conn)
+
+@operation(writes=("Reservation",))
+def update_reservations(rows: list[dict], conn=None):
+    if not rows:
+        return
+    fields = ("ReservationId", "PatientId", "RoomId", "StartDate", "EndDate", "StatusId")
+    with transaction(conn) as c:
+        c.execute(UPDATE_SQL, [{f: r[f] for f in fields} for r in rows])
+
+@operation(writes=("Reservation",))
+def cancel_reservations(reservation_ids: list[int], conn=None) -> dict:
+    with transaction(conn) as c:
+        cancel_id = cancel_status_id(list_statuses(conn=c))
+        if cancel_id is None:
+            raise ServiceError("No 'Cancelled' status found in ReservationStatus.")
+        return bulk_execute(SET_STATUS_SQL, reservation_ids, {"sid": cancel_id}, conn=c)
+
+@operation(writes=("Reservation",))
+def delete_reservations(reservation_ids: list[int], conn=None) -> dict:
+    return bulk_execute(DELETE_SQL, reservation_ids, conn=conn)
@@ -0,0 +1,297 @@
+# services/rollups.py
+"""
+Pre-aggregated revenue rollups for the Reports tab.
+
+RevenueDaily / RevenueMonthly     ServiceRecord amounts per department x StateProgram
+CollectionDaily / CollectionMonthly  Payment amounts per department x PaymentType
+
+refresh() is incremental: ServiceRecord and Payment carry a RowVer
+(ROWVERSION on SQL Server, trigger-maintained counter on the SQLite
+stand-in) and RollupWatermark keeps the last RowVer already folded in.
+Only the days touched by rows above the watermark are recomputed (DELETE +
+INSERT ... GROUP BY for those days), then the months containing them are
+rebuilt from the daily rows. Deletes and date moves leave no row behind to
+see, so the service layer queues the old days in RevenueDirtyDay
+(mark_records_dirty / mark_payments_dirty) in the same transaction.
+
+Reports read only the rollup tables, so they stay fast on any data size.
+"""
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text, bindparam
+
+from services.base import ServiceError, transaction, fetch_all, dialect_name, id_list_sql, operation
+
+ROLLUP_TABLES = ("RevenueDaily", "RevenueMonthly", "CollectionDaily", "CollectionMonthly",
+                 "RevenueDirtyDay", "RollupWatermark")
+
+DAY_CHUNK = 500
+
+# Watermark'ın üst sınırı: henüz commit edilmemiş transaction'ların satırları bir sonraki refresh'e kalır
+HIGH_MARK_SQL = {
+    "mssql": "SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1",
+    "sqlite": "SELECT Value FROM RowVersionSeq",
+}
+
+ROWVER_RANGE = {
+    "mssql": "RowVer > CAST(:lo AS BINARY(8)) AND RowVer <= CAST(:hi AS BINARY(8))",
+    "sqlite": "RowVer > :lo AND RowVer <= :hi",
+}
+
+CHANGED_DAYS_SQL = {
+    "ServiceRecord": "SELECT DISTINCT ServiceDate FROM ServiceRecord WHERE {range}",
+    "Payment": "SELECT DISTINCT PaymentDate FROM Payment WHERE {range}",
+}
+
+WATERMARK_SQL = text("SELECT SourceTable, LastRowVersion FROM RollupWatermark")
+WATERMARK_UPDATE_SQL = text("UPDATE RollupWatermark SET LastRowVersion = :v WHERE SourceTable = :t")
+WATERMARK_INSERT_SQL = text("INSERT INTO RollupWatermark (SourceTable, LastRowVersion) VALUES (:t, :v)")
+
+DIRTY_SQL = text("SELECT Id, Day FROM RevenueDirtyDay")
+DIRTY_CLEAR_SQL = text("DELETE FROM RevenueDirtyDay WHERE Id <= :max_id")
+DIRTY_INSERT_SQL = text("INSERT INTO RevenueDirtyDay (Day) VALUES (:day)")
+
+DIRTY_RECORD_DAYS_SQL = id_list_sql("SELECT DISTINCT ServiceDate FROM ServiceRecord WHERE ServiceRecordId IN :ids")
+DIRTY_PAYMENT_DAYS_SQL = id_list_sql("SELECT DISTINCT PaymentDate FROM Payment WHERE PaymentId IN :ids")
+
+def _days_sql(sql: str):
+    return text(sql).bindparams(bindparam("days", expanding=True))
+
+# Günlük tablolar: seçilen günler silinip kaynaktan tekrar hesaplanır
+REVENUE_DAILY_DELETE_SQL = _days_sql("DELETE FROM RevenueDaily WHERE Day IN :days")
+REVENUE_DAILY_INSERT_SQL = _days_sql("""
+    INSERT INTO RevenueDaily
+    (Day, DepartmentId, ProgramId, RecordCount, TotalPrice, StateCoveredAmount, PatientPayableAmount)
+    SELECT sr.ServiceDate, st.DepartmentId, COALESCE(sr.ProgramId, 0), COUNT(*),
+           ROUND(SUM(sr.TotalPrice), 2), ROUND(SUM(sr.StateCoveredAmount), 2), ROUND(SUM(sr.PatientPayableAmount), 2)
+    FROM ServiceRecord sr
+    JOIN Staff st ON st.StaffId = sr.DoctorId
+    WHERE sr.ServiceDate IN :days
+    GROUP BY sr.ServiceDate, st.DepartmentId, COALESCE(sr.ProgramId, 0)
+""")
+
+COLLECTION_DAILY_DELETE_SQL = _days_sql("DELETE FROM CollectionDaily WHERE Day IN :days")
+COLLECTION_DAILY_INSERT_SQL = _days_sql("""
+    INSERT INTO CollectionDaily (Day, DepartmentId, PaymentTypeId, PaymentCount, Amount)
+    SELECT p.PaymentDate, st.DepartmentId, p.PaymentTypeId, COUNT(*), ROUND(SUM(p.Amount), 2)
+    FROM Payment p
+    JOIN ServiceRecord sr ON sr.ServiceRecordId = p.ServiceRecordId
+    JOIN Staff st ON st.StaffId = sr.DoctorId
+    WHERE p.PaymentDate IN :days
+    GROUP BY p.PaymentDate, st.DepartmentId, p.PaymentTypeId
+""")
+
+# Aylık tablolar günlük tablolardan (ay başına tek sorgu)
+REVENUE_MONTHLY_DELETE_SQL = text("DELETE FROM RevenueMonthly WHERE MonthStart = :m")
+REVENUE_MONTHLY_INSERT_SQL = text("""
+    INSERT INTO RevenueMonthly
+    (MonthStart, DepartmentId, ProgramId, RecordCount, TotalPrice, StateCoveredAmount, PatientPayableAmount)
+    SELECT :m, DepartmentId, ProgramId, SUM(RecordCount),
+           ROUND(SUM(TotalPrice), 2), ROUND(SUM(StateCoveredAmount), 2), ROUND(SUM(PatientPayableAmount), 2)
+    FROM RevenueDaily
+    WHERE Day >= :m AND Day < :next
+    GROUP BY DepartmentId, ProgramId
+""")
+
+COLLECTION_MONTHLY_DELETE_SQL = text("DELETE FROM CollectionMonthly WHERE MonthStart = :m")
+COLLECTION_MONTHLY_INSERT_SQL = text("""
+    INSERT INTO CollectionMonthly (MonthStart, DepartmentId, PaymentTypeId, PaymentCount, Amount)
+    SELECT :m, DepartmentId, PaymentTypeId, SUM(PaymentCount), ROUND(SUM(Amount), 2)
+    FROM CollectionDaily
+    WHERE Day >= :m AND Day < :next
+    GROUP BY DepartmentId, PaymentTypeId
+""")
+
+GRAINS = {
+    "day": ("RevenueDaily", "CollectionDaily", "Day"),
+    "month": ("RevenueMonthly", "CollectionMonthly", "MonthStart"),
+}
+
+# Rapor sorguları: sadece rollup tabloları okunur
+REVENUE_REPORT_SQL = {
+    "Department": """
+        SELECT r.{period} AS Period, d.DepartmentName AS Name,
+               SUM(r.RecordCount) AS Records, ROUND(SUM(r.TotalPrice), 2) AS TotalPrice,
+               ROUND(SUM(r.StateCoveredAmount), 2) AS StateCovered,
+               ROUND(SUM(r.PatientPayableAmount), 2) AS PatientPayable
+        FROM {revenue} r
+        JOIN Department d ON d.DepartmentId = r.DepartmentId
+        WHERE r.{period} >= :start AND r.{period} <= :end
+        GROUP BY r.{period}, d.DepartmentName
+    """,
+    "StateProgram": """
+        SELECT r.{period} AS Period, COALESCE(sp.ProgramName, '(none)') AS Name,
+               SUM(r.RecordCount) AS Records, ROUND(SUM(r.TotalPrice), 2) AS TotalPrice,
+               ROUND(SUM(r.StateCoveredAmount), 2) AS StateCovered,
+               ROUND(SUM(r.PatientPayableAmount), 2) AS PatientPayable
+        FROM {revenue} r
+        LEFT JOIN StateProgram sp ON sp.ProgramId = r.ProgramId
+        WHERE r.{period} >= :start AND r.{period} <= :end
+        GROUP BY r.{period}, COALESCE(sp.ProgramName, '(none)')
+    """,
+}
+
+COLLECTION_REPORT_SQL = {
+    "Department": """
+        SELECT c.{period} AS Period, d.DepartmentName AS Name,
+               SUM(c.PaymentCount) AS Payments, ROUND(SUM(c.Amount), 2) AS Collected
+        FROM {collection} c
+        JOIN Department d ON d.DepartmentId = c.DepartmentId
+        WHERE c.{period} >= :start AND c.{period} <= :end
+        GROUP BY c.{period}, d.DepartmentName
+    """,
+    "PaymentType": """
+        SELECT c.{period} AS Period, pt.PaymentTypeName AS Name,
+               SUM(c.PaymentCount) AS Payments, ROUND(SUM(c.Amount), 2) AS Collected
+        FROM {collection} c
+        JOIN PaymentType pt ON pt.PaymentTypeId = c.PaymentTypeId
+        WHERE c.{period} >= :start AND c.{period} <= :end
+        GROUP BY c.{period}, pt.PaymentTypeName
+    """,
+}
+
+DIMENSIONS = ("Department", "StateProgram", "PaymentType")
+
+REPORT_COLUMNS = {
+    "Department": ("Period", "Name", "Records", "TotalPrice", "StateCovered", "PatientPayable", "Payments", "Collected"),
+    "StateProgram": ("Period", "Name", "Records", "TotalPrice", "StateCovered", "PatientPayable"),
+    "PaymentType": ("Period", "Name", "Payments", "Collected"),
+}
+
+def _as_date(v) -> date:
+    # SQLite DATE kolonları string döner
+    return date.fromisoformat(v[:10]) if isinstance(v, str) else v
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+def _next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _queue_days(conn, days):
+    days = {_as_date(d) for d in days if d is not None}
+    if days:
+        conn.execute(DIRTY_INSERT_SQL, [{"day": d.isoformat()} for d in sorted(days)])
+
+def mark_records_dirty(conn, service_record_ids):
+    """Queues the current ServiceDate of these records. Call before an UPDATE / DELETE."""
+    ids = list(set(service_record_ids))
+    if ids:
+        _queue_days(conn, conn.execute(DIRTY_RECORD_DAYS_SQL, {"ids": ids}).scalars().all())
+
+def mark_payments_dirty(conn, payment_ids):
+    """Queues the PaymentDate of these payments. Call before a DELETE."""
+    ids = list(set(payment_ids))
+    if ids:
+        _queue_days(conn, conn.execute(DIRTY_PAYMENT_DAYS_SQL, {"ids": ids}).scalars().all())
+
+def _recompute_days(conn, days):
+    for chunk in _chunks([d.isoformat() for d in sorted(days)], DAY_CHUNK):
+        p = {"days": chunk}
+        conn.execute(REVENUE_DAILY_DELETE_SQL, p)
+        conn.execute(REVENUE_DAILY_INSERT_SQL, p)
+        conn.execute(COLLECTION_DAILY_DELETE_SQL, p)
+        conn.execute(COLLECTION_DAILY_INSERT_SQL, p)
+
+def _recompute_months(conn, months):
+    for m in sorted(months):
+        p = {"m": m.isoformat(), "next": _next_month(m).isoformat()}
+        conn.execute(REVENUE_MONTHLY_DELETE_SQL, p)
+        conn.execute(REVENUE_MONTHLY_INSERT_SQL, p)
+        conn.execute(COLLECTION_MONTHLY_DELETE_SQL, p)
+        conn.execute(COLLECTION_MONTHLY_INSERT_SQL, p)
+
+@operation(reads=("ServiceRecord", "Payment", "Staff"), writes=ROLLUP_TABLES)
+def refresh(conn=None) -> dict:
+    """
+    Folds every ServiceRecord / Payment change since the last refresh into the
+    rollups. Returns {days, months, seconds, watermarks} (plain dict, API-safe).
+    """
+    started = time.perf_counter()
+    with transaction(conn) as c:
+        dialect = dialect_name(c)
+        if dialect not in HIGH_MARK_SQL:
+            raise ServiceError(f"Rollups are not supported on '{dialect}'.")
+        high = int(c.execute(text(HIGH_MARK_SQL[dialect])).scalar() or 0)
+        marks = {r["SourceTable"]: int(r["LastRowVersion"]) for r in c.execute(WATERMARK_SQL).mappings()}
+
+        days = set()
+        for table, sql in CHANGED_DAYS_SQL.items():
+            lo = marks.get(table, 0)
+            if high > lo:
+                q = text(sql.replace("{range}", ROWVER_RANGE[dialect]))
+                days.update(_as_date(d) for d in c.execute(q, {"lo": lo, "hi": high}).scalars())
+
+        dirty = c.execute(DIRTY_SQL).all()
+        days.update(_as_date(d) for _, d in dirty)
+
+        months = {_month_start(d) for d in days}
+        _recompute_days(c, days)
+        _recompute_months(c, months)
+
+        if dirty:
+            c.execute(DIRTY_CLEAR_SQL, {"max_id": max(i for i, _ in dirty)})
+        for table in CHANGED_DAYS_SQL:
+            if table in marks:
+                c.execute(WATERMARK_UPDATE_SQL, {"t": table, "v": max(high, marks[table])})
+            else:
+                c.execute(WATERMARK_INSERT_SQL, {"t": table, "v": high})
+
+    return {
+        "days": len(days),
+        "months": len(months),
+        "seconds": round(time.perf_counter() - started, 3),
+        "watermarks": {t: max(high, marks.get(t, 0)) for t in CHANGED_DAYS_SQL},
+    }
+
+def refresh_summary(result: dict) -> str:
+    marks = ", ".join(f"{k}={v}" for k, v in result["watermarks"].items())
+    return (f"rollups: {result['days']} day(s), {result['months']} month(s) recomputed "
+            f"in {result['seconds']:.2f}s ({marks})")
+
+@operation(reads=("RevenueDaily", "RevenueMonthly", "CollectionDaily", "CollectionMonthly",
+                  "Department", "StateProgram", "PaymentType"))
+def report(grain: str = "month", dimension: str = "Department", start=None, end=None, conn=None):
+    """
+    Rollup report rows (Period, Name, ... see REPORT_COLUMNS[dimension]) ordered by
+    period and name, for start <= period <= end ('YYYY-MM-DD' or date).
+    """
+    if grain not in GRAINS:
+        raise ServiceError(f"Unknown grain '{grain}'.")
+    if dimension not in DIMENSIONS:
+        raise ServiceError(f"Unknown dimension '{dimension}'.")
+    revenue, collection, period = GRAINS[grain]
+    start = _as_date(start) if start else date(1900, 1, 1)
+    end = _as_date(end) if end else date(9999, 12, 31)
+    if grain == "month":
+        start = _month_start(start)
+    params = {"start": start.isoformat(), "end": end.isoformat()}
+
+    def fill(sql):
+        return text(sql.replace("{period}", period).replace("{revenue}", revenue)
+                    .replace("{collection}", collection))
+
+    rows = {}
+    columns = REPORT_COLUMNS[dimension]
+    for source in (REVENUE_REPORT_SQL, COLLECTION_REPORT_SQL):
+        if dimension not in source:
+            continue
+        for r in fetch_all(fill(source[dimension]), params, conn=conn):
+            key = (str(_as_date(r["Period"])), r["Name"])
+            row = rows.setdefault(key, {c: 0 for c in columns} | {"Period": key[0], "Name": key[1]})
+            row.update({k: v for k, v in r.items() if k not in ("Period", "Name")})
+    return [rows[k] for k in sorted(rows)]
+
+def totals(rows) -> dict:
+    """Column sums of report() rows (numeric columns only)."""
+    out = {}
+    for r in rows:
+        for k, v in r.items():
+            if k not in ("Period", "Name"):
+                out[k] = out.get(k, 0) + (v or 0)
+    return out
@@ -0,0 +1,153 @@
+# services/schema.py
+"""
+Reflected table metadata for the generic definitions tabs.
+
+table_meta('Room') -> {table, pk, name_column, columns: [{name, kind,
+nullable, has_default, auto, computed, version, fk}]}. kind is a FieldSpec
+kind ('text' | 'int' | 'decimal' | 'bool' | 'date'); fk = [table, column] or None.
+
+Reflection takes several catalog queries per table, so results are kept in
+a JSON file (SCHEMA_CACHE_PATH) keyed by database and schema version; a
+startup only runs the one-row version query. The version changes with any
+CREATE / ALTER / DROP (SQL Server sys.objects, SQLite PRAGMA schema_version).
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+
+from services.base import ServiceError, connection
+
+SCHEMA_CACHE_PATH = Path(os.getenv("HOSPITAL_SCHEMA_CACHE", Path.home() / ".hospital" / "schema_cache.json"))
+
+MSSQL_VERSION_SQL = text("""
+    SELECT CONCAT(COUNT(*), ':', CONVERT(VARCHAR(33), MAX(modify_date), 126))
+    FROM sys.objects
+    WHERE is_ms_shipped = 0
+""")
+
+# Kimlik bilgisi kolonları: genel düzenleyicide / dışa aktarmada hiç gösterilmez
+SECRET_COLUMNS = {"passwordhash", "password", "passwordsalt"}
+
+# önbellek dosyasındaki meta biçimi; _reflect çıktısı değişince artırılır
+META_FORMAT = 2
+
+_lock = threading.Lock()
+_loaded: dict = {}      # {"key": "<db>|<version>", "tables": {...}}
+
+def _kind(type_name: str):
+    t = type_name.upper()
+    if t.startswith(("BIT", "BOOL")):
+        return "bool"
+    if "INT" in t:
+        return "int"
+    if t.startswith(("DEC", "NUM", "MONEY", "SMALLMONEY", "FLOAT", "REAL", "DOUBLE")):
+        return "decimal"
+    if t.startswith(("TIMESTAMP", "ROWVERSION", "BINARY", "VARBINARY", "IMAGE", "BLOB")):
+        return None     # düzenlenemez (rowversion / binary)
+    if t.startswith(("DATE", "SMALLDATETIME")):
+        return "date"   # DATE, DATETIME, DATETIME2, DATETIMEOFFSET
+    return "text"
+
+def is_secret(column: str) -> bool:
+    return column.lower() in SECRET_COLUMNS
+
+def schema_version(conn=None) -> str:
+    with connection(conn) as c:
+        if c.dialect.name == "sqlite":
+            return str(c.exec_driver_sql("PRAGMA schema_version").scalar())
+        return str(c.execute(MSSQL_VERSION_SQL).scalar())
+
+def _db_key(conn) -> str:
+    return conn.engine.url.render_as_string(hide_password=True)
+
+def _reflect(conn, table: str) -> dict:
+    insp = inspect(conn)
+    if table not in insp.get_table_names():
+        raise ServiceError(f"Unknown table: {table}")
+    pk_cols = insp.get_pk_constraint(table)["constrained_columns"]
+    fks = {fk["constrained_columns"][0]: [fk["referred_table"], fk["referred_columns"][0]]
+           for fk in insp.get_foreign_keys(table) if len(fk["constrained_columns"]) == 1}
+    declared = {}
+    if conn.dialect.name == "sqlite":
+        # SQLite BIT / DECIMAL'i NUMERIC olarak yansıtır; tanımlanan tip adı lazım
+        declared = {r[1]: r[2] for r in conn.exec_driver_sql(f'PRAGMA table_info("{table}")')}
+
+    columns = []
+    for col in insp.get_columns(table):
+        name = col["name"]
+        type_name = declared.get(name) or type(col["type"]).__name__
+        kind = _kind(type_name)
+        # SQLite: sadece INTEGER PRIMARY KEY (rowid takma adı) kendiliğinden artar;
+        # ServiceRecordBalance gibi PK'si FK olan tablolarda id'yi çağıran verir
+        rowid_alias = (conn.dialect.name == "sqlite" and pk_cols == [name] and name not in fks
+                       and declared.get(name, "").strip().upper() == "INTEGER")
+        columns.append({
+            "name": name,
+            "kind": kind or "text",
+            "nullable": bool(col["nullable"]),
+            "has_default": col.get("default") is not None,
+            "auto": bool(col.get("identity") or col.get("autoincrement") is True or rowid_alias),
+            "computed": bool(col.get("computed")),
+            "version": kind is None or name == "RowVer",
+            "fk": fks.get(name),
+        })
+
+    pk = pk_cols[0] if len(pk_cols) == 1 else None
+    name_column = next((c["name"] for c in columns
+                        if c["kind"] == "text" and c["name"] != pk and not c["version"]), pk)
+    return {"table": table, "pk": pk, "name_column": name_column, "columns": columns}
+
+def _read_file() -> dict:
+    try:
+        return json.loads(SCHEMA_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def _write_file(data: dict):
+    try:
+        SCHEMA_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp = SCHEMA_CACHE_PATH.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=1), encoding="utf-8")
+        os.replace(tmp, SCHEMA_CACHE_PATH)
+    except OSError:
+        pass    # cache yazılamazsa bir sonraki açılışta yeniden yansıtılır
+
+def load(tables, conn=None) -> dict:
+    """
+    {table: meta} for the given tables. The version query runs once per
+    process (and again after invalidate()); reflection only for tables
+    missing from the disk cache of that version.
+    """
+    tables = list(tables)
+    with _lock:
+        known = _loaded.get("tables")
+        if known is None or any(t not in known for t in tables):
+            with connection(conn) as c:
+                db = _db_key(c)
+                key = f"{db}|{schema_version(c)}|{META_FORMAT}"
+                if _loaded.get("key") != key:
+                    cached = _read_file().get(db, {})
+                    _loaded.update(key=key, tables=cached.get("tables", {}) if cached.get("key") == key else {})
+                known = _loaded["tables"]
+                missing = [t for t in tables if t not in known]
+                for t in missing:
+                    known[t] = _reflect(c, t)
+                if missing:
+                    data = _read_file()
+                    data[db] = {"key": key, "tables": known}
+                    _write_file(data)
+        return {t: known[t] for t in tables}
+
+def table_meta(table: str, conn=None) -> dict:
+    return load([table], conn=conn)[table]
+
+def table_names(conn=None) -> list[str]:
+    with connection(conn) as c:
+        return sorted(inspect(c).get_table_names())
+
+def invalidate():
+    with _lock:
+        _loaded.clear()
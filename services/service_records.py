@@ -0,0 +1,220 @@
+# services/service_records.py
+from datetime import date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import text
+
+from services import balances, rollups
+from services.base import (ServiceError, transaction, fetch_all, dialect_name, id_list_sql, top_n_sql, operation,
+                           changed_fields, update_changed)
+
+CENT = Decimal("0.01")
+
+WORKLIST_DAYS = 30
+WORKLIST_PAGE = 200
+
+DOCTOR_LIST_SQL = text("""
+    SELECT sr.ServiceRecordId,
+           sr.PatientId,
+           CONCAT(p.FirstName, ' ', p.LastName) AS PatientName,
+           sr.ServiceId,
+           hs.ServiceName,
+           sr.ProgramId,
+           sp.ProgramName,
+           sr.ServiceDate,
+           sr.TotalPrice,
+           sr.PatientPayableAmount
+    FROM ServiceRecord sr
+    JOIN Patient p ON p.PatientId = sr.PatientId
+    JOIN HealthService hs ON hs.ServiceId = sr.ServiceId
+    JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
+    WHERE sr.DoctorId = :doc
+    ORDER BY sr.ServiceRecordId DESC
+""")
+
+# İş listesi: IX_ServiceRecord_Doctor üzerinde tarih aralığı seek + keyset sayfa (en yeni önce)
+WORKLIST_SQL = """
+    SELECT {top} sr.ServiceRecordId,
+           sr.PatientId,
+           CONCAT(p.FirstName, ' ', p.LastName) AS PatientName,
+           sr.ServiceId,
+           hs.ServiceName,
+           sr.ProgramId,
+           sp.ProgramName,
+           sr.ServiceDate,
+           sr.TotalPrice,
+           sr.PatientPayableAmount,
+           sr.StateCoveredAmount,
+           CAST(sr.RowVer AS BIGINT) AS RowVer
+    FROM ServiceRecord sr
+    JOIN Patient p ON p.PatientId = sr.PatientId
+    JOIN HealthService hs ON hs.ServiceId = sr.ServiceId
+    JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
+    WHERE sr.DoctorId = :doc {filter}
+    ORDER BY sr.ServiceDate DESC, sr.ServiceRecordId DESC
+    {limit}
+"""
+
+WORKLIST_FILTERS = {
+    "start": "AND sr.ServiceDate >= :start",
+    "end": "AND sr.ServiceDate <= :end",
+    "before": "AND (sr.ServiceDate < :before_date OR (sr.ServiceDate = :before_date AND sr.ServiceRecordId < :before_id))",
+    "tc": "AND p.TCNo LIKE :tc",
+    "name": "AND (p.FirstName LIKE :name OR p.LastName LIKE :name)",
+    "fullname": "AND p.FirstName LIKE :first AND p.LastName LIKE :last",
+}
+
+INSERT_SQL = text("""
+    INSERT INTO ServiceRecord
+    (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice, StateCoveredAmount, PatientPayableAmount)
+    VALUES (:PatientId, :ServiceId, :DoctorId, :ProgramId, :ServiceDate, :TotalPrice, :StateCoveredAmount, :PatientPayableAmount)
+""")
+
+# Yeni id insert'ün kendisinden döner (MAX(ServiceRecordId) eşzamanlı insert'lerle yarışır)
+INSERT_ID_SQL = {
+    "mssql": INSERT_SQL.text.replace("    VALUES", "    OUTPUT INSERTED.ServiceRecordId\n    VALUES"),
+    "sqlite": INSERT_SQL.text.rstrip() + "\n    RETURNING ServiceRecordId\n",
+}
+
+# Güvenlik: doktor sadece kendi kaydını güncellesin / silsin
+UPDATE_SQL = text("""
+    UPDATE ServiceRecord
+    SET PatientId=:PatientId, ServiceId=:ServiceId, ProgramId=:ProgramId, ServiceDate=:ServiceDate,
+        TotalPrice=:TotalPrice, StateCoveredAmount=:StateCoveredAmount, PatientPayableAmount=:PatientPayableAmount
+    WHERE ServiceRecordId=:ServiceRecordId AND DoctorId=:DoctorId
+""")
+
+DELETE_SQL = id_list_sql("DELETE FROM ServiceRecord WHERE ServiceRecordId IN :ids AND DoctorId=:doc")
+
+CURRENT_SQL = text("""
+    SELECT ServiceRecordId, PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice,
+           StateCoveredAmount, PatientPayableAmount, CAST(RowVer AS BIGINT) AS RowVer
+    FROM ServiceRecord
+    WHERE ServiceRecordId = :id
+""")
+
+def compute_coverage(total, rate):
+    """
+    Split TotalPrice by StateProgram.CoverageRate (fraction, 0.80 = %80).
+    Returns (StateCoveredAmount, PatientPayableAmount) as Decimals rounded to cents.
+    """
+    total = Decimal(str(total or 0))
+    rate = Decimal(str(rate or 0))
+    covered = (total * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+    return covered, (total - covered).quantize(CENT, rounding=ROUND_HALF_UP)
+
+@operation(reads=("ServiceRecord", "Patient", "HealthService", "StateProgram"))
+def list_for_doctor(doctor_id: int, conn=None):
+    return fetch_all(DOCTOR_LIST_SQL, {"doc": doctor_id}, conn=conn)
+
+def default_worklist_start() -> date:
+    return date.today() - timedelta(days=WORKLIST_DAYS)
+
+def _patient_filter(term: str):
+    term = (term or "").strip().replace("%", "").replace("_", "")
+    if not term:
+        return None, {}
+    if term.isdigit():
+        return "tc", {"tc": term + "%"}
+    parts = term.split()
+    if len(parts) > 1:
+        return "fullname", {"first": parts[0] + "%", "last": " ".join(parts[1:]) + "%"}
+    return "name", {"name": term + "%"}
+
+@operation(reads=("ServiceRecord", "Patient", "HealthService", "StateProgram"))
+def list_worklist(doctor_id: int, start=None, end=None, patient: str = "", before=None,
+                  limit: int = WORKLIST_PAGE, conn=None):
+    """
+    One page of the doctor's records, newest first.
+    start/end bound ServiceDate ('YYYY-MM-DD' or date, None = open); patient is a
+    name / 'First Last' / TCNo prefix. before = (ServiceDate, ServiceRecordId) of
+    the last row of the previous page.
+    """
+    keys, params = [], {"doc": doctor_id, "limit": limit}
+    if start:
+        keys.append("start")
+        params["start"] = str(start)
+    if end:
+        keys.append("end")
+        params["end"] = str(end)
+    if before:
+        keys.append("before")
+        params["before_date"], params["before_id"] = str(before[0]), int(before[1])
+    mode, extra = _patient_filter(patient)
+    if mode:
+        keys.append(mode)
+        params.update(extra)
+    q = top_n_sql(WORKLIST_SQL.replace("{filter}", " ".join(WORKLIST_FILTERS[k] for k in keys)), conn)
+    return fetch_all(q, params, conn=conn)
+
+def _params(r: dict, doctor_id: int) -> dict:
+    return {
+        "PatientId": r["PatientId"],
+        "ServiceId": r["ServiceId"],
+        "DoctorId": doctor_id,
+        "ProgramId": r["ProgramId"],
+        "ServiceDate": r["ServiceDate"],
+        "TotalPrice": r["TotalPrice"],
+        "StateCoveredAmount": r["StateCoveredAmount"],
+        "PatientPayableAmount": r["PatientPayableAmount"],
+    }
+
+@operation(writes=("ServiceRecord", "ServiceRecordBalance"))
+def add_record(data: dict, doctor_id: int, conn=None):
+    add_records([data], doctor_id, conn=conn)
+
+@operation(writes=("ServiceRecord", "ServiceRecordBalance"))
+def add_records(rows: list[dict], doctor_id: int, conn=None):
+    if not rows:
+        return
+    with transaction(conn) as c:
+        dialect = dialect_name(c)
+        if dialect not in INSERT_ID_SQL:
+            raise ServiceError(f"Service records cannot be added on '{dialect}'.")
+        q = text(INSERT_ID_SQL[dialect])
+        ids = [c.execute(q, _params(r, doctor_id)).scalar_one() for r in rows]
+        balances.open_new(c, ids)
+
+@operation(writes=("ServiceRecord", "ServiceRecordBalance", "RevenueDirtyDay"))
+def update_record(record_id: int, data: dict, doctor_id: int, original: dict | None = None, conn=None) -> int:
+    """
+    original: the worklist row (with RowVer). Only changed columns are
+    written, guarded by RowVer -> ConcurrencyConflict with the current row.
+    Without original every column is written.
+    """
+    if original is None:
+        return update_records([dict(data, ServiceRecordId=record_id)], doctor_id, conn=conn)
+    params = _params(data, doctor_id)
+    del params["DoctorId"]
+    changes = changed_fields(original, params)
+    if not changes:
+        return 0
+    with transaction(conn) as c:
+        rollups.mark_records_dirty(c, [record_id])
+        update_changed("ServiceRecord", "ServiceRecordId", record_id, changes, version=original.get("RowVer"),
+                       original=original, current_sql=CURRENT_SQL,
+                       extra_where="AND DoctorId=:doc", extra_params={"doc": doctor_id}, conn=c)
+        if "PatientPayableAmount" in changes:
+            balances.sync_payable(c, [record_id])
+    return 1
+
+@operation(writes=("ServiceRecord", "ServiceRecordBalance", "RevenueDirtyDay"))
+def update_records(rows: list[dict], doctor_id: int, conn=None) -> int:
+    if not rows:
+        return 0
+    params = [dict(_params(r, doctor_id), ServiceRecordId=r["ServiceRecordId"]) for r in rows]
+    with transaction(conn) as c:
+        # Tarih değişebilir: eski gün rollup'ta yeniden hesaplansın
+        rollups.mark_records_dirty(c, [p["ServiceRecordId"] for p in params])
+        count = c.execute(UPDATE_SQL, params).rowcount
+        balances.sync_payable(c, [p["ServiceRecordId"] for p in params])
+        return count
+
+@operation(writes=("ServiceRecord", "ServiceRecordBalance", "RevenueDirtyDay"))
+def delete_records(record_ids: list[int], doctor_id: int, conn=None) -> int:
+    if not record_ids:
+        return 0
+    with transaction(conn) as c:
+        balances.close(c, record_ids, doctor_id)
+        rollups.mark_records_dirty(c, record_ids)
+        return c.execute(DELETE_SQL, {"ids": list(record_ids), "doc": doctor_id}).rowcount
@@ -0,0 +1,98 @@
+# services/staff.py
+from sqlalchemy import text
+
+from services.base import transaction, fetch_all, id_list_sql, pick, bulk_execute, changed_fields, update_changed, \
+    operation
+
+FIELDS = ("FirstName", "LastName", "Title", "DepartmentId", "Phone", "Email", "IsActive")
+
+LIST_SQL = text("""
+    SELECT StaffId, FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive,
+           CAST(RowVer AS BIGINT) AS RowVer
+    FROM Staff
+    ORDER BY StaffId
+""")
+
+CURRENT_SQL = text("""
+    SELECT StaffId, FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive,
+           CAST(RowVer AS BIGINT) AS RowVer
+    FROM Staff
+    WHERE StaffId = :id
+""")
+
+ACTIVE_SQL = text("""
+    SELECT StaffId,
+           CONCAT(FirstName, ' ', LastName) AS FullName,
+           Title
+    FROM Staff
+    WHERE IsActive = 1 OR IsActive IS NULL
+    ORDER BY StaffId
+""")
+
+INSERT_SQL = text("""
+    INSERT INTO Staff (FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive)
+    VALUES (:FirstName, :LastName, :Title, :DepartmentId, :Phone, :Email, :IsActive)
+""")
+
+UPDATE_SQL = text("""
+    UPDATE Staff
+    SET FirstName=:FirstName, LastName=:LastName, Title=:Title, DepartmentId=:DepartmentId,
+        Phone=:Phone, Email=:Email, IsActive=:IsActive
+    WHERE StaffId=:StaffId
+""")
+
+SET_ACTIVE_SQL = id_list_sql("UPDATE Staff SET IsActive=:a WHERE StaffId IN :ids")
+TOGGLE_ACTIVE_SQL = id_list_sql(
+    "UPDATE Staff SET IsActive = CASE WHEN IsActive = 0 THEN 1 ELSE 0 END WHERE StaffId IN :ids"
+)
+DELETE_SQL = id_list_sql("DELETE FROM Staff WHERE StaffId IN :ids")
+
+@operation(reads=("Staff",))
+def list_staff(conn=None):
+    return fetch_all(LIST_SQL, conn=conn)
+
+@operation(reads=("Staff",))
+def list_active_staff(conn=None):
+    """[{StaffId, FullName, Title}] for combos."""
+    return fetch_all(ACTIVE_SQL, conn=conn)
+
+@operation(writes=("Staff",))
+def add_staff(data: dict, conn=None):
+    add_staff_many([data], conn=conn)
+
+@operation(writes=("Staff",))
+def add_staff_many(rows: list[dict], conn=None):
+    if not rows:
+        return
+    with transaction(conn) as c:
+        c.execute(INSERT_SQL, [pick(r, FIELDS) for r in rows])
+
+@operation(writes=("Staff",))
+def update_staff(staff_id: int, data: dict, original: dict | None = None, conn=None) -> bool:
+    """original (listed row with RowVer): changed columns only, see patients.update_patient."""
+    if original is None:
+        update_staff_many([dict(data, StaffId=staff_id)], conn=conn)
+        return True
+    return update_changed("Staff", "StaffId", staff_id, changed_fields(original, pick(data, FIELDS)),
+                          version=original.get("RowVer"), original=original, current_sql=CURRENT_SQL,
+                          conn=conn)
+
+@operation(writes=("Staff",))
+def update_staff_many(rows: list[dict], conn=None):
+    if not rows:
+        return
+    with transaction(conn) as c:
+        c.execute(UPDATE_SQL, [dict(pick(r, FIELDS), StaffId=r["StaffId"]) for r in rows])
+
+@operation(writes=("Staff",))
+def set_active(staff_ids: list[int], active: bool, conn=None) -> dict:
+    return bulk_execute(SET_ACTIVE_SQL, staff_ids, {"a": 1 if active else 0}, conn=conn)
+
+@operation(writes=("Staff",))
+def toggle_active(staff_ids: list[int], conn=None) -> dict:
+    """Flips IsActive of every row (NULL counts as active)."""
+    return bulk_execute(TOGGLE_ACTIVE_SQL, staff_ids, conn=conn)
+
+@operation(writes=("Staff",))
+def delete_staff(staff_ids: list[int], conn=None) -> dict:
+    return bulk_execute(DELETE_SQL, staff_ids, conn=conn)
@@ -0,0 +1,103 @@
+# services/timeline.py
+"""
+Patient timeline: reservations, service records and payments of one patient
+in a single chronological list.
+
+One statement (UNION ALL of three patient-keyed index seeks) so the whole
+history comes back in one round trip. load_timeline() keeps the result per
+patient in a client-side cache that is dropped on any write to the tables
+it reads (services.base.on_write) and after TIMELINE_TTL seconds.
+"""
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from refcache import ReferenceCache
+from services.balances import STATUS_LABELS
+from services.base import fetch_all, on_write, operation
+
+TIMELINE_TTL = 120
+
+TABLES = ("Patient", "Reservation", "ServiceRecord", "ServiceRecordBalance", "Payment")
+
+# Seq: aynı gün içinde rezervasyon -> hizmet -> ödeme sırası
+TIMELINE_SQL = text("""
+    SELECT res.StartDate AS EventDate, 1 AS Seq, 'Reservation' AS Kind, res.ReservationId AS RefId,
+           NULL AS ServiceRecordId,
+           CONCAT('Room ', rm.RoomNumber) AS Title,
+           CONCAT(res.StartDate, ' - ', res.EndDate) AS Detail,
+           NULL AS Amount, st.StatusName AS Status
+    FROM Reservation res
+    JOIN Room rm ON rm.RoomId = res.RoomId
+    JOIN ReservationStatus st ON st.StatusId = res.StatusId
+    WHERE res.PatientId = :pid
+
+    UNION ALL
+
+    SELECT sr.ServiceDate, 2, 'Service', sr.ServiceRecordId,
+           sr.ServiceRecordId,
+           hs.ServiceName,
+           CONCAT('Dr. ', s.FirstName, ' ', s.LastName),
+           sr.PatientPayableAmount, b.BalanceStatus
+    FROM ServiceRecord sr
+    JOIN HealthService hs ON hs.ServiceId = sr.ServiceId
+    JOIN Staff s ON s.StaffId = sr.DoctorId
+    LEFT JOIN ServiceRecordBalance b ON b.ServiceRecordId = sr.ServiceRecordId
+    WHERE sr.PatientId = :pid
+
+    UNION ALL
+
+    SELECT pay.PaymentDate, 3, 'Payment', pay.PaymentId,
+           pay.ServiceRecordId,
+           pt.PaymentTypeName,
+           CONCAT('Record #', pay.ServiceRecordId, ' / ', pay.Payer),
+           pay.Amount, NULL
+    FROM ServiceRecord sr
+    JOIN Payment pay ON pay.ServiceRecordId = sr.ServiceRecordId
+    JOIN PaymentType pt ON pt.PaymentTypeId = pay.PaymentTypeId
+    WHERE sr.PatientId = :pid
+
+    ORDER BY EventDate DESC, Seq DESC, RefId DESC
+""")
+
+_cache = ReferenceCache(ttl_seconds=TIMELINE_TTL)
+
+@on_write
+def _invalidate(tables):
+    if any(t in TABLES for t in tables):
+        _cache.invalidate("Timeline")
+
+@operation(reads=TABLES)
+def get_timeline(patient_id: int, conn=None):
+    """
+    [{EventDate, Kind, RefId, ServiceRecordId, Title, Detail, Amount, Status}],
+    newest first. Kind: 'Reservation' | 'Service' | 'Payment'.
+    """
+    rows = fetch_all(TIMELINE_SQL, {"pid": patient_id}, conn=conn)
+    return [
+        dict(r, Status=STATUS_LABELS.get(r["Status"], r["Status"])) if r["Kind"] == "Service" else dict(r)
+        for r in rows
+    ]
+
+def load_timeline(patient_id: int) -> list:
+    """Cached get_timeline for UI panels."""
+    return _cache.get("Timeline", lambda: get_timeline(patient_id), str(patient_id))
+
+def invalidate(patient_id: int | None = None):
+    # Diğer masalardan gelen değişiklikler için "Refresh" butonu
+    if patient_id is None:
+        _cache.invalidate("Timeline")
+    else:
+        _cache.discard("Timeline", str(patient_id))
+
+def summary(rows) -> dict:
+    """Totals over a timeline: {Visits, Reservations, Payable, Paid, Outstanding}."""
+    payable = sum((Decimal(str(r["Amount"])) for r in rows if r["Kind"] == "Service"), Decimal(0))
+    paid = sum((Decimal(str(r["Amount"])) for r in rows if r["Kind"] == "Payment"), Decimal(0))
+    return {
+        "Visits": sum(1 for r in rows if r["Kind"] == "Service"),
+        "Reservations": sum(1 for r in rows if r["Kind"] == "Reservation"),
+        "Payable": payable,
+        "Paid": paid,
+        "Outstanding": payable - paid,
+    }
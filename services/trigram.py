@@ -0,0 +1,80 @@
+# services/trigram.py
+"""
+Small in-memory trigram index for fuzzy name matching (typos, missing letters).
+
+Each word is padded like pg_trgm ('  ali ' -> '  a', ' al', 'ali', 'li ') and
+similarity is the Jaccard ratio of the trigram sets.
+"""
+from collections import Counter, defaultdict
+import functools
+import heapq
+
+@functools.lru_cache(maxsize=65536)
+def _word_trigrams(word: str) -> frozenset:
+    w = f"  {word} "
+    return frozenset(w[i:i + 3] for i in range(len(w) - 2))
+
+def trigrams(text: str) -> set[str]:
+    # ad / soyadlar çok tekrar eder: kelime başına cache
+    out = set()
+    for word in text.split():
+        out |= _word_trigrams(word)
+    return out
+
+class TrigramIndex:
+    """items: iterable of (key, text, payload). search() -> [(score, payload)]."""
+    def __init__(self, items):
+        self.postings: dict[str, list[int]] = defaultdict(list)
+        self.sizes: list[int] = []
+        self.texts: list[str] = []
+        self.payloads: list = []
+        for _key, text, payload in items:
+            grams = trigrams(text)
+            idx = len(self.payloads)
+            self.payloads.append(payload)
+            self.texts.append(text)
+            self.sizes.append(len(grams))
+            for g in grams:
+                self.postings[g].append(idx)
+        self.postings = dict(self.postings)
+
+    def __len__(self):
+        return len(self.payloads)
+
+    def search(self, text: str, limit: int = 20, min_similarity: float = 0.3):
+        grams = trigrams(text)
+        if not grams:
+            return []
+        q = len(grams)
+        # Jaccard >= min_similarity için gereken en az ortak trigram
+        need = max(1, int(min_similarity * q))
+        lists = sorted((self.postings.get(g, ()) for g in grams), key=len)
+        # Prefix filtering: eşleşen her kayıt en seyrek (q - need + 1) trigramdan birini içerir.
+        # Yaygın trigramların ('  a', 'ali') uzun listeleri yerine adaylar metinden doğrulanır.
+        prefix = lists[:q - need + 1]
+        prefix_total = sum(len(ids) for ids in prefix)
+        if prefix_total * 20 < sum(len(ids) for ids in lists):
+            candidates = set()
+            for ids in prefix:
+                candidates.update(ids)
+            texts = self.texts
+            counts = {i: len(grams & trigrams(texts[i])) for i in candidates}
+        else:
+            counts = Counter()
+            for ids in lists:
+                counts.update(ids)
+        sizes = self.sizes
+        scored = (
+            (c / (q + sizes[i] - c), i)
+            for i, c in counts.items() if c >= need
+        )
+        best = heapq.nlargest(limit, (s for s in scored if s[0] >= min_similarity))
+        return [(round(score, 3), self.payloads[i]) for score, i in best]
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of the trigram sets (word order does not matter)."""
+    ga, gb = trigrams(a), trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    common = len(ga & gb)
+    return common / (len(ga) + len(gb) - common)
@@ -0,0 +1,113 @@
+# services/users.py
+from sqlalchemy import text
+
+from services.base import transaction, fetch_all, id_list_sql, bulk_execute, changed_fields, update_changed, \
+    operation
+
+LIST_SQL = text("""
+    SELECT ua.UserId, ua.Username, ua.RoleId, r.RoleName,
+           ua.StaffId, ua.PatientId, ua.IsActive, ua.PasswordHash, CAST(ua.RowVer AS BIGINT) AS RowVer
+    FROM UserAccount ua
+    JOIN Role r ON r.RoleId = ua.RoleId
+    ORDER BY ua.UserId
+""")
+
+# Çakışma bildirimi için (PasswordHash gösterilmez)
+CURRENT_SQL = text("""
+    SELECT UserId, Username, RoleId, StaffId, PatientId, IsActive, CAST(RowVer AS BIGINT) AS RowVer
+    FROM UserAccount
+    WHERE UserId = :id
+""")
+
+INSERT_SQL = text("""
+    INSERT INTO UserAccount (Username, PasswordHash, RoleId, StaffId, PatientId, IsActive)
+    VALUES (:Username, :PasswordHash, :RoleId, :StaffId, :PatientId, :IsActive)
+""")
+
+UPDATE_SQL = text("""
+    UPDATE UserAccount
+    SET Username=:Username, RoleId=:RoleId, StaffId=:StaffId, PatientId=:PatientId, IsActive=:IsActive
+    WHERE UserId=:UserId
+""")
+
+UPDATE_WITH_PASSWORD_SQL = text("""
+    UPDATE UserAccount
+    SET Username=:Username, PasswordHash=:PasswordHash, RoleId=:RoleId, StaffId=:StaffId,
+        PatientId=:PatientId, IsActive=:IsActive
+    WHERE UserId=:UserId
+""")
+
+SET_ACTIVE_SQL = id_list_sql("UPDATE UserAccount SET IsActive=:a WHERE UserId IN :ids")
+TOGGLE_ACTIVE_SQL = id_list_sql(
+    "UPDATE UserAccount SET IsActive = CASE WHEN IsActive = 0 THEN 1 ELSE 0 END WHERE UserId IN :ids"
+)
+DELETE_SQL = id_list_sql("DELETE FROM UserAccount WHERE UserId IN :ids")
+
+def _params(data: dict) -> dict:
+    # UserDialog "Password" alanını verir; DB kolonu PasswordHash
+    return {
+        "Username": data["Username"],
+        "PasswordHash": data.get("Password"),
+        "RoleId": data["RoleId"],
+        "StaffId": data.get("StaffId"),
+        "PatientId": data.get("PatientId"),
+        "IsActive": data["IsActive"],
+    }
+
+@operation(reads=("UserAccount", "Role"))
+def list_users(conn=None):
+    return fetch_all(LIST_SQL, conn=conn)
+
+@operation(writes=("UserAccount",))
+def add_user(data: dict, conn=None):
+    add_users([data], conn=conn)
+
+@operation(writes=("UserAccount",))
+def add_users(rows: list[dict], conn=None):
+    if not rows:
+        return
+    with transaction(conn) as c:
+        c.execute(INSERT_SQL, [_params(r) for r in rows])
+
+@operation(writes=("UserAccount",))
+def update_user(user_id: int, data: dict, original: dict | None = None, conn=None) -> bool:
+    """
+    original (listed row with RowVer): changed columns only, see
+    patients.update_patient. An empty Password keeps the current PasswordHash.
+    """
+    if original is None:
+        update_users([dict(data, UserId=user_id)], conn=conn)
+        return True
+    params = _params(data)
+    password = params.pop("PasswordHash")
+    changes = changed_fields(original, params)
+    if password:
+        changes["PasswordHash"] = password
+    return update_changed("UserAccount", "UserId", user_id, changes, version=original.get("RowVer"),
+                          original=original, current_sql=CURRENT_SQL, conn=conn)
+
+@operation(writes=("UserAccount",))
+def update_users(rows: list[dict], conn=None):
+    """Rows with an empty Password keep their current PasswordHash."""
+    with_pw = [dict(_params(r), UserId=r["UserId"]) for r in rows if r.get("Password")]
+    without_pw = [dict(_params(r), UserId=r["UserId"]) for r in rows if not r.get("Password")]
+    for p in without_pw:
+        del p["PasswordHash"]
+    with transaction(conn) as c:
+        if with_pw:
+            c.execute(UPDATE_WITH_PASSWORD_SQL, with_pw)
+        if without_pw:
+            c.execute(UPDATE_SQL, without_pw)
+
+@operation(writes=("UserAccount",))
+def set_active(user_ids: list[int], active: bool, conn=None) -> dict:
+    return bulk_execute(SET_ACTIVE_SQL, user_ids, {"a": 1 if active else 0}, conn=conn)
+
+@operation(writes=("UserAccount",))
+def toggle_active(user_ids: list[int], conn=None) -> dict:
+    """Flips IsActive of every row (NULL counts as active)."""
+    return bulk_execute(TOGGLE_ACTIVE_SQL, user_ids, conn=conn)
+
+@operation(writes=("UserAccount",))
+def delete_users(user_ids: list[int], conn=None) -> dict:
+    return bulk_execute(DELETE_SQL, user_ids, conn=conn)
@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Testler yerel SQLite stand-in ile çalışır (SQL Server / API sunucusu gerekmez).
+# services.base HOSPITAL_API_URL'i import sırasında okur: ortam önce ayarlanmalı.
+_TMP = tempfile.mkdtemp(prefix="hospital-tests-")
+STANDIN_PATH = os.path.join(_TMP, "standin.db")
+os.environ.pop("HOSPITAL_API_URL", None)
+os.environ["HOSPITAL_DB_URL"] = f"sqlite:///{STANDIN_PATH}"
+os.environ["HOSPITAL_SCHEMA_CACHE"] = os.path.join(_TMP, "schema_cache.json")
+
+@pytest.fixture
+def standin():
+    """Fresh stand-in database (schema + seed rows) for every test; yields the engine."""
+    from database import standin as db_standin
+    from db import get_engine
+
+    engine = get_engine()
+    engine.dispose()
+    db_standin.create(STANDIN_PATH, force=True)
+    yield engine
+    engine.dispose()
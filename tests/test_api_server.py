@@ -0,0 +1,82 @@
+# tests/test_api_server.py
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _request(port, method, path, body=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+    finally:
+        conn.close()
+
+@pytest.fixture(scope="module")
+def server(tmp_path_factory):
+    """`python -m api.server --standin` in its own process: only what main() imports is registered."""
+    port = _free_port()
+    db = tmp_path_factory.mktemp("api") / "standin.db"
+    proc = subprocess.Popen([sys.executable, "-m", "api.server", "--standin", str(db), "--port", str(port)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            _request(port, "GET", "/health")
+            break
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                pytest.fail(f"API server did not start: {proc.stderr.read().decode(errors='replace')}")
+            time.sleep(0.1)
+    yield port
+    proc.terminate()
+    proc.wait(10)
+
+def test_find_duplicates_over_http(server):
+    status, payload = _request(server, "POST", "/op/duplicates.find_duplicates", {
+        "args": [{"FirstName": "Omer", "LastName": "Zorlu", "BirthDate": "2001-01-01", "TCNo": "", "Phone": ""}],
+        "kwargs": {}})
+    assert status == 200, payload
+    assert [r["TCNo"] for r in payload["result"]] == ["11111111111"]
+
+def test_every_operation_module_is_served(server):
+    # @operation içeren her modül SERVICE_MODULES'ta olmalı (yoksa thin-client'ta NotFound)
+    from services.base import SERVICE_MODULES
+    with_operations = {f"services.{p.stem}" for p in (ROOT / "services").glob("*.py")
+                       if "\n@operation(" in p.read_text(encoding="utf-8")}
+    assert with_operations <= set(SERVICE_MODULES)
+
+    _status, health = _request(server, "GET", "/health")
+    served = {op.split(".")[0] for op in health["operations"]}
+    assert {m.rsplit(".", 1)[-1] for m in with_operations} <= served
+    assert "timeline.get_timeline" in health["operations"]
+
+def test_timeline_over_http(server):
+    status, payload = _request(server, "POST", "/op/timeline.get_timeline", {"args": [1], "kwargs": {}})
+    assert status == 200, payload
+    assert payload["result"]
+
+def test_staff_write_drops_cached_list(server):
+    # staff.* artık işlem: sunucu cache'i yazmada boşalır
+    op = lambda name, *args: _request(server, "POST", f"/op/{name}", {"args": list(args), "kwargs": {}})
+    _status, before = op("staff.list_active_staff")
+    status, payload = op("staff.add_staff", {"FirstName": "Deniz", "LastName": "Acar", "Title": "Doctor",
+                                             "DepartmentId": 1, "Phone": None, "Email": None, "IsActive": 1})
+    assert status == 200, payload
+    _status, after = op("staff.list_active_staff")
+    assert len(after["result"]) == len(before["result"]) + 1
@@ -0,0 +1,71 @@
+# tests/test_base.py
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import text
+
+from services import definitions, patients
+from services.base import ConcurrencyConflict, bulk_execute, changed_fields, fetch_all, id_list_sql, same_value, \
+    transaction, update_changed
+
+ROOM_IDS_SQL = text("SELECT RoomId FROM Room ORDER BY RoomId")
+
+def test_bulk_execute_one_statement(standin):
+    q = id_list_sql("UPDATE Room SET IsActive = :active WHERE RoomId IN :ids")
+    assert bulk_execute(q, [1, 2, 3], {"active": 0}) == {"done": 3, "failed": []}
+    assert bulk_execute(q, []) == {"done": 0, "failed": []}
+
+def test_bulk_execute_falls_back_to_rows(standin):
+    # seed: 1 ve 3 numaralı odaların rezervasyonu var (FK)
+    result = definitions.delete_rows("Room", "RoomId", [1, 2, 3, 4])
+    assert result["done"] == 2
+    assert [f["id"] for f in result["failed"]] == [1, 3]
+    assert all("FOREIGN KEY" in f["error"] for f in result["failed"])
+    assert [r["RoomId"] for r in fetch_all(ROOM_IDS_SQL)] == [1, 3]
+
+def test_bulk_execute_in_outer_transaction(standin):
+    # savepoint'ler dıştaki işlemi bozmaz: başarılı satırlar commit'e kadar bekler
+    q = id_list_sql("DELETE FROM Room WHERE RoomId IN :ids")
+    with transaction() as c:
+        c.execute(text("UPDATE Room SET Floor = '9' WHERE RoomId = 4"))
+        assert bulk_execute(q, [2, 3], conn=c)["done"] == 1
+    assert [r["RoomId"] for r in fetch_all(ROOM_IDS_SQL)] == [1, 3, 4]
+    assert fetch_all(text("SELECT Floor FROM Room WHERE RoomId = 4"))[0]["Floor"] == "9"
+
+@pytest.mark.parametrize("a, b", [
+    (None, ""), ("", None), (Decimal("150.00"), "150"), (Decimal("150.50"), 150.5), (True, 1), (False, "0"),
+    (3, "3"), (date(2025, 1, 10), "2025-01-10"), ("Ali ", "Ali"),
+])
+def test_same_value(a, b):
+    assert same_value(a, b) and same_value(b, a)
+
+@pytest.mark.parametrize("a, b", [
+    (None, "0"), (Decimal("150.00"), "150.01"), (True, 0), (3, "three"), ("ali", "Ali"),
+])
+def test_different_value(a, b):
+    assert not same_value(a, b)
+
+def test_changed_fields():
+    original = {"Floor": "1", "IsActive": True, "BasePrice": Decimal("100.00"), "Note": None}
+    data = {"Floor": "1", "IsActive": 0, "BasePrice": "100", "Note": "", "Extra": "x"}
+    assert changed_fields(original, data) == {"IsActive": 0, "Extra": "x"}
+
+def test_update_changed_rowver_conflict(standin):
+    row = patients.list_patients()[0]
+    assert patients.update_patient(row["PatientId"], {"Phone": "5550000001"}, original=row)
+    with pytest.raises(ConcurrencyConflict) as e:
+        patients.update_patient(row["PatientId"], {"Phone": "5550000002"}, original=row)
+    assert e.value.current["Phone"] == "5550000001"
+    assert patients.update_patient(row["PatientId"], {"Phone": "5550000001"}, original=e.value.current) is False
+
+def test_update_changed_original_values_guard(standin):
+    # RowVer olmayan tablo: değişen kolonların eski değerleri WHERE'e girer
+    current_sql = text("SELECT RoomId, Floor FROM Room WHERE RoomId = :id")
+    original = {"RoomId": 2, "Floor": "1"}
+    assert update_changed("Room", "RoomId", 2, {"Floor": "3"}, original=original, current_sql=current_sql)
+    with pytest.raises(ConcurrencyConflict) as e:
+        update_changed("Room", "RoomId", 2, {"Floor": "4"}, original=original, current_sql=current_sql)
+    assert e.value.current == {"RoomId": 2, "Floor": "3"}
+    with pytest.raises(ConcurrencyConflict, match="no longer exists"):
+        update_changed("Room", "RoomId", 99, {"Floor": "4"}, original=original, current_sql=current_sql)
@@ -0,0 +1,17 @@
+# tests/test_bench_queries.py
+from tools.bench_queries import compare, data_label, data_sizes
+
+def test_label_follows_the_data_not_the_flags(standin):
+    sizes = data_sizes()
+    assert sizes == {"Patient": 2, "Reservation": 2, "ServiceRecord": 2, "Payment": 2}
+    assert data_label(sizes) == "Patient~2,ServiceRecord~2"
+
+def test_label_ignores_small_changes():
+    assert data_label({"Patient": 10234, "ServiceRecord": 31870}) == "Patient~10000,ServiceRecord~32000"
+    assert data_label({"Patient": 10190, "ServiceRecord": 31901}) == "Patient~10000,ServiceRecord~32000"
+    assert data_label({"Patient": 0, "ServiceRecord": 0}) == "Patient~0,ServiceRecord~0"
+
+def test_compare():
+    base = {"a": {"p95": 10.0}, "b": {"p95": 10.0}, "c": {"p95": 10.0}}
+    results = {"a": {"p95": 13.0}, "b": {"p95": 10.2}, "c": {"p95": 7.0}, "d": {"p95": 1.0}}
+    assert compare(results, base, 0.25, 0.5) == {"a": "REGRESSED", "b": "ok", "c": "faster", "d": "new"}
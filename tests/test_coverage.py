@@ -0,0 +1,42 @@
+# tests/test_coverage.py
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from services.coverage import recalculate
+
+def _amounts(conn, sr_id):
+    row = conn.execute(text("""
+        SELECT sr.StateCoveredAmount, sr.PatientPayableAmount, b.PayableAmount
+        FROM ServiceRecord sr JOIN ServiceRecordBalance b ON b.ServiceRecordId = sr.ServiceRecordId
+        WHERE sr.ServiceRecordId = :id"""), {"id": sr_id}).one()
+    return tuple(Decimal(str(v)).quantize(Decimal("0.01")) for v in row)
+
+def test_recalculate_writes_the_new_split_set_based(standin):
+    with standin.begin() as c:
+        # yarım kuruş: 123.45 * 0.50 = 61.725 -> 61.73 (ROUND_HALF_UP, dialog ile aynı)
+        c.execute(text("""
+            INSERT INTO ServiceRecord (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice,
+                                       StateCoveredAmount, PatientPayableAmount)
+            VALUES (1, 1, 2, 1, '2025-01-20', 123.45, 98.76, 24.69)"""))
+        c.execute(text("INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount) VALUES (3, 24.69)"))
+        c.execute(text("UPDATE StateProgram SET CoverageRate = 0.50 WHERE ProgramId = 1"))
+
+    dry = recalculate(commit=False, chunk_size=2)
+    assert (dry.scanned, dry.changed, dry.written) == (3, 2, 0)
+
+    done = recalculate(commit=True, chunk_size=2)
+    assert (done.changed, done.written, done.conflicts, done.chunks) == (2, 2, 0, 2)
+    with standin.connect() as c:
+        assert _amounts(c, 1) == (Decimal("250.00"), Decimal("250.00"), Decimal("250.00"))
+        assert _amounts(c, 3) == (Decimal("61.73"), Decimal("61.72"), Decimal("61.72"))
+        assert _amounts(c, 2) == (Decimal("0.00"), Decimal("300.00"), Decimal("300.00"))    # değişmedi
+
+    again = recalculate(commit=True)
+    assert (again.changed, again.written) == (0, 0)
+
+def test_recalculate_program_filter(standin):
+    with standin.begin() as c:
+        c.execute(text("UPDATE StateProgram SET CoverageRate = 0.50 WHERE ProgramId = 1"))
+    assert recalculate([2], commit=True).written == 0
+    assert recalculate([1], commit=True).written == 1
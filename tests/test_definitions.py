@@ -0,0 +1,72 @@
+# tests/test_definitions.py
+import pytest
+
+from services.base import ServiceError
+from services.definitions import _filter_clause
+
+@pytest.mark.parametrize("raw", ["", ">", ">=", " <> ", "="])
+def test_incomplete_filter_is_left_out(raw):
+    assert _filter_clause("Floor", raw, "f0") is None
+
+def test_operator_filter():
+    assert _filter_clause("BasePrice", ">= 100", "f0", "decimal") == ("BasePrice >= :f0", {"f0": 100})
+
+def test_number_on_text_column_is_equality():
+    assert _filter_clause("Floor", "2", "f0") == ("Floor = :f0", {"f0": 2})
+
+def test_text_is_escaped_prefix_match():
+    sql, params = _filter_clause("RoomNumber", "1_0%", "f0")
+    assert sql == "RoomNumber LIKE :f0 ESCAPE '\\'"
+    assert params == {"f0": "1\\_0\\%%"}
+
+@pytest.mark.parametrize("col, raw, kind", [
+    ("RoomTypeId", "abc", "int"),
+    ("HospitalId", ">x", "text"),      # ...Id kolonları her zaman sayı
+    ("DefaultCapacity", "<>two", "int"),
+    ("IsActive", "yes", "bool"),
+])
+def test_mistyped_number_raises(col, raw, kind):
+    with pytest.raises(ServiceError, match="not a number"):
+        _filter_clause(col, raw, "f0", kind)
+
+def test_date_filters():
+    assert _filter_clause("StartDate", ">=2025-01-10", "f0", "date") == ("StartDate >= :f0", {"f0": "2025-01-10"})
+    assert _filter_clause("StartDate", "2025", "f0", "date")[1] == {"f0": "2025%"}
+    with pytest.raises(ServiceError, match="not a date"):
+        _filter_clause("StartDate", "<2025-13-01", "f0", "date")
+
+def test_write_invalidates_reference_cache(standin):
+    from refcache import reference_cache
+    from services import definitions
+
+    reference_cache.invalidate()
+    before = definitions.list_payment_types()
+    definitions.insert_row("PaymentType", {"PaymentTypeName": "Voucher"})
+    after = definitions.list_payment_types()
+    assert [r["PaymentTypeName"] for r in after] == [r["PaymentTypeName"] for r in before] + ["Voucher"]
+
+def test_write_through_api_server_drops_cached_pages(standin):
+    import asyncio
+    from api.server import ApiServer
+
+    server = ApiServer(workers=1, cache_ttl=60)
+    page = ["PaymentType", "PaymentTypeId", ["PaymentTypeId", "PaymentTypeName"]]
+
+    async def run():
+        first = await server.dispatch("definitions.list_rows", page, {})
+        await server.dispatch("definitions.insert_row", ["PaymentType", {"PaymentTypeName": "Voucher"}], {})
+        return first, await server.dispatch("definitions.list_rows", page, {})
+
+    first, second = asyncio.run(run())
+    assert len(second) == len(first) + 1
+
+def test_staff_and_user_writes_notify_listeners(standin):
+    from refcache import reference_cache
+    from services import staff, users
+
+    reference_cache.put("Staff", [{"StaffId": 1}], "fk")
+    reference_cache.put("UserAccount", [{"UserId": 1}], "fk")
+    staff.set_active([1], True)
+    users.set_active([1], True)
+    assert reference_cache.get("Staff", lambda: [], "fk") == []
+    assert reference_cache.get("UserAccount", lambda: [], "fk") == []
@@ -0,0 +1,72 @@
+# tests/test_duplicates.py
+from datetime import date
+
+import pytest
+
+from services import duplicates, patients
+from services.duplicates import THRESHOLD, _key, _score, _swapped
+
+def key(name="mehmet yilmaz", tc=None, birth="1990-03-04", phone=None):
+    first, _, last = name.partition(" ")
+    return _key(first, last, tc, birth, phone)
+
+def test_same_tcno_wins():
+    score, reasons, _name = _score(key(tc="12345678901"), key("zeynep kaya", tc="12345678901", birth=None))
+    assert (score, reasons) == (1.0, ["same TCNo"])
+
+def test_weights():
+    assert _score(key(), key())[0] == 0.8                               # isim + doğum tarihi
+    assert _score(key(phone="5551112233"), key(phone="5551112233"))[0] == 1.0
+    assert _score(key(), key(birth="1990-04-03"))[0] == round(0.5 + 0.3 * 0.8, 3)
+    # aynı isim tek başına eşiğin altında
+    same_name = _score(key(), key(birth="1985-01-01"))
+    assert same_name[0] == 0.5 < THRESHOLD and same_name[2] == 1.0
+
+def test_typo_with_same_birth_and_phone_is_likely():
+    score, reasons, name = _score(key("mehmet yilmaz", phone="5551112233"),
+                                  key("mehmt yilmaz", phone="5551112233"))
+    assert score >= THRESHOLD and 0.5 < name < 1.0
+    assert reasons[1:] == ["same birth date", "same phone"]
+
+@pytest.mark.parametrize("d, expected", [
+    (date(1990, 3, 4), date(1990, 4, 3)),
+    (date(1990, 3, 13), None),      # 13. ay yok
+    (date(1990, 5, 5), None),
+    (None, None),
+])
+def test_swapped(d, expected):
+    assert _swapped(d) == expected
+
+PEOPLE = [
+    ("Mehmet", "Yılmaz", "30000000001", "1990-03-04", "0555 111 22 33"),
+    ("Mehmt", "Yilmaz", "30000000002", "1990-03-04", None),          # yazım hatası
+    ("Mehmet", "Yilmaz", "30000000003", "1975-01-01", "+90 555 111 2233"),   # aynı telefon
+    ("Zeynep", "Kaya", "30000000004", "1990-03-04", None),           # sadece doğum tarihi
+    ("Mehmet", "Yilmaz", "30000000005", "1990-04-03", None),         # gün/ay yer değiştirmiş
+]
+
+def _add_people():
+    patients.add_patients([{"FirstName": f, "LastName": l, "TCNo": tc, "BirthDate": b, "Gender": None,
+                            "Phone": ph, "Email": None, "Address": None, "IsActive": 1}
+                           for f, l, tc, b, ph in PEOPLE])
+
+def test_find_duplicates(standin):
+    _add_people()
+    found = duplicates.find_duplicates({"FirstName": "Mehmet", "LastName": "YILMAZ", "BirthDate": "1990-03-04",
+                                        "Phone": "5551112233", "TCNo": ""})
+    by_tc = {r["TCNo"]: r for r in found}
+    assert by_tc["30000000001"]["Score"] == 1.0 and by_tc["30000000001"]["Likely"]
+    assert by_tc["30000000002"]["Likely"]
+    assert by_tc["30000000003"]["Likely"]      # isim + telefon = 0.7
+    assert by_tc["30000000005"]["Reasons"] == "name 100%, day/month swapped"
+    assert "30000000004" not in by_tc
+    assert [r["Score"] for r in found] == sorted((r["Score"] for r in found), reverse=True)
+
+def test_find_clusters_agrees_with_score(standin):
+    _add_people()
+    result = duplicates.find_clusters()
+    tcs = [sorted(p["TCNo"] for p in c["Patients"]) for c in result["clusters"]]
+    assert tcs == [["30000000001", "30000000002", "30000000003", "30000000005"]]
+    # tablo taraması _score'u satır içinde tekrarlar: en iyi çift (1, 5) aynı puanı almalı
+    best = _score(key(phone="5551112233"), key(birth="1990-04-03"))[0]
+    assert result["clusters"][0]["Score"] == best == 0.74
@@ -0,0 +1,53 @@
+# tests/test_export.py
+import csv
+import gzip
+import threading
+
+import pytest
+
+from services import export
+from services.base import ServiceError
+
+def _read_csv(path, opener=open, encoding="utf-8-sig"):
+    with opener(path, "rt", newline="", encoding=encoding) as f:
+        return list(csv.reader(f))
+
+def test_csv_export_streams_in_batches(standin, tmp_path):
+    path = str(tmp_path / "patients.csv")
+    seen = []
+    report = export.export("patients", path, batch_size=1, progress=seen.append)
+    rows = _read_csv(path)
+    assert report.rows == 2 and seen == [1, 2]
+    assert rows[0][:3] == ["PatientId", "FirstName", "LastName"]
+    assert [r[1] for r in rows[1:]] == ["Omer", "Ece"]
+    assert not (tmp_path / "patients.csv.part").exists()
+
+def test_csv_gz_export(standin, tmp_path):
+    path = str(tmp_path / "users.csv.gz")
+    report = export.export("users", path)
+    rows = _read_csv(path, gzip.open, "utf-8")
+    assert report.fmt == "csv.gz" and len(rows) == report.rows + 1
+    assert "PasswordHash" not in rows[0]
+
+def test_cancelled_export_leaves_nothing(standin, tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    report = export.export("patients", str(tmp_path / "p.csv"), cancel=cancel)
+    assert report.cancelled and report.rows == 0
+    assert list(tmp_path.iterdir()) == []
+
+def test_table_query_rejects_secrets_and_bad_names():
+    with pytest.raises(ServiceError, match="cannot be exported"):
+        export.table_query("UserAccount", "UserId", ["UserId", "PasswordHash"])
+    with pytest.raises(ServiceError, match="Invalid"):
+        export.table_query("Room; DROP TABLE Room", "RoomId", ["RoomId"])
+    with pytest.raises(ServiceError, match="Unknown export"):
+        export.export("nope", "x.csv")
+
+def test_parquet_export(standin, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "records.parquet")
+    report = export.export("service_records", path)
+    table = pq.read_table(path)
+    assert table.num_rows == report.rows == 2
+    assert table.column_names[0] == "ServiceRecordId"
@@ -0,0 +1,59 @@
+# tests/test_generate_data.py
+from sqlalchemy import text
+
+from database import standin as db_standin
+from services.base import fetch_all
+from tools import generate_data
+
+SMALL = {"hospitals": 1, "departments": 3, "doctors": 4, "receptionists": 2, "rooms": 6,
+         "patients": 300, "reservations": 40, "records": 500}
+
+SNAPSHOT_SQL = {
+    "Patient": text("SELECT TCNo, FirstName, LastName, BirthDate, Phone, FirstNameNorm, PhoneNorm FROM Patient "
+                    "WHERE PatientId > 2 ORDER BY PatientId"),
+    "ServiceRecord": text("SELECT PatientId, ServiceId, DoctorId, ServiceDate, TotalPrice, PatientPayableAmount "
+                          "FROM ServiceRecord WHERE ServiceRecordId > 2 ORDER BY ServiceRecordId"),
+    "Payment": text("SELECT ServiceRecordId, PaymentDate, Amount FROM Payment WHERE ServiceRecordId > 2 "
+                    "ORDER BY PaymentId"),
+}
+
+def _generate(seed=42, **overrides):
+    generate_data.generate(dict(SMALL, **overrides), seed=seed, batch=64)
+    return {name: fetch_all(q) for name, q in SNAPSHOT_SQL.items()}
+
+def _recreate(engine):
+    engine.dispose()
+    db_standin.create(engine.url.database, force=True)
+
+def test_counts_for_scale():
+    counts = generate_data.counts_for(0.0001, {"patients": 5})
+    assert counts["patients"] == 5 and counts["hospitals"] == 1 and counts["records"] == 30
+    assert generate_data.counts_for(10)["patients"] == 1_000_000
+
+def test_same_seed_same_rows(standin):
+    first = _generate()
+    assert len(first["Patient"]) == 300 and len(first["ServiceRecord"]) == 500
+    _recreate(standin)
+    assert _generate() == first
+
+def test_other_streams_do_not_reshuffle(standin):
+    # kayıt sayısını değiştirmek hasta satırlarını değiştirmez
+    first = _generate()
+    _recreate(standin)
+    again = _generate(records=100)
+    assert again["Patient"] == first["Patient"]
+    assert again["ServiceRecord"] == first["ServiceRecord"][:100]
+
+def test_ledger_matches_payments(standin):
+    _generate()
+    rows = fetch_all(text("""
+        SELECT b.ServiceRecordId, b.PayableAmount, b.PaidAmount, sr.PatientPayableAmount,
+               COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = b.ServiceRecordId), 0) AS Paid
+        FROM ServiceRecordBalance b JOIN ServiceRecord sr ON sr.ServiceRecordId = b.ServiceRecordId
+        WHERE b.ServiceRecordId > 2
+    """))
+    assert len(rows) == 500
+    for r in rows:
+        assert float(r["PayableAmount"]) == float(r["PatientPayableAmount"])
+        assert abs(float(r["PaidAmount"]) - float(r["Paid"])) < 0.005
+        assert float(r["PaidAmount"]) <= float(r["PayableAmount"]) + 0.005   # fazla ödeme üretilmez
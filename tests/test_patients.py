@@ -0,0 +1,19 @@
+# tests/test_patients.py
+from services import patients
+
+def _ids(rows):
+    return [r["PatientId"] for r in rows]
+
+def test_search_by_name_and_tc(standin):
+    assert _ids(patients.search_patients("zor")) == [1]
+    assert _ids(patients.search_patients("ÖMER zorlu")) == [1]
+    assert _ids(patients.search_patients("2222")) == [2]
+    assert _ids(patients.search_patients("")) == [2, 1]
+
+def test_inactive_patient_is_found_by_id_only(standin):
+    # düzenlenen rezervasyonun hastası sonradan pasif yapılmış olabilir: '#id' onu yine bulmalı
+    patients.set_active([1], False)
+    assert _ids(patients.search_patients("zor")) == []
+    assert _ids(patients.search_patients("")) == [2]
+    assert _ids(patients.search_patients("#1")) == [1]
+    assert patients.search_patients("#99") == []
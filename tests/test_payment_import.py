@@ -0,0 +1,94 @@
+# tests/test_payment_import.py
+from decimal import Decimal
+
+import pytest
+
+from services.payment_import import _parse_amount
+
+@pytest.mark.parametrize("raw, expected", [
+    ("1.234,56", "1234.56"),
+    ("1,234.56", "1234.56"),
+    ("1234,5", "1234.50"),
+    ("1234.50", "1234.50"),
+    (" 250 ", "250.00"),
+    ("1.234.567", "1234567.00"),
+    ("1,234,567", "1234567.00"),
+    ("1.234.567,8", "1234567.80"),
+])
+def test_parse_amount(raw, expected):
+    assert _parse_amount(raw) == Decimal(expected)
+
+@pytest.mark.parametrize("raw", ["1,234", "1.234", "12.500"])
+def test_parse_amount_rejects_ambiguous_separator(raw):
+    with pytest.raises(ValueError, match="ambiguous"):
+        _parse_amount(raw)
+
+@pytest.mark.parametrize("raw", ["12,3456", "1,234.567", "0.0015"])
+def test_parse_amount_does_not_round(raw):
+    with pytest.raises(ValueError, match="more than two decimals"):
+        _parse_amount(raw)
+
+@pytest.mark.parametrize("raw", ["", None, "abc", "NaN", "1.2.34", "1,234,56", "1,23.4"])
+def test_parse_amount_rejects_garbage(raw):
+    with pytest.raises(ValueError):
+        _parse_amount(raw)
+
+def _write_bank_file(path, rows):
+    lines = ["TransactionDate,Amount,Description,SenderName"]
+    lines += [f"2025-01-20,{amount},{ref},Test" for amount, ref in rows]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def test_post_file_reports_database_errors_per_row(standin, tmp_path):
+    from sqlalchemy import text
+    from services.payment_import import post_file
+
+    with standin.begin() as c:
+        c.execute(text("""
+            INSERT INTO ServiceRecord (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice,
+                                       StateCoveredAmount, PatientPayableAmount)
+            VALUES (1, 3, 2, 2, '2025-01-20', 1200, 0, 1200)"""))
+        c.execute(text("INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount) VALUES (3, 1200)"))
+        # tek bir satırda gerçek bir veritabanı hatası
+        c.execute(text("""CREATE TRIGGER trg_test_fail BEFORE INSERT ON Payment WHEN NEW.Amount = 13
+                          BEGIN SELECT RAISE(ABORT, 'rejected by trigger'); END"""))
+
+    path = tmp_path / "bank.csv"
+    _write_bank_file(path, [("100.00", "SR#3"), ("13.00", "SR#3"), ("200.00", "SR#3"), ("50.00", "SR#99")])
+    report = post_file(str(path), commit=True, chunk_size=10)
+
+    assert (report.accepted, report.posted) == (3, 2)
+    assert report.amount_posted == Decimal("300.00")
+    assert [(e["line"], e["reason"].split(":")[0]) for e in report.exceptions] == [
+        (3, "database error"), (5, "SR#99 has no outstanding balance")]
+    with standin.connect() as c:
+        assert c.execute(text("SELECT PaidAmount FROM ServiceRecordBalance WHERE ServiceRecordId = 3")).scalar() == 300
+
+def test_post_file_twice_posts_each_line_once(standin, tmp_path):
+    from sqlalchemy import text
+    from services.payment_import import post_file
+
+    with standin.begin() as c:
+        c.execute(text("""
+            INSERT INTO ServiceRecord (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice,
+                                       StateCoveredAmount, PatientPayableAmount)
+            VALUES (1, 3, 2, 2, '2025-01-20', 1200, 0, 1200)"""))
+        c.execute(text("INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount) VALUES (3, 1200)"))
+
+    path = tmp_path / "bank.csv"
+    # aynı gün aynı tutarda iki ayrı havale: ikisi de ödeme
+    _write_bank_file(path, [("100.00", "SR#3"), ("100.00", "SR#3"), ("250.00", "SR#3")])
+    first = post_file(str(path), commit=True, chunk_size=2)
+    assert (first.posted, first.already_posted) == (3, 0)
+
+    dry = post_file(str(path), chunk_size=2)
+    assert (dry.accepted, dry.already_posted, dry.exceptions) == (0, 3, [])
+    second = post_file(str(path), commit=True, chunk_size=2)
+    assert (second.accepted, second.posted, second.already_posted, second.exceptions) == (0, 0, 3, [])
+
+    # dosyanın devamı gelirse sadece yeni satır işlenir
+    _write_bank_file(path, [("100.00", "SR#3"), ("100.00", "SR#3"), ("250.00", "SR#3"), ("100.00", "SR#3")])
+    third = post_file(str(path), commit=True, chunk_size=2)
+    assert (third.posted, third.already_posted) == (1, 3)
+    with standin.connect() as c:
+        assert c.execute(text("SELECT PaidAmount FROM ServiceRecordBalance WHERE ServiceRecordId = 3")).scalar() == 550
+        assert c.execute(text("SELECT COUNT(*) FROM Payment WHERE ServiceRecordId = 3")).scalar() == 4
@@ -0,0 +1,30 @@
+# tests/test_prefetch.py
+import threading
+import time
+
+from prefetch import PrefetchJob
+
+def test_result_leaves_out_slow_and_failed_loaders():
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    job = PrefetchJob({"fast": lambda: [1], "slow": lambda: release.wait(5), "failed": fail}, timeout=0.2)
+    started = time.monotonic()
+    try:
+        assert job.result() == {"fast": [1]}
+        assert time.monotonic() - started < 1
+        assert job.done()
+    finally:
+        release.set()
+
+def test_done_waits_for_loaders_before_the_deadline():
+    release = threading.Event()
+    job = PrefetchJob({"slow": release.wait}, timeout=5)
+    try:
+        assert not job.done()
+    finally:
+        release.set()
+    assert job.result() == {"slow": True}
+    assert job.done()
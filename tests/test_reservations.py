@@ -0,0 +1,49 @@
+# tests/test_reservations.py
+import threading
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import event, text
+
+from services.reservations import ReservationConflict, add_reservation
+
+def _booking(start, end, room=4):
+    return {"PatientId": 1, "RoomId": room, "StatusId": 1, "StartDate": start, "EndDate": end}
+
+def test_overlapping_booking_is_rejected(standin):
+    add_reservation(_booking(date(2025, 3, 1), date(2025, 3, 5)), created_by=3)
+    add_reservation(_booking(date(2025, 3, 5), date(2025, 3, 7)), created_by=3)     # çıkış günü boş
+    with pytest.raises(ReservationConflict):
+        add_reservation(_booking(date(2025, 3, 4), date(2025, 3, 6)), created_by=3)
+
+def test_concurrent_bookings_of_one_room_do_not_both_pass(standin):
+    barrier = threading.Barrier(8)
+    outcomes = []
+
+    def slow_insert(_conn, _cursor, statement, *_):
+        # kontrol ile INSERT arasındaki pencereyi genişlet: kilitsiz kontrol burada çift kayıt üretir
+        if statement.lstrip().startswith("INSERT INTO Reservation"):
+            time.sleep(0.05)
+
+    def book():
+        barrier.wait()
+        try:
+            add_reservation(_booking(date(2025, 4, 1), date(2025, 4, 3)), created_by=3)
+            outcomes.append("booked")
+        except ReservationConflict:
+            outcomes.append("conflict")
+
+    event.listen(standin, "before_cursor_execute", slow_insert)
+    try:
+        threads = [threading.Thread(target=book) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        event.remove(standin, "before_cursor_execute", slow_insert)
+
+    assert sorted(outcomes) == ["booked"] + ["conflict"] * 7
+    with standin.connect() as c:
+        assert c.execute(text("SELECT COUNT(*) FROM Reservation WHERE RoomId = 4")).scalar() == 1
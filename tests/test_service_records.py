@@ -0,0 +1,42 @@
+# tests/test_service_records.py
+import re
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+from services import service_records
+
+def _row(payable):
+    return {"PatientId": 1, "ServiceId": 1, "ProgramId": 2, "ServiceDate": date(2025, 1, 20),
+            "TotalPrice": payable, "StateCoveredAmount": 0, "PatientPayableAmount": payable}
+
+def test_add_records_opens_ledger_rows_for_the_inserted_ids(standin):
+    with standin.begin() as c:
+        # ledger'ı olmayan, aynı doktora ait başka bir kayıt: add_records ona dokunmamalı
+        c.execute(text("""
+            INSERT INTO ServiceRecord (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice,
+                                       StateCoveredAmount, PatientPayableAmount)
+            VALUES (2, 2, 2, 2, '2025-01-19', 300, 0, 300)"""))
+        c.execute(text("DELETE FROM ServiceRecordBalance WHERE ServiceRecordId = 3"))
+
+    service_records.add_records([_row(150), _row(250)], doctor_id=2)
+
+    with standin.connect() as c:
+        rows = c.execute(text("SELECT ServiceRecordId, PayableAmount, PaidAmount FROM ServiceRecordBalance "
+                              "WHERE ServiceRecordId > 2 ORDER BY ServiceRecordId")).all()
+    assert [(r[0], float(r[1]), float(r[2])) for r in rows] == [(4, 150.0, 0.0), (5, 250.0, 0.0)]
+
+def _index_columns(script: str, name: str) -> set[str]:
+    m = re.search(rf"CREATE INDEX {name} ON \w+ \(([^)]*)\)\s*INCLUDE \(([^)]*)\)", script)
+    assert m, f"{name} not found"
+    return {c.strip() for part in m.groups() for c in part.split(",")}
+
+@pytest.mark.parametrize("script", ["HospitalDB.sql", "HospitalUpgrade.sql"])
+def test_worklist_index_covers_the_worklist_query(script):
+    # iş listesi sayfası key lookup yapmamalı: sr.* kolonlarının hepsi IX_ServiceRecord_Doctor'da
+    sql = service_records.WORKLIST_SQL + " ".join(service_records.WORKLIST_FILTERS.values())
+    used = set(re.findall(r"\bsr\.(\w+)", sql))
+    text_ = (Path(__file__).resolve().parents[1] / "database" / script).read_text(encoding="utf-8-sig")
+    assert used <= _index_columns(text_, "IX_ServiceRecord_Doctor")
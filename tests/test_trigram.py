@@ -0,0 +1,42 @@
+# tests/test_trigram.py
+import random
+
+import pytest
+
+from services.trigram import TrigramIndex, similarity, trigrams
+
+def test_words_are_padded_like_pg_trgm():
+    assert trigrams("ali") == {"  a", " al", "ali", "li "}
+    assert trigrams("ali  veli") == trigrams("veli ali")
+
+def test_similarity():
+    assert similarity("ayse yilmaz", "yilmaz ayse") == 1.0
+    assert similarity("", "ali") == 0.0
+    typo = similarity("mehmet yilmaz", "mehmt yilmaz")
+    assert 0.5 < typo < 1.0
+    assert similarity("mehmet yilmaz", "zeynep kaya") < 0.1
+
+def _brute_force(texts, query, limit, min_similarity):
+    scored = sorted(((similarity(query, t), i) for i, t in enumerate(texts)), reverse=True)
+    return [(round(s, 3), i) for s, i in scored if s >= min_similarity][:limit]
+
+@pytest.mark.parametrize("query", ["mehmet yilmaz", "mehmt yilmz", "ali", "zeynep kaya", "xq",
+                                   "ali abdurrahmangazi"])
+def test_index_matches_brute_force(query):
+    # yaygın adlar Counter yolunu, "abdurrahmangazi" (seyrek trigramlar) prefix filtering yolunu çalıştırır
+    rnd = random.Random(7)
+    first = ["ali", "ayse", "mehmet", "zeynep", "fatma", "mustafa", "emre", "elif"]
+    last = ["yilmaz", "kaya", "demir", "sahin", "celik", "yildiz", "arslan", "dogan"]
+    texts = [f"{rnd.choice(first)} {rnd.choice(last)}" for _ in range(2000)]
+    texts += ["mehmet yilmaz", "zeynep kayaoglu", "ali abdurrahmangazi", "veli abdurrahmangazi",
+              "abdurrahman yilmaz"]
+    index = TrigramIndex((i, t, i) for i, t in enumerate(texts))
+
+    got = index.search(query, limit=2500, min_similarity=0.3)
+    expected = _brute_force(texts, query, 2500, 0.3)
+    assert sorted(got) == sorted(expected)
+
+def test_search_limit_keeps_best():
+    index = TrigramIndex([(1, "mehmet yilmaz", "exact"), (2, "mehmt yilmaz", "typo"), (3, "ali kaya", "other")])
+    assert [p for _s, p in index.search("mehmet yilmaz", limit=2)] == ["exact", "typo"]
+    assert index.search("   ") == []
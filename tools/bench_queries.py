@@ -0,0 +1,276 @@
+# tools/bench_queries.py
+"""
+Benchmarks the statements behind the UI refreshes (login, users, staff,
+payments, reservations, availability, overlap check, doctor worklist,
+generic table page + edit) and compares them with a stored baseline.
+
+    python -m tools.bench_queries [--standin PATH --scale 0.1] [--iterations 50]
+                                  [--only login,worklist] [--baseline FILE]
+                                  [--save-baseline] [--tolerance 0.25] [--allow-writes]
+
+--standin creates the SQLite stand-in at PATH and fills it with
+tools.generate_data at --scale (only if PATH does not exist yet); without it
+the configured database (HOSPITAL_DB_URL / SQL Server) is used as it is.
+The generic_edit case updates a row (and puts the original value back), so
+it only runs on a --standin or with --allow-writes.
+
+Each case is timed through the service function the window calls (SQL +
+row fetch), after --warmup untimed calls. p50 / p95 / p99 are saved per
+"<dialect>|<label>" in the baseline file; a case regresses when its p95 is
+more than --tolerance (and --min-ms) above the baseline. Exit code 1 on any
+regression. Without --label the label is built from the row counts actually
+in the database (e.g. "Patient~10000,ServiceRecord~30000"), so a run only
+compares with a baseline recorded on the same data size.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+DEFAULT_BASELINE = Path(os.getenv("HOSPITAL_BENCH_BASELINE", "bench_baseline.json"))
+
+def percentile(sorted_values, p: float) -> float:
+    # nearest-rank
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+SIZE_TABLES = ("Patient", "Reservation", "ServiceRecord", "Payment")
+
+def data_sizes() -> dict:
+    from services.base import fetch_one
+    from sqlalchemy import text
+    return {t: fetch_one(text(f"SELECT COUNT(*) AS n FROM {t}"))["n"] for t in SIZE_TABLES}
+
+def _two_digits(n: int) -> int:
+    # 10234 -> 10000, 31870 -> 32000: birkaç satırlık yazma anahtarı değiştirmesin
+    return int(float(f"{n:.2g}")) if n else 0
+
+def data_label(sizes: dict) -> str:
+    """Baseline key suffix from the data present (two significant digits per table)."""
+    return ",".join(f"{t}~{_two_digits(sizes[t])}" for t in ("Patient", "ServiceRecord") if t in sizes)
+
+def prepare_standin(path: str, scale: float, seed: int):
+    from database import standin
+    fresh = not os.path.exists(path)
+    standin.create(path)
+    # engine henüz oluşmadı: tüm servisler bu veritabanını kullanır
+    os.environ["HOSPITAL_DB_URL"] = standin.url_for(path)
+    if fresh:
+        from tools import generate_data
+        print(f"Generating scale {scale} data into {path} ...", file=sys.stderr)
+        stats = generate_data.generate(generate_data.counts_for(scale), seed=seed)
+        print(stats.summary(), file=sys.stderr)
+
+def require_write_target(ap, args, what: str):
+    """Write workloads only on a --standin, or on the configured database with --allow-writes."""
+    if not (args.standin or args.allow_writes):
+        ap.error(f"{what} writes to the configured database; use --standin PATH or --allow-writes")
+
+class Context:
+    """Sample keys picked once from the data (busiest doctor, a login, a room, ...)."""
+    def __init__(self):
+        from sqlalchemy import text
+        from services import service_records
+        from services.base import fetch_one
+
+        def one(sql, **params):
+            return fetch_one(text(sql), params)
+
+        self.user = one("""SELECT ua.Username, ua.PasswordHash FROM UserAccount ua
+                           WHERE ua.IsActive = 1 ORDER BY ua.UserId DESC""")
+        self.doctor_id = one("""SELECT DoctorId FROM ServiceRecord
+                                GROUP BY DoctorId ORDER BY COUNT(*) DESC""")["DoctorId"]
+        self.room_id = one("""SELECT RoomId FROM Reservation
+                              GROUP BY RoomId ORDER BY COUNT(*) DESC""")["RoomId"]
+        last = one("SELECT MAX(EndDate) AS d FROM Reservation")["d"]
+        end = date.fromisoformat(str(last)[:10])
+        self.overlap_range = ((end - timedelta(days=10)).isoformat(), end.isoformat())
+        # DoctorWindow'un varsayılan aralığı, doktorun son kaydına göre
+        last = one("SELECT MAX(ServiceDate) AS d FROM ServiceRecord WHERE DoctorId = :doc", doc=self.doctor_id)["d"]
+        end = date.fromisoformat(str(last)[:10])
+        self.worklist_range = ((end - timedelta(days=service_records.WORKLIST_DAYS)).isoformat(), end.isoformat())
+
+def _generic_case(table: str):
+    from services import definitions, schema
+
+    meta = schema.table_meta(table)
+    pk = meta["pk"]
+    version = "RowVer" if any(c["name"] == "RowVer" for c in meta["columns"]) else None
+    cols = [pk] + [c["name"] for c in meta["columns"] if not c["version"] and c["name"] != pk]
+
+    def refresh():
+        return definitions.list_rows(table, pk, cols, sort=pk, descending=True,
+                                     limit=definitions.ROWS_PAGE, version=version)
+    return refresh, pk, cols
+
+def _edit_case(table: str, column: str):
+    """
+    GenericCrudWidget.edit_row: one diff-only update, value flipped back and
+    forth; restore() writes the original value back exactly (NULL included).
+    """
+    from services import definitions
+
+    refresh, pk, _cols = _generic_case(table)
+    state = {"row": dict(refresh()[0])}
+    base_value = state["row"][column]
+
+    def edit():
+        row = state["row"]
+        value = base_value if row[column] != base_value else f"{base_value or ''}x"
+        definitions.update_row(table, pk, row[pk], {column: value}, original=row)
+        state["row"] = dict(row, **{column: value})
+        return 1
+
+    def restore():
+        row = state["row"]
+        if row[column] != base_value:
+            definitions.update_row(table, pk, row[pk], {column: base_value}, original=row)
+    return edit, restore
+
+WRITE_CASES = ("generic_edit",)
+
+def build_cases(ctx: Context, writes: bool = False) -> dict:
+    """
+    name -> (callable, cleanup or None). Each callable returns the rows it
+    fetched. WRITE_CASES are only built with writes=True.
+    """
+    import auth
+    from services import payments, reservations, service_records, staff, users
+
+    start, end = ctx.overlap_range
+    room_refresh, _pk, _cols = _generic_case("Room")
+    cases = {
+        "login": (lambda: [auth.login(ctx.user["Username"], ctx.user["PasswordHash"])], None),
+        "users": (users.list_users, None),
+        "staff": (staff.list_staff, None),
+        "payments": (payments.list_payments, None),
+        "reservations": (reservations.list_reservations, None),
+        "availability": (reservations.list_availability, None),
+        "overlap_check": (lambda: [reservations.count_overlaps(ctx.room_id, start, end)], None),
+        "worklist": (lambda: service_records.list_worklist(ctx.doctor_id, *ctx.worklist_range), None),
+        "generic_refresh": (room_refresh, None),
+    }
+    if writes:
+        edit, restore = _edit_case("Room", "Floor")
+        cases["generic_edit"] = (lambda: [edit()], restore)
+    return cases
+
+def run_case(fn, iterations: int, warmup: int) -> dict:
+    rows = 0
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+        rows = len(result) if result is not None else 0
+    times.sort()
+    return {"n": iterations, "rows": rows,
+            "p50": round(percentile(times, 50), 3), "p95": round(percentile(times, 95), 3),
+            "p99": round(percentile(times, 99), 3)}
+
+def compare(results: dict, baseline: dict, tolerance: float, min_ms: float) -> dict:
+    """-> {case: 'ok' | 'REGRESSED' | 'new' | 'faster'}"""
+    out = {}
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            out[name] = "new"
+        elif r["p95"] > b["p95"] * (1 + tolerance) and r["p95"] - b["p95"] > min_ms:
+            out[name] = "REGRESSED"
+        elif r["p95"] < b["p95"] * (1 - tolerance) and b["p95"] - r["p95"] > min_ms:
+            out[name] = "faster"
+        else:
+            out[name] = "ok"
+    return out
+
+def read_baselines(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the hot SQL paths")
+    ap.add_argument("--standin", help="SQLite stand-in path (created and filled if missing)")
+    ap.add_argument("--scale", type=float, default=0.1, help="generate_data scale for a new --standin")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--label", help="baseline key suffix (default: row counts of the database)")
+    ap.add_argument("--iterations", type=int, default=50)
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--only", help="comma separated case names")
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    ap.add_argument("--min-ms", type=float, default=0.5, help="ignore p95 differences below this")
+    ap.add_argument("--allow-writes", action="store_true",
+                    help="run the write cases (generic_edit) on the configured database")
+    args = ap.parse_args(argv)
+    wanted = [n.strip() for n in args.only.split(",") if n.strip()] if args.only else []
+    writes = bool(args.standin or args.allow_writes)
+    if any(n in WRITE_CASES for n in wanted):
+        require_write_target(ap, args, ", ".join(n for n in wanted if n in WRITE_CASES))
+
+    if args.standin:
+        prepare_standin(args.standin, args.scale, args.seed)
+
+    from db import get_engine
+
+    ctx = Context()
+    cases = build_cases(ctx, writes=writes)
+    if not writes and not wanted:
+        print(f"skipping {', '.join(WRITE_CASES)} (needs --standin or --allow-writes)", file=sys.stderr)
+    if wanted:
+        unknown = [n for n in wanted if n not in cases]
+        if unknown:
+            ap.error(f"unknown case(s): {', '.join(unknown)} (known: {', '.join(cases)})")
+        cases = {n: cases[n] for n in wanted}
+
+    sizes = data_sizes()
+    key = f"{get_engine().dialect.name}|{args.label or data_label(sizes)}"
+
+    results = {}
+    for name, (fn, cleanup) in cases.items():
+        try:
+            results[name] = run_case(fn, args.iterations, args.warmup)
+        finally:
+            if cleanup:
+                cleanup()
+
+    baselines = read_baselines(args.baseline)
+    stored = baselines.get(key, {})
+    status = compare(results, stored.get("cases", {}), args.tolerance, args.min_ms)
+
+    print(f"{key}  " + ", ".join(f"{t}={n:,}" for t, n in sizes.items()))
+    if not stored and not args.save_baseline:
+        print(f"  no baseline for {key} in {args.baseline}: nothing to compare (use --save-baseline)",
+              file=sys.stderr)
+    if stored and stored.get("sizes") != sizes:
+        print(f"  note: baseline was recorded with {stored.get('sizes')}")
+    print(f"{'case':<18}{'rows':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'base p95':>10}  status")
+    for name, r in results.items():
+        b = stored.get("cases", {}).get(name, {})
+        base = f"{b['p95']:.3f}" if b else "-"
+        print(f"{name:<18}{r['rows']:>8,}{r['p50']:>10.3f}{r['p95']:>10.3f}{r['p99']:>10.3f}{base:>10}  {status[name]}")
+
+    if args.save_baseline:
+        baselines[key] = {"sizes": sizes, "machine": platform.node(), "cases": {**stored.get("cases", {}), **results}}
+        args.baseline.write_text(json.dumps(baselines, indent=1, sort_keys=True), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline} ({key})")
+        return 0
+
+    regressed = [n for n, s in status.items() if s == "REGRESSED"]
+    if regressed:
+        print(f"Regression: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+# tools/bench_ui.py
+"""
+Headless UI benchmark: admin, doctor and receptionist windows and their
+dialogs under Qt's offscreen platform (no display needed).
+
+    python -m tools.bench_ui [--standin PATH --scale 0.1] [--repeat 5]
+                             [--only admin,doctor] [--baseline FILE]
+                             [--save-baseline] [--tolerance 0.25]
+
+Measured per step, in ms:
+  <role>.construct           window __init__ incl. its own queries
+  <role>.construct_prefetched window __init__ with the login prefetch result (UI only)
+  <role>.render.<table>      filling one table from already fetched rows
+  <role>.dialog.<action>     Add / Edit dialog opened and painted, incl. its
+                             combo / FK loads (the dialog is then cancelled)
+and memory per window: Python allocations (tracemalloc, separate untimed
+pass) and process RSS growth. Data, --standin and the baseline file work as
+in tools.bench_queries (keys "ui:<dialect>|<label>").
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# QApplication'dan önce: pencere açılmadan çalışır
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from tools.bench_queries import DEFAULT_BASELINE, compare, data_label, data_sizes, percentile, prepare_standin, \
+    read_baselines
+
+ROLES = ("admin", "doctor", "receptionist")
+
+def _rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class Harness:
+    def __init__(self, app, repeat: int):
+        self.app = app
+        self.repeat = repeat
+        self.times: dict[str, list[float]] = {}
+        self.memory: dict[str, dict] = {}
+        self._patch_modals()
+
+    def _patch_modals(self):
+        """Dialogs are shown, painted and cancelled instead of blocking in exec()."""
+        from PyQt6.QtWidgets import QDialog, QMessageBox
+        from ui import generic_crud, patient_dialog, payment_dialog, reservation_dialog, \
+            servicerecord_dialog, staff_dialog, user_dialog
+
+        app = self.app
+
+        def exec_(dlg):
+            dlg.show()
+            app.processEvents()
+            dlg.close()
+            return QDialog.DialogCode.Rejected
+
+        for cls in (generic_crud.EditDialog, patient_dialog.PatientDialog, payment_dialog.PaymentDialog,
+                    reservation_dialog.ReservationDialog, servicerecord_dialog.ServiceRecordDialog,
+                    staff_dialog.StaffDialog, user_dialog.UserDialog):
+            cls.exec = exec_
+        for name in ("information", "warning", "critical"):
+            setattr(QMessageBox, name, staticmethod(lambda *a, **k: QMessageBox.StandardButton.Ok))
+
+    def time(self, name: str, fn, repeat: int | None = None):
+        for _ in range(repeat or self.repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            self.app.processEvents()
+            self.times.setdefault(name, []).append((time.perf_counter() - t0) * 1000)
+        return result
+
+    def measure_memory(self, name: str, build):
+        """Untimed: Python allocations and RSS growth of one more window."""
+        rss0 = _rss_mb()
+        tracemalloc.start()
+        w = build()
+        self.app.processEvents()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss1 = _rss_mb()
+        self.memory[name] = {"py_kb": round(current / 1024), "py_peak_kb": round(peak / 1024),
+                             "rss_mb": round(rss1 - rss0, 1) if rss0 is not None else None}
+        return w
+
+    def results(self) -> dict:
+        out = {}
+        for name, values in self.times.items():
+            s = sorted(values)
+            out[name] = {"n": len(s), "p50": round(percentile(s, 50), 3), "p95": round(percentile(s, 95), 3),
+                         "p99": round(percentile(s, 99), 3)}
+        return out
+
+def _session(role: str):
+    import auth
+    from sqlalchemy import text
+    from services.base import fetch_one
+
+    # Rolün en çok kaydı olan kullanıcısı (doktor: en dolu worklist)
+    row = fetch_one(text("""
+        SELECT ua.Username, ua.PasswordHash
+        FROM UserAccount ua
+        JOIN Role r ON r.RoleId = ua.RoleId
+        WHERE r.RoleName = :role AND ua.IsActive = 1
+        ORDER BY (SELECT COUNT(*) FROM ServiceRecord sr WHERE sr.DoctorId = ua.StaffId) DESC, ua.UserId
+    """), {"role": role.capitalize()})
+    if row is None:
+        return None
+    return auth.login(row["Username"], row["PasswordHash"])
+
+def _select_first(tbl):
+    if tbl.rowCount():
+        tbl.clearSelection()
+        tbl.selectRow(0)
+
+def _doctor_rows(session):
+    from datetime import date, timedelta
+    from sqlalchemy import text
+    from services import service_records
+    from services.base import fetch_one
+
+    # Sentetik veri bugünden önce bitebilir: doktorun son kaydına göre aralık
+    last = fetch_one(text("SELECT MAX(ServiceDate) AS d FROM ServiceRecord WHERE DoctorId = :doc"),
+                     {"doc": session["staff_id"]})["d"]
+    end = date.fromisoformat(str(last)[:10]) if last else date.today()
+    start = end - timedelta(days=service_records.WORKLIST_DAYS)
+    return service_records.list_worklist(session["staff_id"], start=start, end=end)
+
+def bench_admin(h: Harness, session):
+    import prefetch
+    from ui.admin_window import AdminWindow
+
+    build = lambda: AdminWindow(session, lambda: None)
+    h.time("admin.construct", build)
+    pre = prefetch.start(session).result()
+    w = h.time("admin.construct_prefetched", lambda: AdminWindow(session, lambda: None, prefetched=pre))
+    h.measure_memory("admin", build)
+
+    h.time("admin.render.users", lambda: w._render_users(pre["users"]))
+    h.time("admin.render.staff", lambda: w._render_staff(pre["staff"]))
+    h.time("admin.render.payments", lambda: w._render_payments(pre["payments"]))
+    h.time("admin.render.balances", lambda: w._render_balances(pre["balances"]))
+
+    h.time("admin.dialog.add_user", w.add_user)
+    _select_first(w.tbl_users)
+    h.time("admin.dialog.edit_user", w.edit_user)
+    h.time("admin.dialog.add_staff", w.add_staff)
+    _select_first(w.tbl_staff)
+    h.time("admin.dialog.edit_staff", w.edit_staff)
+    h.time("admin.dialog.add_payment", w.add_payment)
+
+    # System Definitions: her tablo için Add / Edit (FK combo'ları dahil)
+    for i in range(w.def_tabs.count()):
+        crud = w.def_tabs.widget(i)
+        table = w.def_tabs.tabText(i)
+        h.time(f"admin.render.def.{table}", crud.refresh)
+        h.time(f"admin.dialog.add.{table}", crud.add_row)
+        _select_first(crud.tbl)
+        h.time(f"admin.dialog.edit.{table}", crud.edit_row)
+    w.close()
+
+def bench_doctor(h: Harness, session):
+    from ui.doctor_window import DoctorWindow
+
+    rows = _doctor_rows(session)
+    build = lambda: DoctorWindow(session, lambda: None)
+    h.time("doctor.construct", build)
+    w = h.time("doctor.construct_prefetched",
+               lambda: DoctorWindow(session, lambda: None, prefetched={"service_records": rows}))
+    h.measure_memory("doctor", lambda: DoctorWindow(session, lambda: None, prefetched={"service_records": rows}))
+
+    h.time("doctor.render.worklist", lambda: w._show_page(rows, append=False))
+    h.time("doctor.dialog.add_record", w.add_record)
+    _select_first(w.tbl)
+    h.time("doctor.dialog.edit_record", w.edit_record)
+    w.close()
+
+def bench_receptionist(h: Harness, session):
+    import prefetch
+    from ui.receptionist_window import ReceptionistWindow
+
+    build = lambda: ReceptionistWindow(session, lambda: None)
+    h.time("receptionist.construct", build)
+    pre = prefetch.start(session).result()
+    w = h.time("receptionist.construct_prefetched",
+               lambda: ReceptionistWindow(session, lambda: None, prefetched=pre))
+    h.measure_memory("receptionist", build)
+
+    h.time("receptionist.render.patients", lambda: w._render_patients(pre["patients"]))
+    h.time("receptionist.render.reservations", lambda: w._render_reservations(pre["reservations"]))
+    h.time("receptionist.render.availability", lambda: w._render_availability(pre["availability"]))
+
+    h.time("receptionist.dialog.add_patient", w.add_patient)
+    _select_first(w.tbl_patients)
+    h.time("receptionist.dialog.edit_patient", w.edit_patient)
+    h.time("receptionist.dialog.add_reservation", w.add_reservation)
+    _select_first(w.tbl_res)
+    h.time("receptionist.dialog.edit_reservation", w.edit_reservation)
+    w.close()
+
+BENCHES = {"admin": bench_admin, "doctor": bench_doctor, "receptionist": bench_receptionist}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless UI benchmark (Qt offscreen)")
+    ap.add_argument("--standin", help="SQLite stand-in path (created and filled if missing)")
+    ap.add_argument("--scale", type=float, default=0.1, help="generate_data scale for a new --standin")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--label", help="baseline key suffix (default: row counts of the database)")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", help="comma separated roles: " + ", ".join(ROLES))
+    ap.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)")
+    ap.add_argument("--min-ms", type=float, default=2.0, help="ignore p95 differences below this")
+    args = ap.parse_args(argv)
+
+    roles = [r.strip() for r in args.only.split(",")] if args.only else list(ROLES)
+    unknown = [r for r in roles if r not in BENCHES]
+    if unknown:
+        ap.error(f"unknown role(s): {', '.join(unknown)}")
+    if args.standin:
+        prepare_standin(args.standin, args.scale, args.seed)
+
+    from PyQt6.QtWidgets import QApplication
+    from db import get_engine
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    h = Harness(app, args.repeat)
+    for role in roles:
+        session = _session(role)
+        if session is None:
+            print(f"skip {role}: no active {role} login", file=sys.stderr)
+            continue
+        BENCHES[role](h, session)
+
+    results = h.results()
+    key = f"ui:{get_engine().dialect.name}|{args.label or data_label(data_sizes())}"
+    baselines = read_baselines(args.baseline)
+    stored = baselines.get(key, {})
+    if not stored and not args.save_baseline:
+        print(f"no baseline for {key} in {args.baseline}: nothing to compare (use --save-baseline)",
+              file=sys.stderr)
+    status = compare(results, stored.get("cases", {}), args.tolerance, args.min_ms)
+
+    print(key)
+    print(f"{'step':<44}{'p50 ms':>10}{'p95 ms':>10}{'base p95':>10}  status")
+    for name, r in results.items():
+        b = stored.get("cases", {}).get(name, {})
+        base = f"{b['p95']:.1f}" if b else "-"
+        print(f"{name:<44}{r['p50']:>10.1f}{r['p95']:>10.1f}{base:>10}  {status[name]}")
+    print(f"\n{'window memory':<20}{'python KB':>12}{'py peak KB':>12}{'RSS +MB':>10}")
+    for name, m in h.memory.items():
+        rss = "-" if m["rss_mb"] is None else f"{m['rss_mb']:.1f}"
+        print(f"{name:<20}{m['py_kb']:>12,}{m['py_peak_kb']:>12,}{rss:>10}")
+
+    if args.save_baseline:
+        baselines[key] = {"memory": h.memory, "cases": {**stored.get("cases", {}), **results}}
+        args.baseline.write_text(json.dumps(baselines, indent=1, sort_keys=True), encoding="utf-8")
+        print(f"Baseline saved to {args.baseline} ({key})")
+        return 0
+
+    regressed = [n for n, s in status.items() if s == "REGRESSED"]
+    if regressed:
+        print(f"Regression: {', '.join(regressed)}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+# tools/explain_plans.py
+"""
+Captures the execution plan of every statement the app issues and flags
+scans, key lookups, implicit conversions and missing-index hints.
+
+    python -m tools.explain_plans [--standin PATH --scale 0.1] [--no-ui]
+                                  [--json plans.json] [--diff old.json]
+                                  [--small-table 1000]
+
+Statements are collected two ways:
+  - recorded while the windows, dialogs and GenericCrudWidget tabs run
+    headless (tools.bench_ui), plus auth.login, the bench_queries cases and
+    the search / report variants below;
+  - every module-level text() constant of auth and services/* (writes
+    included), with placeholder parameters.
+Each distinct statement is then explained without being run: SQLite
+EXPLAIN QUERY PLAN, SQL Server SET SHOWPLAN_XML ON (estimated plan).
+
+Scans of tables with fewer than --small-table rows are listed but not
+flagged. --json writes a sorted, diff-friendly report (one entry per
+statement, keyed by calling function + statement hash); --diff compares
+the flags with an earlier report, e.g. before / after an index change.
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import re
+import sys
+import threading
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from sqlalchemy import event, text
+from sqlalchemy.sql.elements import TextClause
+
+from tools.bench_queries import prepare_standin
+
+CATALOG_MODULES = ["auth", "services.balances", "services.coverage", "services.definitions",
+                   "services.duplicates", "services.export", "services.patients", "services.payment_import", "services.payments",
+                   "services.reservations", "services.rollups", "services.schema", "services.service_records",
+                   "services.staff", "services.timeline", "services.users"]
+
+# Çağıranı bulmak için: bu modüllerden gelen ilk frame
+_CALLER_PREFIXES = ("services.", "auth", "ui.", "prefetch", "refcache")
+_SKIP_CALLERS = ("services.base", "services.aio")
+
+SHOWPLAN_NS = {"p": "http://schemas.microsoft.com/sqlserver/2004/07/showplan"}
+
+class Recorder:
+    """before_cursor_execute hook: records statements, or turns them into EXPLAIN in explain mode."""
+    def __init__(self, engine):
+        self.engine = engine
+        self.seen: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.recording = False
+        event.listen(engine, "before_cursor_execute", self._hook, retval=True)
+
+    def _caller(self) -> str | None:
+        """First app frame on the stack; None for schema reflection and the tool's own queries."""
+        f = sys._getframe(2)
+        while f is not None:
+            mod = f.f_globals.get("__name__", "")
+            if mod == "sqlalchemy.engine.reflection":
+                return None
+            if mod.startswith(_CALLER_PREFIXES) and not mod.startswith(_SKIP_CALLERS):
+                return f"{mod}.{f.f_code.co_name}"
+            f = f.f_back
+        return None
+
+    def _hook(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.get("explain") and conn.dialect.name == "sqlite":
+            return "EXPLAIN QUERY PLAN " + statement, parameters
+        if self.recording and not conn.info.get("explain"):
+            params = parameters[0] if executemany and parameters else parameters
+            with self._lock:
+                if statement not in self.seen:
+                    source = self._caller()
+                    if source:
+                        self.seen[statement] = {"source": source, "params": params, "static": False}
+        return statement, parameters
+
+    def add_static(self, source: str, statement: str, params):
+        with self._lock:
+            self.seen.setdefault(statement, {"source": source, "params": params, "static": True})
+
+def _placeholder_params(q: TextClause) -> dict:
+    return {name: [1, 2] if bp.expanding else None for name, bp in q._bindparams.items()}
+
+def _catalog():
+    """(source, TextClause) for the module-level SQL constants."""
+    for name in CATALOG_MODULES:
+        mod = importlib.import_module(name)
+        for attr, value in sorted(vars(mod).items()):
+            if isinstance(value, TextClause):
+                yield f"{name}.{attr}", value
+            elif isinstance(value, dict):
+                for key, v in value.items():
+                    if isinstance(v, TextClause):
+                        yield f"{name}.{attr}[{key}]", v
+
+def record_static(rec: Recorder):
+    """Compiles each catalog constant to its driver statement without running it."""
+    with rec.engine.connect() as c:
+        c.info["explain"] = True
+        if c.dialect.name != "sqlite":
+            c.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            for source, q in _catalog():
+                compiled = {}
+
+                def grab(conn, cursor, statement, parameters, context, executemany):
+                    compiled.setdefault("s", (statement, parameters))
+
+                event.listen(rec.engine, "before_cursor_execute", grab)
+                try:
+                    c.execute(q, _placeholder_params(q))
+                except Exception:
+                    pass    # plan aşamasında yeniden denenir, hata orada raporlanır
+                finally:
+                    event.remove(rec.engine, "before_cursor_execute", grab)
+                if "s" in compiled:
+                    statement, params = compiled["s"]
+                    if statement.startswith("EXPLAIN QUERY PLAN "):
+                        statement = statement[len("EXPLAIN QUERY PLAN "):]
+                    rec.add_static(source, statement, params)
+        finally:
+            if c.dialect.name != "sqlite":
+                c.exec_driver_sql("SET SHOWPLAN_XML OFF")
+            c.rollback()
+
+def _workload():
+    """Read paths not reached by the UI harness (search modes, filters, reports)."""
+    from services import balances, duplicates, patients, payments, rollups, service_records, timeline
+    from tools.bench_queries import Context, build_cases
+
+    ctx = Context()
+    for _name, (fn, cleanup) in build_cases(ctx, writes=True).items():
+        try:
+            fn()
+        finally:
+            if cleanup:
+                cleanup()
+    for term in ("", "ali", "ali yil", "3000", "#5", "zzz"):
+        patients.search_patients(term)
+    for term in ("", "ali", "ali yil", "3000", "#5", "2025-01-10"):
+        payments.search_outstanding_records(term)
+    for term in ("", "ali", "ali yil", "3000"):
+        service_records.list_worklist(ctx.doctor_id, *ctx.worklist_range, patient=term)
+    for status in ("U", "P", "S", "O"):
+        balances.list_by_status(status)
+    duplicates.find_duplicates({"FirstName": "Ali", "LastName": "Yilmaz", "BirthDate": "1980-01-01",
+                                "Phone": "05321234567", "TCNo": "12345678901"})
+    timeline.get_timeline(1)
+    rollups.refresh()
+    for grain in rollups.GRAINS:
+        for dim in rollups.DIMENSIONS:
+            rollups.report(grain, dim)
+
+def _run_ui():
+    import os
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from tools import bench_ui
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    h = bench_ui.Harness(app, repeat=1)
+    for role, bench in bench_ui.BENCHES.items():
+        session = bench_ui._session(role)
+        if session is not None:
+            bench(h, session)
+
+# ---------------- plan analysis ----------------
+
+_NOT_ALIAS = {"WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "CROSS", "ON", "SET", "VALUES", "GROUP",
+              "ORDER", "UNION", "WITH", "AS", "SELECT", "OUTPUT", "DEFAULT"}
+
+def _aliases(statement: str) -> dict:
+    """alias -> table (SQLite plans name tables by their alias)."""
+    out = {}
+    for table, alias in re.findall(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", statement, re.I):
+        out[table] = table
+        if alias and alias.upper() not in _NOT_ALIAS:
+            out[alias] = table
+    return out
+
+def _sqlite_flags(lines, small, aliases) -> list[str]:
+    flags = []
+    for line in lines:
+        m = re.match(r"SCAN (\w+)(?: AS \w+)?(.*)", line)
+        if m:
+            table, rest = m.group(1), m.group(2)
+            if table == "CONSTANT" or aliases.get(table, table) in small:
+                continue
+            if table in aliases and aliases[table] != table:
+                table = f"{aliases[table]} {table}"
+            if "COVERING INDEX" in rest:
+                flags.append(f"index scan: {table}{rest}")
+            elif "USING INDEX" in rest:
+                flags.append(f"index scan + row lookups: {table}{rest}")
+            else:
+                flags.append(f"table scan: {table}")
+            continue
+        m = re.match(r"SEARCH (\w+)(?: AS \w+)? USING INDEX (\w+)", line)
+        if m and "COVERING" not in line and aliases.get(m.group(1), m.group(1)) not in small:
+            flags.append(f"key lookup: {aliases.get(m.group(1), m.group(1))} via {m.group(2)}")
+        if "AUTOMATIC" in line:
+            # SQLite sorgu için geçici index kuruyor: kalıcı index eksik
+            flags.append(f"missing index: {line}")
+    return flags
+
+def _sqlserver_flags(xml: str, small) -> tuple[list[str], list[str]]:
+    root = ET.fromstring(xml)
+    lines, flags = [], []
+    for op in root.iter("{%s}RelOp" % SHOWPLAN_NS["p"]):
+        physical = op.get("PhysicalOp")
+        obj = op.find(".//p:Object", SHOWPLAN_NS)
+        table = (obj.get("Table") or "").strip("[]") if obj is not None else ""
+        index = (obj.get("Index") or "").strip("[]") if obj is not None else ""
+        lines.append(f"{physical} {table}{'.' + index if index else ''} rows={op.get('EstimateRows')} "
+                     f"cost={op.get('EstimatedTotalSubtreeCost')}")
+        if table in small:
+            continue
+        if physical in ("Table Scan", "Clustered Index Scan", "Index Scan"):
+            flags.append(f"{physical.lower()}: {table}{'.' + index if index else ''}")
+        elif physical in ("Key Lookup", "RID Lookup"):
+            flags.append(f"{physical.lower()}: {table}")
+    for w in root.iter("{%s}PlanAffectingConvert" % SHOWPLAN_NS["p"]):
+        flags.append(f"implicit conversion: {w.get('Expression')} ({w.get('ConvertIssue')})")
+    for g in root.iter("{%s}MissingIndexGroup" % SHOWPLAN_NS["p"]):
+        for mi in g.iter("{%s}MissingIndex" % SHOWPLAN_NS["p"]):
+            cols = {cg.get("Usage"): [c.get("Name").strip("[]") for c in cg.iter("{%s}Column" % SHOWPLAN_NS["p"])]
+                    for cg in mi.iter("{%s}ColumnGroup" % SHOWPLAN_NS["p"])}
+            flags.append(f"missing index: {mi.get('Table').strip('[]')} "
+                         f"eq={cols.get('EQUALITY', [])} ineq={cols.get('INEQUALITY', [])} "
+                         f"include={cols.get('INCLUDE', [])} impact={g.get('Impact')}")
+    return lines, flags
+
+def explain_all(rec: Recorder, small: set, skipped: list) -> dict:
+    """Static entries that do not compile on this dialect are appended to skipped."""
+    report = {}
+    with rec.engine.connect() as c:
+        sqlite = c.dialect.name == "sqlite"
+        c.info["explain"] = True
+        if not sqlite:
+            c.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            for statement, info in rec.seen.items():
+                key = f"{info['source']}#{hashlib.sha1(statement.encode()).hexdigest()[:8]}"
+                entry = {"source": info["source"], "sql": " ".join(statement.split())}
+                try:
+                    rows = c.exec_driver_sql(statement, info["params"] or ()).all()
+                    if sqlite:
+                        entry["plan"] = [r[3] for r in rows]
+                        entry["flags"] = _sqlite_flags(entry["plan"], small, _aliases(statement))
+                    else:
+                        entry["plan"], entry["flags"] = _sqlserver_flags(rows[0][0], small)
+                except Exception as e:
+                    if info["static"]:
+                        # diğer dialect'e ait sabit (örn. sys.objects): bu veritabanında anlamsız
+                        skipped.append(info["source"])
+                        continue
+                    entry["plan"], entry["flags"] = [], [f"not explained: {str(e).splitlines()[0][:160]}"]
+                report[key] = entry
+        finally:
+            if not sqlite:
+                c.exec_driver_sql("SET SHOWPLAN_XML OFF")
+            c.rollback()
+    return dict(sorted(report.items()))
+
+def _small_tables(limit: int) -> set:
+    from sqlalchemy import inspect
+    from db import get_engine
+
+    small = set()
+    with get_engine().connect() as c:
+        for t in inspect(c).get_table_names():
+            n = c.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar()
+            if n < limit:
+                small.add(t)
+    return small
+
+def diff(old: dict, new: dict) -> list[str]:
+    out = []
+    for key in sorted(set(old) | set(new)):
+        before, after = set(old.get(key, {}).get("flags", [])), set(new.get(key, {}).get("flags", []))
+        if key not in old:
+            out.append(f"+ {key} (new statement) {sorted(after) or ''}")
+        elif key not in new:
+            out.append(f"- {key} (no longer issued)")
+        else:
+            out += [f"  {key}: fixed   {f}" for f in sorted(before - after)]
+            out += [f"  {key}: NEW     {f}" for f in sorted(after - before)]
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Capture execution plans and flag scans / lookups / conversions")
+    ap.add_argument("--standin", help="SQLite stand-in path (created and filled if missing)")
+    ap.add_argument("--scale", type=float, default=0.1)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--no-ui", action="store_true", help="skip the headless windows / dialogs")
+    ap.add_argument("--small-table", type=int, default=1000, help="do not flag scans of tables smaller than this")
+    ap.add_argument("--json", type=Path, help="write the per-statement report")
+    ap.add_argument("--diff", type=Path, help="compare flags with an earlier --json report")
+    ap.add_argument("--all", action="store_true", help="print statements without flags too")
+    args = ap.parse_args(argv)
+
+    if args.standin:
+        prepare_standin(args.standin, args.scale, args.seed)
+    from db import get_engine
+
+    rec = Recorder(get_engine())
+    rec.recording = True
+    try:
+        if not args.no_ui:
+            _run_ui()
+        _workload()
+    finally:
+        rec.recording = False
+    runtime = len(rec.seen)
+    record_static(rec)
+
+    skipped = []
+    report = explain_all(rec, _small_tables(args.small_table), skipped)
+    flagged = {k: v for k, v in report.items() if v["flags"]}
+    print(f"{len(report)} statement(s): {runtime} recorded at runtime, {len(report) - runtime} from the catalog; "
+          f"{len(flagged)} flagged", file=sys.stderr)
+    if skipped:
+        print(f"not for this dialect: {', '.join(skipped)}", file=sys.stderr)
+    for key, entry in (report if args.all else flagged).items():
+        print(f"\n{key}\n  {entry['sql'][:300]}")
+        for f in entry["flags"]:
+            print(f"  ! {f}")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=1, sort_keys=True, default=str), encoding="utf-8")
+        print(f"\nReport written to {args.json}", file=sys.stderr)
+    if args.diff:
+        old = json.loads(args.diff.read_text(encoding="utf-8"))
+        changes = diff(old, report)
+        print(f"\n{len(changes)} change(s) against {args.diff}")
+        for line in changes:
+            print(line)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
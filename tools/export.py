@@ -0,0 +1,49 @@
+# tools/export.py
+"""
+Streams a grid query or a whole table to CSV / gzip CSV / Parquet.
+
+    python -m tools.export payments payments.parquet
+    python -m tools.export doctor_records recs.csv.gz --param doc=2
+    python -m tools.export --table Department --columns DepartmentId,DepartmentName --pk DepartmentId dep.csv
+
+Format follows the file extension (.csv, .csv.gz, .parquet) unless --format
+is given. Ctrl+C stops the export and removes the partial file.
+"""
+import argparse
+import sys
+
+from services import export
+
+def _progress(rows):
+    print(f"\r  {rows:,} rows", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Streaming export")
+    ap.add_argument("source", nargs="?", choices=sorted(export.EXPORTS), help="named grid export")
+    ap.add_argument("path")
+    ap.add_argument("--table", help="export a table instead of a named grid")
+    ap.add_argument("--columns", help="comma separated (with --table)")
+    ap.add_argument("--pk", help="order by column (with --table)")
+    ap.add_argument("--param", action="append", default=[], metavar="KEY=VALUE")
+    ap.add_argument("--format", choices=export.FORMATS)
+    ap.add_argument("--batch", type=int, default=20000)
+    args = ap.parse_args(argv)
+
+    if bool(args.source) == bool(args.table):
+        ap.error("give either a source or --table")
+    if args.table and not (args.columns and args.pk):
+        ap.error("--table needs --columns and --pk")
+
+    params = dict(p.split("=", 1) for p in args.param)
+    kwargs = dict(fmt=args.format, batch_size=args.batch, progress=_progress)
+    if args.table:
+        q = export.table_query(args.table, args.pk, args.columns.split(","))
+        report = export.export_query(q, args.path, params, **kwargs)
+    else:
+        report = export.export(args.source, args.path, params, **kwargs)
+    print(file=sys.stderr)
+    print(report.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# tools/find_duplicates.py
+"""
+Lists groups of likely duplicate patients (same / swapped birth date or
+same phone, similar name).
+
+    python -m tools.find_duplicates [--threshold 0.6] [--csv clusters.csv]
+"""
+import argparse
+import csv
+import sys
+
+from services import duplicates
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Find duplicate patients")
+    ap.add_argument("--threshold", type=float, default=duplicates.THRESHOLD)
+    ap.add_argument("--max-block", type=int, default=500, help="skip birth date / phone groups larger than this")
+    ap.add_argument("--csv", help="write the clusters to a CSV file")
+    args = ap.parse_args(argv)
+
+    result = duplicates.find_clusters(threshold=args.threshold, max_block=args.max_block)
+    clusters = result["clusters"]
+    print(f"{len(clusters)} cluster(s) among {result['patients']:,} patients, "
+          f"{result['pairs']:,} pairs compared, {result['skipped_blocks']} oversized group(s) skipped, "
+          f"{result['seconds']}s", file=sys.stderr)
+
+    cols = ["PatientId", "FullName", "TCNo", "BirthDate", "Phone", "IsActive"]
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8-sig") as f:
+            w = csv.writer(f)
+            w.writerow(["Cluster", "Score", *cols])
+            for n, c in enumerate(clusters, start=1):
+                for p in c["Patients"]:
+                    w.writerow([n, c["Score"], *(p[k] for k in cols)])
+    else:
+        for n, c in enumerate(clusters, start=1):
+            print(f"#{n} score {c['Score']}")
+            for p in c["Patients"]:
+                print("\t" + "\t".join(str(p[k]) for k in cols))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+# tools/generate_data.py
+"""
+Deterministic synthetic data for volume testing (hospitals, departments,
+staff + logins, rooms, patients, reservations, service records, payments).
+
+    python -m tools.generate_data [--scale 1.0] [--seed 42] [--batch 5000]
+                                  [--end YYYY-MM-DD] [--days 730]
+                                  [--patients N] [--records N] ...
+
+Scale 1.0 is ~100k patients / 300k service records; --scale 10 gives a
+million patients. Per-table counts can be overridden; reservations stop
+early when the rooms are full for the whole window. The same seed, counts
+and --end always give the same rows (each table has its own random stream,
+so changing one count does not reshuffle the others). Rows are appended
+after the existing data; lookup tables (Role, RoomType, ReservationStatus,
+HealthService, StateProgram, PaymentType) come from the seed script.
+
+Rows go in executemany batches of --batch rows, one transaction per batch
+(fast_executemany on SQL Server). Ledger rows (ServiceRecordBalance) are
+written at the end; run tools.refresh_rollups afterwards for the reports.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import text
+
+from db import get_engine
+from services import patients, payments, service_records
+
+BASE_COUNTS = {
+    "hospitals": 2,
+    "departments": 12,      # hastanelere dağıtılır
+    "doctors": 120,
+    "receptionists": 30,
+    "rooms": 200,
+    "patients": 100_000,
+    "reservations": 60_000,
+    "records": 300_000,
+}
+MIN_COUNTS = {"hospitals": 1, "departments": 1, "doctors": 1, "receptionists": 1, "rooms": 1}
+
+DEFAULT_END = date(2026, 1, 1)
+
+FIRST_NAMES = [
+    "Ahmet", "Mehmet", "Mustafa", "Ali", "Huseyin", "Hasan", "Ibrahim", "Ismail", "Omer", "Yusuf",
+    "Murat", "Emre", "Burak", "Can", "Kerem", "Emir", "Eren", "Baris", "Serkan", "Volkan",
+    "Ayse", "Fatma", "Emine", "Hatice", "Zeynep", "Elif", "Meryem", "Sultan", "Hulya", "Ece",
+    "Esra", "Merve", "Busra", "Derya", "Selin", "Ceren", "Gizem", "Irem", "Defne", "Asli",
+    "Cagri", "Gokhan", "Onur", "Tolga", "Ugur", "Sevgi", "Nur", "Deniz", "Ozge", "Sibel",
+]
+LAST_NAMES = [
+    "Yilmaz", "Kaya", "Demir", "Sahin", "Celik", "Yildiz", "Yildirim", "Ozturk", "Aydin", "Ozdemir",
+    "Arslan", "Dogan", "Kilic", "Aslan", "Cetin", "Kara", "Koc", "Kurt", "Ozkan", "Simsek",
+    "Polat", "Ozcan", "Korkmaz", "Cakir", "Erdogan", "Yavuz", "Can", "Acar", "Sen", "Aktas",
+    "Guler", "Yalcin", "Gunes", "Bozkurt", "Bulut", "Keskin", "Unal", "Turan", "Gul", "Zorlu",
+]
+CITIES = ["Istanbul", "Ankara", "Izmir", "Bursa", "Antalya", "Konya", "Adana", "Kocaeli", "Eskisehir", "Trabzon"]
+DEPARTMENTS = [
+    "Dahiliye", "Kardiyoloji", "Ortopedi", "Noroloji", "Pediatri", "Genel Cerrahi", "Goz", "KBB",
+    "Uroloji", "Dermatoloji", "Kadin Dogum", "Psikiyatri", "Onkoloji", "Acil", "Radyoloji", "Fizik Tedavi",
+]
+
+INSERTS = {
+    "Hospital": "INSERT INTO Hospital (HospitalName, Address, Phone) VALUES (:HospitalName, :Address, :Phone)",
+    "Department": """INSERT INTO Department (DepartmentName, Description, HospitalId)
+                     VALUES (:DepartmentName, :Description, :HospitalId)""",
+    "Staff": """INSERT INTO Staff (FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive)
+                VALUES (:FirstName, :LastName, :Title, :DepartmentId, :Phone, :Email, 1)""",
+    "UserAccount": """INSERT INTO UserAccount (Username, PasswordHash, RoleId, StaffId, PatientId, IsActive)
+                      VALUES (:Username, :PasswordHash, :RoleId, :StaffId, NULL, 1)""",
+    "Room": """INSERT INTO Room (RoomNumber, RoomTypeId, HospitalId, Floor, IsActive, DepartmentId)
+               VALUES (:RoomNumber, :RoomTypeId, :HospitalId, :Floor, 1, :DepartmentId)""",
+    "Reservation": """INSERT INTO Reservation (PatientId, RoomId, CreatedByStaffId, StatusId, StartDate, EndDate, CreatedDate)
+                      VALUES (:PatientId, :RoomId, :CreatedByStaffId, :StatusId, :StartDate, :EndDate, :CreatedDate)""",
+}
+
+# Yeni kayıtların ledger satırları tek set-based insert ile (balances.ENSURE_SQL'in aralık hali)
+OPEN_BALANCES_SQL = text("""
+    INSERT INTO ServiceRecordBalance (ServiceRecordId, PayableAmount, PaidAmount)
+    SELECT sr.ServiceRecordId, sr.PatientPayableAmount,
+           COALESCE((SELECT SUM(p.Amount) FROM Payment p WHERE p.ServiceRecordId = sr.ServiceRecordId), 0)
+    FROM ServiceRecord sr
+    WHERE sr.ServiceRecordId > :after
+      AND NOT EXISTS (SELECT 1 FROM ServiceRecordBalance b WHERE b.ServiceRecordId = sr.ServiceRecordId)
+""")
+
+def counts_for(scale: float, overrides: dict | None = None) -> dict:
+    out = {k: max(MIN_COUNTS.get(k, 0), int(round(v * scale))) for k, v in BASE_COUNTS.items()}
+    out.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return out
+
+class Stats:
+    """Per-table row counts and time spent generating vs. loading."""
+    def __init__(self):
+        self.tables: dict[str, dict] = {}
+        self.started = time.perf_counter()
+
+    def add(self, table, rows, gen_s, load_s):
+        t = self.tables.setdefault(table, {"rows": 0, "gen": 0.0, "load": 0.0})
+        t["rows"] += rows
+        t["gen"] += gen_s
+        t["load"] += load_s
+
+    def summary(self) -> str:
+        lines = [f"{'table':<22}{'rows':>12}{'gen rows/s':>14}{'load rows/s':>14}{'seconds':>10}"]
+        total_rows = 0
+        for name, t in self.tables.items():
+            total_rows += t["rows"]
+            gen = t["rows"] / t["gen"] if t["gen"] else 0
+            load = t["rows"] / t["load"] if t["load"] else 0
+            lines.append(f"{name:<22}{t['rows']:>12,}{gen:>14,.0f}{load:>14,.0f}{t['gen'] + t['load']:>10.1f}")
+        elapsed = time.perf_counter() - self.started
+        lines.append(f"{'total':<22}{total_rows:>12,}{'':>14}{total_rows / elapsed if elapsed else 0:>14,.0f}"
+                     f"{elapsed:>10.1f}")
+        return "\n".join(lines)
+
+class Loader:
+    """
+    Batched inserts on one connection: executemany per batch, commit per batch
+    (BCP batch size gibi: log / lock büyümesini sınırlar).
+    """
+    def __init__(self, conn, batch: int, stats: Stats, progress=None):
+        self.conn = conn
+        self.batch = batch
+        self.stats = stats
+        self.progress = progress
+
+    def load(self, table: str, sql, rows) -> int:
+        """rows: iterable of param dicts (generated lazily). -> rows inserted."""
+        q = text(sql) if isinstance(sql, str) else sql
+        it = iter(rows)
+        done = 0
+        while True:
+            t0 = time.perf_counter()
+            chunk = [r for _, r in zip(range(self.batch), it)]
+            t1 = time.perf_counter()
+            if not chunk:
+                break
+            self.conn.execute(q, chunk)
+            self.conn.commit()
+            t2 = time.perf_counter()
+            done += len(chunk)
+            self.stats.add(table, len(chunk), t1 - t0, t2 - t1)
+            if self.progress:
+                self.progress(table, done)
+        return done
+
+    def max_id(self, table: str, pk: str) -> int:
+        return self.conn.execute(text(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}")).scalar()
+
+    def new_ids(self, table: str, pk: str, after: int) -> list[int]:
+        # IDENTITY / AUTOINCREMENT insert sırasını korur: i. üretilen satır = i. id
+        return [r[0] for r in self.conn.execute(
+            text(f"SELECT {pk} FROM {table} WHERE {pk} > :after ORDER BY {pk}"), {"after": after})]
+
+    def lookup(self, sql: str) -> list:
+        return self.conn.execute(text(sql)).all()
+
+def _rng(seed: int, stream: str) -> random.Random:
+    return random.Random(f"{seed}:{stream}")
+
+def _phone(rng) -> str:
+    return f"05{rng.randint(30, 59)}{rng.randint(0, 9_999_999):07d}"
+
+def _skewed(rng, n: int) -> int:
+    # Az sayıda hasta çok sık gelir (kronik hastalar): index'i başa yığ
+    return int(n * rng.random() ** 2.5)
+
+def gen_patients(rng, n: int, first_id: int, dup_rate: float):
+    """Patient rows (patients._params fills the *Norm columns); dup_rate: near-duplicates with a typo."""
+    prev = None
+    for i in range(n):
+        pid = first_id + i
+        if prev and rng.random() < dup_rate:
+            # Aynı kişi ikinci kez kaydedilmiş: harf hatası / telefon farklı, doğum tarihi aynı
+            first = prev["FirstName"]
+            cut = rng.randrange(1, len(first))
+            row = dict(prev, FirstName=first[:cut] + first[cut + 1:], Phone=_phone(rng))
+        else:
+            gender = rng.choice(("Male", "Female"))
+            first = FIRST_NAMES[rng.randrange(20) + (0 if gender == "Male" else 20)] \
+                if rng.random() < 0.8 else rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            birth = date(1930, 1, 1) + timedelta(days=rng.randrange(365 * 94))
+            row = {"FirstName": first, "LastName": last, "BirthDate": birth.isoformat(), "Gender": gender,
+                   "Phone": _phone(rng) if rng.random() < 0.9 else None,
+                   "Address": rng.choice(CITIES)}
+        # TCNo: 11 hane, 3 ile başlar (seed verisiyle çakışmaz), PatientId'den türetilir
+        row.update(TCNo=f"3{pid:010d}",
+                   Email=f"{row['FirstName']}.{row['LastName']}{pid}@example.com".lower(),
+                   IsActive=0 if rng.random() < 0.03 else 1)
+        prev = row
+        yield patients._params(row)
+
+def gen_reservations(rng, n: int, room_ids, patient_ids, receptionist_ids, status, start: date, days: int,
+                     today: date):
+    """
+    Back-to-back stays per room with idle gaps, ~8% cancelled bookings that
+    overlap the real stays, and patients with several stays in a row.
+    """
+    per_room = max(1, n // len(room_ids))
+    made = 0
+    for room in room_ids:
+        day = start + timedelta(days=rng.randrange(7))
+        for _ in range(per_room):
+            if made >= n:
+                return
+            length = min(1 + int(rng.expovariate(1 / 3)), 30)
+            s = day
+            e = s + timedelta(days=length)
+            if rng.random() < 0.08:
+                # İptal edilen rezervasyon: gerçek konaklamalarla çakışır
+                s = s - timedelta(days=rng.randrange(3))
+                st = status["Cancelled"]
+            else:
+                st = status["CheckedIn"] if e <= today else status["Reserved"]
+                day = e + timedelta(days=int(rng.expovariate(1 / 2)))
+            created = s - timedelta(days=rng.randrange(30))
+            yield {"PatientId": patient_ids[_skewed(rng, len(patient_ids))], "RoomId": room,
+                   "CreatedByStaffId": rng.choice(receptionist_ids), "StatusId": st,
+                   "StartDate": s.isoformat(), "EndDate": e.isoformat(), "CreatedDate": created.isoformat()}
+            made += 1
+            if day > start + timedelta(days=days):
+                break
+
+def gen_records(rng, n: int, patient_ids, doctor_ids, services_, programs, start: date, days: int, payable_out):
+    """ServiceRecord rows; payable_out collects (PatientPayableAmount, ServiceDate) for the payments."""
+    for _ in range(n):
+        service_id, base_price = rng.choice(services_)
+        program_id, rate = programs[0] if rng.random() < 0.7 else rng.choice(programs)
+        total = (Decimal(str(base_price)) * Decimal(rng.choice((90, 100, 100, 100, 110, 125))) / 100).quantize(
+            Decimal("0.01"))
+        covered, payable = service_records.compute_coverage(total, rate)
+        # Yeni tarihlerde daha çok kayıt (büyüyen hastane)
+        d = start + timedelta(days=int(days * rng.random() ** 0.7))
+        payable_out.append((payable, d))
+        yield {"PatientId": patient_ids[_skewed(rng, len(patient_ids))], "ServiceId": service_id,
+               "DoctorId": rng.choice(doctor_ids), "ProgramId": program_id, "ServiceDate": d.isoformat(),
+               "TotalPrice": total, "StateCoveredAmount": covered, "PatientPayableAmount": payable}
+
+def gen_payments(rng, record_ids, payables, payment_type_ids, end: date):
+    """Settled (1-2 payments), partly paid and unpaid records."""
+    for sr, (payable, d) in zip(record_ids, payables):
+        if payable <= 0:
+            continue
+        r = rng.random()
+        if r < 0.65:
+            parts = [payable] if rng.random() < 0.8 else [(payable / 2).quantize(Decimal("0.01"))] * 2
+            if len(parts) == 2:
+                parts[1] = payable - parts[0]
+        elif r < 0.8:
+            parts = [(payable * Decimal(rng.randint(10, 90)) / 100).quantize(Decimal("0.01"))]
+        else:
+            continue
+        pay_day = d
+        for amount in parts:
+            pay_day = min(pay_day + timedelta(days=int(rng.expovariate(1 / 5))), end)
+            yield {"ServiceRecordId": sr, "PaymentDate": pay_day.isoformat(), "Amount": amount,
+                   "PaymentTypeId": rng.choice(payment_type_ids), "Payer": "Patient"}
+
+def generate(counts: dict, seed: int = 42, batch: int = 5000, end: date = DEFAULT_END, days: int = 730,
+             dup_rate: float = 0.01, password: str = "1234", progress=None) -> Stats:
+    stats = Stats()
+    start = end - timedelta(days=days)
+    with get_engine().connect() as conn:
+        if conn.dialect.name == "sqlite":
+            # Yükleme süresince fsync yok; stand-in test verisi
+            conn.exec_driver_sql("PRAGMA synchronous = OFF")
+        ld = Loader(conn, batch, stats, progress)
+
+        roles = {name: rid for rid, name in ld.lookup("SELECT RoleId, RoleName FROM Role")}
+        status = {name: sid for sid, name in ld.lookup("SELECT StatusId, StatusName FROM ReservationStatus")}
+        room_types = [r[0] for r in ld.lookup("SELECT RoomTypeId FROM RoomType ORDER BY RoomTypeId")]
+        services_ = [tuple(r) for r in ld.lookup("SELECT ServiceId, BasePrice FROM HealthService ORDER BY ServiceId")]
+        programs = [tuple(r) for r in ld.lookup(
+            "SELECT ProgramId, CoverageRate FROM StateProgram ORDER BY CoverageRate DESC, ProgramId")]
+        payment_types = [r[0] for r in ld.lookup("SELECT PaymentTypeId FROM PaymentType ORDER BY PaymentTypeId")]
+        for need, rows in [("Role Doctor/Receptionist", {"Doctor", "Receptionist"} <= roles.keys()),
+                           ("ReservationStatus Reserved/CheckedIn/Cancelled",
+                            {"Reserved", "CheckedIn", "Cancelled"} <= status.keys()),
+                           ("RoomType", room_types), ("HealthService", services_),
+                           ("StateProgram", programs), ("PaymentType", payment_types)]:
+            if not rows:
+                raise SystemExit(f"Lookup data missing ({need}); run the seed script first.")
+
+        # Hospital / Department
+        rng = _rng(seed, "hospital")
+        after = ld.max_id("Hospital", "HospitalId")
+        ld.load("Hospital", INSERTS["Hospital"], (
+            {"HospitalName": f"{rng.choice(CITIES)} Hastanesi {after + i + 1}", "Address": rng.choice(CITIES),
+             "Phone": _phone(rng)} for i in range(counts["hospitals"])))
+        hospital_ids = ld.new_ids("Hospital", "HospitalId", after)
+
+        rng = _rng(seed, "department")
+        after = ld.max_id("Department", "DepartmentId")
+        ld.load("Department", INSERTS["Department"], (
+            {"DepartmentName": DEPARTMENTS[i % len(DEPARTMENTS)], "Description": None,
+             "HospitalId": hospital_ids[i % len(hospital_ids)]} for i in range(counts["departments"])))
+        department_ids = ld.new_ids("Department", "DepartmentId", after)
+        dept_hospital = {d: hospital_ids[i % len(hospital_ids)] for i, d in enumerate(department_ids)}
+
+        # Staff + logins (doctorN / receptionN, N = StaffId)
+        rng = _rng(seed, "staff")
+        after = ld.max_id("Staff", "StaffId")
+        titles = ["Doctor"] * counts["doctors"] + ["Receptionist"] * counts["receptionists"]
+        ld.load("Staff", INSERTS["Staff"], (
+            {"FirstName": rng.choice(FIRST_NAMES), "LastName": rng.choice(LAST_NAMES), "Title": t,
+             "DepartmentId": rng.choice(department_ids), "Phone": _phone(rng),
+             "Email": f"staff{after + i + 1}@hospital.example.com"} for i, t in enumerate(titles)))
+        staff_ids = ld.new_ids("Staff", "StaffId", after)
+        doctor_ids = staff_ids[:counts["doctors"]]
+        receptionist_ids = staff_ids[counts["doctors"]:]
+        ld.load("UserAccount", INSERTS["UserAccount"], (
+            {"Username": f"{'doctor' if t == 'Doctor' else 'reception'}{sid}", "PasswordHash": password,
+             "RoleId": roles[t], "StaffId": sid} for sid, t in zip(staff_ids, titles)))
+
+        # Rooms
+        rng = _rng(seed, "room")
+        after = ld.max_id("Room", "RoomId")
+
+        def rooms():
+            for i in range(counts["rooms"]):
+                dept = department_ids[i % len(department_ids)]
+                floor = 1 + (i // len(department_ids)) // 20
+                yield {"RoomNumber": f"{floor}{after + i + 1:04d}", "RoomTypeId": rng.choice(room_types),
+                       "HospitalId": dept_hospital[dept], "Floor": str(floor), "DepartmentId": dept}
+        ld.load("Room", INSERTS["Room"], rooms())
+        room_ids = ld.new_ids("Room", "RoomId", after)
+
+        # Patients
+        after = ld.max_id("Patient", "PatientId")
+        ld.load("Patient", patients.INSERT_SQL,
+                gen_patients(_rng(seed, "patient"), counts["patients"], after + 1, dup_rate))
+        patient_ids = ld.new_ids("Patient", "PatientId", after)
+        if not patient_ids:
+            patient_ids = [r[0] for r in ld.lookup("SELECT PatientId FROM Patient ORDER BY PatientId")]
+
+        ld.load("Reservation", INSERTS["Reservation"],
+                gen_reservations(_rng(seed, "reservation"), counts["reservations"], room_ids, patient_ids,
+                                 receptionist_ids, status, start, days, end))
+
+        # Service records -> payments -> ledger
+        after = ld.max_id("ServiceRecord", "ServiceRecordId")
+        payables = []
+        ld.load("ServiceRecord", service_records.INSERT_SQL,
+                gen_records(_rng(seed, "record"), counts["records"], patient_ids, doctor_ids, services_,
+                            programs, start, days, payables))
+        record_ids = ld.new_ids("ServiceRecord", "ServiceRecordId", after)
+        ld.load("Payment", payments.INSERT_SQL,
+                gen_payments(_rng(seed, "payment"), record_ids, payables, payment_types, end))
+
+        t0 = time.perf_counter()
+        n = conn.execute(OPEN_BALANCES_SQL, {"after": after}).rowcount
+        conn.commit()
+        stats.add("ServiceRecordBalance", max(n, 0), 0.0, time.perf_counter() - t0)
+    return stats
+
+def _progress(table, done):
+    print(f"\r  {table}: {done:,} rows", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate and bulk-load deterministic synthetic data")
+    ap.add_argument("--scale", type=float, default=1.0, help="multiplies the base counts (1.0 = 100k patients)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--batch", type=int, default=5000, help="rows per executemany batch / commit")
+    ap.add_argument("--end", type=date.fromisoformat, default=DEFAULT_END, help="last day of generated activity")
+    ap.add_argument("--days", type=int, default=730, help="length of the activity window")
+    ap.add_argument("--dup-rate", type=float, default=0.01, help="share of near-duplicate patients")
+    ap.add_argument("--password", default="1234", help="password of the generated doctorN / receptionN logins")
+    for name in BASE_COUNTS:
+        ap.add_argument(f"--{name}", type=int, default=None, help=f"override count (base {BASE_COUNTS[name]:,})")
+    args = ap.parse_args(argv)
+
+    counts = counts_for(args.scale, {k: getattr(args, k) for k in BASE_COUNTS})
+    print("Generating: " + ", ".join(f"{k}={v:,}" for k, v in counts.items()), file=sys.stderr)
+    stats = generate(counts, seed=args.seed, batch=args.batch, end=args.end, days=args.days,
+                     dup_rate=args.dup_rate, password=args.password, progress=_progress)
+    print(file=sys.stderr)
+    print(stats.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# tools/load_sim.py
+"""
+Multi-user load simulator: scripted desks running the windows' workflows
+through the same service calls, concurrently.
+
+    python -m tools.load_sim [--receptionists 4] [--doctors 8] [--admins 1]
+                             [--duration 60] [--think 1.0] [--processes 1]
+                             [--skip-refresh] [--seed 42]
+                             (--standin PATH [--scale 0.1] | --allow-writes)
+
+  receptionist: type-ahead search, register a patient (duplicate check,
+                insert, patient list refresh), book a room (insert with
+                overlap check, reservation + availability refresh)
+  doctor:       worklist refresh, patient search, add a service record,
+                sometimes edit the newest one (RowVer guarded)
+  admin:        outstanding record search, post a payment, payment +
+                balance list refresh
+
+Desks are threads; --processes spreads them over worker processes (one
+engine / connection pool per process, see MSSQL_POOL_SIZE). Think time
+between steps is exponential with mean --think seconds. The report gives
+throughput, latency percentiles per action, deadlocks / lock timeouts,
+rejected bookings (ReservationConflict), edit conflicts, overpayments and
+double bookings that slipped through the overlap check during the run.
+
+Every desk writes (patients, reservations, service records, payments):
+--standin runs against the SQLite stand-in at PATH (created and filled by
+tools.generate_data at --scale if missing); the configured database is only
+used with --allow-writes.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from tools.bench_queries import percentile, prepare_standin, require_write_target
+from tools.generate_data import CITIES, FIRST_NAMES, LAST_NAMES
+
+DOUBLE_BOOKINGS_SQL = text("""
+    SELECT COUNT(*) AS n
+    FROM Reservation a
+    JOIN Reservation b ON b.RoomId = a.RoomId AND b.ReservationId > a.ReservationId
+    WHERE b.ReservationId > :after
+      AND a.StatusId <> :cancel AND b.StatusId <> :cancel
+      AND NOT (a.EndDate <= b.StartDate OR a.StartDate >= b.EndDate)
+""")
+
+def classify(e: Exception) -> str:
+    """Outcome name of a failed step."""
+    from services.balances import Overpayment
+    from services.base import ConcurrencyConflict
+    from services.reservations import ReservationConflict
+
+    if isinstance(e, ReservationConflict):
+        return "booking_conflict"
+    if isinstance(e, ConcurrencyConflict):
+        return "edit_conflict"
+    if isinstance(e, Overpayment):
+        return "overpayment"
+    if isinstance(e, DBAPIError):
+        msg = str(e.orig).lower() if e.orig else str(e).lower()
+        # SQL Server 1205 deadlock victim; SQLite tek yazıcı kilidi
+        if "deadlock" in msg or "1205" in msg:
+            return "deadlock"
+        if "locked" in msg or "lock request time out" in msg or "1222" in msg:
+            return "lock_timeout"
+    return "error"
+
+class Desk:
+    """One simulated user. samples: (action, ms, outcome)."""
+    def __init__(self, role: str, staff_id: int, n: int, cfg: dict, stop: threading.Event):
+        self.role = role
+        self.staff_id = staff_id
+        self.n = n
+        self.cfg = cfg
+        self.stop = stop
+        self.rng = random.Random(f"{cfg['seed']}:{role}:{n}")
+        self.samples: list[tuple] = []
+        self.errors: Counter = Counter()
+        self._seq = 0
+
+    def step(self, action: str, fn, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+            outcome = "ok"
+        except Exception as e:
+            result = None
+            outcome = classify(e)
+            if outcome == "error":
+                self.errors[f"{action}: {type(e).__name__}: {str(e)[:120]}"] += 1
+        self.samples.append((action, (time.perf_counter() - t0) * 1000, outcome))
+        return result, outcome
+
+    def think(self):
+        mean = self.cfg["think"]
+        if mean > 0:
+            self.stop.wait(self.rng.expovariate(1 / mean))
+
+    def refresh(self, action: str, fn, *args):
+        if not self.cfg["skip_refresh"]:
+            self.step(action, fn, *args)
+
+    def prefix(self) -> str:
+        name = self.rng.choice(FIRST_NAMES if self.rng.random() < 0.5 else LAST_NAMES)
+        return name[:self.rng.randint(2, 4)]
+
+    # ---- receptionist ----
+    def _new_patient(self) -> dict:
+        self._seq += 1
+        gender = self.rng.choice(("Male", "Female"))
+        return {
+            "FirstName": self.rng.choice(FIRST_NAMES), "LastName": self.rng.choice(LAST_NAMES),
+            # masa başına ayrı TCNo bloğu: eşzamanlı kayıtlar çakışmaz
+            "TCNo": str(self.cfg["tc_base"] + self.n * 100_000 + self._seq),
+            "BirthDate": (date(1940, 1, 1) + timedelta(days=self.rng.randrange(365 * 80))).isoformat(),
+            "Gender": gender, "Phone": f"05{self.rng.randint(30, 59)}{self.rng.randint(0, 9_999_999):07d}",
+            "Email": None, "Address": self.rng.choice(CITIES), "IsActive": 1,
+        }
+
+    def receptionist_cycle(self):
+        from services import definitions, duplicates, patients, reservations
+
+        found, _ = self.step("search_patients", patients.search_patients, self.prefix())
+        self.think()
+        if self.rng.random() < 0.4:
+            data = self._new_patient()
+            self.step("find_duplicates", duplicates.find_duplicates, data)
+            self.step("add_patient", patients.add_patient, data)
+            self.refresh("refresh_patients", patients.list_patients)
+            self.think()
+        if not found:
+            return
+        rooms = definitions.list_rooms_for_combo()
+        statuses = definitions.list_statuses()
+        reserved = next((s["StatusId"] for s in statuses if s["StatusName"] == "Reserved"), statuses[0]["StatusId"])
+        start = date.today() + timedelta(days=self.rng.randrange(self.cfg["booking_days"]))
+        data = {"PatientId": self.rng.choice(found)["PatientId"], "RoomId": self.rng.choice(rooms)["RoomId"],
+                "StatusId": reserved, "StartDate": start.isoformat(),
+                "EndDate": (start + timedelta(days=self.rng.randint(1, 7))).isoformat()}
+        self.step("add_reservation", reservations.add_reservation, data, self.staff_id)
+        self.refresh("refresh_reservations", reservations.list_reservations)
+        self.refresh("refresh_availability", reservations.list_availability)
+
+    # ---- doctor ----
+    def doctor_cycle(self):
+        from services import definitions, patients, service_records
+
+        rows, _ = self.step("refresh_worklist", service_records.list_worklist, self.staff_id,
+                            service_records.default_worklist_start(), date.today())
+        self.think()
+        found, _ = self.step("search_patients", patients.search_patients, self.prefix())
+        if found:
+            service = self.rng.choice(definitions.list_services())
+            program = self.rng.choice(definitions.list_programs())
+            covered, payable = service_records.compute_coverage(service["BasePrice"], program["CoverageRate"])
+            self.step("add_record", service_records.add_record, {
+                "PatientId": self.rng.choice(found)["PatientId"], "ServiceId": service["ServiceId"],
+                "ProgramId": program["ProgramId"], "ServiceDate": date.today().isoformat(),
+                "TotalPrice": service["BasePrice"], "StateCoveredAmount": covered, "PatientPayableAmount": payable,
+            }, self.staff_id)
+            self.refresh("refresh_worklist", service_records.list_worklist, self.staff_id,
+                         service_records.default_worklist_start(), date.today())
+        self.think()
+        if rows and self.rng.random() < 0.3:
+            # Fiyat düzeltmesi (listelenen satıra göre, RowVer kontrollü)
+            original = dict(rows[0])
+            rate = next((p["CoverageRate"] for p in definitions.list_programs()
+                         if p["ProgramId"] == original["ProgramId"]), 0)
+            total = round(float(original["TotalPrice"]) + self.rng.choice((-10, 10)), 2)
+            covered, payable = service_records.compute_coverage(total, rate)
+            data = {"PatientId": original["PatientId"], "ServiceId": original["ServiceId"],
+                    "ProgramId": original["ProgramId"], "ServiceDate": str(original["ServiceDate"])[:10],
+                    "TotalPrice": total, "StateCoveredAmount": covered, "PatientPayableAmount": payable}
+            self.step("edit_record", service_records.update_record, original["ServiceRecordId"], data,
+                      self.staff_id, original=original)
+
+    # ---- admin ----
+    def admin_cycle(self):
+        from services import balances, payments, definitions
+
+        records, _ = self.step("search_outstanding", payments.search_outstanding_records, "")
+        self.think()
+        if records:
+            r = self.rng.choice(records[:10])     # herkes listenin başından seçer: yarış olur
+            outstanding = float(r["OutstandingAmount"])
+            amount = round(outstanding if self.rng.random() < 0.7 else outstanding * self.rng.uniform(0.2, 0.8), 2)
+            if amount > 0:
+                types = definitions.list_payment_types()
+                self.step("add_payment", payments.add_payment, {
+                    "ServiceRecordId": r["ServiceRecordId"], "PaymentDate": date.today().isoformat(),
+                    "Amount": amount, "PaymentTypeId": self.rng.choice(types)["PaymentTypeId"], "Payer": "Patient",
+                })
+                self.refresh("refresh_payments", payments.list_payments)
+                self.refresh("refresh_balances", balances.list_by_status, "U")
+        self.think()
+
+    def run(self):
+        cycle = getattr(self, f"{self.role}_cycle")
+        # Masalar aynı anda başlamasın
+        self.stop.wait(self.rng.uniform(0, self.cfg["think"]))
+        while not self.stop.is_set():
+            cycle()
+
+def run_desks(specs: list, cfg: dict) -> tuple:
+    """specs: [(role, staff_id, n)]. Runs in this process; -> (samples, errors)."""
+    stop = threading.Event()
+    desks = [Desk(role, staff_id, n, cfg, stop) for role, staff_id, n in specs]
+    threads = [threading.Thread(target=d.run, name=f"{d.role}-{d.n}", daemon=True) for d in desks]
+    for t in threads:
+        t.start()
+    stop.wait(cfg["duration"])
+    stop.set()
+    for t in threads:
+        t.join()
+    samples, errors = [], Counter()
+    for d in desks:
+        samples.extend(d.samples)
+        errors.update(d.errors)
+    return samples, errors
+
+def _staff_for(role: str) -> list[int]:
+    from services.base import fetch_all
+    rows = fetch_all(text("""
+        SELECT DISTINCT ua.StaffId FROM UserAccount ua JOIN Role r ON r.RoleId = ua.RoleId
+        WHERE r.RoleName = :role AND ua.IsActive = 1 AND ua.StaffId IS NOT NULL
+        ORDER BY ua.StaffId
+    """), {"role": role.capitalize()})
+    return [r["StaffId"] for r in rows]
+
+def report(samples, errors, elapsed: float, double_bookings: int, desks: int) -> str:
+    by_action = defaultdict(list)
+    outcomes = Counter()
+    for action, ms, outcome in samples:
+        by_action[action].append((ms, outcome))
+        outcomes[outcome] += 1
+    lines = [f"{desks} desk(s), {elapsed:.0f}s, {len(samples):,} actions, {len(samples) / elapsed:.1f} actions/s",
+             f"{'action':<22}{'count':>8}{'/s':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'not ok':>8}"]
+    for action, values in sorted(by_action.items()):
+        ms = sorted(v for v, _ in values)
+        bad = sum(1 for _, o in values if o != "ok")
+        lines.append(f"{action:<22}{len(ms):>8,}{len(ms) / elapsed:>8.1f}{percentile(ms, 50):>10.1f}"
+                     f"{percentile(ms, 95):>10.1f}{percentile(ms, 99):>10.1f}{bad:>8,}")
+    lines.append("")
+    lines.append("outcomes: " + ", ".join(f"{k}={v:,}" for k, v in sorted(outcomes.items())))
+    lines.append(f"deadlocks={outcomes['deadlock']}, lock timeouts={outcomes['lock_timeout']}, "
+                 f"rejected bookings={outcomes['booking_conflict']}, double bookings={double_bookings}, "
+                 f"edit conflicts={outcomes['edit_conflict']}, overpayments={outcomes['overpayment']}")
+    for msg, n in errors.most_common(10):
+        lines.append(f"  {n}x {msg}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Multi-user workflow load simulator")
+    ap.add_argument("--receptionists", type=int, default=4)
+    ap.add_argument("--doctors", type=int, default=8)
+    ap.add_argument("--admins", type=int, default=1)
+    ap.add_argument("--duration", type=float, default=60, help="seconds")
+    ap.add_argument("--think", type=float, default=1.0, help="mean think time between steps (seconds)")
+    ap.add_argument("--processes", type=int, default=1, help="spread the desks over this many processes")
+    ap.add_argument("--skip-refresh", action="store_true", help="leave out the full list refreshes after writes")
+    ap.add_argument("--booking-days", type=int, default=60, help="bookings start within this many days")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--standin", help="SQLite stand-in path (created and filled if missing)")
+    ap.add_argument("--scale", type=float, default=0.1, help="generate_data scale for a new --standin")
+    ap.add_argument("--allow-writes", action="store_true", help="run against the configured database")
+    args = ap.parse_args(argv)
+    require_write_target(ap, args, "the simulation")
+    if args.standin:
+        prepare_standin(args.standin, args.scale, args.seed)
+
+    from services.base import fetch_one
+    from services.definitions import cancel_status_id
+
+    specs = []
+    for role, count in (("receptionist", args.receptionists), ("doctor", args.doctors), ("admin", args.admins)):
+        staff_ids = _staff_for(role)
+        if count and not staff_ids:
+            ap.error(f"no active {role} login to simulate (see tools.generate_data)")
+        specs += [(role, staff_ids[i % len(staff_ids)], len(specs) + i) for i in range(count)]
+    if not specs:
+        ap.error("no desks")
+
+    before = fetch_one(text("SELECT COALESCE(MAX(ReservationId), 0) AS id FROM Reservation"))["id"]
+    tc = fetch_one(text("SELECT MAX(TCNo) AS tc FROM Patient WHERE TCNo LIKE '4%'"))["tc"]
+    cfg = {"duration": args.duration, "think": args.think, "skip_refresh": args.skip_refresh,
+           "booking_days": args.booking_days, "seed": args.seed,
+           "tc_base": max(int(tc) + 1 if tc and tc.isdigit() else 0, 40_000_000_000)}
+    cfg["tc_base"] += 1_000_000 - cfg["tc_base"] % 1_000_000     # masa blokları hizalı
+
+    print(f"Running {len(specs)} desk(s) for {args.duration:.0f}s ...", file=sys.stderr)
+    started = time.perf_counter()
+    if args.processes > 1:
+        parts = [specs[i::args.processes] for i in range(args.processes)]
+        samples, errors = [], Counter()
+        with ProcessPoolExecutor(args.processes) as pool:
+            for s, e in pool.map(run_desks, [p for p in parts if p], [cfg] * len(parts)):
+                samples.extend(s)
+                errors.update(e)
+    else:
+        samples, errors = run_desks(specs, cfg)
+    elapsed = time.perf_counter() - started
+
+    double = fetch_one(DOUBLE_BOOKINGS_SQL, {"after": before, "cancel": cancel_status_id() or 0})
+    print(report(samples, errors, elapsed, double["n"], len(specs)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+# tools/post_payments.py
+"""
+Posts payments from a bank transfer / POS settlement CSV file.
+
+    python -m tools.post_payments FILE [--format bank|pos] [--payment-type NAME]
+                                       [--delimiter ';'] [--chunk 1000]
+                                       [--exceptions exceptions.csv] [--commit]
+
+Without --commit only matches and validates (dry run). Unmatched / invalid
+lines are written to the exceptions report. Lines posted by an earlier run
+are skipped, so an interrupted or repeated run can post the same file again.
+"""
+import argparse
+import sys
+
+from services.payment_import import FORMATS, post_file
+
+def _progress(report):
+    print(f"\r  {report.lines:,} lines, {report.accepted:,} accepted, {report.posted:,} posted", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Bulk payment posting from settlement files")
+    ap.add_argument("file")
+    ap.add_argument("--format", choices=sorted(FORMATS), default="bank")
+    ap.add_argument("--payment-type", default=None, help="PaymentTypeName (default per format)")
+    ap.add_argument("--delimiter", default=",")
+    ap.add_argument("--encoding", default="utf-8-sig")
+    ap.add_argument("--chunk", type=int, default=1000)
+    ap.add_argument("--exceptions", default=None, help="CSV path for rejected lines")
+    ap.add_argument("--commit", action="store_true", help="insert accepted lines (default: dry run)")
+    args = ap.parse_args(argv)
+
+    report = post_file(args.file, fmt=args.format, payment_type=args.payment_type, commit=args.commit,
+                       chunk_size=args.chunk, delimiter=args.delimiter, encoding=args.encoding,
+                       progress=_progress)
+    print(file=sys.stderr)
+    print(report.summary())
+    if args.exceptions:
+        report.write_exceptions(args.exceptions)
+        print(f"Exceptions written to {args.exceptions}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
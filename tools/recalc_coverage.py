@@ -0,0 +1,45 @@
+# tools/recalc_coverage.py
+"""
+Recalculates ServiceRecord coverage amounts after StateProgram rate changes.
+
+    python -m tools.recalc_coverage [--program ID ...] [--chunk 5000] [--commit] [--yes]
+
+Always runs a dry run first and prints the diff report; --commit then writes
+the changes (asks for confirmation unless --yes).
+"""
+import argparse
+import sys
+
+from services.coverage import recalculate
+
+def _progress(report):
+    print(f"\r  {report.scanned:,} scanned, {report.changed:,} to change", end="", file=sys.stderr, flush=True)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Recalculate ServiceRecord coverage split")
+    ap.add_argument("--program", type=int, action="append", dest="programs",
+                    help="only records of this ProgramId (repeatable)")
+    ap.add_argument("--chunk", type=int, default=5000)
+    ap.add_argument("--samples", type=int, default=20)
+    ap.add_argument("--commit", action="store_true", help="write the changes after the dry run")
+    ap.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+    args = ap.parse_args(argv)
+
+    dry = recalculate(args.programs, commit=False, chunk_size=args.chunk,
+                      sample_limit=args.samples, progress=_progress)
+    print(file=sys.stderr)
+    print(dry.summary())
+
+    if not args.commit or not dry.changed:
+        return 0
+    if not args.yes and input(f"Write {dry.changed} changed records? [y/N] ").strip().lower() != "y":
+        return 1
+
+    done = recalculate(args.programs, commit=True, chunk_size=args.chunk,
+                       sample_limit=0, progress=_progress)
+    print(file=sys.stderr)
+    print(done.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+# tools/refresh_rollups.py
+"""
+Folds ServiceRecord / Payment changes into the revenue rollup tables.
+
+    python -m tools.refresh_rollups [--report month|day] [--by Department|StateProgram|PaymentType]
+                                    [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+
+Incremental (only days changed since the last run); safe to schedule every
+few minutes. The first run builds the rollups from scratch.
+"""
+import argparse
+import sys
+
+from services import rollups
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Refresh revenue rollups")
+    ap.add_argument("--report", choices=tuple(rollups.GRAINS), help="print a report after refreshing")
+    ap.add_argument("--by", choices=rollups.DIMENSIONS, default="Department")
+    ap.add_argument("--from", dest="start")
+    ap.add_argument("--to", dest="end")
+    args = ap.parse_args(argv)
+
+    print(rollups.refresh_summary(rollups.refresh()))
+
+    if args.report:
+        rows = rollups.report(args.report, args.by, args.start, args.end)
+        cols = rollups.REPORT_COLUMNS[args.by]
+        print("\t".join(cols))
+        for r in rows:
+            print("\t".join(str(r[c]) for c in cols))
+        tot = rollups.totals(rows)
+        print("TOTAL\t\t" + "\t".join(str(tot.get(c, "")) for c in cols[2:]))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
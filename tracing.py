@@ -0,0 +1,470 @@
+# tracing.py
+"""
+Per-action tracing, written locally as OpenTelemetry (OTLP/JSON) lines.
+
+    HOSPITAL_TRACE=1      on (off by default: no wrappers, no listeners)
+    HOSPITAL_TRACE_DIR    output directory (default ~/.hospital/traces)
+
+One trace per user action, e.g. Add Reservation:
+
+    ui.click ReceptionistWindow / Add Reservation [btn_r_add]   role, staff_id, paint_ms
+      ui.load ReceptionistWindow._load_rooms_for_combo
+        service definitions.list_rooms_for_combo                 hospital.rows
+          db SELECT                                              db.statement, db.rowcount
+      ui.dialog ReservationDialog                                (includes the user's time)
+        ui.click ReservationDialog / Save
+          ui.validate ReservationDialog._validate
+      service reservations.add_reservation                       hospital.writes
+        db SELECT / db INSERT
+      ui.refresh ReceptionistWindow.refresh_reservations
+        service reservations.list_reservations
+        ui.render ReceptionistWindow._render_reservations        hospital.rows
+
+Spans of a trace are held until its root ends and then queued for a
+background writer, which appends one OTLP ExportTraceServiceRequest per
+batch to <host>-<yyyymmdd>.jsonl (the OpenTelemetry Collector's
+otlpjsonfile receiver reads these). The UI thread only enqueues; when the
+writer falls behind, spans are dropped and counted instead of waiting.
+
+    python -m tracing [FILES...]   slowest actions with time per phase
+"""
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import os
+import queue
+import re
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+
+TRACE_DIR = Path(os.getenv("HOSPITAL_TRACE_DIR", Path.home() / ".hospital" / "traces"))
+SERVICE_NAME = "hospital-desk"
+SCOPE_NAME = "hospital"
+QUEUE_TRACES = 2000       # bekleyen trace sayısı; dolarsa yeni spanler atılır
+BATCH_SPANS = 512
+FLUSH_SECONDS = 1.0
+STATEMENT_CHARS = 1000
+
+_KINDS = {"internal": 1, "client": 3}
+
+_current: contextvars.ContextVar = contextvars.ContextVar("hospital_span", default=None)
+_session: dict = {}
+_lock = threading.Lock()
+
+def enabled() -> bool:
+    return os.getenv("HOSPITAL_TRACE", "").strip().lower() not in ("", "0", "off")
+
+def set_session(session: dict | None):
+    """Role / staff / user of the logged-in desk, added to every action (root span)."""
+    global _session
+    session = session or {}
+    attrs = {"enduser.id": session.get("user_id"), "enduser.role": session.get("role_name"),
+             "hospital.staff_id": session.get("staff_id")}
+    _session = {k: v for k, v in attrs.items() if v is not None}
+
+def current_span():
+    return _current.get()
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "root", "attributes",
+                 "start_ns", "end_ns", "error", "_pending")
+
+    def __init__(self, name: str, kind: str = "internal", attributes: dict | None = None, parent=None):
+        self.name = name
+        self.kind = kind
+        self.root = parent.root if parent is not None else self
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.parent_id = parent.span_id if parent is not None else ""
+        self.span_id = os.urandom(8).hex()
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self._pending = [] if parent is None else None
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+
+    def record_error(self, e: BaseException):
+        self.error = f"{type(e).__name__}: {e}"[:300]
+
+    def end(self, drop: bool = False):
+        """Root: exports the whole trace (or drops it). Child: waits for its root."""
+        self.end_ns = time.time_ns()
+        root = self.root
+        with _lock:
+            if root is not self and root._pending is not None:
+                root._pending.append(self)
+                return
+            if root is self:
+                spans, self._pending = self._pending + [self], None
+                for k, v in _session.items():
+                    self.attributes.setdefault(k, v)
+            else:
+                # kök çoktan bitti (örn. arka plan thread'i): tek başına gönder
+                spans = [self]
+        if not drop:
+            exporter().export(spans)
+
+    def to_otlp(self) -> dict:
+        out = {"traceId": self.trace_id, "spanId": self.span_id, "name": self.name, "kind": _KINDS[self.kind],
+               "startTimeUnixNano": str(self.start_ns), "endTimeUnixNano": str(self.end_ns),
+               "attributes": _otlp_attributes(self.attributes)}
+        if self.parent_id:
+            out["parentSpanId"] = self.parent_id
+        if self.error:
+            out["status"] = {"code": 2, "message": self.error}
+        return out
+
+def _otlp_value(v) -> dict:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}    # OTLP/JSON: int64 metin olarak
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+def _otlp_attributes(attrs: dict) -> list:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items() if v is not None]
+
+@contextmanager
+def span(name: str, attributes: dict | None = None, kind: str = "internal"):
+    s = Span(name, kind, attributes, _current.get())
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:
+        s.record_error(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+def _count(value):
+    return len(value) if isinstance(value, (list, tuple)) else None
+
+def _max_positional(fn):
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+def traced(name: str, attributes: dict | None = None, kind: str = "internal", rows_from_arg: int | None = None):
+    """Decorator: fn runs in a span; hospital.rows = len(result) or len(args[rows_from_arg])."""
+    def deco(fn):
+        limit = _max_positional(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if limit is not None:
+                # PyQt *args alan slota clicked(checked) argümanını da verir; asıl metot almaz
+                args = args[:limit]
+            with span(name, attributes, kind) as s:
+                result = fn(*args, **kwargs)
+                rows = _count(args[rows_from_arg]) if rows_from_arg is not None and len(args) > rows_from_arg \
+                    else _count(result)
+                if rows is not None:
+                    s.attributes["hospital.rows"] = rows
+                return result
+        wrapper._traced = True
+        return wrapper
+    return deco
+
+def trace_operation(name: str, writes: tuple, fn, remote: bool = False):
+    """services.base.operation: span per service call."""
+    attrs = {"hospital.operation": name}
+    if writes:
+        attrs["hospital.writes"] = ",".join(writes)
+    return traced(f"service {name}", attrs, "client" if remote else "internal")(fn)
+
+# ---------------- exporter ----------------
+
+class JsonlExporter:
+    """Background writer: OTLP/JSON, one ExportTraceServiceRequest per line."""
+    def __init__(self, directory: Path = TRACE_DIR):
+        self.directory = Path(directory)
+        self.queue: queue.Queue = queue.Queue(QUEUE_TRACES)
+        self.dropped = 0
+        self.host = socket.gethostname()
+        self.resource = _otlp_attributes({"service.name": SERVICE_NAME, "host.name": self.host,
+                                          "process.pid": os.getpid()})
+        self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: list):
+        try:
+            self.queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += len(spans)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            spans, stop = list(item), False
+            deadline = time.monotonic() + FLUSH_SECONDS
+            while len(spans) < BATCH_SPANS:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                spans += item
+            self._write(spans)
+            if stop:
+                return
+
+    def _write(self, spans: list):
+        line = {"resourceSpans": [{"resource": {"attributes": self.resource},
+                                   "scopeSpans": [{"scope": {"name": SCOPE_NAME},
+                                                   "spans": [s.to_otlp() for s in spans]}]}]}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self.directory / f"{self.host}-{date.today():%Y%m%d}.jsonl", "a", encoding="utf-8") as f:
+                f.write(json.dumps(line, separators=(",", ":")) + "\n")
+        except OSError as e:
+            self.dropped += len(spans)
+            print(f"traces not written: {e}", file=sys.stderr)
+
+    def close(self, timeout: float = 2.0):
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+        if self.dropped:
+            print(f"tracing: {self.dropped} span(s) dropped", file=sys.stderr)
+
+@functools.lru_cache(maxsize=None)
+def exporter() -> JsonlExporter:
+    e = JsonlExporter()
+    atexit.register(e.close)
+    return e
+
+# ---------------- instrumentation ----------------
+
+def _instrument_db():
+    """Child span per statement, only inside a traced action / service call."""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        parent = _current.get()
+        if parent is None:
+            return
+        verb = statement.split(None, 1)[0].upper() if statement.strip() else "SQL"
+        s = Span(f"db {verb}", "client", {"db.system": conn.dialect.name,
+                                          "db.statement": statement[:STATEMENT_CHARS]}, parent)
+        if executemany:
+            s.attributes["db.batch_size"] = len(parameters)
+        conn.info.setdefault("_trace_spans", []).append(s)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        stack = conn.info.get("_trace_spans")
+        if stack:
+            s = stack.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                s.attributes["db.rowcount"] = cursor.rowcount
+            s.end()
+
+    @event.listens_for(Engine, "handle_error")
+    def _error(ctx):
+        stack = ctx.connection.info.get("_trace_spans") if ctx.connection is not None else None
+        if stack:
+            s = stack.pop()
+            s.record_error(ctx.original_exception)
+            s.end()
+
+# metot adı -> UI aşaması
+_UI_PHASES = (
+    (re.compile(r"exec"), "dialog"),
+    (re.compile(r"_validate"), "validate"),
+    (re.compile(r"refresh\w*|load_more|load_older"), "refresh"),
+    (re.compile(r"_render\w*|_show_page"), "render"),
+    (re.compile(r"_load\w*|load_\w+"), "load"),
+)
+
+def _phase(method: str):
+    return next((phase for rx, phase in _UI_PHASES if rx.fullmatch(method)), None)
+
+def instrument_ui():
+    """Wraps the ui.* dialog / validate / refresh / render / load methods in spans (once)."""
+    import importlib
+    from PyQt6.QtWidgets import QDialog
+
+    for path in sorted((Path(__file__).parent / "ui").glob("*.py")):
+        module = importlib.import_module(f"ui.{path.stem}")
+        for cls in list(vars(module).values()):
+            if not inspect.isclass(cls) or cls.__module__ != module.__name__:
+                continue
+            names = [n for n, v in vars(cls).items() if inspect.isfunction(v)]
+            if issubclass(cls, QDialog):
+                names.append("exec")
+            for n in names:
+                phase = _phase(n)
+                fn = getattr(cls, n)
+                if phase is None or getattr(fn, "_traced", False):
+                    continue
+                name = f"ui.dialog {cls.__name__}" if phase == "dialog" else f"ui.{phase} {cls.__name__}.{n}"
+                setattr(cls, n, traced(name, {"ui.phase": phase},
+                                       rows_from_arg=1 if phase == "render" else None)(fn))
+
+class ActionTracer:
+    """
+    notify() hook (profiling.ProfilingApplication): one root span per
+    button click, ended once the paint / layout events after it are done.
+    """
+    def __init__(self):
+        import profiling
+        self._p = profiling
+        self._settling: list[Span] = []
+
+    def _clicked(self, button):
+        s = _current.get()
+        if s is not None and s.name == "ui.event":
+            owner, label = self._p.button_names(button)
+            s.name = f"ui.click {owner} / {label}"
+            s.attributes.update({"ui.owner": owner, "ui.action": label})
+
+    def dispatch(self, notify, receiver, event):
+        p = self._p
+        if self._settling and event.type() in p.RENDER_EVENTS:
+            t0 = time.perf_counter()
+            try:
+                return notify(receiver, event)
+            finally:
+                s = self._settling[-1]
+                s.attributes["ui.paint_ms"] = round(s.attributes.get("ui.paint_ms", 0)
+                                                    + (time.perf_counter() - t0) * 1000, 3)
+
+        if not (receiver.isWidgetType() and receiver.isEnabled() and p.is_click(receiver, event)):
+            return notify(receiver, event)
+
+        p.watch_buttons(receiver, "_tracing_watch", self._clicked)
+        s = Span("ui.event", "internal", None, _current.get())
+        token = _current.set(s)
+        try:
+            return notify(receiver, event)
+        except BaseException as e:
+            s.record_error(e)
+            raise
+        finally:
+            _current.reset(token)
+            if s.root is not s:
+                s.end()
+            elif s.name == "ui.event" and not s._pending:
+                # tıklama olmadı, iş de yapılmadı (örn. boş alanda Enter)
+                s.end(drop=True)
+            else:
+                from PyQt6.QtCore import QTimer
+                self._settling.append(s)
+                QTimer.singleShot(0, lambda: self._settle(s))
+
+    def _settle(self, s: Span):
+        if s in self._settling:
+            self._settling.remove(s)
+        s.end()
+
+if enabled():
+    _instrument_db()
+
+# ---------------- report ----------------
+
+def read_spans(paths) -> list[dict]:
+    spans = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                for rs in json.loads(line).get("resourceSpans", []):
+                    resource = {a["key"]: next(iter(a["value"].values())) for a in rs["resource"]["attributes"]}
+                    for ss in rs.get("scopeSpans", []):
+                        for sp in ss.get("spans", []):
+                            sp["_host"] = resource.get("host.name")
+                            sp["_attrs"] = {a["key"]: next(iter(a["value"].values())) for a in sp["attributes"]}
+                            spans.append(sp)
+    return spans
+
+def _ms(sp) -> float:
+    return (int(sp["endTimeUnixNano"]) - int(sp["startTimeUnixNano"])) / 1e6
+
+def summarize(spans: list[dict]) -> list[dict]:
+    """
+    Per action (root ui.click name): n, p50 / p95 / max busy ms, mean ms per
+    phase, mean queries. Busy time excludes the time dialogs waited for the
+    user; phases are inclusive (db is also in service) and prefetch loaders
+    run in parallel, so they need not add up to it.
+    """
+    children: dict[str, list] = {}
+    for sp in spans:
+        if sp.get("parentSpanId"):
+            children.setdefault(sp["parentSpanId"], []).append(sp)
+
+    def walk(sp):
+        for c in children.get(sp["spanId"], []):
+            yield c
+            yield from walk(c)
+
+    groups: dict[str, list] = {}
+    for root in (sp for sp in spans if not sp.get("parentSpanId") and sp["name"].startswith("ui.click ")):
+        phases = {"load": 0.0, "refresh": 0.0, "render": 0.0, "service": 0.0, "db": 0.0}
+        wait, queries = 0.0, 0
+        for sp in walk(root):
+            kind = sp["name"].split(None, 1)[0]
+            phase = sp["_attrs"].get("ui.phase")
+            if phase == "dialog":
+                wait += _ms(sp) - sum(_ms(c) for c in children.get(sp["spanId"], []) if c["name"].startswith("ui."))
+            elif phase in phases:
+                phases[phase] += _ms(sp)
+            elif kind == "service":
+                phases["service"] += _ms(sp)
+            elif kind == "db":
+                phases["db"] += _ms(sp)
+                queries += 1
+        groups.setdefault(root["name"], []).append({"busy": _ms(root) - wait, "wait": wait, "queries": queries,
+                                                    "host": root["_host"], **phases})
+    out = []
+    for name, rows in groups.items():
+        busy = sorted(r["busy"] for r in rows)
+        mean = lambda k: round(sum(r[k] for r in rows) / len(rows), 1)
+        out.append({"action": name.removeprefix("ui.click "), "n": len(rows),
+                    "p50": round(busy[len(busy) // 2], 1), "p95": round(busy[min(len(busy) - 1, int(len(busy) * .95))], 1),
+                    "max": round(busy[-1], 1), "hosts": len({r["host"] for r in rows}),
+                    **{k: mean(k) for k in ("load", "refresh", "render", "service", "db", "queries", "wait")}})
+    return sorted(out, key=lambda r: r["p95"], reverse=True)
+
+def main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Slowest UI actions from the trace files")
+    ap.add_argument("files", nargs="*", type=Path, help=f"JSONL files (default: all in {TRACE_DIR})")
+    ap.add_argument("--top", type=int, default=30)
+    args = ap.parse_args(argv)
+
+    files = args.files or sorted(TRACE_DIR.glob("*.jsonl"))
+    rows = summarize(read_spans(files))
+    if not rows:
+        print("No actions traced.")
+        return 0
+    print(f"{'action':<52}{'n':>5}{'hosts':>6}{'p50':>8}{'p95':>8}{'max':>8}"
+          f"{'load':>8}{'refresh':>8}{'render':>8}{'service':>8}{'db':>8}{'qry':>5}  (ms, mean; busy time)")
+    for r in rows[:args.top]:
+        print(f"{r['action'][:51]:<52}{r['n']:>5}{r['hosts']:>6}{r['p50']:>8.1f}{r['p95']:>8.1f}{r['max']:>8.1f}"
+              f"{r['load']:>8.1f}{r['refresh']:>8.1f}{r['render']:>8.1f}{r['service']:>8.1f}{r['db']:>8.1f}"
+              f"{r['queries']:>5.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,27 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton,
     QTableWidget, QTableWidgetItem, QHBoxLayout, QMessageBox,
-    QTabWidget
+    QTabWidget, QComboBox, QDateEdit
 )
-from PyQt6.QtCore import Qt
-from sqlalchemy import text
-from db import get_engine
+from PyQt6.QtCore import Qt, QDate
+from services import balances, definitions, payments, rollups, schema, staff, users
+from services.base import ConcurrencyConflict, ServiceError
+from services.patients import search_patients
 
 from ui.user_dialog import UserDialog
 from ui.staff_dialog import StaffDialog
 from ui.payment_dialog import PaymentDialog
-from ui.generic_crud import GenericCrudWidget, FieldSpec
+from ui.generic_crud import GenericCrudWidget
+from ui.export_runner import export_source
+from ui import bulk
+from ui.conflict import show_conflict
+from ui.patient_timeline import PatientTimelineWidget
 
-engine = get_engine()
+# Yansıtılan kolon adları yerine gösterilecek etiketler
+DEFINITION_LABELS = {"CoverageRate": "CoverageRate (0.80 = %80)"}
 
 class AdminWindow(QMainWindow):
-    def __init__(self, session, on_logout):
+    def __init__(self, session, on_logout, prefetched=None):
         super().__init__()
         self.session = session
         self.on_logout = on_logout
@@ -39,15 +45,32 @@ class AdminWindow(QMainWindow):
         self.tabs.addTab(self._build_users_tab(), "UserAccount Management")
         self.tabs.addTab(self._build_staff_tab(), "Staff Management")
         self.tabs.addTab(self._build_payments_tab(), "Payments")
+        self.tabs.addTab(self._build_reports_tab(), "Reports")
+        self.tabs.addTab(PatientTimelineWidget(self.search_patient_list), "Patient Timeline")
         self.tabs.addTab(self._build_definitions_tab(), "System Definitions")
         layout.addWidget(self.tabs)
 
         root.setLayout(layout)
         self.setCentralWidget(root)
 
-        self.refresh_users()
-        self.refresh_staff()
-        self.refresh_payments()
+        # Login sırasında prefetch edildiyse tekrar sorgulama
+        prefetched = prefetched or {}
+        if "users" in prefetched:
+            self._render_users(prefetched["users"])
+        else:
+            self.refresh_users()
+        if "staff" in prefetched:
+            self._render_staff(prefetched["staff"])
+        else:
+            self.refresh_staff()
+        if "payments" in prefetched:
+            self._render_payments(prefetched["payments"])
+        else:
+            self.refresh_payments()
+        if "balances" in prefetched:
+            self._render_balances(prefetched["balances"])
+        else:
+            self.refresh_balances()
 
     def _logout(self):
         self.close()
@@ -55,37 +78,16 @@ class AdminWindow(QMainWindow):
 
     # ---------------- Common helpers ----------------
     def load_roles(self):
-        q = text("SELECT RoleId, RoleName FROM Role ORDER BY RoleId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_roles()
 
     def load_departments(self):
-        q = text("SELECT DepartmentId, DepartmentName FROM Department ORDER BY DepartmentId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_departments()
 
     def load_staff_list(self):
-        q = text("""
-            SELECT StaffId,
-                   (FirstName + ' ' + LastName) AS FullName,
-                   Title
-            FROM Staff
-            WHERE IsActive = 1 OR IsActive IS NULL
-            ORDER BY StaffId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
-
-    def load_patient_list(self):
-        q = text("""
-            SELECT PatientId,
-                   (FirstName + ' ' + LastName) AS FullName
-            FROM Patient
-            WHERE IsActive = 1 OR IsActive IS NULL
-            ORDER BY PatientId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return staff.list_active_staff()
+
+    def search_patient_list(self, term):
+        return search_patients(term)
 
     def _to_int_bool(self, s: str) -> int:
         v = (s or "").strip().lower()
@@ -105,34 +107,12 @@ class AdminWindow(QMainWindow):
             return None
         
     def load_payment_types(self):
-        q = text("SELECT PaymentTypeId, PaymentTypeName FROM PaymentType ORDER BY PaymentTypeId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
-
-    def load_service_records_for_payment(self):
-        q = text("""
-            SELECT sr.ServiceRecordId,
-                ('SR#' + CAST(sr.ServiceRecordId AS varchar(20)) + ' | PatientId='
-                    + CAST(sr.PatientId AS varchar(20)) + ' | DoctorId=' + CAST(sr.DoctorId AS varchar(20))
-                    + ' | Payable=' + CAST(sr.PatientPayableAmount AS varchar(50))
-                ) AS Display
-            FROM ServiceRecord sr
-            ORDER BY sr.ServiceRecordId DESC
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_payment_types()
 
     def refresh_payments(self):
-        q = text("""
-            SELECT p.PaymentId, p.ServiceRecordId, CAST(p.PaymentDate AS date) AS PaymentDate,
-                p.Amount, pt.PaymentTypeName, p.Payer
-            FROM Payment p
-            JOIN PaymentType pt ON pt.PaymentTypeId = p.PaymentTypeId
-            ORDER BY p.PaymentId DESC
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
+        self._render_payments(payments.list_payments())
 
+    def _render_payments(self, rows):
         self.tbl_pay.setRowCount(0)
         for r in rows:
             i = self.tbl_pay.rowCount()
@@ -163,38 +143,27 @@ class AdminWindow(QMainWindow):
 
     def add_payment(self):
         payment_types = self.load_payment_types()
-        service_records = self.load_service_records_for_payment()
 
         if not payment_types:
             QMessageBox.warning(self, "Info", "No PaymentType found. Add PaymentType first.")
             return
-        if not service_records:
-            QMessageBox.warning(self, "Info", "No ServiceRecord found. Doctor must create ServiceRecords first.")
-            return
 
-        dlg = PaymentDialog(servicerecords=service_records, payment_types=payment_types, parent=self)
+        dlg = PaymentDialog(search_records=payments.search_outstanding_records, payment_types=payment_types, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            INSERT INTO Payment (ServiceRecordId, PaymentDate, Amount, PaymentTypeId, Payer)
-            VALUES (:sr, :dt, :amt, :pt, :payer)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "sr": data["ServiceRecordId"],
-                    "dt": data["PaymentDate"],
-                    "amt": data["Amount"],
-                    "pt": data["PaymentTypeId"],
-                    "payer": data["Payer"],
-                })
+            payments.add_payment(data)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Not Allowed", str(e))
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
 
         self.refresh_payments()
+        self.refresh_balances()
 
     def delete_payment_hard(self):
         pid = self._selected_payment()
@@ -210,43 +179,40 @@ class AdminWindow(QMainWindow):
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text("DELETE FROM Payment WHERE PaymentId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": pid})
+            payments.delete_payments([pid])
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
 
         self.refresh_payments()
+        self.refresh_balances()
 
-    def load_hospitals(self):
-        q = text("SELECT HospitalId AS id, HospitalName AS name FROM Hospital ORDER BY HospitalId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+    def refresh_balances(self):
+        status = self.cmb_bal_status.currentData()
+        self._render_balances(balances.list_by_status(status))
 
-    def load_departments_fk(self):
-        q = text("SELECT DepartmentId AS id, DepartmentName AS name FROM Department ORDER BY DepartmentId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+    def _render_balances(self, rows):
+        self.tbl_bal.setRowCount(0)
+        for r in rows:
+            i = self.tbl_bal.rowCount()
+            self.tbl_bal.insertRow(i)
 
-    def load_service_categories_fk(self):
-        q = text("SELECT ServiceCategoryId AS id, CategoryName AS name FROM ServiceCategory ORDER BY ServiceCategoryId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
-        
-    def load_roomtypes_fk(self):
-        q = text("SELECT RoomTypeId AS id, TypeName AS name FROM RoomType ORDER BY RoomTypeId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+            def put(col, val, center=False):
+                item = QTableWidgetItem("" if val is None else str(val))
+                if center:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                self.tbl_bal.setItem(i, col, item)
 
-    def load_hospitals_fk(self):
-        q = text("SELECT HospitalId AS id, HospitalName AS name FROM Hospital ORDER BY HospitalId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+            put(0, r["ServiceRecordId"], True)
+            put(1, r["PatientName"])
+            put(2, str(r["ServiceDate"]))
+            put(3, r["PayableAmount"], True)
+            put(4, r["PaidAmount"], True)
+            put(5, r["OutstandingAmount"], True)
 
+        self.tbl_bal.resizeColumnsToContents()
 
-    # ================= USERS TAB =================
     def _build_users_tab(self):
         w = QWidget()
         layout = QVBoxLayout()
@@ -255,16 +221,19 @@ class AdminWindow(QMainWindow):
         self.btn_u_refresh = QPushButton("Refresh")
         self.btn_u_add = QPushButton("Add User")
         self.btn_u_edit = QPushButton("Edit Selected")
-        self.btn_u_toggle = QPushButton("Toggle Active")
+        self.btn_u_toggle = QPushButton("Toggle Active (Selected)")
         self.btn_u_delete = QPushButton("Delete (Hard)")
+        self.btn_u_export = QPushButton("Export...")
 
         self.btn_u_refresh.clicked.connect(self.refresh_users)
         self.btn_u_add.clicked.connect(self.add_user)
         self.btn_u_edit.clicked.connect(self.edit_user)
         self.btn_u_toggle.clicked.connect(self.toggle_user_active)
         self.btn_u_delete.clicked.connect(self.delete_user_hard)
+        self.btn_u_export.clicked.connect(lambda: export_source(self, "users"))
 
-        for b in [self.btn_u_refresh, self.btn_u_add, self.btn_u_edit, self.btn_u_toggle, self.btn_u_delete]:
+        for b in [self.btn_u_refresh, self.btn_u_add, self.btn_u_edit, self.btn_u_toggle, self.btn_u_delete,
+                  self.btn_u_export]:
             btns.addWidget(b)
         btns.addStretch(1)
         note_lbl = QLabel("Not: 'Toggle Active' önerilen. Hard delete FK yüzünden hata verebilir.")
@@ -286,16 +255,9 @@ class AdminWindow(QMainWindow):
         return w
 
     def refresh_users(self):
-        q = text("""
-            SELECT ua.UserId, ua.Username, ua.RoleId, r.RoleName,
-                   ua.StaffId, ua.PatientId, ua.IsActive, ua.PasswordHash
-            FROM UserAccount ua
-            JOIN Role r ON r.RoleId = ua.RoleId
-            ORDER BY ua.UserId
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
+        self._render_users(users.list_users())
 
+    def _render_users(self, rows):
         self.tbl_users.setRowCount(0)
         for r in rows:
             row_idx = self.tbl_users.rowCount()
@@ -315,6 +277,7 @@ class AdminWindow(QMainWindow):
             put(5, r["PatientId"], True)
             put(6, 1 if r["IsActive"] else 0, True)
             put(7, r["PasswordHash"])
+            self.tbl_users.item(row_idx, 0).setData(Qt.ItemDataRole.UserRole, dict(r))
 
         self.tbl_users.resizeColumnsToContents()
 
@@ -338,28 +301,19 @@ class AdminWindow(QMainWindow):
             "IsActive": self._to_int_bool(get(6)),
         }
 
+    def _selected_user_ids(self) -> list[int]:
+        return bulk.selected_ids(self.tbl_users)
+
     def add_user(self):
         staff_list = self.load_staff_list()
-        patient_list = self.load_patient_list()
-        dlg = UserDialog(mode="add", roles=self.roles, staff_list=staff_list, patient_list=patient_list, parent=self)
+        dlg = UserDialog(mode="add", roles=self.roles, staff_list=staff_list,
+                         search_patients=self.search_patient_list, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            INSERT INTO UserAccount (Username, PasswordHash, RoleId, StaffId, PatientId, IsActive)
-            VALUES (:u, :p, :rid, :sid, :pid, :act)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "u": data["Username"],
-                    "p": data["Password"],
-                    "rid": data["RoleId"],
-                    "sid": data["StaffId"],
-                    "pid": data["PatientId"],
-                    "act": data["IsActive"],
-                })
+            users.add_user(data)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -372,47 +326,21 @@ class AdminWindow(QMainWindow):
             QMessageBox.information(self, "Info", "Select a user row first.")
             return
 
+        original = bulk.selected_row_data(self.tbl_users)
         staff_list = self.load_staff_list()
-        patient_list = self.load_patient_list()
-        dlg = UserDialog(mode="edit", roles=self.roles, staff_list=staff_list, patient_list=patient_list,
-                         initial=selected, parent=self)
+        dlg = UserDialog(mode="edit", roles=self.roles, staff_list=staff_list,
+                         search_patients=self.search_patient_list, initial=selected, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        if data["Password"]:
-            q = text("""
-                UPDATE UserAccount
-                SET Username=:u, PasswordHash=:p, RoleId=:rid, StaffId=:sid, PatientId=:pid, IsActive=:act
-                WHERE UserId=:id
-            """)
-            params = {
-                "id": selected["UserId"],
-                "u": data["Username"],
-                "p": data["Password"],
-                "rid": data["RoleId"],
-                "sid": data["StaffId"],
-                "pid": data["PatientId"],
-                "act": data["IsActive"],
-            }
-        else:
-            q = text("""
-                UPDATE UserAccount
-                SET Username=:u, RoleId=:rid, StaffId=:sid, PatientId=:pid, IsActive=:act
-                WHERE UserId=:id
-            """)
-            params = {
-                "id": selected["UserId"],
-                "u": data["Username"],
-                "rid": data["RoleId"],
-                "sid": data["StaffId"],
-                "pid": data["PatientId"],
-                "act": data["IsActive"],
-            }
-
+        # Password boşsa mevcut PasswordHash korunur (servis içinde)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, params)
+            users.update_user(selected["UserId"], data, original=original)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh_users()
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
@@ -420,46 +348,43 @@ class AdminWindow(QMainWindow):
         self.refresh_users()
 
     def toggle_user_active(self):
-        selected = self._selected_user()
-        if not selected:
+        ids = self._selected_user_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a user row first.")
             return
 
-        new_val = 0 if selected["IsActive"] == 1 else 1
-        q = text("UPDATE UserAccount SET IsActive=:a WHERE UserId=:id")
-
+        # Her satır kendi durumunun tersine döner (tek UPDATE)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"a": new_val, "id": selected["UserId"]})
+            result = users.toggle_active(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Toggle failed:\n{e}")
             return
 
         self.refresh_users()
+        bulk.report(self, "Toggle Active", ids, result)
 
     def delete_user_hard(self):
-        selected = self._selected_user()
-        if not selected:
+        ids = self._selected_user_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a user row first.")
             return
 
         ok = QMessageBox.question(
             self, "Confirm Delete",
-            f"Hard delete UserId={selected['UserId']} ?\nFK varsa hata verebilir.",
+            f"Hard delete {bulk.describe(ids, 'UserId')} ?\nFK varsa hata verebilir.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text("DELETE FROM UserAccount WHERE UserId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": selected["UserId"]})
+            result = users.delete_users(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
 
         self.refresh_users()
+        bulk.report(self, "Delete", ids, result)
 
     # ================= STAFF TAB =================
     def _build_staff_tab(self):
@@ -470,16 +395,19 @@ class AdminWindow(QMainWindow):
         self.btn_s_refresh = QPushButton("Refresh")
         self.btn_s_add = QPushButton("Add Staff")
         self.btn_s_edit = QPushButton("Edit Selected")
-        self.btn_s_toggle = QPushButton("Toggle Active")
+        self.btn_s_toggle = QPushButton("Toggle Active (Selected)")
         self.btn_s_delete = QPushButton("Delete (Hard)")
+        self.btn_s_export = QPushButton("Export...")
 
         self.btn_s_refresh.clicked.connect(self.refresh_staff)
         self.btn_s_add.clicked.connect(self.add_staff)
         self.btn_s_edit.clicked.connect(self.edit_staff)
         self.btn_s_toggle.clicked.connect(self.toggle_staff_active)
         self.btn_s_delete.clicked.connect(self.delete_staff_hard)
+        self.btn_s_export.clicked.connect(lambda: export_source(self, "staff"))
 
-        for b in [self.btn_s_refresh, self.btn_s_add, self.btn_s_edit, self.btn_s_toggle, self.btn_s_delete]:
+        for b in [self.btn_s_refresh, self.btn_s_add, self.btn_s_edit, self.btn_s_toggle, self.btn_s_delete,
+                  self.btn_s_export]:
             btns.addWidget(b)
         btns.addStretch(1)
         btns.addWidget(QLabel("Not: Staff silmek FK (UserAccount/Reservation/...) yüzünden hata verebilir."))
@@ -499,14 +427,9 @@ class AdminWindow(QMainWindow):
         return w
 
     def refresh_staff(self):
-        q = text("""
-            SELECT StaffId, FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive
-            FROM Staff
-            ORDER BY StaffId
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
+        self._render_staff(staff.list_staff())
 
+    def _render_staff(self, rows):
         self.tbl_staff.setRowCount(0)
         for r in rows:
             row_idx = self.tbl_staff.rowCount()
@@ -526,6 +449,7 @@ class AdminWindow(QMainWindow):
             put(5, r["Phone"])
             put(6, r["Email"])
             put(7, 1 if r["IsActive"] else 0, True)
+            self.tbl_staff.item(row_idx, 0).setData(Qt.ItemDataRole.UserRole, dict(r))
 
         self.tbl_staff.resizeColumnsToContents()
 
@@ -550,6 +474,9 @@ class AdminWindow(QMainWindow):
             "IsActive": self._to_int_bool(get(7)),
         }
 
+    def _selected_staff_ids(self) -> list[int]:
+        return bulk.selected_ids(self.tbl_staff)
+
     def add_staff(self):
         departments = self.load_departments()
         dlg = StaffDialog(departments=departments, initial=None, parent=self)
@@ -557,21 +484,8 @@ class AdminWindow(QMainWindow):
             return
         data = dlg.get_data()
 
-        q = text("""
-            INSERT INTO Staff (FirstName, LastName, Title, DepartmentId, Phone, Email, IsActive)
-            VALUES (:fn, :ln, :t, :did, :ph, :em, :act)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "fn": data["FirstName"],
-                    "ln": data["LastName"],
-                    "t": data["Title"],
-                    "did": data["DepartmentId"],
-                    "ph": data["Phone"],
-                    "em": data["Email"],
-                    "act": data["IsActive"],
-                })
+            staff.add_staff(data)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -584,29 +498,19 @@ class AdminWindow(QMainWindow):
             QMessageBox.information(self, "Info", "Select a staff row first.")
             return
 
+        original = bulk.selected_row_data(self.tbl_staff)
         departments = self.load_departments()
         dlg = StaffDialog(departments=departments, initial=selected, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            UPDATE Staff
-            SET FirstName=:fn, LastName=:ln, Title=:t, DepartmentId=:did, Phone=:ph, Email=:em, IsActive=:act
-            WHERE StaffId=:id
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "id": selected["StaffId"],
-                    "fn": data["FirstName"],
-                    "ln": data["LastName"],
-                    "t": data["Title"],
-                    "did": data["DepartmentId"],
-                    "ph": data["Phone"],
-                    "em": data["Email"],
-                    "act": data["IsActive"],
-                })
+            staff.update_staff(selected["StaffId"], data, original=original)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh_staff()
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
@@ -614,46 +518,42 @@ class AdminWindow(QMainWindow):
         self.refresh_staff()
 
     def toggle_staff_active(self):
-        selected = self._selected_staff()
-        if not selected:
+        ids = self._selected_staff_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a staff row first.")
             return
 
-        new_val = 0 if selected["IsActive"] == 1 else 1
-        q = text("UPDATE Staff SET IsActive=:a WHERE StaffId=:id")
-
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"a": new_val, "id": selected["StaffId"]})
+            result = staff.toggle_active(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Toggle failed:\n{e}")
             return
 
         self.refresh_staff()
+        bulk.report(self, "Toggle Active", ids, result)
 
     def delete_staff_hard(self):
-        selected = self._selected_staff()
-        if not selected:
+        ids = self._selected_staff_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a staff row first.")
             return
 
         ok = QMessageBox.question(
             self, "Confirm Delete",
-            f"Hard delete StaffId={selected['StaffId']} ?\nUserAccount/Reservation/ServiceRecord FK varsa hata verebilir.",
+            f"Hard delete {bulk.describe(ids, 'StaffId')} ?\nUserAccount/Reservation/ServiceRecord FK varsa hata verebilir.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text("DELETE FROM Staff WHERE StaffId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": selected["StaffId"]})
+            result = staff.delete_staff(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
 
         self.refresh_staff()
+        bulk.report(self, "Delete", ids, result)
 
     # ================= PAYMENT TAB =================
 
@@ -665,14 +565,17 @@ class AdminWindow(QMainWindow):
         self.btn_pay_refresh = QPushButton("Refresh")
         self.btn_pay_add = QPushButton("Add Payment")
         self.btn_pay_delete = QPushButton("Delete (Hard)")
+        self.btn_pay_export = QPushButton("Export...")
 
         self.btn_pay_refresh.clicked.connect(self.refresh_payments)
         self.btn_pay_add.clicked.connect(self.add_payment)
         self.btn_pay_delete.clicked.connect(self.delete_payment_hard)
+        self.btn_pay_export.clicked.connect(lambda: export_source(self, "payments"))
 
         btns.addWidget(self.btn_pay_refresh)
         btns.addWidget(self.btn_pay_add)
         btns.addWidget(self.btn_pay_delete)
+        btns.addWidget(self.btn_pay_export)
         btns.addStretch(1)
         layout.addLayout(btns)
 
@@ -685,134 +588,170 @@ class AdminWindow(QMainWindow):
         self.tbl_pay.verticalHeader().setVisible(False)
 
         layout.addWidget(self.tbl_pay)
+
+        # Tahsilat kuyruğu: ServiceRecordBalance üzerinden (index'li, aggregate yok)
+        bal_bar = QHBoxLayout()
+        bal_bar.addWidget(QLabel("Balance queue:"))
+        self.cmb_bal_status = QComboBox()
+        for code in ("U", "P", "O"):
+            self.cmb_bal_status.addItem(balances.STATUS_LABELS[code], code)
+        self.cmb_bal_status.currentIndexChanged.connect(self.refresh_balances)
+        bal_bar.addWidget(self.cmb_bal_status)
+        self.btn_bal_refresh = QPushButton("Refresh")
+        self.btn_bal_refresh.clicked.connect(self.refresh_balances)
+        bal_bar.addWidget(self.btn_bal_refresh)
+        self.btn_bal_export = QPushButton("Export...")
+        self.btn_bal_export.clicked.connect(lambda: export_source(
+            self, "balances", {"status": self.cmb_bal_status.currentData()},
+            default_name=f"balances_{self.cmb_bal_status.currentData()}"))
+        bal_bar.addWidget(self.btn_bal_export)
+        bal_bar.addStretch(1)
+        layout.addLayout(bal_bar)
+
+        self.tbl_bal = QTableWidget(0, 6)
+        self.tbl_bal.setHorizontalHeaderLabels([
+            "ServiceRecordId", "Patient", "ServiceDate", "Payable", "Paid", "Outstanding"
+        ])
+        self.tbl_bal.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tbl_bal.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tbl_bal.verticalHeader().setVisible(False)
+        layout.addWidget(self.tbl_bal)
+
         w.setLayout(layout)
         return w
 
-    # ================= DEFINITIONS TAB =================
-
-    def _build_definitions_tab(self):
-        from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTabWidget
+    # ================= REPORTS TAB =================
 
+    def _build_reports_tab(self):
         w = QWidget()
         layout = QVBoxLayout()
-        tabs = QTabWidget()
-
-        # Department (needs HospitalId FK)
-        dept_fields = [
-            FieldSpec("DepartmentName", "DepartmentName", "text", True),
-            FieldSpec("Description", "Description", "text", False),
-            FieldSpec("HospitalId", "Hospital", "fk", True, fk_loader=self.load_hospitals),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                table_name="Department",
-                pk_name="DepartmentId",
-                select_columns=["DepartmentId", "DepartmentName", "Description", "HospitalId"],
-                fields=dept_fields,
-                title="Department"
-            ),
-            "Department"
-        )
 
-        # RoomType
-        roomtype_fields = [
-            FieldSpec("TypeName", "TypeName", "text", True),
-            FieldSpec("Description", "Description", "text", False),
-            FieldSpec("DefaultCapacity", "DefaultCapacity", "int", True),
-            FieldSpec("BaseDailyPrice", "BaseDailyPrice", "decimal", True),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                "RoomType", "RoomTypeId",
-                ["RoomTypeId", "TypeName", "Description", "DefaultCapacity", "BaseDailyPrice"],
-                roomtype_fields,
-                "RoomType"
-            ),
-            "RoomType"
-        )
+        bar = QHBoxLayout()
+        self.cmb_rep_grain = QComboBox()
+        self.cmb_rep_grain.addItem("Monthly", "month")
+        self.cmb_rep_grain.addItem("Daily", "day")
+        self.cmb_rep_dim = QComboBox()
+        for dim in rollups.DIMENSIONS:
+            self.cmb_rep_dim.addItem(dim, dim)
+
+        today = QDate.currentDate()
+        self.dt_rep_from = QDateEdit(QDate(today.year(), 1, 1))
+        self.dt_rep_from.setCalendarPopup(True)
+        self.dt_rep_to = QDateEdit(today)
+        self.dt_rep_to.setCalendarPopup(True)
+
+        self.btn_rep_show = QPushButton("Show")
+        self.btn_rep_show.clicked.connect(self.refresh_report)
+        self.btn_rep_update = QPushButton("Update Rollups")
+        self.btn_rep_update.clicked.connect(self.update_rollups)
+
+        bar.addWidget(QLabel("Grain:"))
+        bar.addWidget(self.cmb_rep_grain)
+        bar.addWidget(QLabel("By:"))
+        bar.addWidget(self.cmb_rep_dim)
+        bar.addWidget(QLabel("From:"))
+        bar.addWidget(self.dt_rep_from)
+        bar.addWidget(QLabel("To:"))
+        bar.addWidget(self.dt_rep_to)
+        bar.addWidget(self.btn_rep_show)
+        bar.addWidget(self.btn_rep_update)
+        bar.addStretch(1)
+        layout.addLayout(bar)
+
+        self.tbl_rep = QTableWidget(0, 0)
+        self.tbl_rep.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tbl_rep.verticalHeader().setVisible(False)
+        layout.addWidget(self.tbl_rep)
+
+        self.lbl_rep_totals = QLabel("")
+        self.lbl_rep_status = QLabel("")
+        layout.addWidget(self.lbl_rep_totals)
+        layout.addWidget(self.lbl_rep_status)
 
-        # ServiceCategory
-        cat_fields = [
-            FieldSpec("CategoryName", "CategoryName", "text", True),
-            FieldSpec("Description", "Description", "text", False),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                "ServiceCategory", "ServiceCategoryId",
-                ["ServiceCategoryId", "CategoryName", "Description"],
-                cat_fields,
-                "ServiceCategory"
-            ),
-            "ServiceCategory"
-        )
+        w.setLayout(layout)
+        return w
 
-        # HealthService (needs ServiceCategoryId FK)
-        hs_fields = [
-            FieldSpec("ServiceName", "ServiceName", "text", True),
-            FieldSpec("ServiceCategoryId", "ServiceCategory", "fk", True, fk_loader=self.load_service_categories_fk),
-            FieldSpec("BasePrice", "BasePrice", "decimal", True),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                "HealthService", "ServiceId",
-                ["ServiceId", "ServiceName", "ServiceCategoryId", "BasePrice"],
-                hs_fields,
-                "HealthService"
-            ),
-            "HealthService"
+    def update_rollups(self):
+        result = rollups.refresh()
+        self.lbl_rep_status.setText(rollups.refresh_summary(result))
+        self.refresh_report()
+
+    def refresh_report(self):
+        dim = self.cmb_rep_dim.currentData()
+        rows = rollups.report(
+            self.cmb_rep_grain.currentData(), dim,
+            self.dt_rep_from.date().toString("yyyy-MM-dd"),
+            self.dt_rep_to.date().toString("yyyy-MM-dd"),
         )
+        cols = rollups.REPORT_COLUMNS[dim]
+        self.tbl_rep.setColumnCount(len(cols))
+        self.tbl_rep.setHorizontalHeaderLabels(list(cols))
+        self.tbl_rep.setRowCount(len(rows))
+        for i, r in enumerate(rows):
+            for j, c in enumerate(cols):
+                item = QTableWidgetItem("" if r[c] is None else str(r[c]))
+                if j >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.tbl_rep.setItem(i, j, item)
+        self.tbl_rep.resizeColumnsToContents()
+
+        tot = rollups.totals(rows)
+        self.lbl_rep_totals.setText("TOTAL  " + "  ".join(f"{c}={tot[c]}" for c in cols[2:] if c in tot))
 
-        # StateProgram
-        sp_fields = [
-            FieldSpec("ProgramName", "ProgramName", "text", True),
-            FieldSpec("Description", "Description", "text", False),
-            FieldSpec("CoverageRate", "CoverageRate (0.80 = %80)", "decimal", True),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                "StateProgram", "ProgramId",
-                ["ProgramId", "ProgramName", "Description", "CoverageRate"],
-                sp_fields,
-                "StateProgram"
-            ),
-            "StateProgram"
-        )
+    # ================= DEFINITIONS TAB =================
 
-        # PaymentType
-        pt_fields = [
-            FieldSpec("PaymentTypeName", "PaymentTypeName", "text", True),
-            FieldSpec("Description", "Description", "text", False),
-        ]
-        tabs.addTab(
-            GenericCrudWidget(
-                "PaymentType", "PaymentTypeId",
-                ["PaymentTypeId", "PaymentTypeName", "Description"],
-                pt_fields,
-                "PaymentType"
-            ),
-            "PaymentType"
-        )
+    def _build_definitions_tab(self):
+        from PyQt6.QtWidgets import QWidget, QVBoxLayout, QTabWidget, QLineEdit, QCompleter
 
-        # Rooms
-        room_fields = [
-            FieldSpec("RoomNumber", "RoomNumber", "text", True),
-            FieldSpec("RoomTypeId", "RoomType", "fk", True, fk_loader=self.load_roomtypes_fk),
-            FieldSpec("HospitalId", "Hospital", "fk", True, fk_loader=self.load_hospitals_fk),
-            FieldSpec("Floor", "Floor", "text", True),
-            FieldSpec("IsActive", "IsActive", "bool", True),
-            FieldSpec("DepartmentId", "Department", "fk", True, fk_loader=self.load_departments_fk),
-        ]
-
-        tabs.addTab(
-            GenericCrudWidget(
-                "Room", "RoomId",
-                ["RoomId", "RoomNumber", "RoomTypeId", "HospitalId", "Floor", "IsActive", "DepartmentId"],
-                room_fields,
-                "Room"
-            ),
-            "Room"
-        )
+        w = QWidget()
+        layout = QVBoxLayout()
+
+        # Tanım / lookup tablolarından birini adıyla aç (kolonlar / FK'ler yansıtılan şemadan)
+        top = QHBoxLayout()
+        self.def_table_name = QLineEdit()
+        self.def_table_name.setPlaceholderText("Table name")
+        self.def_table_name.returnPressed.connect(self.open_definition_table)
+        btn_open = QPushButton("Open Table")
+        btn_open.clicked.connect(self.open_definition_table)
+        top.addWidget(self.def_table_name)
+        top.addWidget(btn_open)
+        top.addStretch(1)
+        layout.addLayout(top)
+
+        self.def_tabs = QTabWidget()
+        self.def_tabs.setTabsClosable(True)
+        self.def_tabs.tabCloseRequested.connect(self.def_tabs.removeTab)
+        try:
+            schema.load(definitions.DEFINITION_TABLES)
+            self.def_table_name.setCompleter(QCompleter(definitions.EDITABLE_TABLES))
+        except Exception as e:
+            QMessageBox.critical(self, "DB Error", f"Schema reflection failed:\n{e}")
+        for table in definitions.DEFINITION_TABLES:
+            self._add_definition_tab(table)
 
-        layout.addWidget(tabs)
+        layout.addWidget(self.def_tabs)
         w.setLayout(layout)
-        return w
\ No newline at end of file
+        return w
+
+    def _add_definition_tab(self, table: str):
+        for i in range(self.def_tabs.count()):
+            if self.def_tabs.tabText(i) == table:
+                self.def_tabs.setCurrentIndex(i)
+                return
+        try:
+            widget = GenericCrudWidget(table, labels=DEFINITION_LABELS)
+        except Exception as e:
+            QMessageBox.warning(self, "Open Table", str(e))
+            return
+        self.def_tabs.setCurrentIndex(self.def_tabs.addTab(widget, table))
+
+    def open_definition_table(self):
+        name = self.def_table_name.text().strip()
+        if not name:
+            return
+        tables = {t.lower(): t for t in definitions.EDITABLE_TABLES}
+        if name.lower() not in tables:
+            QMessageBox.warning(self, "Open Table",
+                                f"{name} cannot be edited here.\nAvailable: {', '.join(definitions.EDITABLE_TABLES)}")
+            return
+        self._add_definition_tab(tables[name.lower()])
\ No newline at end of file
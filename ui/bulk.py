@@ -0,0 +1,48 @@
+# ui/bulk.py
+from PyQt6.QtWidgets import QMessageBox
+from PyQt6.QtCore import Qt
+
+MAX_LISTED = 20
+
+def selected_rows(tbl) -> list[int]:
+    """Selected row indexes of a row-selection QTableWidget, top to bottom."""
+    return sorted(ix.row() for ix in tbl.selectionModel().selectedRows())
+
+def selected_ids(tbl, col: int = 0) -> list[int]:
+    out = []
+    for row in selected_rows(tbl):
+        it = tbl.item(row, col)
+        if it and it.text().strip():
+            out.append(int(it.text()))
+    return out
+
+def describe(ids, label: str = "Id") -> str:
+    shown = ", ".join(str(i) for i in ids[:MAX_LISTED])
+    more = f" (+{len(ids) - MAX_LISTED} more)" if len(ids) > MAX_LISTED else ""
+    return f"{len(ids)} row(s): {label}={shown}{more}"
+
+def report(parent, action: str, ids, result: dict):
+    """
+    Shows the outcome of a bulk service call ({done, failed}, see
+    services.base.bulk_execute). Silent when every row succeeded.
+    """
+    failed = result.get("failed") or []
+    if failed:
+        lines = [f"Id={f['id']}: {f['error']}" for f in failed[:MAX_LISTED]]
+        if len(failed) > MAX_LISTED:
+            lines.append(f"... {len(failed) - MAX_LISTED} more")
+        QMessageBox.warning(
+            parent, f"{action}: partly failed",
+            f"{result['done']} of {len(ids)} row(s) done, {len(failed)} failed:\n\n" + "\n".join(lines)
+        )
+    elif result["done"] < len(ids):
+        # Başka bir kullanıcı arada silmiş olabilir
+        QMessageBox.information(
+            parent, action, f"{result['done']} of {len(ids)} row(s) done; the others no longer exist."
+        )
+
+def selected_row_data(tbl):
+    """Row dict stored on column 0 (Qt.UserRole) of the first selected row, or None."""
+    rows = selected_rows(tbl)
+    it = tbl.item(rows[0], 0) if rows else None
+    return it.data(Qt.ItemDataRole.UserRole) if it else None
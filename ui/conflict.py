@@ -0,0 +1,28 @@
+# ui/conflict.py
+from PyQt6.QtWidgets import QMessageBox
+
+from services.base import same_value
+
+def show_conflict(parent, err, mine: dict | None = None):
+    """
+    Reports a ConcurrencyConflict: the server's current values of the row,
+    with the edited value next to the fields that differ. Nothing was saved.
+    """
+    current = getattr(err, "current", None)
+    if not current:
+        QMessageBox.warning(parent, "Edit Conflict", f"{err}\nYour changes were not saved.")
+        return
+    mine = mine or {}
+    lines = []
+    for k, v in current.items():
+        if k == "RowVer":
+            continue
+        line = f"{k}: {'' if v is None else v}"
+        if k in mine and not same_value(v, mine[k]):
+            line += f"    (yours: {'' if mine[k] is None else mine[k]})"
+        lines.append(line)
+    QMessageBox.warning(
+        parent, "Edit Conflict",
+        f"{err}\nYour changes were not saved. Current values on the server:\n\n" + "\n".join(lines)
+        + "\n\nThe list has been refreshed; edit again to apply your changes."
+    )
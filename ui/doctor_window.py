@@ -1,17 +1,20 @@
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QLabel, QPushButton, QHBoxLayout,
-    QTableWidget, QTableWidgetItem, QMessageBox
+    QTableWidget, QTableWidgetItem, QMessageBox, QDateEdit, QLineEdit
 )
-from PyQt6.QtCore import Qt
-from sqlalchemy import text
-from db import get_engine
+from PyQt6.QtCore import Qt, QDate
+from services import definitions, service_records
+from services.base import ConcurrencyConflict
+from services.patients import search_patients
 
 from ui.servicerecord_dialog import ServiceRecordDialog
-
-engine = get_engine()
+from ui.export_runner import export_source
+from ui.patient_timeline import PatientTimelineDialog
+from ui import bulk
+from ui.conflict import show_conflict
 
 class DoctorWindow(QMainWindow):
-    def __init__(self, session, on_logout):
+    def __init__(self, session, on_logout, prefetched=None):
         super().__init__()
         self.session = session
         self.on_logout = on_logout
@@ -35,17 +38,46 @@ class DoctorWindow(QMainWindow):
         self.btn_add = QPushButton("Add ServiceRecord")
         self.btn_edit = QPushButton("Edit Selected")
         self.btn_delete = QPushButton("Delete (Hard)")
+        self.btn_export = QPushButton("Export...")
+        self.btn_timeline = QPushButton("Patient Timeline")
 
         self.btn_refresh.clicked.connect(self.refresh)
         self.btn_add.clicked.connect(self.add_record)
         self.btn_edit.clicked.connect(self.edit_record)
         self.btn_delete.clicked.connect(self.delete_record_hard)
+        self.btn_export.clicked.connect(lambda: export_source(
+            self, "doctor_records", {"doc": self.staff_id}, default_name=f"service_records_{self.staff_id}"))
+        self.btn_timeline.clicked.connect(self.show_timeline)
 
-        for b in [self.btn_refresh, self.btn_add, self.btn_edit, self.btn_delete]:
+        for b in [self.btn_refresh, self.btn_add, self.btn_edit, self.btn_delete, self.btn_export,
+                  self.btn_timeline]:
             btns.addWidget(b)
         btns.addStretch(1)
         layout.addLayout(btns)
 
+        # Varsayılan: son WORKLIST_DAYS gün; eski kayıtlar "Load older" ile
+        filters = QHBoxLayout()
+        today = QDate.currentDate()
+        self.dt_from = QDateEdit(today.addDays(-service_records.WORKLIST_DAYS))
+        self.dt_from.setCalendarPopup(True)
+        self.dt_to = QDateEdit(today)
+        self.dt_to.setCalendarPopup(True)
+        self.txt_patient = QLineEdit()
+        self.txt_patient.setPlaceholderText("Patient name or TCNo")
+        self.txt_patient.returnPressed.connect(self.refresh)
+        self.btn_apply = QPushButton("Apply")
+        self.btn_apply.clicked.connect(self.refresh)
+
+        filters.addWidget(QLabel("From:"))
+        filters.addWidget(self.dt_from)
+        filters.addWidget(QLabel("To:"))
+        filters.addWidget(self.dt_to)
+        filters.addWidget(QLabel("Patient:"))
+        filters.addWidget(self.txt_patient)
+        filters.addWidget(self.btn_apply)
+        filters.addStretch(1)
+        layout.addLayout(filters)
+
         self.tbl = QTableWidget(0, 10)
         self.tbl.setHorizontalHeaderLabels([
             "ServiceRecordId", "PatientId", "Patient", "ServiceId", "Service",
@@ -56,68 +88,77 @@ class DoctorWindow(QMainWindow):
         self.tbl.verticalHeader().setVisible(False)
         layout.addWidget(self.tbl)
 
+        more = QHBoxLayout()
+        self.lbl_count = QLabel("")
+        self.btn_older = QPushButton("Load older")
+        self.btn_older.clicked.connect(self.load_older)
+        more.addWidget(self.lbl_count)
+        more.addStretch(1)
+        more.addWidget(self.btn_older)
+        layout.addLayout(more)
+
+        self._last_key = None       # (ServiceDate, ServiceRecordId) of the last row shown
+        self._past_window = False   # From tarihinden öncesi yükleniyor mu
+
         root.setLayout(layout)
         self.setCentralWidget(root)
 
-        self.refresh()
+        # Login sırasında prefetch edildiyse tekrar sorgulama
+        prefetched = prefetched or {}
+        if "service_records" in prefetched:
+            self._show_page(prefetched["service_records"], append=False)
+        else:
+            self.refresh()
 
     def _logout(self):
         self.close()
         self.on_logout()
 
     # ---- data loaders for dialog ----
-    def _load_patients(self):
-        q = text("""
-            SELECT PatientId, (FirstName + ' ' + LastName) AS FullName
-            FROM Patient
-            WHERE IsActive = 1 OR IsActive IS NULL
-            ORDER BY PatientId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
-
     def _load_services(self):
-        q = text("""
-            SELECT ServiceId, ServiceName, BasePrice
-            FROM HealthService
-            ORDER BY ServiceId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_services()
 
     def _load_programs(self):
-        q = text("""
-            SELECT ProgramId, ProgramName, CoverageRate
-            FROM StateProgram
-            ORDER BY ProgramId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_programs()
 
     # ---- table refresh ----
+    def _fetch(self, before=None):
+        return service_records.list_worklist(
+            self.staff_id,
+            start=None if self._past_window else self.dt_from.date().toString("yyyy-MM-dd"),
+            end=self.dt_to.date().toString("yyyy-MM-dd"),
+            patient=self.txt_patient.text(),
+            before=before,
+        )
+
     def refresh(self):
-        q = text("""
-            SELECT sr.ServiceRecordId,
-                   sr.PatientId,
-                   (p.FirstName + ' ' + p.LastName) AS PatientName,
-                   sr.ServiceId,
-                   hs.ServiceName,
-                   sr.ProgramId,
-                   sp.ProgramName,
-                   CAST(sr.ServiceDate AS date) AS ServiceDate,
-                   sr.TotalPrice,
-                   sr.PatientPayableAmount
-            FROM ServiceRecord sr
-            JOIN Patient p ON p.PatientId = sr.PatientId
-            JOIN HealthService hs ON hs.ServiceId = sr.ServiceId
-            JOIN StateProgram sp ON sp.ProgramId = sr.ProgramId
-            WHERE sr.DoctorId = :doc
-            ORDER BY sr.ServiceRecordId DESC
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q, {"doc": self.staff_id}).mappings().all())
-
-        self.tbl.setRowCount(0)
+        self._past_window = False
+        self._show_page(self._fetch(), append=False)
+
+    def load_older(self):
+        rows = self._fetch(before=self._last_key)
+        if not rows and not self._past_window:
+            # Tarih aralığı bitti: From öncesine devam
+            self._past_window = True
+            rows = self._fetch(before=self._last_key)
+        self._show_page(rows, append=True)
+
+    def _show_page(self, rows, append: bool):
+        self._render(rows, append)
+        if rows:
+            self._last_key = (rows[-1]["ServiceDate"], rows[-1]["ServiceRecordId"])
+        elif not append:
+            self._last_key = None
+        full = len(rows) >= service_records.WORKLIST_PAGE
+        self.btn_older.setEnabled(full or not self._past_window)
+        self.btn_older.setText("Load older" if full or self._past_window
+                               else "Load older (before From date)")
+        scope = "all dates" if self._past_window else f"since {self.dt_from.date().toString('yyyy-MM-dd')}"
+        self.lbl_count.setText(f"{self.tbl.rowCount()} record(s) shown ({scope})")
+
+    def _render(self, rows, append: bool = False):
+        if not append:
+            self.tbl.setRowCount(0)
         for r in rows:
             i = self.tbl.rowCount()
             self.tbl.insertRow(i)
@@ -131,6 +172,7 @@ class DoctorWindow(QMainWindow):
             self._put(i, 7, str(r["ServiceDate"]))
             self._put(i, 8, r["TotalPrice"], True)
             self._put(i, 9, r["PatientPayableAmount"], True)
+            self.tbl.item(i, 0).setData(Qt.ItemDataRole.UserRole, dict(r))
 
         self.tbl.resizeColumnsToContents()
 
@@ -155,12 +197,18 @@ class DoctorWindow(QMainWindow):
             "PatientId": int(get(1)),
             "ServiceId": int(get(3)),
             "ProgramId": int(get(5)),
+            "ServiceDate": get(7),
             "TotalPrice": float(get(8)) if get(8).strip() else 0.0,
         }
 
+    def show_timeline(self):
+        # Seçili kaydın hastası (yoksa boş arama)
+        selected = self._selected()
+        dlg = PatientTimelineDialog(search_patients, selected["PatientId"] if selected else None, parent=self)
+        dlg.exec()
+
     # ---- CRUD ----
     def add_record(self):
-        patients = self._load_patients()
         services = self._load_services()
         programs = self._load_programs()
         
@@ -172,32 +220,13 @@ class DoctorWindow(QMainWindow):
             QMessageBox.warning(self, "Info", "No state programs found. Admin must add StateProgram records first.")
             return
 
-        if not patients:
-            QMessageBox.warning(self, "Info", "No patients found. Receptionist must add patients first.")
-            return
-
-        dlg = ServiceRecordDialog(patients=patients, services=services, programs=programs, parent=self)
+        dlg = ServiceRecordDialog(search_patients=search_patients, services=services, programs=programs, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            INSERT INTO ServiceRecord
-            (PatientId, ServiceId, DoctorId, ProgramId, ServiceDate, TotalPrice, StateCoveredAmount, PatientPayableAmount)
-            VALUES (:pid, :sid, :doc, :prg, :dt, :tot, :cov, :pay)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "pid": data["PatientId"],
-                    "sid": data["ServiceId"],
-                    "doc": self.staff_id,
-                    "prg": data["ProgramId"],
-                    "dt": data["ServiceDate"],
-                    "tot": data["TotalPrice"],
-                    "cov": data["StateCoveredAmount"],
-                    "pay": data["PatientPayableAmount"],
-                })
+            service_records.add_record(data, self.staff_id)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -210,35 +239,22 @@ class DoctorWindow(QMainWindow):
             QMessageBox.information(self, "Info", "Select a service record first.")
             return
 
-        patients = self._load_patients()
+        original = bulk.selected_row_data(self.tbl)
         services = self._load_services()
         programs = self._load_programs()
 
-        dlg = ServiceRecordDialog(patients=patients, services=services, programs=programs, initial=selected, parent=self)
+        dlg = ServiceRecordDialog(search_patients=search_patients, services=services, programs=programs,
+                                  initial=selected, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        # Güvenlik: doktor sadece kendi kaydını güncellesin
-        q = text("""
-            UPDATE ServiceRecord
-            SET PatientId=:pid, ServiceId=:sid, ProgramId=:prg, ServiceDate=:dt,
-                TotalPrice=:tot, StateCoveredAmount=:cov, PatientPayableAmount=:pay
-            WHERE ServiceRecordId=:id AND DoctorId=:doc
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "id": selected["ServiceRecordId"],
-                    "doc": self.staff_id,
-                    "pid": data["PatientId"],
-                    "sid": data["ServiceId"],
-                    "prg": data["ProgramId"],
-                    "dt": data["ServiceDate"],
-                    "tot": data["TotalPrice"],
-                    "cov": data["StateCoveredAmount"],
-                    "pay": data["PatientPayableAmount"],
-                })
+            service_records.update_record(selected["ServiceRecordId"], data, self.staff_id, original=original)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh()
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
@@ -259,10 +275,8 @@ class DoctorWindow(QMainWindow):
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text("DELETE FROM ServiceRecord WHERE ServiceRecordId=:id AND DoctorId=:doc")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": selected["ServiceRecordId"], "doc": self.staff_id})
+            service_records.delete_records([selected["ServiceRecordId"]], self.staff_id)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
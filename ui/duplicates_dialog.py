@@ -0,0 +1,67 @@
+# ui/duplicates_dialog.py
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem
+from PyQt6.QtCore import Qt, QTimer
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="duplicates")
+
+_COLUMNS = ["Cluster", "Score", "PatientId", "FullName", "TCNo", "BirthDate", "Phone", "IsActive"]
+
+class DuplicateClustersDialog(QDialog):
+    """
+    Runs find_clusters() (services.duplicates) on a background thread and
+    lists the groups of likely duplicate patients.
+    """
+    def __init__(self, find_clusters, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Duplicate Patients")
+        self.resize(900, 550)
+
+        layout = QVBoxLayout()
+        self.lbl = QLabel("Scanning patients...")
+        self.tbl = QTableWidget(0, len(_COLUMNS))
+        self.tbl.setHorizontalHeaderLabels(_COLUMNS)
+        self.tbl.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tbl.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tbl.verticalHeader().setVisible(False)
+        layout.addWidget(self.lbl)
+        layout.addWidget(self.tbl)
+        self.setLayout(layout)
+
+        self._future = _executor.submit(find_clusters)
+        self._poll = QTimer(self)
+        self._poll.setInterval(100)
+        self._poll.timeout.connect(self._check)
+        self._poll.start()
+
+    def _check(self):
+        if not self._future.done():
+            return
+        self._poll.stop()
+        try:
+            result = self._future.result()
+        except Exception as e:
+            self.lbl.setText(f"Scan failed: {e}")
+            return
+        self._render(result)
+
+    def _render(self, result):
+        clusters = result["clusters"]
+        self.lbl.setText(
+            f"{len(clusters)} group(s) of likely duplicates among {result['patients']:,} patients "
+            f"({result['pairs']:,} pairs compared in {result['seconds']}s)"
+        )
+        self.tbl.setRowCount(sum(len(c["Patients"]) for c in clusters))
+        i = 0
+        for n, c in enumerate(clusters, start=1):
+            for p in c["Patients"]:
+                values = [n, c["Score"], p["PatientId"], p["FullName"], p["TCNo"], p["BirthDate"],
+                          p["Phone"], 1 if p["IsActive"] else 0]
+                for col, val in enumerate(values):
+                    item = QTableWidgetItem("" if val is None else str(val))
+                    if col in (0, 1, 2, 7):
+                        item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                    self.tbl.setItem(i, col, item)
+                i += 1
+        self.tbl.resizeColumnsToContents()
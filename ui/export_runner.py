@@ -0,0 +1,82 @@
+# ui/export_runner.py
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtWidgets import QFileDialog, QProgressDialog, QMessageBox
+from PyQt6.QtCore import Qt, QTimer
+
+from services import export
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+
+_FILTERS = "CSV (*.csv);;CSV gzip (*.csv.gz);;Parquet (*.parquet)"
+
+class ExportTask:
+    """
+    Runs one export on a background thread with a progress dialog.
+    Cancel stops the stream between batches and removes the partial file.
+    """
+    def __init__(self, parent, run, path: str):
+        self.parent = parent
+        self.path = path
+        self.rows = 0
+        self.cancel = threading.Event()
+
+        self.dlg = QProgressDialog(f"Exporting to {path}...", "Cancel", 0, 0, parent)
+        self.dlg.setWindowTitle("Export")
+        self.dlg.setWindowModality(Qt.WindowModality.WindowModal)
+        self.dlg.setMinimumDuration(0)
+        self.dlg.canceled.connect(self.cancel.set)
+
+        self.future = _executor.submit(run, path, self._progress, self.cancel)
+        self._poll = QTimer(parent)
+        self._poll.setInterval(100)
+        self._poll.timeout.connect(self._check)
+        self._poll.start()
+        self.dlg.show()
+
+    def _progress(self, rows: int):
+        # worker thread: sadece sayaç, UI güncellemesi timer'da
+        self.rows = rows
+
+    def _check(self):
+        if not self.future.done():
+            if not self.cancel.is_set():
+                self.dlg.setLabelText(f"Exporting to {self.path}...\n{self.rows:,} rows")
+            return
+        self._poll.stop()
+        self.dlg.reset()
+        self.parent._export_task = None
+        try:
+            report = self.future.result()
+        except Exception as e:
+            QMessageBox.critical(self.parent, "Export Failed", str(e))
+            return
+        QMessageBox.information(self.parent, "Export", report.summary())
+
+def _ask_path(parent, default_name: str):
+    path, selected = QFileDialog.getSaveFileName(parent, "Export", default_name + ".csv", _FILTERS)
+    if not path:
+        return None
+    if "." not in path.rsplit("/", 1)[-1]:
+        path += {"CSV gzip (*.csv.gz)": ".csv.gz", "Parquet (*.parquet)": ".parquet"}.get(selected, ".csv")
+    return path
+
+def _start(parent, run, default_name: str):
+    if getattr(parent, "_export_task", None) is not None:
+        QMessageBox.information(parent, "Export", "An export is already running.")
+        return
+    path = _ask_path(parent, default_name)
+    if path:
+        # Referans tutulmazsa task (ve timer) GC ile kaybolur
+        parent._export_task = ExportTask(parent, run, path)
+
+def export_source(parent, source: str, params: dict | None = None, default_name: str | None = None):
+    """Export a named grid query (services.export.EXPORTS) chosen by the user to a file."""
+    _start(parent, lambda path, progress, cancel: export.export(
+        source, path, params, progress=progress, cancel=cancel), default_name or source)
+
+def export_table(parent, table: str, pk: str, columns: list[str], default_name: str | None = None):
+    q = export.table_query(table, pk, columns)
+    _start(parent, lambda path, progress, cancel: export.export_query(
+        q, path, progress=progress, cancel=cancel), default_name or table)
@@ -1,36 +1,60 @@
 # ui/generic_crud.py
 from dataclasses import dataclass
+from datetime import date
 from typing import Any, Callable, Optional
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget, QTableWidgetItem,
     QMessageBox, QDialog, QFormLayout, QLineEdit, QSpinBox, QDoubleSpinBox,
-    QComboBox, QCheckBox
+    QComboBox, QCheckBox, QLabel
 )
-from PyQt6.QtCore import Qt
-from sqlalchemy import text
-from db import get_engine
-
-engine = get_engine()
+from PyQt6.QtCore import Qt, QTimer
+from services import definitions, schema
+from ui.export_runner import export_table
+from services.base import ConcurrencyConflict
+from ui import bulk
+from ui.conflict import show_conflict
 
 @dataclass
 class FieldSpec:
     name: str
     label: str
-    kind: str = "text"  # "text" | "int" | "decimal" | "fk" | "bool"
+    kind: str = "text"  # "text" | "int" | "decimal" | "fk" | "bool" | "date"
     required: bool = True
     fk_loader: Optional[Callable[[], list[dict]]] = None   # returns rows with id/name keys
     fk_id_key: str = "id"
     fk_name_key: str = "name"
 
+def fields_from_meta(meta: dict, labels: dict | None = None) -> list[FieldSpec]:
+    """FieldSpecs for the editable columns of services.schema.table_meta()."""
+    labels = labels or {}
+    fields = []
+    for c in meta["columns"]:
+        if c["auto"] or c["computed"] or c["version"] or schema.is_secret(c["name"]):
+            continue
+        required = not c["nullable"] and not c["has_default"] and c["kind"] != "bool"
+        if c["fk"]:
+            target = c["fk"][0]
+            fields.append(FieldSpec(c["name"], labels.get(c["name"], target), "fk", required,
+                                    fk_loader=lambda t=target: definitions.fk_options(t)))
+        else:
+            fields.append(FieldSpec(c["name"], labels.get(c["name"], c["name"]), c["kind"], required))
+    return fields
+
 class EditDialog(QDialog):
-    def __init__(self, title: str, fields: list[FieldSpec], initial: dict | None = None, parent=None):
+    """
+    bulk=True: every field gets a 'Set' checkbox and get_data() returns only
+    the checked fields (same values written to all selected rows).
+    """
+    def __init__(self, title: str, fields: list[FieldSpec], initial: dict | None = None, parent=None,
+                 bulk: bool = False):
         super().__init__(parent)
         self.setWindowTitle(title)
         self.setMinimumWidth(520)
         self.fields = fields
         self.initial = initial or {}
         self.widgets: dict[str, Any] = {}
+        self.set_checks: dict[str, QCheckBox] = {}
 
         layout = QVBoxLayout()
         form = QFormLayout()
@@ -62,6 +86,10 @@ class EditDialog(QDialog):
                     idx = w.findData(int(cur))
                     if idx >= 0:
                         w.setCurrentIndex(idx)
+            elif f.kind == "date":
+                w = QLineEdit()
+                w.setPlaceholderText("YYYY-MM-DD")
+                w.setText("" if self.initial.get(f.name) is None else str(self.initial.get(f.name))[:10])
             elif f.kind == "bool":
                 w = QCheckBox()
                 raw = self.initial.get(f.name, 0)
@@ -72,7 +100,17 @@ class EditDialog(QDialog):
                 w = QLineEdit()
 
             self.widgets[f.name] = w
-            form.addRow(f.label, w)
+            if bulk:
+                chk = QCheckBox("Set")
+                w.setEnabled(False)
+                chk.toggled.connect(w.setEnabled)
+                self.set_checks[f.name] = chk
+                row = QHBoxLayout()
+                row.addWidget(chk)
+                row.addWidget(w, 1)
+                form.addRow(f.label, row)
+            else:
+                form.addRow(f.label, w)
 
         layout.addLayout(form)
 
@@ -87,12 +125,26 @@ class EditDialog(QDialog):
 
         self.setLayout(layout)
 
+    def _checked(self, f: FieldSpec) -> bool:
+        return not self.set_checks or self.set_checks[f.name].isChecked()
+
     def _validate(self):
+        if self.set_checks and not any(c.isChecked() for c in self.set_checks.values()):
+            QMessageBox.warning(self, "Error", "Check at least one field to set.")
+            return
         for f in self.fields:
             w = self.widgets[f.name]
+            if not self._checked(f):
+                continue
+            if f.kind == "date" and w.text().strip():
+                try:
+                    date.fromisoformat(w.text().strip())
+                except ValueError:
+                    QMessageBox.warning(self, "Error", f"{f.label}: use YYYY-MM-DD.")
+                    return
             if not f.required:
                 continue
-            if f.kind == "text":
+            if f.kind in ("text", "date"):
                 if not w.text().strip():
                     QMessageBox.warning(self, "Error", f"{f.label} is required.")
                     return
@@ -105,6 +157,8 @@ class EditDialog(QDialog):
     def get_data(self) -> dict:
         out = {}
         for f in self.fields:
+            if not self._checked(f):
+                continue
             w = self.widgets[f.name]
             if f.kind == "text":
                 out[f.name] = w.text().strip()
@@ -116,6 +170,8 @@ class EditDialog(QDialog):
                 out[f.name] = w.currentData()
             elif f.kind == "bool":
                 out[f.name] = 1 if w.isChecked() else 0
+            elif f.kind == "date":
+                out[f.name] = w.text().strip() or None
             else:
                 out[f.name] = None
         return out
@@ -123,21 +179,43 @@ class EditDialog(QDialog):
 class GenericCrudWidget(QWidget):
     """
     Minimal CRUD:
-      - list
+      - list (server-side sort by header click, per-column filters, paged)
       - add
-      - edit
-      - delete hard
+      - edit (several selected rows: only the checked fields, one UPDATE)
+      - delete hard (all selected rows, one DELETE)
 
     You provide:
-      table_name, pk_name, select_columns, fields (for add/edit)
+      table_name, and optionally pk_name, select_columns, fields (for add/edit);
+      whatever is left out comes from the reflected schema (services.schema).
+
+    Filters: 'abc' prefix match, '12' / ...Id columns equality, '>=100', '<5', '<>x'.
+    Incomplete ('>=') or mistyped filters are left out and shown under the filter row.
     """
-    def __init__(self, table_name: str, pk_name: str, select_columns: list[str], fields: list[FieldSpec], title: str):
+    def __init__(self, table_name: str, pk_name: str | None = None, select_columns: list[str] | None = None,
+                 fields: list[FieldSpec] | None = None, title: str | None = None, labels: dict | None = None):
         super().__init__()
+        self.version_col = None
+        if pk_name is None or select_columns is None or fields is None:
+            meta = schema.table_meta(table_name)
+            if any(c["name"] == "RowVer" for c in meta["columns"]):
+                self.version_col = "RowVer"
+            if not meta["pk"]:
+                raise ValueError(f"{table_name} has no single-column primary key.")
+            pk_name = pk_name or meta["pk"]
+            if select_columns is None:
+                # pk ilk kolon olmalı (_selected_pks)
+                cols = [c["name"] for c in meta["columns"] if not c["version"] and not schema.is_secret(c["name"])]
+                select_columns = [pk_name] + [c for c in cols if c != pk_name]
+            if fields is None:
+                fields = fields_from_meta(meta, labels)
         self.table_name = table_name
         self.pk_name = pk_name
         self.select_columns = select_columns
         self.fields = fields
-        self.title = title
+        self.title = title or table_name
+        self.sort_col = pk_name
+        self.sort_desc = True
+        self._last_row = None
 
         layout = QVBoxLayout()
 
@@ -146,65 +224,142 @@ class GenericCrudWidget(QWidget):
         self.btn_add = QPushButton("Add")
         self.btn_edit = QPushButton("Edit Selected")
         self.btn_delete = QPushButton("Delete (Hard)")
+        self.btn_export = QPushButton("Export...")
 
         self.btn_refresh.clicked.connect(self.refresh)
         self.btn_add.clicked.connect(self.add_row)
         self.btn_edit.clicked.connect(self.edit_row)
         self.btn_delete.clicked.connect(self.delete_row)
+        self.btn_export.clicked.connect(
+            lambda: export_table(self, self.table_name, self.pk_name, self.select_columns))
 
-        for b in [self.btn_refresh, self.btn_add, self.btn_edit, self.btn_delete]:
+        for b in [self.btn_refresh, self.btn_add, self.btn_edit, self.btn_delete, self.btn_export]:
             btns.addWidget(b)
         btns.addStretch(1)
         layout.addLayout(btns)
 
+        # Kolon filtreleri: sunucuda WHERE olarak uygulanır
+        filters = QHBoxLayout()
+        self.filter_edits: dict[str, QLineEdit] = {}
+        for col in select_columns:
+            e = QLineEdit()
+            e.setPlaceholderText(col)
+            e.setClearButtonEnabled(True)
+            e.textChanged.connect(lambda _: self._filter_timer.start())
+            e.returnPressed.connect(self.refresh)
+            self.filter_edits[col] = e
+            filters.addWidget(e)
+        layout.addLayout(filters)
+
+        # filtre / sorgu hataları: yazarken modal pencere açılmasın
+        self.lbl_filter = QLabel()
+        self.lbl_filter.setStyleSheet("color: #b00020;")
+        self.lbl_filter.setWordWrap(True)
+        self.lbl_filter.hide()
+        layout.addWidget(self.lbl_filter)
+
+        self._filter_timer = QTimer(self)
+        self._filter_timer.setSingleShot(True)
+        self._filter_timer.setInterval(400)
+        self._filter_timer.timeout.connect(self.refresh)
+
         self.tbl = QTableWidget(0, len(select_columns))
         self.tbl.setHorizontalHeaderLabels(select_columns)
         self.tbl.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
         self.tbl.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
         self.tbl.verticalHeader().setVisible(False)
+        header = self.tbl.horizontalHeader()
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        header.sectionClicked.connect(self._sort_by)
 
         layout.addWidget(self.tbl)
+
+        self.btn_more = QPushButton(f"Load more ({definitions.ROWS_PAGE})")
+        self.btn_more.clicked.connect(self.load_more)
+        self.btn_more.setEnabled(False)
+        layout.addWidget(self.btn_more)
         self.setLayout(layout)
 
         self.refresh()
 
+    def _sort_by(self, index: int):
+        col = self.select_columns[index]
+        if col == self.sort_col:
+            self.sort_desc = not self.sort_desc
+        else:
+            self.sort_col, self.sort_desc = col, False
+        order = Qt.SortOrder.DescendingOrder if self.sort_desc else Qt.SortOrder.AscendingOrder
+        self.tbl.horizontalHeader().setSortIndicator(index, order)
+        self.refresh()
+
+    def _fetch(self, after=None):
+        filters = {c: e.text() for c, e in self.filter_edits.items() if e.text().strip()}
+        try:
+            problems = definitions.filter_problems(self.table_name, filters)
+            rows = definitions.list_rows(
+                self.table_name, self.pk_name, self.select_columns,
+                sort=self.sort_col, descending=self.sort_desc, filters=filters,
+                after=after, limit=definitions.ROWS_PAGE, version=self.version_col,
+            )
+        except Exception as e:
+            self._show_filter_problems({}, f"Filter / Sort: {e}")
+            return None
+        self._show_filter_problems(problems)
+        return rows
+
+    def _show_filter_problems(self, problems: dict, error: str = ""):
+        for col, e in self.filter_edits.items():
+            e.setStyleSheet("border: 1px solid #b00020;" if col in problems else "")
+            e.setToolTip(problems.get(col, ""))
+        lines = ([error] if error else []) + [f"Ignored filter - {m}" for m in problems.values()]
+        self.lbl_filter.setText("\n".join(lines))
+        self.lbl_filter.setVisible(bool(lines))
+
     def refresh(self):
-        cols = ", ".join(self.select_columns)
-        q = text(f"SELECT {cols} FROM {self.table_name} ORDER BY {self.pk_name} DESC")
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
-
-        self.tbl.setRowCount(0)
-        for r in rows:
-            i = self.tbl.rowCount()
-            self.tbl.insertRow(i)
+        self._filter_timer.stop()
+        rows = self._fetch()
+        if rows is not None:
+            self._render(rows, append=False)
+
+    def load_more(self):
+        if self._last_row is None:
+            return
+        after = (self._last_row[self.sort_col], self._last_row[self.pk_name])
+        rows = self._fetch(after)
+        if rows is not None:
+            self._render(rows, append=True)
+
+    def _render(self, rows, append: bool):
+        if not append:
+            self.tbl.setRowCount(0)
+        start = self.tbl.rowCount()
+        self.tbl.setRowCount(start + len(rows))
+        for i, r in enumerate(rows, start=start):
             for c, colname in enumerate(self.select_columns):
                 val = r.get(colname)
                 item = QTableWidgetItem("" if val is None else str(val))
                 if colname.lower().endswith("id"):
                     item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if c == 0:
+                    # Listelenen satır (tipli değerler + RowVer): edit_row tekrar okumaz
+                    item.setData(Qt.ItemDataRole.UserRole, dict(r))
                 self.tbl.setItem(i, c, item)
+        if rows:
+            self._last_row = rows[-1]
+        elif not append:
+            self._last_row = None
+        self.btn_more.setEnabled(len(rows) == definitions.ROWS_PAGE)
 
         self.tbl.resizeColumnsToContents()
 
     def _selected_pk(self) -> Optional[int]:
-        items = self.tbl.selectedItems()
-        if not items:
-            return None
-        row = items[0].row()
-        # pk is always first column in our config
-        pk_txt = self.tbl.item(row, 0).text()
-        return int(pk_txt) if pk_txt else None
+        pks = self._selected_pks()
+        return pks[0] if pks else None
 
-    def _selected_row_dict(self) -> Optional[dict]:
-        items = self.tbl.selectedItems()
-        if not items:
-            return None
-        row = items[0].row()
-        d = {}
-        for c, colname in enumerate(self.select_columns):
-            d[colname] = self.tbl.item(row, c).text()
-        return d
+    def _selected_pks(self) -> list[int]:
+        # pk is always first column in our config
+        return bulk.selected_ids(self.tbl, 0)
 
     def add_row(self):
         dlg = EditDialog(f"Add - {self.title}", self.fields, initial=None, parent=self)
@@ -212,13 +367,8 @@ class GenericCrudWidget(QWidget):
             return
         data = dlg.get_data()
 
-        cols = ", ".join([f.name for f in self.fields])
-        params = ", ".join([f":{f.name}" for f in self.fields])
-        q = text(f"INSERT INTO {self.table_name} ({cols}) VALUES ({params})")
-
         try:
-            with engine.begin() as conn:
-                conn.execute(q, data)
+            definitions.insert_row(self.table_name, data)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -226,57 +376,67 @@ class GenericCrudWidget(QWidget):
         self.refresh()
 
     def edit_row(self):
-        pk = self._selected_pk()
-        if not pk:
+        pks = self._selected_pks()
+        if not pks:
             QMessageBox.information(self, "Info", "Select a row first.")
             return
-
-        # fetch fresh row from DB (so types are correct)
-        cols = ", ".join(self.select_columns)
-        q0 = text(f"SELECT {cols} FROM {self.table_name} WHERE {self.pk_name}=:id")
-        with engine.connect() as conn:
-            row = conn.execute(q0, {"id": pk}).mappings().first()
-        if not row:
-            QMessageBox.warning(self, "Error", "Row not found.")
+        if len(pks) > 1:
+            self._edit_many(pks)
             return
+        pk = pks[0]
+        row = self.tbl.item(bulk.selected_rows(self.tbl)[0], 0).data(Qt.ItemDataRole.UserRole)
 
-        dlg = EditDialog(f"Edit - {self.title}", self.fields, initial=dict(row), parent=self)
+        dlg = EditDialog(f"Edit - {self.title}", self.fields, initial=row, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        set_clause = ", ".join([f"{f.name}=:{f.name}" for f in self.fields])
-        q = text(f"UPDATE {self.table_name} SET {set_clause} WHERE {self.pk_name}=:id")
-        data["id"] = pk
+        try:
+            definitions.update_row(self.table_name, self.pk_name, pk, data, original=row)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh()
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
+            return
+
+        self.refresh()
+
+    def _edit_many(self, pks: list[int]):
+        dlg = EditDialog(f"Edit {len(pks)} rows - {self.title}", self.fields, initial=None, parent=self,
+                         bulk=True)
+        if dlg.exec() != dlg.DialogCode.Accepted:
+            return
+        data = dlg.get_data()
 
         try:
-            with engine.begin() as conn:
-                conn.execute(q, data)
+            result = definitions.update_many(self.table_name, self.pk_name, pks, data)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
 
         self.refresh()
+        bulk.report(self, "Update", pks, result)
 
     def delete_row(self):
-        pk = self._selected_pk()
-        if not pk:
+        pks = self._selected_pks()
+        if not pks:
             QMessageBox.information(self, "Info", "Select a row first.")
             return
         ok = QMessageBox.question(
             self, "Confirm Delete",
-            f"Hard delete {self.title} (Id={pk}) ?\nFK varsa hata verebilir.",
+            f"Hard delete {self.title} {bulk.describe(pks)} ?\nFK varsa hata verebilir.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text(f"DELETE FROM {self.table_name} WHERE {self.pk_name}=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": pk})
+            result = definitions.delete_rows(self.table_name, self.pk_name, pks)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
 
         self.refresh()
+        bulk.report(self, "Delete", pks, result)
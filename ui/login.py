@@ -2,7 +2,9 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit, QPushButton, QLabel, QMessageBox
 )
+from PyQt6.QtCore import QTimer
 from auth import login
+import prefetch
 
 class LoginWindow(QWidget):
     def __init__(self, on_success):
@@ -23,12 +25,21 @@ class LoginWindow(QWidget):
         self.btn = QPushButton("Login")
         self.btn.clicked.connect(self.handle_login)
 
+        self.lbl_status = QLabel("")
+
         layout.addWidget(QLabel("Please login"))
         layout.addWidget(self.username)
         layout.addWidget(self.password)
         layout.addWidget(self.btn)
+        layout.addWidget(self.lbl_status)
         self.setLayout(layout)
 
+        self._session = None
+        self._job = None
+        self._poll = QTimer(self)
+        self._poll.setInterval(20)
+        self._poll.timeout.connect(self._check_prefetch)
+
     def handle_login(self):
         u = self.username.text().strip()
         p = self.password.text()
@@ -42,4 +53,19 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Error", "Invalid credentials or inactive user.")
             return
 
-        self.on_success(session)
+        # Rol penceresinin ilk verisini arka planda çek; UI donmadan beklenir.
+        self._session = session
+        self._job = prefetch.start(session)
+        self.btn.setEnabled(False)
+        self.lbl_status.setText("Loading...")
+        self._poll.start()
+
+    def _check_prefetch(self):
+        if not self._job.done():
+            return
+        self._poll.stop()
+        prefetched = self._job.result()
+        session, self._session, self._job = self._session, None, None
+        self.btn.setEnabled(True)
+        self.lbl_status.setText("")
+        self.on_success(session, prefetched)
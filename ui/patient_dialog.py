@@ -1,13 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QFormLayout, QLineEdit, QDateEdit,
-    QComboBox, QCheckBox, QPushButton, QHBoxLayout, QMessageBox
+    QComboBox, QCheckBox, QPushButton, QHBoxLayout, QMessageBox, QLabel, QListWidget
 )
-from PyQt6.QtCore import QDate
+from PyQt6.QtCore import QDate, QTimer
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dupcheck")
+
+def _dupe_text(r) -> str:
+    mark = "!" if r.get("Likely") else "?"
+    return f"{mark} {r['PatientId']} - {r['FullName']} | TC {r['TCNo']} | {r['BirthDate']} | {r['Reasons']}"
 
 class PatientDialog(QDialog):
-    def __init__(self, initial=None, parent=None):
+    """
+    find_duplicates(data, exclude_id) -> [{PatientId, FullName, ..., Reasons, Likely}]
+    (services.duplicates.find_duplicates); when given, possible duplicates are
+    listed while typing and a likely duplicate must be confirmed on Save.
+    """
+    def __init__(self, initial=None, parent=None, find_duplicates=None):
         super().__init__(parent)
         self.initial = initial or {}
+        self.find_duplicates = find_duplicates
         self.setWindowTitle("Add Patient" if not initial else "Edit Patient")
         self.setMinimumWidth(450)
 
@@ -42,6 +56,14 @@ class PatientDialog(QDialog):
 
         layout.addLayout(form)
 
+        self.lbl_dupes = QLabel("Possible duplicates:")
+        self.lst_dupes = QListWidget()
+        self.lst_dupes.setMaximumHeight(110)
+        self.lbl_dupes.hide()
+        self.lst_dupes.hide()
+        layout.addWidget(self.lbl_dupes)
+        layout.addWidget(self.lst_dupes)
+
         btns = QHBoxLayout()
         ok = QPushButton("Save")
         cancel = QPushButton("Cancel")
@@ -55,6 +77,62 @@ class PatientDialog(QDialog):
 
         self._load()
 
+        self._future = None
+        self._stale = False
+        if find_duplicates is not None:
+            self._debounce = QTimer(self)
+            self._debounce.setSingleShot(True)
+            self._debounce.setInterval(300)
+            self._debounce.timeout.connect(self._start_check)
+            self._poll = QTimer(self)
+            self._poll.setInterval(20)
+            self._poll.timeout.connect(self._check_result)
+            for w in (self.first, self.last, self.tcno, self.phone):
+                w.textChanged.connect(lambda _: self._debounce.start())
+            self.birth.dateChanged.connect(lambda _: self._debounce.start())
+
+    # ---- duplicate check (arka planda, yazarken) ----
+    def _check_data(self):
+        data = self.get_data()
+        # tek harf ile aramaya gerek yok
+        if len(data["LastName"]) < 2 and len(data["TCNo"]) < 11 and len(data["Phone"]) < 10:
+            return None
+        return data
+
+    def _start_check(self):
+        if self._future is not None:
+            # bitince son değerlerle tekrar
+            self._stale = True
+            return
+        data = self._check_data()
+        if data is None:
+            self._show_dupes([])
+            return
+        self._stale = False
+        self._future = _executor.submit(self.find_duplicates, data, self.initial.get("PatientId"))
+        self._poll.start()
+
+    def _check_result(self):
+        if self._future is None or not self._future.done():
+            return
+        self._poll.stop()
+        fut, self._future = self._future, None
+        if self._stale:
+            self._start_check()
+            return
+        try:
+            self._show_dupes(fut.result())
+        except Exception:
+            # kontrol yardımcı bilgi; hata kaydı engellemesin
+            self._show_dupes([])
+
+    def _show_dupes(self, rows):
+        self.lst_dupes.clear()
+        for r in rows:
+            self.lst_dupes.addItem(_dupe_text(r))
+        self.lbl_dupes.setVisible(bool(rows))
+        self.lst_dupes.setVisible(bool(rows))
+
     def _load(self):
         if not self.initial:
             self.chk_active.setChecked(True)
@@ -96,8 +174,27 @@ class PatientDialog(QDialog):
         if not self.tcno.text().strip():
             QMessageBox.warning(self, "Error", "TCNo is required.")
             return
+        if self.find_duplicates is not None and not self._confirm_not_duplicate():
+            return
         self.accept()
 
+    def _confirm_not_duplicate(self) -> bool:
+        # Kayıt anında son değerlerle senkron kontrol (canlı sonuç eski olabilir)
+        try:
+            likely = [r for r in self.find_duplicates(self.get_data(), self.initial.get("PatientId"))
+                      if r.get("Likely")]
+        except Exception:
+            return True
+        if not likely:
+            return True
+        lines = "\n".join(_dupe_text(r) for r in likely[:5])
+        ok = QMessageBox.question(
+            self, "Possible Duplicate",
+            f"This patient may already be registered:\n\n{lines}\n\nSave anyway?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        return ok == QMessageBox.StandardButton.Yes
+
     def get_data(self):
         return {
             "FirstName": self.first.text().strip(),
@@ -0,0 +1,24 @@
+# ui/patient_picker.py
+from ui.search_picker import SearchPicker
+
+def _patient_text(r) -> str:
+    mark = "~ " if r.get("Fuzzy") else ""
+    return f"{mark}{r['PatientId']} - {r['FullName']} | TC {r['TCNo']} | {r['BirthDate']}"
+
+class PatientPicker(SearchPicker):
+    """
+    Patient type-ahead (name / TCNo prefix / #PatientId) over
+    patients.search_patients. patient_id preselects that patient.
+    """
+    def __init__(self, search_patients, patient_id=None, parent=None):
+        super().__init__(
+            search_patients, _patient_text,
+            placeholder="Name, TCNo or #PatientId",
+            debounce_ms=150,
+            initial_text=f"#{patient_id}" if patient_id else "",
+            parent=parent,
+        )
+
+    def patient_id(self):
+        row = self.selected_row()
+        return int(row["PatientId"]) if row else None
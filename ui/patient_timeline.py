@@ -0,0 +1,108 @@
+# ui/patient_timeline.py
+from PyQt6.QtWidgets import (
+    QWidget, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QMessageBox
+)
+from PyQt6.QtGui import QColor
+from PyQt6.QtCore import Qt
+
+from services import timeline
+from ui.patient_picker import PatientPicker
+
+_COLUMNS = ["Date", "Type", "Id", "Record", "Title", "Detail", "Amount", "Status"]
+
+_COLORS = {
+    "Reservation": QColor("#e8f0fe"),
+    "Service": QColor("#fff8e1"),
+    "Payment": QColor("#e6f4ea"),
+}
+
+class PatientTimelineWidget(QWidget):
+    """
+    One patient's reservations, service records and payments, newest first.
+    The patient is chosen with a PatientPicker; data comes from
+    services.timeline.load_timeline (cached per patient).
+    """
+    def __init__(self, search_patients, patient_id=None, parent=None):
+        super().__init__(parent)
+        self._patient_id = None
+
+        layout = QVBoxLayout()
+
+        self.picker = PatientPicker(search_patients, patient_id=patient_id)
+        self.picker.list.setMinimumHeight(90)
+        self.picker.selectionChanged.connect(self._on_patient)
+        layout.addWidget(self.picker)
+
+        top = QHBoxLayout()
+        self.lbl_summary = QLabel("Select a patient.")
+        self.btn_refresh = QPushButton("Refresh")
+        self.btn_refresh.clicked.connect(self.refresh)
+        top.addWidget(self.lbl_summary)
+        top.addStretch(1)
+        top.addWidget(self.btn_refresh)
+        layout.addLayout(top)
+
+        self.tbl = QTableWidget(0, len(_COLUMNS))
+        self.tbl.setHorizontalHeaderLabels(_COLUMNS)
+        self.tbl.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tbl.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self.tbl.verticalHeader().setVisible(False)
+        layout.addWidget(self.tbl)
+
+        self.setLayout(layout)
+
+    def _on_patient(self, row):
+        pid = int(row["PatientId"]) if row else None
+        if pid != self._patient_id:
+            self._patient_id = pid
+            self._load()
+
+    def refresh(self):
+        # Başka masalardaki değişiklikler bu process'in cache'ini düşürmez
+        if self._patient_id is not None:
+            timeline.invalidate(self._patient_id)
+        self._load()
+
+    def _load(self):
+        if self._patient_id is None:
+            self._render([])
+            self.lbl_summary.setText("Select a patient.")
+            return
+        try:
+            rows = timeline.load_timeline(self._patient_id)
+        except Exception as e:
+            QMessageBox.critical(self, "DB Error", str(e))
+            return
+        self._render(rows)
+        s = timeline.summary(rows)
+        self.lbl_summary.setText(
+            f"{s['Reservations']} reservation(s) | {s['Visits']} service record(s) | "
+            f"Payable {s['Payable']} | Paid {s['Paid']} | Outstanding {s['Outstanding']}"
+        )
+
+    def _render(self, rows):
+        self.tbl.setRowCount(0)
+        self.tbl.setRowCount(len(rows))
+        for i, r in enumerate(rows):
+            values = [r["EventDate"], r["Kind"], r["RefId"], r["ServiceRecordId"],
+                      r["Title"], r["Detail"], r["Amount"], r["Status"]]
+            color = _COLORS.get(r["Kind"])
+            for c, val in enumerate(values):
+                item = QTableWidgetItem("" if val is None else str(val))
+                if c in (2, 3, 6):
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if color is not None:
+                    item.setBackground(color)
+                self.tbl.setItem(i, c, item)
+        self.tbl.resizeColumnsToContents()
+
+class PatientTimelineDialog(QDialog):
+    def __init__(self, search_patients, patient_id=None, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Patient Timeline")
+        self.resize(900, 600)
+        layout = QVBoxLayout()
+        self.timeline = PatientTimelineWidget(search_patients, patient_id=patient_id)
+        layout.addWidget(self.timeline)
+        self.setLayout(layout)
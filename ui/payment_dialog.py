@@ -4,12 +4,18 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QDate
 
+from ui.search_picker import SearchPicker
+
+def _record_text(r) -> str:
+    return (f"SR#{r['ServiceRecordId']} | {r['PatientName']} ({r['TCNo']}) | {r['ServiceDate']}"
+            f" | Payable={r['PayableAmount']} | Outstanding={r['OutstandingAmount']}")
+
 class PaymentDialog(QDialog):
     """
-    servicerecords: [{ServiceRecordId, Display}]
+    search_records(term) -> [{ServiceRecordId, PatientName, TCNo, ServiceDate, PayableAmount, OutstandingAmount}]
     payment_types: [{PaymentTypeId, PaymentTypeName}]
     """
-    def __init__(self, servicerecords, payment_types, parent=None):
+    def __init__(self, search_records, payment_types, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Add Payment")
         self.setMinimumWidth(520)
@@ -17,9 +23,12 @@ class PaymentDialog(QDialog):
         layout = QVBoxLayout()
         form = QFormLayout()
 
-        self.cmb_sr = QComboBox()
-        for sr in servicerecords:
-            self.cmb_sr.addItem(sr["Display"], sr["ServiceRecordId"])
+        # Tüm kayıtları yüklemek yerine sunucuda arama (sadece açık bakiyeli kayıtlar)
+        self.sr_picker = SearchPicker(
+            search_records, _record_text,
+            placeholder="Patient name, TCNo, #RecordId or YYYY-MM-DD",
+        )
+        self.sr_picker.selectionChanged.connect(self._on_record_selected)
 
         self.cmb_pt = QComboBox()
         for pt in payment_types:
@@ -36,7 +45,7 @@ class PaymentDialog(QDialog):
         self.payer = QLineEdit()
         self.payer.setPlaceholderText("Patient / Relative / Insurance / etc.")
 
-        form.addRow("ServiceRecord", self.cmb_sr)
+        form.addRow("ServiceRecord", self.sr_picker)
         form.addRow("PaymentType", self.cmb_pt)
         form.addRow("PaymentDate", self.dt)
         form.addRow("Amount", self.amount)
@@ -55,7 +64,15 @@ class PaymentDialog(QDialog):
         layout.addLayout(btns)
         self.setLayout(layout)
 
+    def _on_record_selected(self, row):
+        # Varsayılan tutar: kalan borç
+        if row is not None and row["OutstandingAmount"] is not None:
+            self.amount.setValue(float(row["OutstandingAmount"]))
+
     def _validate(self):
+        if self.sr_picker.selected_row() is None:
+            QMessageBox.warning(self, "Error", "Select a ServiceRecord.")
+            return
         if self.amount.value() <= 0:
             QMessageBox.warning(self, "Error", "Amount must be > 0.")
             return
@@ -66,7 +83,7 @@ class PaymentDialog(QDialog):
 
     def get_data(self):
         return {
-            "ServiceRecordId": int(self.cmb_sr.currentData()),
+            "ServiceRecordId": int(self.sr_picker.selected_row()["ServiceRecordId"]),
             "PaymentTypeId": int(self.cmb_pt.currentData()),
             "PaymentDate": self.dt.date().toString("yyyy-MM-dd"),
             "Amount": float(self.amount.value()),
@@ -3,16 +3,21 @@ from PyQt6.QtWidgets import (
     QTabWidget, QTableWidget, QTableWidgetItem, QMessageBox
 )
 from PyQt6.QtCore import Qt
-from sqlalchemy import text
-from db import get_engine
+from services import definitions, duplicates, reservations
+from services import patients as patient_service
+from services.base import ConcurrencyConflict, ServiceError
+from services.reservations import ReservationConflict
 
 from ui.patient_dialog import PatientDialog
+from ui.duplicates_dialog import DuplicateClustersDialog
 from ui.reservation_dialog import ReservationDialog
-
-engine = get_engine()
+from ui.export_runner import export_source
+from ui import bulk
+from ui.conflict import show_conflict
+from ui.patient_timeline import PatientTimelineWidget
 
 class ReceptionistWindow(QMainWindow):
-    def __init__(self, session, on_logout):
+    def __init__(self, session, on_logout, prefetched=None):
         super().__init__()
         self.session = session
         self.on_logout = on_logout
@@ -34,14 +39,27 @@ class ReceptionistWindow(QMainWindow):
         self.tabs.addTab(self._build_patients_tab(), "Patients")
         self.tabs.addTab(self._build_reservations_tab(), "Reservations")
         self.tabs.addTab(self._build_availability_tab(), "Room Availability")
+        self.timeline = PatientTimelineWidget(self._search_patients)
+        self.tabs.addTab(self.timeline, "Patient Timeline")
         layout.addWidget(self.tabs)
 
         root.setLayout(layout)
         self.setCentralWidget(root)
 
-        self.refresh_patients()
-        self.refresh_reservations()
-        self.refresh_availability()
+        # Login sırasında prefetch edildiyse tekrar sorgulama
+        prefetched = prefetched or {}
+        if "patients" in prefetched:
+            self._render_patients(prefetched["patients"])
+        else:
+            self.refresh_patients()
+        if "reservations" in prefetched:
+            self._render_reservations(prefetched["reservations"])
+        else:
+            self.refresh_reservations()
+        if "availability" in prefetched:
+            self._render_availability(prefetched["availability"])
+        else:
+            self.refresh_availability()
 
     def _logout(self):
         self.close()
@@ -56,16 +74,21 @@ class ReceptionistWindow(QMainWindow):
         self.btn_p_refresh = QPushButton("Refresh")
         self.btn_p_add = QPushButton("Add Patient")
         self.btn_p_edit = QPushButton("Edit Selected")
-        self.btn_p_toggle = QPushButton("Toggle Active")
+        self.btn_p_toggle = QPushButton("Toggle Active (Selected)")
         self.btn_p_delete = QPushButton("Delete (Hard)")
+        self.btn_p_export = QPushButton("Export...")
+        self.btn_p_dupes = QPushButton("Find Duplicates")
 
         self.btn_p_refresh.clicked.connect(self.refresh_patients)
         self.btn_p_add.clicked.connect(self.add_patient)
         self.btn_p_edit.clicked.connect(self.edit_patient)
         self.btn_p_toggle.clicked.connect(self.toggle_patient_active)
         self.btn_p_delete.clicked.connect(self.delete_patient_hard)
+        self.btn_p_export.clicked.connect(lambda: export_source(self, "patients"))
+        self.btn_p_dupes.clicked.connect(lambda: DuplicateClustersDialog(duplicates.find_clusters, parent=self).exec())
 
-        for b in [self.btn_p_refresh, self.btn_p_add, self.btn_p_edit, self.btn_p_toggle, self.btn_p_delete]:
+        for b in [self.btn_p_refresh, self.btn_p_add, self.btn_p_edit, self.btn_p_toggle, self.btn_p_delete,
+                  self.btn_p_export, self.btn_p_dupes]:
             btns.addWidget(b)
         btns.addStretch(1)
         layout.addLayout(btns)
@@ -84,16 +107,9 @@ class ReceptionistWindow(QMainWindow):
         return w
 
     def refresh_patients(self):
-        q = text("""
-            SELECT PatientId, FirstName, LastName, TCNo,
-                CAST(BirthDate AS date) AS BirthDate,
-                Gender, Phone, Email, Address, IsActive
-            FROM Patient
-            ORDER BY PatientId
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
+        self._render_patients(patient_service.list_patients())
 
+    def _render_patients(self, rows):
         self.tbl_patients.setRowCount(0)
         for r in rows:
             i = self.tbl_patients.rowCount()
@@ -109,6 +125,7 @@ class ReceptionistWindow(QMainWindow):
             self._put(self.tbl_patients, i, 7, r.get("Email"))
             self._put(self.tbl_patients, i, 8, r.get("Address"))
             self._put(self.tbl_patients, i, 9, 1 if r["IsActive"] else 0, True)
+            self.tbl_patients.item(i, 0).setData(Qt.ItemDataRole.UserRole, dict(r))
 
         self.tbl_patients.resizeColumnsToContents()
 
@@ -136,31 +153,18 @@ class ReceptionistWindow(QMainWindow):
             "IsActive": (get(9).strip().lower() in ("1", "true", "yes")),
         }
 
+    def _selected_patient_ids(self) -> list[int]:
+        return bulk.selected_ids(self.tbl_patients)
+
 
     def add_patient(self):
-        dlg = PatientDialog(parent=self)
+        dlg = PatientDialog(parent=self, find_duplicates=duplicates.find_duplicates)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            INSERT INTO Patient
-            (FirstName, LastName, TCNo, BirthDate, Gender, Phone, Email, Address, IsActive)
-            VALUES (:fn, :ln, :tc, :bd, :g, :ph, :em, :ad, :act)
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "fn": data["FirstName"],
-                    "ln": data["LastName"],
-                    "tc": data["TCNo"],
-                    "bd": data["BirthDate"],
-                    "g": data["Gender"],
-                    "ph": data["Phone"],
-                    "em": data["Email"],
-                    "ad": data["Address"],
-                    "act": data["IsActive"],
-                })
+            patient_service.add_patient(data)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -175,31 +179,18 @@ class ReceptionistWindow(QMainWindow):
             QMessageBox.information(self, "Info", "Select a patient first.")
             return
 
-        dlg = PatientDialog(initial=selected, parent=self)
+        original = bulk.selected_row_data(self.tbl_patients)
+        dlg = PatientDialog(initial=selected, parent=self, find_duplicates=duplicates.find_duplicates)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            UPDATE Patient
-            SET FirstName=:fn, LastName=:ln, TCNo=:tc, BirthDate=:bd, Gender=:g,
-                Phone=:ph, Email=:em, Address=:ad, IsActive=:act
-            WHERE PatientId=:id
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "id": selected["PatientId"],
-                    "fn": data["FirstName"],
-                    "ln": data["LastName"],
-                    "tc": data["TCNo"],
-                    "bd": data["BirthDate"],
-                    "g": data["Gender"],
-                    "ph": data["Phone"],
-                    "em": data["Email"],
-                    "ad": data["Address"],
-                    "act": data["IsActive"],
-                })
+            patient_service.update_patient(selected["PatientId"], data, original=original)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh_patients()
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
@@ -209,41 +200,38 @@ class ReceptionistWindow(QMainWindow):
 
 
     def toggle_patient_active(self):
-        selected = self._selected_patient()
-        if not selected:
+        ids = self._selected_patient_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a patient first.")
             return
 
-        new_val = 0 if selected["IsActive"] else 1
-        q = text("UPDATE Patient SET IsActive=:a WHERE PatientId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"a": new_val, "id": selected["PatientId"]})
+            result = patient_service.toggle_active(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Toggle failed:\n{e}")
             return
         self.refresh_patients()
+        bulk.report(self, "Toggle Active", ids, result)
 
     def delete_patient_hard(self):
-        selected = self._selected_patient()
-        if not selected:
+        ids = self._selected_patient_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a patient first.")
             return
         ok = QMessageBox.question(
             self, "Confirm Delete",
-            f"Hard delete PatientId={selected['PatientId']}?\nFK varsa hata verebilir.",
+            f"Hard delete {bulk.describe(ids, 'PatientId')}?\nFK varsa hata verebilir.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if ok != QMessageBox.StandardButton.Yes:
             return
-        q = text("DELETE FROM Patient WHERE PatientId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": selected["PatientId"]})
+            result = patient_service.delete_patients(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
         self.refresh_patients()
+        bulk.report(self, "Delete", ids, result)
 
     # ---------------- RESERVATIONS TAB ----------------
     def _build_reservations_tab(self):
@@ -256,14 +244,17 @@ class ReceptionistWindow(QMainWindow):
         self.btn_r_edit = QPushButton("Edit Selected")
         self.btn_r_cancel = QPushButton("Cancel Selected")
         self.btn_r_delete = QPushButton("Delete (Hard)")
+        self.btn_r_export = QPushButton("Export...")
 
         self.btn_r_refresh.clicked.connect(self.refresh_reservations)
         self.btn_r_add.clicked.connect(self.add_reservation)
         self.btn_r_edit.clicked.connect(self.edit_reservation)
         self.btn_r_cancel.clicked.connect(self.cancel_reservation)
         self.btn_r_delete.clicked.connect(self.delete_reservation_hard)
+        self.btn_r_export.clicked.connect(lambda: export_source(self, "reservations"))
 
-        for b in [self.btn_r_refresh, self.btn_r_add, self.btn_r_edit, self.btn_r_cancel, self.btn_r_delete]:
+        for b in [self.btn_r_refresh, self.btn_r_add, self.btn_r_edit, self.btn_r_cancel, self.btn_r_delete,
+                  self.btn_r_export]:
             btns.addWidget(b)
         btns.addStretch(1)
         layout.addLayout(btns)
@@ -282,49 +273,18 @@ class ReceptionistWindow(QMainWindow):
 
     def _load_statuses(self):
         # ReservationStatus tablon farklı isimliyse burada düzeltiriz.
-        q = text("SELECT StatusId, StatusName FROM ReservationStatus ORDER BY StatusId")
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
-
-    def _load_patients_for_combo(self):
-        q = text("""
-            SELECT PatientId, (FirstName + ' ' + LastName) AS FullName
-            FROM Patient
-            WHERE IsActive = 1 OR IsActive IS NULL
-            ORDER BY PatientId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_statuses()
+
+    def _search_patients(self, term):
+        return patient_service.search_patients(term)
 
     def _load_rooms_for_combo(self):
-        q = text("""
-            SELECT r.RoomId,
-                   ('RoomId=' + CAST(r.RoomId AS varchar(20))) AS Display
-            FROM Room r
-            WHERE r.IsActive = 1 OR r.IsActive IS NULL
-            ORDER BY r.RoomId
-        """)
-        with engine.connect() as conn:
-            return list(conn.execute(q).mappings().all())
+        return definitions.list_rooms_for_combo()
 
     def refresh_reservations(self):
-        q = text("""
-            SELECT res.ReservationId,
-                   res.PatientId,
-                   (p.FirstName + ' ' + p.LastName) AS PatientName,
-                   res.RoomId,
-                   CAST(res.StartDate AS date) AS StartDate,
-                   CAST(res.EndDate AS date) AS EndDate,
-                   res.StatusId,
-                   st.StatusName
-            FROM Reservation res
-            JOIN Patient p ON p.PatientId = res.PatientId
-            JOIN ReservationStatus st ON st.StatusId = res.StatusId
-            ORDER BY res.ReservationId DESC
-        """)
-        with engine.connect() as conn:
-            rows = list(conn.execute(q).mappings().all())
+        self._render_reservations(reservations.list_reservations())
 
+    def _render_reservations(self, rows):
         self.tbl_res.setRowCount(0)
         for r in rows:
             i = self.tbl_res.rowCount()
@@ -337,6 +297,7 @@ class ReceptionistWindow(QMainWindow):
             self._put(self.tbl_res, i, 5, str(r["EndDate"]))
             self._put(self.tbl_res, i, 6, r["StatusId"], True)
             self._put(self.tbl_res, i, 7, r["StatusName"])
+            self.tbl_res.item(i, 0).setData(Qt.ItemDataRole.UserRole, dict(r))
 
         self.tbl_res.resizeColumnsToContents()
 
@@ -352,57 +313,29 @@ class ReceptionistWindow(QMainWindow):
             "ReservationId": int(get(0)),
             "PatientId": int(get(1)),
             "RoomId": int(get(3)),
+            "StartDate": get(4),
+            "EndDate": get(5),
             "StatusId": int(get(6)),
         }
 
+    def _selected_reservation_ids(self) -> list[int]:
+        return bulk.selected_ids(self.tbl_res)
+
     def add_reservation(self):
-        patients = self._load_patients_for_combo()
         rooms = self._load_rooms_for_combo()
         statuses = self._load_statuses()
 
-        dlg = ReservationDialog(patients=patients, rooms=rooms, statuses=statuses, parent=self)
+        dlg = ReservationDialog(search_patients=self._search_patients, rooms=rooms, statuses=statuses, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        # Çakışma kontrolü (aynı oda, tarih aralığı overlap)
-        overlap_q = text("""
-            SELECT COUNT(1)
-            FROM Reservation
-            WHERE RoomId = :room
-              AND StatusId <> :cancel
-              AND NOT (EndDate <= :start OR StartDate >= :end)
-        """)
-        # Cancel status id bilinmiyorsa 0 verip devre dışı kalır; idealde "Cancelled" id’sini buluruz.
-        cancel_id = next((s["StatusId"] for s in statuses if str(s["StatusName"]).lower().startswith("cancel")), 0)
-
-        with engine.connect() as conn:
-            cnt = int(conn.execute(overlap_q, {
-                "room": data["RoomId"],
-                "cancel": cancel_id,
-                "start": data["StartDate"],
-                "end": data["EndDate"],
-            }).scalar() or 0)
-
-        if cnt > 0:
+        # Çakışma kontrolü (aynı oda, tarih aralığı overlap) servis içinde, aynı transaction'da yapılır.
+        try:
+            reservations.add_reservation(data, self.session["staff_id"])
+        except ReservationConflict:
             QMessageBox.warning(self, "Not Available", "Selected room is not available for that date range.")
             return
-
-        q = text("""
-                INSERT INTO Reservation
-                (PatientId, RoomId, CreatedByStaffId, StatusId, StartDate, EndDate, CreatedDate)
-                VALUES (:pid, :rid, :cb, :sid, :sd, :ed, CAST(GETDATE() AS date))
-            """)
-        try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "pid": data["PatientId"],
-                    "rid": data["RoomId"],
-                    "cb": self.session["staff_id"],
-                    "sid": data["StatusId"],
-                    "sd": data["StartDate"],
-                    "ed": data["EndDate"],
-                })
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Insert failed:\n{e}")
             return
@@ -416,30 +349,22 @@ class ReceptionistWindow(QMainWindow):
             QMessageBox.information(self, "Info", "Select a reservation first.")
             return
 
-        patients = self._load_patients_for_combo()
+        original = bulk.selected_row_data(self.tbl_res)
         rooms = self._load_rooms_for_combo()
         statuses = self._load_statuses()
 
-        dlg = ReservationDialog(patients=patients, rooms=rooms, statuses=statuses, initial=selected, parent=self)
+        dlg = ReservationDialog(search_patients=self._search_patients, rooms=rooms, statuses=statuses,
+                                initial=selected, parent=self)
         if dlg.exec() != dlg.DialogCode.Accepted:
             return
         data = dlg.get_data()
 
-        q = text("""
-            UPDATE Reservation
-            SET PatientId=:pid, RoomId=:rid, StartDate=:sd, EndDate=:ed, StatusId=:sid
-            WHERE ReservationId=:id
-        """)
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {
-                    "id": selected["ReservationId"],
-                    "pid": data["PatientId"],
-                    "rid": data["RoomId"],
-                    "sd": data["StartDate"],
-                    "ed": data["EndDate"],
-                    "sid": data["StatusId"],
-                })
+            reservations.update_reservation(selected["ReservationId"], data, original=original)
+        except ConcurrencyConflict as e:
+            show_conflict(self, e, data)
+            self.refresh_reservations()
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Update failed:\n{e}")
             return
@@ -448,51 +373,53 @@ class ReceptionistWindow(QMainWindow):
         self.refresh_availability()
 
     def cancel_reservation(self):
-        selected = self._selected_reservation()
-        if not selected:
+        ids = self._selected_reservation_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a reservation first.")
             return
+        if len(ids) > 1:
+            ok = QMessageBox.question(
+                self, "Confirm Cancel", f"Cancel {bulk.describe(ids, 'ReservationId')}?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if ok != QMessageBox.StandardButton.Yes:
+                return
 
-        statuses = self._load_statuses()
-        cancel_id = next((s["StatusId"] for s in statuses if str(s["StatusName"]).lower().startswith("cancel")), None)
-        if cancel_id is None:
-            QMessageBox.warning(self, "Error", "No 'Cancelled' status found in ReservationStatus.")
-            return
-
-        q = text("UPDATE Reservation SET StatusId=:sid WHERE ReservationId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"sid": cancel_id, "id": selected["ReservationId"]})
+            result = reservations.cancel_reservations(ids)
+        except ServiceError as e:
+            QMessageBox.warning(self, "Error", str(e))
+            return
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Cancel failed:\n{e}")
             return
 
         self.refresh_reservations()
         self.refresh_availability()
+        bulk.report(self, "Cancel", ids, result)
 
     def delete_reservation_hard(self):
-        selected = self._selected_reservation()
-        if not selected:
+        ids = self._selected_reservation_ids()
+        if not ids:
             QMessageBox.information(self, "Info", "Select a reservation first.")
             return
         ok = QMessageBox.question(
             self, "Confirm Delete",
-            f"Hard delete ReservationId={selected['ReservationId']}?\nFK varsa hata verebilir.",
+            f"Hard delete {bulk.describe(ids, 'ReservationId')}?\nFK varsa hata verebilir.",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
         )
         if ok != QMessageBox.StandardButton.Yes:
             return
 
-        q = text("DELETE FROM Reservation WHERE ReservationId=:id")
         try:
-            with engine.begin() as conn:
-                conn.execute(q, {"id": selected["ReservationId"]})
+            result = reservations.delete_reservations(ids)
         except Exception as e:
             QMessageBox.critical(self, "DB Error", f"Delete failed:\n{e}")
             return
 
         self.refresh_reservations()
         self.refresh_availability()
+        bulk.report(self, "Delete", ids, result)
 
     # ---------------- AVAILABILITY TAB ----------------
     def _build_availability_tab(self):
@@ -517,26 +444,15 @@ class ReceptionistWindow(QMainWindow):
         return w
 
     def refresh_availability(self):
-        # Basit özet tablo (doluluk/rezerv sayısı)
-        q = text("""
-            SELECT r.RoomId,
-                   COUNT(res.ReservationId) AS TotalReservations,
-                   SUM(CASE WHEN st.StatusName NOT LIKE 'Cancel%' THEN 1 ELSE 0 END) AS ActiveReservations,
-                   MAX(CAST(res.EndDate AS date)) AS LastReservationEnd
-            FROM Room r
-            LEFT JOIN Reservation res ON res.RoomId = r.RoomId
-            LEFT JOIN ReservationStatus st ON st.StatusId = res.StatusId
-            GROUP BY r.RoomId
-            ORDER BY r.RoomId
-        """)
         try:
-            with engine.connect() as conn:
-                rows = list(conn.execute(q).mappings().all())
+            rows = reservations.list_availability()
         except Exception as e:
             # Şema farklıysa burada yakalarız.
             QMessageBox.critical(self, "DB Error", f"Availability query failed:\n{e}")
             return
+        self._render_availability(rows)
 
+    def _render_availability(self, rows):
         self.tbl_av.setRowCount(0)
         for r in rows:
             i = self.tbl_av.rowCount()
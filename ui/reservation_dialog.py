@@ -4,13 +4,15 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import QDate
 
+from ui.patient_picker import PatientPicker
+
 class ReservationDialog(QDialog):
     """
-    patients: [{PatientId, FullName}]
+    search_patients(term) -> [{PatientId, FullName, TCNo, BirthDate}]
     rooms: [{RoomId, Display}]
     statuses: [{StatusId, StatusName}]
     """
-    def __init__(self, patients, rooms, statuses, initial=None, parent=None):
+    def __init__(self, search_patients, rooms, statuses, initial=None, parent=None):
         super().__init__(parent)
         self.initial = initial or {}
         self.setWindowTitle("Add Reservation" if not initial else "Edit Reservation")
@@ -19,9 +21,7 @@ class ReservationDialog(QDialog):
         layout = QVBoxLayout()
         form = QFormLayout()
 
-        self.cmb_patient = QComboBox()
-        for p in patients:
-            self.cmb_patient.addItem(f"{p['PatientId']} - {p['FullName']}", p["PatientId"])
+        self.patient_picker = PatientPicker(search_patients, patient_id=self.initial.get("PatientId"))
 
         self.cmb_room = QComboBox()
         for r in rooms:
@@ -39,7 +39,7 @@ class ReservationDialog(QDialog):
         self.dt_end.setCalendarPopup(True)
         self.dt_end.setDate(QDate.currentDate().addDays(1))
 
-        form.addRow("Patient", self.cmb_patient)
+        form.addRow("Patient", self.patient_picker)
         form.addRow("Room", self.cmb_room)
         form.addRow("StartDate", self.dt_start)
         form.addRow("EndDate", self.dt_end)
@@ -63,13 +63,9 @@ class ReservationDialog(QDialog):
         if not self.initial:
             return
 
-        # initial: PatientId/RoomId/StatusId + StartDate/EndDate (date string olabilir)
-        pid = self.initial.get("PatientId")
+        # initial: RoomId/StatusId + StartDate/EndDate (date string olabilir); hasta picker'da seçili gelir
         rid = self.initial.get("RoomId")
         sid = self.initial.get("StatusId")
-        if pid is not None:
-            i = self.cmb_patient.findData(pid)
-            if i >= 0: self.cmb_patient.setCurrentIndex(i)
         if rid is not None:
             i = self.cmb_room.findData(rid)
             if i >= 0: self.cmb_room.setCurrentIndex(i)
@@ -77,10 +73,16 @@ class ReservationDialog(QDialog):
             i = self.cmb_status.findData(sid)
             if i >= 0: self.cmb_status.setCurrentIndex(i)
 
-        # PyQt QDate'e çevirmek zor; burada edit ekranında tarihleri değiştirmeyi zorunlu yapmıyoruz.
-        # İstersen sonra parsing ekleriz.
+        # Tarihler de yüklenir: aksi halde düzenlemede bugüne dönüp "değişmiş" sayılırlar
+        for dt, key in [(self.dt_start, "StartDate"), (self.dt_end, "EndDate")]:
+            d = QDate.fromString(str(self.initial.get(key) or "")[:10], "yyyy-MM-dd")
+            if d.isValid():
+                dt.setDate(d)
 
     def _validate(self):
+        if self.patient_picker.patient_id() is None:
+            QMessageBox.warning(self, "Error", "Select a patient.")
+            return
         if self.dt_end.date() <= self.dt_start.date():
             QMessageBox.warning(self, "Error", "EndDate must be after StartDate.")
             return
@@ -88,7 +90,7 @@ class ReservationDialog(QDialog):
 
     def get_data(self):
         return {
-            "PatientId": int(self.cmb_patient.currentData()),
+            "PatientId": self.patient_picker.patient_id(),
             "RoomId": int(self.cmb_room.currentData()),
             "StatusId": int(self.cmb_status.currentData()),
             "StartDate": self.dt_start.date().toString("yyyy-MM-dd"),
@@ -0,0 +1,100 @@
+# ui/search_picker.py
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLineEdit, QListWidget, QListWidgetItem, QLabel
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search")
+
+class SearchPicker(QWidget):
+    """
+    Type-ahead picker backed by a server-side TOP-N search.
+
+    search_fn(term) -> rows runs on a background thread after the user stops
+    typing for `debounce_ms`; results of an older term are dropped.
+    display_fn(row) -> str is the list text. selected_row() returns the row.
+    initial_text is searched right away (e.g. '#12' to preselect a record).
+    """
+    selectionChanged = pyqtSignal(object)
+
+    def __init__(self, search_fn, display_fn, placeholder: str = "", debounce_ms: int = 250,
+                 initial_text: str = "", parent=None):
+        super().__init__(parent)
+        self.search_fn = search_fn
+        self.display_fn = display_fn
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        self.edit = QLineEdit()
+        self.edit.setPlaceholderText(placeholder)
+        self.edit.setClearButtonEnabled(True)
+        self.edit.setText(initial_text)
+        self.list = QListWidget()
+        self.list.setMinimumHeight(140)
+        self.lbl_status = QLabel("")
+
+        layout.addWidget(self.edit)
+        layout.addWidget(self.list)
+        layout.addWidget(self.lbl_status)
+        self.setLayout(layout)
+
+        self._debounce = QTimer(self)
+        self._debounce.setSingleShot(True)
+        self._debounce.setInterval(debounce_ms)
+        self._debounce.timeout.connect(self._start_search)
+
+        self._poll = QTimer(self)
+        self._poll.setInterval(20)
+        self._poll.timeout.connect(self._check_result)
+
+        self._future = None
+        self._future_term = None
+        self._pending_term = None
+
+        self.edit.textChanged.connect(lambda _: self._debounce.start())
+        self.list.currentItemChanged.connect(lambda *_: self.selectionChanged.emit(self.selected_row()))
+
+        self._start_search()
+
+    def _start_search(self):
+        term = self.edit.text().strip()
+        if self._future is not None and not self._future.done():
+            # Önceki arama bitince en son terimle tekrar aranır
+            self._pending_term = term
+            return
+        self._pending_term = None
+        self.lbl_status.setText("Searching...")
+        self._future = _executor.submit(self.search_fn, term)
+        self._future_term = term
+        self._poll.start()
+
+    def _check_result(self):
+        if self._future is None or not self._future.done():
+            return
+        self._poll.stop()
+        fut, self._future = self._future, None
+
+        if self._pending_term is not None and self._pending_term != self._future_term:
+            self._start_search()
+            return
+        try:
+            rows = fut.result()
+        except Exception as e:
+            self.lbl_status.setText(f"Search failed: {e}")
+            return
+        self._render(rows)
+
+    def _render(self, rows):
+        self.list.clear()
+        for r in rows:
+            item = QListWidgetItem(self.display_fn(r))
+            item.setData(Qt.ItemDataRole.UserRole, r)
+            self.list.addItem(item)
+        if rows:
+            self.list.setCurrentRow(0)
+        self.lbl_status.setText(f"{len(rows)} match(es)" if rows else "No match")
+
+    def selected_row(self):
+        item = self.list.currentItem()
+        return item.data(Qt.ItemDataRole.UserRole) if item else None
@@ -3,15 +3,17 @@ from PyQt6.QtWidgets import (
     QDoubleSpinBox, QPushButton, QHBoxLayout, QMessageBox, QLabel
 )
 from PyQt6.QtCore import QDate
+from services.service_records import compute_coverage
+from ui.patient_picker import PatientPicker
 
 class ServiceRecordDialog(QDialog):
     """
-    patients: [{PatientId, FullName}]
+    search_patients(term) -> [{PatientId, FullName, TCNo, BirthDate}]
     services: [{ServiceId, ServiceName, BasePrice}]
     programs: [{ProgramId, ProgramName, CoverageRate}]
     initial: dict or None
     """
-    def __init__(self, patients, services, programs, initial=None, parent=None):
+    def __init__(self, search_patients, services, programs, initial=None, parent=None):
         super().__init__(parent)
         self.initial = initial or {}
         self.services = services
@@ -23,9 +25,7 @@ class ServiceRecordDialog(QDialog):
         layout = QVBoxLayout()
         form = QFormLayout()
 
-        self.cmb_patient = QComboBox()
-        for p in patients:
-            self.cmb_patient.addItem(f"{p['PatientId']} - {p['FullName']}", p["PatientId"])
+        self.patient_picker = PatientPicker(search_patients, patient_id=self.initial.get("PatientId"))
 
         self.cmb_service = QComboBox()
         for s in services:
@@ -62,7 +62,7 @@ class ServiceRecordDialog(QDialog):
         self.cmb_program.currentIndexChanged.connect(self._recalc)
         self.total.valueChanged.connect(self._recalc)
 
-        form.addRow("Patient", self.cmb_patient)
+        form.addRow("Patient", self.patient_picker)
         form.addRow("Service", self.cmb_service)
         form.addRow("Program", self.cmb_program)
         form.addRow("ServiceDate", self.dt)
@@ -127,14 +127,12 @@ class ServiceRecordDialog(QDialog):
             return
 
         pr = self._find_program(int(pid))
-        rate = float(pr["CoverageRate"] or 0) if pr else 0.0
+        rate = pr["CoverageRate"] if pr else 0
 
-        total = float(self.total.value())
-        covered = total * rate
-        payable = total - covered
+        covered, payable = compute_coverage(round(self.total.value(), 2), rate)
 
-        self.covered.setValue(round(covered, 2))
-        self.payable.setValue(round(payable, 2))
+        self.covered.setValue(float(covered))
+        self.payable.setValue(float(payable))
 
     def _load_initial_or_defaults(self):
         if not self.initial:
@@ -143,7 +141,7 @@ class ServiceRecordDialog(QDialog):
             return
 
         # initial select
-        for (cmb, key) in [(self.cmb_patient, "PatientId"), (self.cmb_service, "ServiceId"), (self.cmb_program, "ProgramId")]:
+        for (cmb, key) in [(self.cmb_service, "ServiceId"), (self.cmb_program, "ProgramId")]:
             v = self.initial.get(key)
             if v is not None:
                 idx = cmb.findData(int(v))
@@ -156,10 +154,15 @@ class ServiceRecordDialog(QDialog):
         except Exception:
             self.total.setValue(0)
 
-        # date parsing: basitçe bugün bırakıyoruz; istersen sonra parse ederiz
+        d = QDate.fromString(str(self.initial.get("ServiceDate") or "")[:10], "yyyy-MM-dd")
+        if d.isValid():
+            self.dt.setDate(d)
         self._recalc()
 
     def _validate(self):
+        if self.patient_picker.patient_id() is None:
+            QMessageBox.warning(self, "Error", "Select a patient.")
+            return
         if self.total.value() <= 0:
             QMessageBox.warning(self, "Error", "TotalPrice must be > 0.")
             return
@@ -167,7 +170,7 @@ class ServiceRecordDialog(QDialog):
 
     def get_data(self):
         return {
-            "PatientId": int(self.cmb_patient.currentData()),
+            "PatientId": self.patient_picker.patient_id(),
             "ServiceId": int(self.cmb_service.currentData()),
             "ProgramId": int(self.cmb_program.currentData()),
             "ServiceDate": self.dt.date().toString("yyyy-MM-dd"),
@@ -4,20 +4,21 @@ from PyQt6.QtWidgets import (
     QCheckBox, QPushButton, QHBoxLayout, QMessageBox
 )
 
+from ui.patient_picker import PatientPicker
+
 class UserDialog(QDialog):
     """
     mode: "add" | "edit"
     roles: list[{"RoleId": int, "RoleName": str}]
     staff_list: list[{"StaffId": int, "FullName": str, "Title": str}]
-    patient_list: list[{"PatientId": int, "FullName": str}]
+    search_patients(term) -> list[{"PatientId": int, "FullName": str, ...}]
     initial: dict or None
     """
-    def __init__(self, mode, roles, staff_list, patient_list, initial=None, parent=None):
+    def __init__(self, mode, roles, staff_list, search_patients, initial=None, parent=None):
         super().__init__(parent)
         self.mode = mode
         self.roles = roles
         self.staff_list = staff_list
-        self.patient_list = patient_list
         self.initial = initial or {}
 
         # roleId -> roleName map
@@ -44,12 +45,8 @@ class UserDialog(QDialog):
             label = f"{s['StaffId']} - {s['FullName']} ({s['Title']})"
             self.cmb_staff.addItem(label, s["StaffId"])
 
-        # Patient combobox (None option)
-        self.cmb_patient = QComboBox()
-        self.cmb_patient.addItem("None", None)
-        for p in patient_list:
-            label = f"{p['PatientId']} - {p['FullName']}"
-            self.cmb_patient.addItem(label, p["PatientId"])
+        # Patient arama (sadece Patient rolünde kullanılır)
+        self.patient_picker = PatientPicker(search_patients, patient_id=self.initial.get("PatientId"))
 
         self.chk_active = QCheckBox("IsActive")
 
@@ -57,7 +54,7 @@ class UserDialog(QDialog):
         self.form.addRow("Password", self.txt_password)  # edit modunda boş bırakılırsa değişmez
         self.form.addRow("Role", self.cmb_role)
         self.form.addRow("Staff", self.cmb_staff)
-        self.form.addRow("Patient", self.cmb_patient)
+        self.form.addRow("Patient", self.patient_picker)
         self.form.addRow("", self.chk_active)
 
         layout.addLayout(self.form)
@@ -103,23 +100,21 @@ class UserDialog(QDialog):
 
         if not has_patient_role:
             # Projede hasta login yok: tamamen gizle
-            self._set_row_visible(self.cmb_patient, False)
-            self.cmb_patient.setCurrentIndex(0)
-            self.cmb_patient.setEnabled(False)
+            self._set_row_visible(self.patient_picker, False)
+            self.patient_picker.setEnabled(False)
         else:
             # hasta rolü varsa görünür kalsın, role'a göre enable/disable
-            self._set_row_visible(self.cmb_patient, True)
+            self._set_row_visible(self.patient_picker, True)
 
         if role_name == "patient":
             # Patient user
-            self.cmb_patient.setEnabled(True)
+            self.patient_picker.setEnabled(True)
             self.cmb_staff.setEnabled(False)
             self.cmb_staff.setCurrentIndex(0)
         else:
             # Staff user (Admin/Doctor/Receptionist)
             self.cmb_staff.setEnabled(True)
-            self.cmb_patient.setEnabled(False)
-            self.cmb_patient.setCurrentIndex(0)
+            self.patient_picker.setEnabled(False)
 
     def _load_initial(self):
         if self.mode == "add":
@@ -139,11 +134,6 @@ class UserDialog(QDialog):
         if idx >= 0:
             self.cmb_staff.setCurrentIndex(idx)
 
-        patient_id = self.initial.get("PatientId", None)
-        idx = self.cmb_patient.findData(patient_id)
-        if idx >= 0:
-            self.cmb_patient.setCurrentIndex(idx)
-
         self.chk_active.setChecked(bool(self.initial.get("IsActive", True)))
 
     def _validate(self):
@@ -159,7 +149,7 @@ class UserDialog(QDialog):
         role_name = self._role_name().lower().strip()
 
         staff_id = self.cmb_staff.currentData()
-        patient_id = self.cmb_patient.currentData()
+        patient_id = self.patient_picker.patient_id()
 
         # Role-based required checks
         if role_name == "patient":
@@ -182,7 +172,7 @@ class UserDialog(QDialog):
         role_name = self.role_map.get(role_id, "").lower().strip()
 
         staff_id = self.cmb_staff.currentData()
-        patient_id = self.cmb_patient.currentData()
+        patient_id = self.patient_picker.patient_id()
 
         # Force correct linkage
         if role_name == "patient":